@@ -8,4 +8,7 @@ SRC_PATH = os.path.join(os.getcwd(), 'src')
 EXECUTOR_PATH = os.path.join(SRC_PATH, 'aceinna', 'executor.py')
 
 sys.path.append('./src')
-runpy.run_path(EXECUTOR_PATH, run_name='__main__')
+
+# worker processes import this file, only the main process runs executor
+if __name__ == '__main__':
+    runpy.run_path(EXECUTOR_PATH, run_name='__main__')
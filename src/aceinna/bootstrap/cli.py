@@ -11,6 +11,8 @@ import psutil
 from ..models import WebserverArgs
 
 from ..core.driver import (Driver, DriverEvents)
+from ..core.multi_driver import (MultiDriver, parse_device_ports)
+from ..core.fleet_upgrade import FleetUpgradeStatus
 from ..core.device_context import DeviceContext
 from ..core.tunnel_web import WebServer
 from ..core.tunnel_base import TunnelEvents
@@ -31,6 +33,19 @@ class CommandLine:
     supported_commands = []
     input_string = None
     current_command = None
+    # commands of multi-device mode, device is selected by id
+    multi_device_commands = [
+        {'name': 'devices', 'function': 'devices_handler',
+         'description': 'List devices'},
+        {'name': 'select', 'function': 'select_handler',
+         'description': 'Select device by id, such as select COM3'},
+        {'name': 'fleet_upgrade', 'function': 'fleet_upgrade_handler',
+         'description': 'Upgrade firmware of devices at the same time'}
+    ]
+    common_commands = [
+        {'name': 'statistics', 'function': 'statistics_handler',
+         'description': 'Show statistics of output packets'}
+    ]
 
     def __init__(self, **kwargs):
         self._build_options(**kwargs)
@@ -51,42 +66,70 @@ class CommandLine:
         # prepage logger
         self._prepare_logger()
 
-    def handle_discovered(self, device_provider):
+    def handle_discovered(self, device_provider, device_id=None):
         device_context = DeviceContext(device_provider)
-        APP_CONTEXT.device_context = device_context
+        if device_id is None:
+            APP_CONTEXT.device_context = device_context
+        else:
+            APP_CONTEXT.set_device_context(device_id, device_context)
 
         if self._tunnel:
-            self._tunnel.notify('discovered')
+            self._tunnel.notify('discovered', device_id)
 
-    def handle_lost(self):
+    def handle_lost(self, device_id=None):
         if self._tunnel:
-            self._tunnel.notify('lost')
+            self._tunnel.notify('lost', device_id)
 
-    def handle_upgrade_finished(self):
+    def handle_upgrade_finished(self, device_id=None):
         if self._tunnel:
             self._tunnel.notify(
-                'continous', 'upgrade_complete', {'success': True})
+                'continous', 'upgrade_complete', {'success': True}, device_id)
 
-    def handle_upgrade_fail(self, code, message):
+    def handle_upgrade_fail(self, code, message, device_id=None):
         if self._tunnel:
             self._tunnel.notify('continous', 'upgrade_complete', {
-                                'success': False, 'code': code, 'message': message})
+                                'success': False, 'code': code, 'message': message},
+                                device_id)
 
-    def handle_error(self, error, message):
+    def handle_error(self, error, message, device_id=None):
         if self._tunnel:
-            self._tunnel.notify('lost')
-
-    def handle_request(self, method, converted_method, parameters):
-        result = self._driver.execute(converted_method, parameters)
+            self._tunnel.notify('lost', device_id)
+
+    def handle_fleet_upgrade_status(self, device_id, status):
+        message = status['status']
+        if status['status'] != FleetUpgradeStatus.Upgrading:
+            message += ' in {0}s'.format(status['duration'])
+        if status['message']:
+            message += ', ' + status['message']
+        print('{0} : {1}'.format(device_id, message))
+
+    def handle_fleet_upgrade_finish(self, report):
+        statuses = [device['status'] for device in report['devices']]
+        print('Fleet upgrade finished in {0}s, {1} succeeded, {2} failed'.format(
+            report['duration'], statuses.count(FleetUpgradeStatus.Success),
+            statuses.count(FleetUpgradeStatus.Failed)))
+
+    def handle_request(self, method, converted_method, parameters, device_id=None):
+        result = self._driver.execute(
+            converted_method, parameters, **self._get_device_args(device_id))
         if self._tunnel:
-            self._tunnel.notify('invoke', method, result)
+            self._tunnel.notify('invoke', method, result, device_id)
 
-    def handle_receive_continous_data(self, packet_type, data):
+    def handle_receive_continous_data(self, packet_type, data, device_id=None):
         if self._tunnel:
-            self._tunnel.notify('continous', packet_type, data)
+            self._tunnel.notify('continous', packet_type, data, device_id)
+
+    def _get_device_args(self, device_id):
+        # device is addressed by id in multi-device mode
+        if self.options.com_ports:
+            return {'device_id': device_id}
+        return {}
 
     def _prepare_driver(self):
-        self._driver = Driver(self.options)
+        if self.options.com_ports:
+            self._driver = MultiDriver(self.options)
+        else:
+            self._driver = Driver(self.options)
 
         self._driver.on(DriverEvents.Discovered,
                         self.handle_discovered)
@@ -106,6 +149,12 @@ class CommandLine:
         self._driver.on(DriverEvents.Continous,
                         self.handle_receive_continous_data)
 
+        if self.options.com_ports:
+            self._driver.fleet_upgrade.on(
+                'status', self.handle_fleet_upgrade_status)
+            self._driver.fleet_upgrade.on(
+                'finish', self.handle_fleet_upgrade_finish)
+
         self._driver.detect()
 
         self.setup_command_handler()
@@ -141,13 +190,17 @@ class CommandLine:
         '''
         Prepare command
         '''
-        self.supported_commands = self._driver.execute('get_command_lines')
+        self.supported_commands = self._driver.execute('get_command_lines') + \
+            self.common_commands
+        if self.options.com_ports:
+            self.supported_commands = self.supported_commands + \
+                self.multi_device_commands
 
         while True:
             token = input(">>")
             self.input_string = token.split(" ")
 
-            if self._driver._device_provider.is_upgrading:
+            if self._driver.device_provider.is_upgrading:
                 continue
 
             if token.strip() == 'exit':
@@ -198,6 +251,51 @@ class CommandLine:
         else:
             print("No more command line.")
 
+    def devices_handler(self):
+        '''
+        List devices of multi-device mode, * is the selected device
+        '''
+        for device in self._driver.list_devices():
+            print('{0} {1} : {2}, {3}'.format(
+                '*' if device['selected'] else ' ',
+                device['deviceId'],
+                device['deviceType'],
+                'connected' if device['connected'] else 'disconnected'))
+        return True
+
+    def select_handler(self):
+        '''
+        Select device of commands by device id
+        '''
+        if len(self.input_string) == 1:
+            print("Usage:")
+            print("select device_id")
+        elif not self._driver.select(self.input_string[1]):
+            print('Unknown device {0}, allowed one of values: {1}'.format(
+                self.input_string[1], self._driver.device_ids))
+        return True
+
+    def statistics_handler(self):
+        '''
+        Print statistics of output packets of device
+        '''
+        device_context = APP_CONTEXT.get_device_context(self._driver.device_id)
+        for packet_type, result in device_context.statistics.snapshot().items():
+            print('{0} : received {1}, failures {2} ({3:.2%}), rate {4} hz, '
+                  'interval p50/p95/p99 {5}/{6}/{7} ms'.format(
+                      packet_type, result['received'], result['failures'],
+                      result['failureRatio'], result['rate'],
+                      result['interval']['p50'], result['interval']['p95'],
+                      result['interval']['p99']))
+            epochs = result.get('epochs')
+            if epochs:
+                print('    period {0} ms, missing {1}, duplicates {2}, '
+                      'out of order {3}, restarts {4}, clock drift {5} ppm'.format(
+                          epochs['period'], epochs['missing'],
+                          epochs['duplicates'], epochs['outOfOrder'],
+                          epochs['restarts'], epochs['clockDrift']))
+        return True
+
     def connect_handler(self):
         '''
         Connect to device, may no need it later
@@ -217,11 +315,40 @@ class CommandLine:
             self._driver.execute('upgrade_framework', file_name)
         return True
 
+    def fleet_upgrade_handler(self):
+        '''
+        Upgrade firmware of devices at the same time, followed by file name,
+        and optional comma separated device ids, max workers and link limit
+        '''
+        input_args = len(self.input_string)
+        if input_args == 1:
+            print("Usage:")
+            print("fleet_upgrade file_name [device_ids] [max_workers] [link_limit]")
+            return True
+
+        parameters = {'file': self.input_string[1]}
+        if input_args > 2:
+            parameters['deviceIds'] = parse_device_ports(self.input_string[2])
+        try:
+            if input_args > 3:
+                parameters['maxWorkers'] = int(self.input_string[3])
+            if input_args > 4:
+                parameters['linkLimit'] = int(self.input_string[4])
+        except ValueError:
+            print('Max workers and link limit should be integers')
+            return True
+
+        result = self._driver.execute('fleet_upgrade', parameters)
+        if result['packetType'] == 'error':
+            print(result['data'])
+        return True
+
     def record_handler(self):
         '''record command is used to save the outputs into local machine
         '''
         # TODO: check device is idel
-        if APP_CONTEXT.device_context.runtime_status != 'LOGGING':
+        device_context = APP_CONTEXT.get_device_context(self._driver.device_id)
+        if device_context.runtime_status != 'LOGGING':
             self._driver.execute('start_data_log')
         return True
 
@@ -229,7 +356,8 @@ class CommandLine:
         '''record command is used to save the outputs into local machine
         '''
         # TODO: check device is idel
-        if APP_CONTEXT.device_context.runtime_status == 'LOGGING':
+        device_context = APP_CONTEXT.get_device_context(self._driver.device_id)
+        if device_context.runtime_status == 'LOGGING':
             self._driver.execute('stop_data_log')
 
         if self.webserver_running:
@@ -8,6 +8,7 @@ import threading
 from ..models import WebserverArgs
 
 from ..core.driver import (Driver, DriverEvents)
+from ..core.multi_driver import MultiDriver
 from ..core.device_context import DeviceContext
 from ..core.tunnel_web import WebServer
 from ..core.tunnel_base import TunnelEvents
@@ -24,6 +25,7 @@ class Default:
     options = None
     _tunnel = None
     _driver = None
+    _event_loop = None
 
     def __init__(self, **kwargs):
         self._build_options(**kwargs)
@@ -34,6 +36,11 @@ class Default:
         '''
         Prepare components, initialize the application
         '''
+        if self.options.use_asyncio:
+            import asyncio
+            # shared by webserver and message center of device
+            self._event_loop = asyncio.new_event_loop()
+
         # prepare driver
         threading.Thread(target=self._prepare_driver).start()
         # prepare tunnel
@@ -41,34 +48,56 @@ class Default:
         # prepage logger
         self._prepare_logger()
 
-    def handle_discovered(self, device_provider):
+    def handle_discovered(self, device_provider, device_id=None):
         device_context = DeviceContext(device_provider)
-        APP_CONTEXT.device_context = device_context
+        if device_id is None:
+            APP_CONTEXT.device_context = device_context
+        else:
+            APP_CONTEXT.set_device_context(device_id, device_context)
 
-        self._tunnel.notify('discovered')
+        self._tunnel.notify('discovered', device_id)
 
-    def handle_lost(self):
-        self._tunnel.notify('lost')
+    def handle_lost(self, device_id=None):
+        self._tunnel.notify('lost', device_id)
 
-    def handle_upgrade_finished(self):
-        self._tunnel.notify('continous', 'upgrade_complete', {'success': True})
+    def handle_upgrade_finished(self, device_id=None):
+        self._tunnel.notify('continous', 'upgrade_complete',
+                            {'success': True}, device_id)
 
-    def handle_upgrade_fail(self, code, message):
+    def handle_upgrade_fail(self, code, message, device_id=None):
         self._tunnel.notify('continous', 'upgrade_complete', {
-                            'success': False, 'code': code, 'message': message})
+                            'success': False, 'code': code, 'message': message},
+                            device_id)
+
+    def handle_error(self, error, message, device_id=None):
+        self._tunnel.notify('lost', device_id)
+
+    def handle_request(self, method, converted_method, parameters, device_id=None):
+        result = self._driver.execute(
+            converted_method, parameters, **self._get_device_args(device_id))
+        self._tunnel.notify('invoke', method, result, device_id)
 
-    def handle_error(self, error, message):
-        self._tunnel.notify('lost')
+    async def handle_request_async(self, method, converted_method, parameters, device_id=None):
+        result = await self._driver.execute_async(
+            converted_method, parameters, **self._get_device_args(device_id))
+        self._tunnel.notify('invoke', method, result, device_id)
 
-    def handle_request(self, method, converted_method, parameters):
-        result = self._driver.execute(converted_method, parameters)
-        self._tunnel.notify('invoke', method, result)
+    def handle_receive_continous_data(self, packet_type, data, device_id=None):
+        self._tunnel.notify('continous', packet_type, data, device_id)
 
-    def handle_receive_continous_data(self, packet_type, data):
-        self._tunnel.notify('continous', packet_type, data)
+    def _get_device_args(self, device_id):
+        # device is addressed by id in multi-device mode
+        if self.options.com_ports:
+            return {'device_id': device_id}
+        return {}
 
     def _prepare_driver(self):
-        self._driver = Driver(self.options)
+        if self.options.com_ports:
+            self._driver = MultiDriver(self.options)
+        else:
+            self._driver = Driver(self.options)
+        if self._event_loop:
+            self._driver.set_event_loop(self._event_loop)
 
         self._driver.on(DriverEvents.Discovered,
                         self.handle_discovered)
@@ -94,12 +123,15 @@ class Default:
         import tornado.ioloop
         if sys.version_info[0] > 2:
             import asyncio
-            asyncio.set_event_loop(asyncio.new_event_loop())
+            asyncio.set_event_loop(
+                self._event_loop or asyncio.new_event_loop())
 
         event_loop = tornado.ioloop.IOLoop.current()
 
         self._tunnel = WebServer(self.options, event_loop)
         self._tunnel.on(TunnelEvents.Request, self.handle_request)
+        if self._event_loop:
+            self._tunnel.set_async_request_handler(self.handle_request_async)
         self._tunnel.setup()
 
     def _prepare_logger(self):
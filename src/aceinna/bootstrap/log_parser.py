@@ -1,10 +1,13 @@
 import os
 import sys
+import functools
 from ctypes import *
 from ..models import LogParserArgs
 from ..framework.constants import APP_TYPE
 from ..framework.context import APP_CONTEXT
 from ..framework.utils import resource
+from ..framework.columnar_log import (export_csv, FILE_EXTENSION)
+from ..tools.parallel_parse import (resolve_jobs, run_tasks)
 
 
 def prepare_lib_folder():
@@ -41,22 +44,54 @@ def prepare_lib_folder():
     return lib_path
 
 
-def do_parse(log_type, folder_path, kml_rate, dr_parse):
-    lib_path = prepare_lib_folder()
+def do_export_csv(folder_path):
+    '''
+    Convert columnar logs under folder to CSV
+    '''
+    for root, _, file_name in os.walk(folder_path):
+        for fname in file_name:
+            if fname.endswith(FILE_EXTENSION):
+                csv_path = export_csv(os.path.join(root, fname))
+                print('Exported', csv_path)
 
+
+def decode_log_file(lib_path, log_type, kml_rate, dr_parse, file_path):
+    '''
+    Decode a log file by decoder lib, it is run in worker process
+    '''
     lib = CDLL(lib_path)
+    if log_type == 'openrtk':
+        lib.decode_openrtk_user(bytes(file_path, encoding='utf8'))
+    if log_type == 'rtkl':
+        lib.decode_openrtk_inceptio(
+            bytes(file_path, encoding='utf8'))
+    if log_type == 'ins401':
+        lib.decode_ins401(bytes(file_path, encoding='utf8'), bytes(
+            dr_parse, encoding='utf8'), kml_rate)
+
+
+def do_parse(log_type, folder_path, kml_rate, dr_parse, jobs=1):
+    if log_type == 'columnar':
+        return do_export_csv(folder_path)
+
+    lib_path = prepare_lib_folder()
+
+    decode = functools.partial(
+        decode_log_file, lib_path, log_type, kml_rate, dr_parse)
+    tasks = []
     for root, _, file_name in os.walk(folder_path):
         for fname in file_name:
             if (fname.startswith('user') and fname.endswith('.bin')) or (fname.startswith('ins_save') and fname.endswith('.bin')):
                 file_path = os.path.join(folder_path, fname)
-                if log_type == 'openrtk':
-                    lib.decode_openrtk_user(bytes(file_path, encoding='utf8'))
-                if log_type == 'rtkl':
-                    lib.decode_openrtk_inceptio(
-                        bytes(file_path, encoding='utf8'))
-                if log_type == 'ins401':
-                    lib.decode_ins401(bytes(file_path, encoding='utf8'), bytes(
-                        dr_parse, encoding='utf8'), kml_rate)
+                tasks.append((decode, (file_path,),
+                              os.path.getsize(file_path), file_path))
+
+    # files are decoded on a process pool, each file by one worker
+    for (_, _, _, file_path), (is_success, error) in zip(
+            tasks, run_tasks(tasks, resolve_jobs(jobs))):
+        if not is_success:
+            print('Decode failed. File path: {0}\n{1}'.format(
+                file_path, error))
 
 
 class LogParser:
@@ -76,7 +111,8 @@ class LogParser:
         do_parse(self._options.log_type,
                  self._options.path,
                  self._options.kml_rate,
-                 self._options.powerdr)
+                 self._options.powerdr,
+                 self._options.jobs)
 
         os._exit(1)
 
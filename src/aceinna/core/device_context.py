@@ -49,6 +49,16 @@ class DeviceContext:
     def device_type(self):
         return self._provider.type
 
+    @property
+    def device_id(self):
+        ''' Id of device in multi-device mode, it is None for single device
+        '''
+        return self._provider.device_id
+
+    @property
+    def statistics(self):
+        return self._provider.statistics
+
     @property
     def properties(self):
         return self._provider.properties
@@ -1,6 +1,9 @@
 import time
+import asyncio
+import functools
 import serial
 from .event_base import EventBase
+from .packet_statistics import PacketStatistics
 from ..framework.communicator import CommunicatorFactory
 from ..devices import DeviceManager
 from ..framework.utils.print import print_red
@@ -9,6 +12,13 @@ DEFAULT_INTERFACE = 'uart'
 
 BAUDRATE_MAPPING = {'IMU': 57600}
 
+# methods handled by driver itself, see execute
+DRIVER_METHODS = ['check_mode', 'list_ports', 'force_bootloader']
+
+# max count of read blocks waiting to be parsed of each device, in
+# multi-device mode
+DEVICE_QUEUE_SIZE = 64
+
 
 class DriverEvents:
     ''' Driver Events
@@ -33,6 +43,9 @@ class Driver(EventBase):
         self._communicator = None
         self._device_provider = None
         self._with_exception = False
+        self._event_loop = None
+        self._device_id = None
+        self._statistics = None
         self._interface = self._options.interface.lower() \
             if self._options.interface is not None else DEFAULT_INTERFACE
 
@@ -80,6 +93,12 @@ class Driver(EventBase):
         Load device provider
         '''
         self._device_provider = device_provider
+        if self._event_loop:
+            self._device_provider.set_event_loop(self._event_loop)
+        if self._device_id is not None:
+            self._device_provider.set_device_id(
+                self._device_id, self._statistics)
+            self._device_provider.message_queue_size = DEVICE_QUEUE_SIZE
         self._device_provider.setup(self._options)
         self._device_provider.on('exception', self._handle_device_exception)
         self._device_provider.on('upgrade_failed',
@@ -116,6 +135,28 @@ class Driver(EventBase):
     def _handle_receive_continous_data(self, packet_type, data):
         self.emit(DriverEvents.Continous, packet_type, data)
 
+    def set_event_loop(self, loop):
+        '''
+        Run message center of discovered device on the asyncio loop
+        '''
+        self._event_loop = loop
+
+    def set_device_id(self, device_id):
+        '''
+        Drive one of devices in multi-device mode, the device has its own
+        statistics and logger
+        '''
+        self._device_id = device_id
+        self._statistics = PacketStatistics()
+
+    @property
+    def device_id(self):
+        return self._device_id
+
+    @property
+    def device_provider(self):
+        return self._device_provider
+
     def detect(self):
         ''' Detect aceinna device
         '''
@@ -123,6 +164,7 @@ class Driver(EventBase):
         if self._communicator is None:
             self._communicator = CommunicatorFactory.create(
                 self._interface, self._options)
+            self._communicator.device_id = self._device_id
 
         self._communicator.find_device(self._device_discover_handler)
 
@@ -183,6 +225,17 @@ class Driver(EventBase):
 
         return getattr(self._device_provider, method, None)(parameters)
 
+    async def execute_async(self, method, parameters=None):
+        '''
+        Execute command on device on the running loop
+        '''
+        if method in DRIVER_METHODS or not self._device_provider:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None, functools.partial(self.execute, method, parameters))
+
+        return await self._device_provider.execute_async(method, parameters)
+
     def _process_force_bootloader(self, port_name, device_type):
         # OpenRTK has a bootloader switch, no need force enter bootloader
 
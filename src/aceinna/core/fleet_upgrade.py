@@ -0,0 +1,263 @@
+'''
+Upgrade firmware of several devices at the same time. The firmware is loaded
+once into a FirmwareBundle, and its parts are split once and shared by all
+devices. At most max workers devices are upgraded at a time, and devices
+sharing a link, such as ports of one usb hub, are upgraded at most link limit
+at a time.
+'''
+import time
+import threading
+import collections
+from .event_base import EventBase
+from .driver import DriverEvents
+from ..framework.utils.firmware_parser import FirmwareBundle
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_LINK_LIMIT = 2
+# seconds to wait upgrade of a device, including the detection after upgrade
+DEVICE_UPGRADE_TIMEOUT = 900
+
+
+class FleetUpgradeStatus:
+    ''' Upgrade status of a device
+    '''
+    Waiting = 'waiting'
+    Upgrading = 'upgrading'
+    Success = 'success'
+    Failed = 'failed'
+
+
+class FleetUpgrade(EventBase):
+    '''
+    Upgrade devices of a multi driver, the upgrade of each device is done by
+    its provider. Event 'status' is emitted with device id and the status of
+    device once it changes, 'finish' is emitted with the report of all
+    devices.
+    '''
+
+    def __init__(self, driver):
+        super(FleetUpgrade, self).__init__()
+        self._driver = driver
+        self._condition = threading.Condition()
+        self._is_running = False
+        # device id: status of device
+        self._devices = collections.OrderedDict()
+        # device id: event set when upgrade of device is done
+        self._done_events = {}
+        # device id: time the upgrade of device is started
+        self._started_times = {}
+        self.started_time = None
+        self.ended_time = None
+
+        driver.on(DriverEvents.UpgradeFinished, self._handle_finished)
+        driver.on(DriverEvents.UpgradeFail, self._handle_fail)
+        driver.on(DriverEvents.Continous, self._handle_continous)
+
+    @property
+    def is_running(self):
+        return self._is_running
+
+    def start(self, file, device_ids=None, max_workers=DEFAULT_MAX_WORKERS,
+              link_limit=DEFAULT_LINK_LIMIT, links=None):
+        '''
+        Upgrade devices in a thread, it returns False if a fleet upgrade is
+        running
+        '''
+        if not self._prepare(device_ids, links):
+            return False
+
+        thread = threading.Thread(
+            target=self._run, args=(file, max_workers, link_limit))
+        thread.start()
+        return True
+
+    def run(self, file, device_ids=None, max_workers=DEFAULT_MAX_WORKERS,
+            link_limit=DEFAULT_LINK_LIMIT, links=None):
+        '''
+        Upgrade devices and wait them done, it returns the report, or None
+        if a fleet upgrade is running
+        '''
+        if not self._prepare(device_ids, links):
+            return None
+
+        self._run(file, max_workers, link_limit)
+        return self.get_report()
+
+    def get_report(self):
+        '''
+        Status of each device, duration is in seconds
+        '''
+        with self._condition:
+            devices = [dict(device) for device in self._devices.values()]
+
+        ended_time = self.ended_time or time.time()
+        return {
+            'running': self._is_running,
+            'duration': round(ended_time - self.started_time, 3)
+            if self.started_time else 0,
+            'devices': devices
+        }
+
+    def _prepare(self, device_ids, links):
+        if device_ids is None:
+            device_ids = self._driver.device_ids
+        links = links or {}
+
+        with self._condition:
+            if self._is_running:
+                return False
+            self._is_running = True
+            self.started_time = time.time()
+            self.ended_time = None
+            self._done_events = {}
+            self._started_times = {}
+            self._devices = collections.OrderedDict()
+            for device_id in device_ids:
+                self._devices[device_id] = {
+                    'deviceId': device_id,
+                    # each port is a link if it is not assigned
+                    'link': links.get(device_id, device_id),
+                    'status': FleetUpgradeStatus.Waiting,
+                    'current': 0,
+                    'total': 0,
+                    'duration': 0,
+                    'message': None
+                }
+        return True
+
+    def _run(self, file, max_workers, link_limit):
+        try:
+            bundle = self._load_firmware(file)
+            if bundle is None:
+                for device_id in list(self._devices.keys()):
+                    self._update(device_id, status=FleetUpgradeStatus.Failed,
+                                 message='Cannot find firmware file')
+            else:
+                self._schedule(bundle, max_workers, link_limit)
+        finally:
+            with self._condition:
+                self._is_running = False
+                self.ended_time = time.time()
+            self.emit('finish', self.get_report())
+
+    def _load_firmware(self, file):
+        if isinstance(file, bytes):
+            return FirmwareBundle(file)
+
+        # firmware is downloaded by provider of a connected device
+        for device_id in self._devices.keys():
+            device_provider = self._get_device_provider(device_id)
+            if not device_provider:
+                continue
+            can_download, firmware_content = \
+                device_provider.download_firmware(file)
+            if can_download:
+                return FirmwareBundle(firmware_content)
+            return None
+        return None
+
+    def _schedule(self, bundle, max_workers, link_limit):
+        pending = list(self._devices.keys())
+        running = []
+        # link: count of devices upgrading
+        link_usage = collections.Counter()
+
+        with self._condition:
+            while pending or running:
+                device_id = None
+                if len(running) < max_workers:
+                    device_id = next(
+                        (item for item in pending
+                         if link_usage[self._devices[item]['link']] < link_limit),
+                        None)
+
+                if device_id is None:
+                    # wait a running device done
+                    self._condition.wait()
+                    running = [item for item in running
+                               if self._devices[item]['status'] ==
+                               FleetUpgradeStatus.Upgrading]
+                    link_usage = collections.Counter(
+                        [self._devices[item]['link'] for item in running])
+                    continue
+
+                pending.remove(device_id)
+                running.append(device_id)
+                link_usage[self._devices[device_id]['link']] += 1
+                self._devices[device_id]['status'] = \
+                    FleetUpgradeStatus.Upgrading
+                self._started_times[device_id] = time.time()
+                threading.Thread(target=self._upgrade_device,
+                                 args=(device_id, bundle)).start()
+
+    def _upgrade_device(self, device_id, bundle):
+        with self._condition:
+            status = dict(self._devices[device_id])
+        self.emit('status', device_id, status)
+
+        device_provider = self._get_device_provider(device_id)
+        if not device_provider:
+            return self._update(device_id, status=FleetUpgradeStatus.Failed,
+                                message='Device is not connected')
+        if device_provider.is_upgrading:
+            return self._update(device_id, status=FleetUpgradeStatus.Failed,
+                                message='Device is upgrading')
+
+        done_event = threading.Event()
+        self._done_events[device_id] = done_event
+        try:
+            self._driver.execute(
+                'upgrade_framework', {'file': bundle}, device_id)
+        except Exception as ex:  # pylint: disable=broad-except
+            self._done_events.pop(device_id, None)
+            return self._update(device_id, status=FleetUpgradeStatus.Failed,
+                                message=str(ex))
+
+        if not done_event.wait(DEVICE_UPGRADE_TIMEOUT):
+            self._done_events.pop(device_id, None)
+            self._update(device_id, status=FleetUpgradeStatus.Failed,
+                         message='Upgrade timeout')
+
+    def _get_device_provider(self, device_id):
+        driver = self._driver.get_driver(device_id)
+        device_provider = driver.device_provider if driver else None
+        if device_provider and device_provider.connected:
+            return device_provider
+        return None
+
+    def _update(self, device_id, **changes):
+        with self._condition:
+            device = self._devices.get(device_id)
+            if device is None:
+                return
+            device.update(changes)
+            started_time = self._started_times.get(device_id)
+            if started_time and device['status'] in [
+                    FleetUpgradeStatus.Success, FleetUpgradeStatus.Failed]:
+                device['duration'] = round(time.time() - started_time, 3)
+            status = dict(device)
+            self._condition.notify_all()
+        self.emit('status', device_id, status)
+
+    def _complete(self, device_id, status, message=None):
+        # upgrade of device not in fleet is not handled
+        done_event = self._done_events.pop(device_id, None)
+        if done_event is None:
+            return
+        self._update(device_id, status=status, message=message)
+        done_event.set()
+
+    def _handle_finished(self, device_id=None):
+        self._complete(device_id, FleetUpgradeStatus.Success)
+
+    def _handle_fail(self, code, message, device_id=None):
+        self._complete(device_id, FleetUpgradeStatus.Failed,
+                       '{0}: {1}'.format(code, message))
+
+    def _handle_continous(self, packet_type, data, device_id=None):
+        if packet_type != 'upgrade_progress' or \
+                device_id not in self._done_events:
+            return
+        with self._condition:
+            self._devices[device_id]['current'] = data['addr']
+            self._devices[device_id]['total'] = data['fs_len']
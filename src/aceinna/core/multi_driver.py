@@ -0,0 +1,257 @@
+import re
+import copy
+import functools
+import threading
+import collections
+from .event_base import EventBase
+from .driver import (Driver, DriverEvents)
+from .fleet_upgrade import (
+    FleetUpgrade, DEFAULT_MAX_WORKERS, DEFAULT_LINK_LIMIT)
+from ..framework.utils.print import print_red
+
+DEVICE_EVENTS = [
+    DriverEvents.Discovered,
+    DriverEvents.Lost,
+    DriverEvents.UpgradeStart,
+    DriverEvents.UpgradeFail,
+    DriverEvents.UpgradeProgress,
+    DriverEvents.UpgradeFinished,
+    DriverEvents.Continous,
+    DriverEvents.Error
+]
+
+# methods handled by multi driver itself, see execute
+MULTI_DRIVER_METHODS = ['list_devices', 'fleet_upgrade',
+                        'get_fleet_upgrade_status']
+
+
+def parse_device_ports(com_ports):
+    '''
+    Parse serial ports of devices, such as 'COM3,COM4' or a list of ports
+    '''
+    if not com_ports:
+        return []
+
+    if isinstance(com_ports, str):
+        com_ports = com_ports.split(',')
+
+    ports = []
+    for port in com_ports:
+        port = port.strip()
+        if port and port not in ports:
+            ports.append(port)
+    return ports
+
+
+def build_device_id(port):
+    '''
+    Device id is the name of port, such as COM3 or ttyUSB0 of /dev/ttyUSB0
+    '''
+    return re.split(r'[\\/]', port.rstrip('\\/'))[-1]
+
+
+class MultiDriver(EventBase):
+    '''
+    Drive several devices in one process. Each device has its own driver,
+    communicator, message center, statistics and logger, and it is addressed
+    by device id. Events of Driver are emitted with device id as the last
+    argument.
+    '''
+
+    def __init__(self, options):
+        super(MultiDriver, self).__init__()
+        self._options = options
+        self._drivers = collections.OrderedDict()
+        self._selected_id = None
+        self._fleet_upgrade = None
+
+        for port in parse_device_ports(options.com_ports):
+            device_id = build_device_id(port)
+            if device_id in self._drivers:
+                raise ValueError(
+                    'Duplicate device id {0} of port {1}'.format(device_id, port))
+
+            device_options = copy.copy(options)
+            device_options.com_port = port
+            driver = Driver(device_options)
+            driver.set_device_id(device_id)
+            for event_type in DEVICE_EVENTS:
+                driver.on(event_type, functools.partial(
+                    self._forward_event, event_type, device_id))
+            self._drivers[device_id] = driver
+
+        if len(self._drivers) == 0:
+            raise ValueError('No serial port is assigned for devices')
+
+    @property
+    def device_ids(self):
+        return list(self._drivers.keys())
+
+    @property
+    def device_id(self):
+        ''' Id of the selected device, it is used if no device id is given
+        '''
+        return self._selected_id
+
+    @property
+    def device_provider(self):
+        driver = self.get_driver()
+        return driver.device_provider if driver else None
+
+    def get_driver(self, device_id=None):
+        '''
+        Get driver of device id, the selected one is returned without id
+        '''
+        if device_id is None:
+            device_id = self._selected_id
+        return self._drivers.get(device_id)
+
+    def select(self, device_id):
+        '''
+        Select the default device of commands
+        '''
+        if device_id not in self._drivers:
+            return False
+        self._selected_id = device_id
+        return True
+
+    def list_devices(self):
+        devices = []
+        for device_id, driver in self._drivers.items():
+            device_provider = driver.device_provider
+            devices.append({
+                'deviceId': device_id,
+                'deviceType': device_provider.type if device_provider else None,
+                'connected': device_provider.connected if device_provider else False,
+                'selected': device_id == self._selected_id
+            })
+        return devices
+
+    def set_event_loop(self, loop):
+        '''
+        Run message centers of all devices on the asyncio loop
+        '''
+        for driver in self._drivers.values():
+            driver.set_event_loop(loop)
+
+    def detect(self):
+        ''' Detect devices on their ports at the same time, returns when
+        all of them are detected or failed
+        '''
+        threads = []
+        for device_id, driver in self._drivers.items():
+            thread = threading.Thread(
+                target=self._detect, args=(device_id, driver))
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if self._selected_id is None:
+            # select the first connected device
+            for device_id, driver in self._drivers.items():
+                if driver.device_provider:
+                    self._selected_id = device_id
+                    break
+
+    def execute(self, method, parameters=None, device_id=None):
+        ''' Execute command on device of device id
+        '''
+        if method == 'list_devices':
+            return {
+                'packetType': 'devices',
+                'data': self.list_devices()
+            }
+
+        if method == 'fleet_upgrade':
+            return self._start_fleet_upgrade(parameters)
+
+        if method == 'get_fleet_upgrade_status':
+            return {
+                'packetType': 'fleetUpgradeStatus',
+                'data': self.fleet_upgrade.get_report()
+            }
+
+        driver = self.get_driver(device_id)
+        if not driver:
+            return self._unknown_device(device_id)
+
+        return driver.execute(method, parameters)
+
+    async def execute_async(self, method, parameters=None, device_id=None):
+        '''
+        Execute command on device of device id on the running loop
+        '''
+        if method in MULTI_DRIVER_METHODS:
+            return self.execute(method, parameters, device_id)
+
+        driver = self.get_driver(device_id)
+        if not driver:
+            return self._unknown_device(device_id)
+
+        return await driver.execute_async(method, parameters)
+
+    @property
+    def fleet_upgrade(self):
+        '''
+        Upgrade firmware of devices at the same time
+        '''
+        if self._fleet_upgrade is None:
+            self._fleet_upgrade = FleetUpgrade(self)
+            self._fleet_upgrade.on('status', functools.partial(
+                self._forward_fleet_upgrade, 'fleet_upgrade_status'))
+            self._fleet_upgrade.on('finish', functools.partial(
+                self._forward_fleet_upgrade, 'fleet_upgrade_complete', None))
+        return self._fleet_upgrade
+
+    def _start_fleet_upgrade(self, parameters):
+        '''
+        Parameters are file name of firmware, and optional device ids,
+        max workers, link limit, and links which is a map of device id to
+        name of link shared by devices
+        '''
+        parameters = parameters or {}
+        device_ids = parameters.get('deviceIds') or self.device_ids
+        unknown_ids = [device_id for device_id in device_ids
+                       if device_id not in self._drivers]
+        if not parameters.get('file') or unknown_ids:
+            return {
+                'packetType': 'error',
+                'data': 'Unknown devices {0}'.format(unknown_ids)
+                if unknown_ids else 'Firmware file is required'
+            }
+
+        started = self.fleet_upgrade.start(
+            parameters['file'], device_ids,
+            max_workers=parameters.get('maxWorkers') or DEFAULT_MAX_WORKERS,
+            link_limit=parameters.get('linkLimit') or DEFAULT_LINK_LIMIT,
+            links=parameters.get('links'))
+        if not started:
+            return {
+                'packetType': 'error',
+                'data': 'Fleet upgrade is running'
+            }
+        return {
+            'packetType': 'success'
+        }
+
+    def _forward_fleet_upgrade(self, packet_type, device_id, data):
+        self.emit(DriverEvents.Continous, packet_type, data, device_id)
+
+    def _detect(self, device_id, driver):
+        try:
+            driver.detect()
+        except Exception as ex:  # pylint: disable=broad-except
+            # one device fails should not stop the others
+            print_red('Cannot connect device {0}: {1}'.format(device_id, ex))
+            self.emit(DriverEvents.Error, 'app', str(ex), device_id)
+
+    def _forward_event(self, event_type, device_id, *args):
+        self.emit(event_type, *args, device_id)
+
+    def _unknown_device(self, device_id):
+        return {
+            'packetType': 'error',
+            'data': 'Unknown device {0}'.format(device_id)
+        }
@@ -1,130 +1,371 @@
+'''
+Statistics of output packets. Counters of a packet type are updated in O(1)
+when a packet is collected: rate is counted in buckets of one second and
+smoothed exponentially, intervals between packets are kept in a fixed sized
+ring. Percentiles of intervals are calculated when a snapshot is taken.
+
+Packets with a device time tag are also checked epoch by epoch, the nominal
+period is learned from the tags, then missing epochs, duplicates and out of
+order packets are counted, and drift of host clock to device clock is
+estimated.
+'''
+import math
 import collections
-import time
 
+# seconds of a rate bucket
+RATE_BUCKET_DURATION = 1
+# weight of the latest bucket in the smoothed rate
+RATE_SMOOTHING = 0.5
+# intervals of the latest packets, it is one second at 1kHz
+INTERVAL_SAMPLES = 1000
+INTERVAL_PERCENTILES = [50, 95, 99]
+
+# field of device time tag in packet: seconds of a unit
+TIME_TAG_FIELDS = [('GPS_TimeOfWeek', 0.001), ('GPS_TimeofWeek', 1),
+                   ('timeOfWeek', 1), ('timeITOW', 0.001),
+                   ('timeCntr', 0.001)]
+SECONDS_OF_WEEK = 604800
+# intervals of tags to learn the nominal period
+PERIOD_LEARNING_SAMPLES = 16
+# an interval is k periods if it differs from k periods less than it
+PERIOD_TOLERANCE = 0.25
+# tags going back more periods than it is a restart of device, not out
+# of order
+RESTART_PERIODS = 100
+# seconds of device time, host time is offset by the latency of read, the
+# min offset of a window is taken as the clock offset
+DRIFT_WINDOW = 10
+
+
+def calculate_percentile(sorted_values, percentile):
+    ''' Nearest rank percentile of sorted values
+    '''
+    if len(sorted_values) == 0:
+        return 0
+    rank = int(math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def get_device_time(data):
+    ''' Device time tag of packet in seconds, it is None if the packet has
+    no time tag. Items of a list packet are of the same epoch.
+    '''
+    if isinstance(data, list):
+        if len(data) == 0:
+            return None
+        data = data[0]
+    if not isinstance(data, dict):
+        return None
+
+    for field, unit in TIME_TAG_FIELDS:
+        value = data.get(field)
+        if value is not None:
+            return value * unit
+    return None
+
+
+class EpochCounter(object):
+    ''' Check device time tags of a packet type
+    '''
+    __slots__ = ['period', 'missing', 'duplicates', 'out_of_order',
+                 'restarts', 'drift', '_last_tag', '_learning_intervals',
+                 '_mismatch_count', '_mismatch_missing', '_rollover',
+                 '_anchor', '_window', '_gaps']
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # nominal period in seconds, None until it is learned
+        self.period = None
+        self.missing = 0
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.restarts = 0
+        # ppm, positive if host clock is faster than device clock
+        self.drift = 0
+        self._last_tag = None
+        self._learning_intervals = []
+        # consecutive intervals not matched to period, period is learned
+        # again if the packet rate is changed
+        self._mismatch_count = 0
+        self._mismatch_missing = 0
+        # seconds of rolled over weeks, device time is unwrapped for drift
+        self._rollover = 0
+        # (device time, min offset) of the first window, and the current
+        self._anchor = None
+        self._window = None
+        # epochs of the latest gaps in periods, a late packet of them is not
+        # missing
+        self._gaps = collections.deque(maxlen=RESTART_PERIODS)
+
+    def add(self, device_time, event_time):
+        if self._last_tag is None:
+            self._last_tag = device_time
+            self._estimate_drift(device_time, event_time)
+            return
+
+        interval = device_time - self._last_tag
+        if interval < -SECONDS_OF_WEEK / 2:
+            # rollover of time of week
+            interval += SECONDS_OF_WEEK
+            self._rollover += SECONDS_OF_WEEK
+        self._estimate_drift(device_time + self._rollover, event_time)
+
+        if interval == 0:
+            self.duplicates += 1
+            return
+
+        if interval < 0:
+            if self.period and -interval < RESTART_PERIODS * self.period:
+                self.out_of_order += 1
+                self._fill_gap(device_time)
+                return
+            self.restarts += 1
+            self._last_tag = device_time
+            self._rollover = 0
+            self._anchor = self._window = None
+            self._gaps.clear()
+            return
+
+        last_tag = self._last_tag
+        self._last_tag = device_time
+        if self.period is None:
+            self._learn(interval)
+            return
+
+        epochs = self._count(interval)
+        if self.period is not None:
+            # epochs skipped by the interval, the latest ones are kept
+            for index in range(max(1, epochs - RESTART_PERIODS), epochs):
+                self._gaps.append(
+                    self._get_epoch(last_tag + index * self.period))
+
+    def _get_epoch(self, device_time):
+        return int(round((device_time % SECONDS_OF_WEEK) / self.period))
+
+    def _fill_gap(self, device_time):
+        # the late packet was counted as missing when the gap was seen
+        epoch = self._get_epoch(device_time)
+        if epoch in self._gaps:
+            self._gaps.remove(epoch)
+            self.missing -= 1
+            if self._mismatch_missing > 0:
+                self._mismatch_missing -= 1
+
+    def _learn(self, interval):
+        self._learning_intervals.append(interval)
+        if len(self._learning_intervals) < PERIOD_LEARNING_SAMPLES:
+            return
+
+        # most of intervals are nominal, the lower median is taken
+        intervals = sorted(self._learning_intervals)
+        self.period = intervals[(len(intervals) - 1) // 2]
+        self._learning_intervals = []
+        for item in intervals:
+            self._count(item)
 
-def calculate_collect(packet_collection, failure_collection, key):
-    ''' Calculate collect data as statistics
+    def _count(self, interval):
+        periods = interval / self.period
+        epochs = int(round(periods))
+        if epochs >= 1 and abs(periods - epochs) < PERIOD_TOLERANCE:
+            self.missing += epochs - 1
+        else:
+            epochs = 0
+
+        if epochs == 1:
+            self._mismatch_count = 0
+            self._mismatch_missing = 0
+            return epochs
+
+        self._mismatch_count += 1
+        self._mismatch_missing += max(epochs - 1, 0)
+        if self._mismatch_count >= PERIOD_LEARNING_SAMPLES:
+            # packet rate is changed, gaps of the new rate are not missing
+            self.missing -= self._mismatch_missing
+            self.period = None
+            self._mismatch_count = 0
+            self._mismatch_missing = 0
+            self._gaps.clear()
+        return epochs
+
+    def _estimate_drift(self, device_time, event_time):
+        offset = event_time - device_time
+        if self._window is None or \
+                not 0 <= device_time - self._window[0] < DRIFT_WINDOW:
+            if self._window is not None and self._anchor is None:
+                self._anchor = self._window
+            elif self._window is not None:
+                elapsed = self._window[0] - self._anchor[0]
+                if elapsed > 0:
+                    self.drift = (self._window[1] - self._anchor[1]) / \
+                        elapsed * 1000000
+            self._window = [device_time, offset]
+        elif offset < self._window[1]:
+            self._window[1] = offset
+
+    def get_result(self):
+        return {
+            'period': round(self.period * 1000, 3) if self.period else 0,
+            'missing': self.missing,
+            'duplicates': self.duplicates,
+            'outOfOrder': self.out_of_order,
+            'restarts': self.restarts,
+            'clockDrift': round(self.drift, 1)
+        }
+
+
+class PacketCounter(object):
+    ''' Counters of a packet type
     '''
-    received = 0
-    crc_failures = 0
-    rate = 0
+    __slots__ = ['received', 'failures', 'rate', 'last_event_time',
+                 '_bucket_start', '_bucket_count', '_intervals',
+                 '_interval_index', '_interval_count', '_percentiles',
+                 'epochs']
+
+    def __init__(self):
+        # EpochCounter if packet has device time tag
+        self.epochs = None
+        self.reset()
+
+    def reset(self):
+        if self.epochs is not None:
+            self.epochs.reset()
+        self.received = 0
+        self.failures = 0
+        self.rate = 0
+        self.last_event_time = None
+        self._bucket_start = None
+        self._bucket_count = 0
+        self._intervals = [0] * INTERVAL_SAMPLES
+        self._interval_index = 0
+        self._interval_count = 0
+        # (interval count, percentiles), calculated once for a snapshot
+        self._percentiles = None
+
+    def add_success(self, event_time):
+        self.received += 1
+
+        if self.last_event_time is None:
+            self.last_event_time = self._bucket_start = event_time
+            return
+
+        self._intervals[self._interval_index] = \
+            event_time - self.last_event_time
+        self._interval_index = (self._interval_index + 1) % INTERVAL_SAMPLES
+        self._interval_count += 1
+        self.last_event_time = event_time
 
-    if key in packet_collection:
-        received = packet_collection[key]['received']
-        rate = packet_collection[key]['rate']
+        # packets received after the start of bucket
+        self._bucket_count += 1
+        duration = event_time - self._bucket_start
+        if duration >= RATE_BUCKET_DURATION:
+            bucket_rate = self._bucket_count / duration
+            if self.rate:
+                bucket_rate = RATE_SMOOTHING * bucket_rate + \
+                    (1 - RATE_SMOOTHING) * self.rate
+            self.rate = bucket_rate
+            self._bucket_start = event_time
+            self._bucket_count = 0
 
-    if key in failure_collection:
-        crc_failures = failure_collection[key]
+    def add_failure(self):
+        self.failures += 1
 
-    calculate_result = {
-        'received': received,
-        'failures': crc_failures,
-        'rate': rate,
-        # 'event_time': event_time
-    }
+    def add_device_time(self, device_time, event_time):
+        if self.epochs is None:
+            self.epochs = EpochCounter()
+        self.epochs.add(device_time, event_time)
 
-    return calculate_result
+    def get_interval_percentiles(self):
+        ''' Percentiles of intervals between the latest packets, in ms
+        '''
+        if self._percentiles and \
+                self._percentiles[0] == self._interval_count:
+            return self._percentiles[1]
+
+        count = min(self._interval_count, INTERVAL_SAMPLES)
+        intervals = sorted(self._intervals[:count])
+        percentiles = {}
+        for percentile in INTERVAL_PERCENTILES:
+            percentiles['p%d' % percentile] = round(
+                calculate_percentile(intervals, percentile) * 1000, 3)
+        self._percentiles = (self._interval_count, percentiles)
+        return percentiles
+
+    def get_result(self):
+        total = self.received + self.failures
+        result = {
+            'received': self.received,
+            'failures': self.failures,
+            'rate': round(self.rate, 1),
+            'failureRatio': round(self.failures / total, 4) if total else 0,
+            'interval': self.get_interval_percentiles()
+        }
+        if self.epochs is not None:
+            result['epochs'] = self.epochs.get_result()
+        return result
 
 
 class PacketStatistics:
     ''' Packet Statistics Service
     '''
-    # {
-    #   'z1': Freeze sized Queue,
-    #   'pos': Freeze sized Queue,
-    # }
-    _packet_collect_dict = {}
-    _failure_collect_dict = {}
-    _last_statistics = None
-    _last_time = None
-
-    def _get_packet_types(self):
-        packet_types_in_success = self._packet_collect_dict.keys()
-        packet_types_in_failure = self._failure_collect_dict.keys()
-        packet_types = list(packet_types_in_success)
-
-        for packet_type in packet_types_in_failure:
-            if packet_type not in packet_types:
-                packet_types.append(packet_type)
-
-        if len(packet_types) == 0:
-            return None
 
-        return packet_types
+    def __init__(self):
+        # collected per instance, each device has its own statistics
+        # packet type: PacketCounter
+        self._counters = {}
+        self._last_statistics = None
+
+    def _get_counter(self, packet_type):
+        counter = self._counters.get(packet_type)
+        if counter is None:
+            counter = self._counters[packet_type] = PacketCounter()
+        return counter
 
     def collect(self, collect_type, packet_type, event_time):
         ''' Collect packet type
         '''
         if collect_type == 'success':
-            if packet_type not in self._packet_collect_dict:
-                self._packet_collect_dict[packet_type] = {
-                    'received': 0,
-                    # max calculate 500Hz
-                    'sampling': collections.deque(maxlen=500),
-                    'rate': 0,
-                    'last_calculate_time': event_time,
-                }
-
-            self._packet_collect_dict[packet_type]['received'] += 1
-            self._packet_collect_dict[packet_type]['sampling'].append(
-                event_time
-            )
-
-            last_calculate_time = self._packet_collect_dict[packet_type]['last_calculate_time']
-            duration = event_time - last_calculate_time
-
-            if duration >= 1:
-                count = 0
-
-                try:
-                    start = self._packet_collect_dict[packet_type]['sampling'].index(
-                        last_calculate_time)
-                    end = self._packet_collect_dict[packet_type]['sampling'].index(
-                        event_time)
-                    count = end - start
-                except ValueError:
-                    count = 0
-
-                self._packet_collect_dict[packet_type]['rate'] = round(
-                    count/duration, 1)
-
-                self._packet_collect_dict[packet_type]['last_calculate_time'] = event_time
+            self._get_counter(packet_type).add_success(event_time)
 
         if collect_type == 'fail':
-            if packet_type not in self._failure_collect_dict:
-                self._failure_collect_dict[packet_type] = 0
+            self._get_counter(packet_type).add_failure()
 
-            self._failure_collect_dict[packet_type] += 1
+    def collect_device_time(self, packet_type, device_time, event_time):
+        ''' Collect device time tag of a received packet
+        '''
+        self._get_counter(packet_type).add_device_time(device_time, event_time)
+
+    def get_received_count(self):
+        ''' Get count of all received packets
+        '''
+        return sum([counter.received
+                    for counter in list(self._counters.values())])
 
     def reset(self):
         ''' Reset statistics
         '''
-        for packet_type in self._packet_collect_dict:
-            self._packet_collect_dict[packet_type]['received'] = 0
-            self._packet_collect_dict[packet_type]['rate'] = 0
+        for counter in list(self._counters.values()):
+            counter.reset()
 
-        for packet_type in self._failure_collect_dict:
-            self._failure_collect_dict[packet_type] = 0
-
-        self._last_time = None
+    def snapshot(self):
+        ''' Statistics of each packet type. Received and failures are
+        counts, rate is packets per second, failure ratio is ratio of crc
+        failures in all packets, interval is percentiles of intervals
+        between packets in ms. Epochs are counted by device time tags, in
+        which period is in ms, clock drift is in ppm.
+        '''
+        return dict([(packet_type, counter.get_result())
+                     for packet_type, counter in list(self._counters.items())])
 
     def get_result(self):
-        ''' Get statistics result
+        ''' Get statistics result, it is None if no change since last result
         '''
-        packet_types = self._get_packet_types()
+        result = self.snapshot()
 
-        if not packet_types:
+        if not result:
             return None
 
-        result = {}
-        for key in packet_types:
-            statistics_result = calculate_collect(
-                self._packet_collect_dict,
-                self._failure_collect_dict,
-                key
-            )
-            result[key] = statistics_result
-
         # diff the last statistics, if no change, return None
         if self._last_statistics == result:
             return None
@@ -0,0 +1,344 @@
+'''
+Broadcast output packets to websocket clients. Packets of devices are
+collected into bounded buffers under one lock, the buffers are swapped and
+flushed to clients every update period. Each client subscribes
+to packet types with a max rate and an encoding, a batch is decimated and
+encoded once for all clients of same rate and encoding. Messages of a client
+are sent through a bounded queue, so a slow client drops its oldest frames
+instead of stalling others.
+'''
+import json
+import time
+import threading
+import collections
+
+DEFAULT_MAX_QUEUE = 100
+# samples of a packet type kept between flushes, the oldest is dropped when
+# it is full, such as the loop is stalled
+DEFAULT_CAPACITY = 2000
+
+ENCODING_JSON = 'json'
+# field names are sent once in a schema message, then batches of the schema
+# are sent as column arrays
+ENCODING_COLUMNAR = 'columnar'
+ENCODINGS = [ENCODING_JSON, ENCODING_COLUMNAR]
+
+SCHEMA_PACKET_TYPE = 'schema'
+
+
+def encode_message(method, result, device_id=None):
+    '''
+    Encode message in the format of websocket response
+    '''
+    message = {
+        'method': method,
+        'result': result
+    }
+    if device_id is not None:
+        message['deviceId'] = device_id
+    return json.dumps(message)
+
+
+def pick_evenly(samples, count):
+    if count >= len(samples):
+        return samples
+    if count <= 0:
+        return []
+    step = len(samples) / count
+    return [samples[int(index * step)] for index in range(count)]
+
+
+class HubClient(object):
+    '''
+    A subscriber of hub. send(message) writes message to the client, and
+    returns a future which is done when it is written, or None. The next
+    message is sent after the previous one is written.
+    '''
+
+    def __init__(self, send, max_queue=DEFAULT_MAX_QUEUE):
+        self.send = send
+        self.is_streaming = False
+        # None is all packet types
+        self.packet_types = None
+        # max samples per second of a packet type, 0 is not decimated
+        self.max_rate = 0
+        self.encoding = ENCODING_JSON
+        self.known_schemas = set()
+        self.sent_count = 0
+        self.dropped_count = 0
+        # samples skipped by decimation to max rate
+        self.decimated_count = 0
+        self._max_queue = max_queue
+        # items are (message, is_droppable)
+        self._queue = collections.deque()
+        self._is_writing = False
+
+    def subscribe(self, packet_types=None, max_rate=0,
+                  encoding=ENCODING_JSON):
+        if encoding not in ENCODINGS:
+            raise ValueError('Unknown encoding {0}'.format(encoding))
+        if max_rate < 0:
+            raise ValueError('Max rate should not be negative')
+
+        self.packet_types = set(packet_types) \
+            if packet_types is not None else None
+        self.max_rate = max_rate
+        self.encoding = encoding
+
+    def is_subscribed(self, packet_type):
+        return self.packet_types is None or packet_type in self.packet_types
+
+    @property
+    def queue_size(self):
+        return len(self._queue)
+
+    def put(self, message, is_droppable=True):
+        '''
+        Queue message, the oldest droppable message is dropped if queue is
+        full. Message not droppable, such as a schema, is always queued.
+        '''
+        if len(self._queue) >= self._max_queue:
+            for index, (_, queued_droppable) in enumerate(self._queue):
+                if queued_droppable:
+                    del self._queue[index]
+                    self.dropped_count += 1
+                    break
+        self._queue.append((message, is_droppable))
+        self._write_next()
+
+    def get_status(self):
+        return {
+            'sentCount': self.sent_count,
+            'droppedCount': self.dropped_count,
+            'decimatedCount': self.decimated_count,
+            'queueSize': len(self._queue)
+        }
+
+    def _write_next(self):
+        while not self._is_writing and self._queue:
+            message, _ = self._queue.popleft()
+            future = self.send(message)
+            self.sent_count += 1
+            if future is not None and not future.done():
+                self._is_writing = True
+                future.add_done_callback(self._on_written)
+
+    def _on_written(self, future):
+        # such as the connection is closed, it is handled by on_close
+        future.exception()
+        self._is_writing = False
+        self._write_next()
+
+
+class StreamHub(object):
+    '''
+    Collect output packets from device threads, flush them to clients on
+    the loop
+    '''
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.clients = ()
+        self.capacity = capacity
+        # (device_id, packet_type): count of samples dropped by overflow
+        self.overflow_counts = {}
+        self._lock = threading.Lock()
+        # (device_id, packet_type): deque of (arrive_time, data), it is
+        # swapped with an empty one on flush
+        self._collection = {}
+        # (device_id, packet_type): data, only the latest one is sent
+        self._latest = {}
+        self._is_collect_all = False
+        self._collect_types = frozenset()
+        # (device_id, packet_type, max_rate): (tokens, last_time)
+        self._buckets = {}
+        # (packet_type, fields): schema id
+        self._schemas = {}
+        self._schema_messages = {}
+
+    def add_client(self, client):
+        self.clients = self.clients + (client,)
+        self.update_subscriptions()
+
+    def remove_client(self, client):
+        self.clients = tuple([item for item in self.clients
+                              if item is not client])
+        self.update_subscriptions()
+
+    def update_subscriptions(self):
+        '''
+        Update packet types to collect, it should be called when a client
+        subscribes, starts or stops stream
+        '''
+        streaming_clients = [client for client in self.clients
+                             if client.is_streaming]
+        self._is_collect_all = any([client.packet_types is None
+                                    for client in streaming_clients])
+        collect_types = set()
+        for client in streaming_clients:
+            if client.packet_types is not None:
+                collect_types.update(client.packet_types)
+        self._collect_types = frozenset(collect_types)
+
+    def collect(self, device_id, packet_type, data):
+        '''
+        Collect output packet, packet no client streams is skipped. It could
+        be called from device thread.
+        '''
+        if not self._is_collect_all and \
+                packet_type not in self._collect_types:
+            return
+
+        key = (device_id, packet_type)
+        with self._lock:
+            samples = self._collection.get(key)
+            if samples is None:
+                samples = self._collection[key] = collections.deque(
+                    maxlen=self.capacity)
+            elif len(samples) == self.capacity:
+                self.overflow_counts[key] = \
+                    self.overflow_counts.get(key, 0) + 1
+            samples.append((time.time(), data))
+
+    def collect_latest(self, device_id, packet_type, data):
+        '''
+        Keep the latest data of packet type, it is sent to all clients,
+        such as upgrade progress
+        '''
+        with self._lock:
+            self._latest[(device_id, packet_type)] = data
+
+    def broadcast(self, message, is_streaming_only=False, is_droppable=True):
+        '''
+        Send an encoded message to clients
+        '''
+        for client in self.clients:
+            if is_streaming_only and not client.is_streaming:
+                continue
+            client.put(message, is_droppable)
+
+    def has_streaming_client(self):
+        return any([client.is_streaming for client in self.clients])
+
+    def get_overflow_status(self):
+        '''
+        Count of samples dropped by overflow, of each packet type
+        '''
+        with self._lock:
+            overflow_counts = list(self.overflow_counts.items())
+        return [{
+            'deviceId': device_id,
+            'packetType': packet_type,
+            'droppedCount': count
+        } for (device_id, packet_type), count in overflow_counts]
+
+    def flush(self):
+        '''
+        Send collected packets to clients, it should be called on the loop
+        '''
+        with self._lock:
+            collection, self._collection = self._collection, {}
+            latest, self._latest = self._latest, {}
+
+        for (device_id, packet_type), data in latest.items():
+            self.broadcast(encode_message('stream', {
+                'packetType': packet_type,
+                'data': data
+            }, device_id))
+
+        now = time.time()
+        for (device_id, packet_type), samples in collection.items():
+            self._flush_packet(device_id, packet_type, list(samples), now)
+
+    def _flush_packet(self, device_id, packet_type, samples, now):
+        decimated_samples = {}
+        frames = {}
+        for client in self.clients:
+            if not client.is_streaming or \
+                    not client.is_subscribed(packet_type):
+                continue
+
+            frame_key = (client.max_rate, client.encoding)
+            if frame_key not in frames:
+                if client.max_rate not in decimated_samples:
+                    decimated_samples[client.max_rate] = self._decimate(
+                        device_id, packet_type, client.max_rate, samples, now)
+                frames[frame_key] = self._encode(
+                    device_id, packet_type,
+                    decimated_samples[client.max_rate], client.encoding)
+
+            client.decimated_count += \
+                len(samples) - len(decimated_samples[client.max_rate])
+            for message, schema_id in frames[frame_key]:
+                if schema_id is not None and \
+                        schema_id not in client.known_schemas:
+                    client.put(self._schema_messages[schema_id], False)
+                    client.known_schemas.add(schema_id)
+                client.put(message)
+
+    def _decimate(self, device_id, packet_type, max_rate, samples, now):
+        '''
+        Pick samples evenly, at most max_rate samples per second on average.
+        Samples are often received in bursts, so the budget is refilled by
+        elapsed time instead of checking arrive time of each sample.
+        '''
+        if not max_rate:
+            return [data for _, data in samples]
+
+        key = (device_id, packet_type, max_rate)
+        tokens, last_time = self._buckets.get(key, (1, now))
+        # budget of one second at most is kept
+        tokens = min(tokens + (now - last_time) * max_rate, max(max_rate, 1))
+        count = min(len(samples), int(tokens))
+        self._buckets[key] = (tokens - count, now)
+        return [data for _, data in pick_evenly(samples, count)]
+
+    def _encode(self, device_id, packet_type, samples, encoding):
+        '''
+        Encode samples into list of (message, schema id)
+        '''
+        if len(samples) == 0:
+            return []
+
+        if encoding == ENCODING_COLUMNAR and \
+                all([isinstance(sample, dict) for sample in samples]):
+            return self._encode_columnar(device_id, packet_type, samples)
+
+        return [(encode_message('stream', {
+            'packetType': packet_type,
+            'data': samples
+        }, device_id), None)]
+
+    def _encode_columnar(self, device_id, packet_type, samples):
+        # samples of same fields are in one batch
+        batches = []
+        for sample in samples:
+            fields = tuple(sample.keys())
+            if len(batches) == 0 or batches[-1][0] != fields:
+                batches.append((fields, []))
+            batches[-1][1].append(list(sample.values()))
+
+        frames = []
+        for fields, rows in batches:
+            schema_id = self._get_schema_id(packet_type, fields)
+            frames.append((encode_message('stream', {
+                'packetType': packet_type,
+                'encoding': ENCODING_COLUMNAR,
+                'schemaId': schema_id,
+                'data': [list(column) for column in zip(*rows)]
+            }, device_id), schema_id))
+        return frames
+
+    def _get_schema_id(self, packet_type, fields):
+        schema_id = self._schemas.get((packet_type, fields))
+        if schema_id is None:
+            schema_id = len(self._schemas) + 1
+            self._schemas[(packet_type, fields)] = schema_id
+            self._schema_messages[schema_id] = encode_message('stream', {
+                'packetType': SCHEMA_PACKET_TYPE,
+                'data': {
+                    'schemaId': schema_id,
+                    'packetType': packet_type,
+                    'fields': list(fields)
+                }
+            })
+        return schema_id
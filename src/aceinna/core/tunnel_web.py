@@ -1,12 +1,15 @@
 import os
 import sys
 import json
+import threading
 import traceback
+import contextvars
 import tornado.websocket
 import tornado.ioloop
 import tornado.httpserver
 import tornado.web
 from .tunnel_base import (TunnelBase, TunnelEvents)
+from .stream_hub import (StreamHub, HubClient, encode_message)
 from .. import VERSION
 from ..framework.context import APP_CONTEXT
 from ..framework.constants import DEFAULT_PORT_RANGE
@@ -23,19 +26,23 @@ SERVER_UPDATE_RATE = 50
 
 OPERATION_PACKET_TYPES = [
     'ping', 'upgrade_complete',
-    'mag_status', 'backup_status', 'restore_status'
+    'mag_status', 'backup_status', 'restore_status',
+    'fleet_upgrade_status', 'fleet_upgrade_complete'
 ]  # 'upgrade_progress'
 
+# the client whose request is handled, invoke result is responded to it
+REQUEST_CLIENT = contextvars.ContextVar('request_client', default=None)
+
 
 class WSHandler(tornado.websocket.WebSocketHandler):
     '''
-    Websocket handler
+    Websocket handler, one for each client. Output packets are sent by
+    stream hub of server.
     '''
-    is_streaming = False
     is_logging = False
     file_logger = None
-    period_output_callback = None
-    _output_packet_collection = {}
+    logging_device_id = None
+    client = None
     _tunnel = None
 
     # override methods
@@ -44,9 +51,10 @@ class WSHandler(tornado.websocket.WebSocketHandler):
         Websocket handler initialize
         '''
         self._tunnel = server
-        server.ws_handler = self
+        self.client = HubClient(self._write_frame)
 
     def open(self):
+        self._tunnel.add_ws_handler(self)
         device_context = APP_CONTEXT.device_context
 
         if device_context and device_context.connected:
@@ -54,61 +62,45 @@ class WSHandler(tornado.websocket.WebSocketHandler):
         else:
             self.response_device_isnot_connected()
 
-        self.period_output_callback = tornado.ioloop.PeriodicCallback(
-            self.response_output_packet_data, SERVER_UPDATE_RATE)
-        self.period_output_callback.start()
+    @property
+    def is_streaming(self):
+        return self.client.is_streaming
 
-    def on_message(self, message):
+    async def on_message(self, message):
         client_msg = json.loads(message)
         method = client_msg['method'] if 'method' in client_msg else None
         parameters = client_msg['params'] if 'params' in client_msg else None
+        # device is addressed by id in multi-device mode
+        device_id = client_msg.get('deviceId')
 
         if not method:
             self.response_unkonwn_method()
             return
 
         try:
-            self._handle_message(method, parameters)
+            REQUEST_CLIENT.set(self)
+            await self._handle_message(method, parameters, device_id)
         except Exception as ex:  # pylint:disable=broad-except
             print_red('Error when execute command:{0}'.format(ex))
             if resource.is_dev_mode():
                 traceback.print_exc()
             self.response_message(
-                method, {'packetType': 'error', 'data': 'Server Error'})
+                method, {'packetType': 'error', 'data': 'Server Error'},
+                device_id)
 
     def on_close(self):
         self._reset()
-        try:
-            self.period_output_callback.stop()
-        except:  # pylint:disable=bare-except
-            # need log exception
-            pass
+        self._tunnel.remove_ws_handler(self)
 
     def check_origin(self, origin):
         return True
 
-    def handle_continous_data(self, packet_type, data):
+    def log_continous_data(self, packet_type, data, device_id=None):
         '''
-        Listenr for receive output packet
+        Log output packet if the client is recording log of the device
         '''
-        if packet_type in OPERATION_PACKET_TYPES:
-            return self.response_message('stream', {
-                'packetType': packet_type,
-                'data': data
-            })
-
-        if packet_type == 'upgrade_progress':
-            self._output_packet_collection[packet_type] = data
-
-        if not self.is_streaming:
-            return
-
-        if not packet_type in self._output_packet_collection:
-            self._output_packet_collection[packet_type] = []
-
-        self._output_packet_collection[packet_type].append(data)
-
-        if self.file_logger and self.is_logging:
+        if self.file_logger and self.is_logging and self.is_streaming and \
+                device_id == self.logging_device_id:
             self.file_logger.append(packet_type, data)
 
     # private
@@ -116,28 +108,38 @@ class WSHandler(tornado.websocket.WebSocketHandler):
         '''
         Reset some status after request from client
         '''
-        self.is_streaming = False
+        self.client.is_streaming = False
+        self._tunnel.stream_hub.update_subscriptions()
         self.is_logging = False
         if self.file_logger:
             self.file_logger.stop_user_log()
 
-    def _handle_message(self, method, parameters):
+    def _write_frame(self, message):
+        try:
+            return self.write_message(message)
+        except tornado.websocket.WebSocketClosedError:
+            return None
+
+    async def _handle_message(self, method, parameters, device_id=None):
         '''
         Handle received message
         '''
-        device_context = APP_CONTEXT.device_context
-
         converted_method = helper.name_convert_camel_to_snake(method)
 
         if hasattr(self, converted_method):
-            getattr(self, converted_method, None)(parameters)
+            getattr(self, converted_method, None)(parameters, device_id)
+        elif self._tunnel.async_request_handler:
+            # device commands are awaited on the loop
+            await self._tunnel.async_request_handler(
+                method, converted_method, parameters, device_id)
         else:
             # if device_context.check_allow_method(converted_method):
             try:
                 self._tunnel.emit(TunnelEvents.Request,
                                   method,
                                   converted_method,
-                                  parameters)
+                                  parameters,
+                                  device_id)
             except Exception as ex:
                 if resource.is_dev_mode():
                     traceback.print_exc()
@@ -155,11 +157,14 @@ class WSHandler(tornado.websocket.WebSocketHandler):
             self.response_server_info(device_context)
 
     # response
-    def response_device_lost(self):
+    def response_device_lost(self, device_id=None):
         self.response_message(
             'stream', {
                 'packetType': 'ping', 'data': {'status': 2}
-            })
+            }, device_id)
+        if device_id is not None:
+            # other devices are still connected
+            return
         self.response_message('stream', {
             'packetType': 'serverInfo',
             'data': {
@@ -169,31 +174,15 @@ class WSHandler(tornado.websocket.WebSocketHandler):
                 'clientCount': 0,
             }})
 
-    def response_invoke(self, method, result):
-        self.response_message(method, result)
+    def response_invoke(self, method, result, device_id=None):
+        self.response_message(method, result, device_id)
 
-    @skip_error(tornado.websocket.WebSocketClosedError)
-    def response_message(self, method, data):
+    def response_message(self, method, data, device_id=None):
         '''
-        Format response
+        Format response, it should be called on the loop, see WebServer.notify.
+        Response is queued after stream frames, and it is not dropped.
         '''
-        loop = None
-        if sys.version_info[0] > 2:
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                pass
-
-            if not loop:
-                loop = self._tunnel.non_main_ioloop.asyncio_loop
-                asyncio.set_event_loop(loop)
-
-        self.write_message(
-            json.dumps({
-                'method': method,
-                'result': data
-            }))
+        self.client.put(encode_message(method, data, device_id), False)
 
     @skip_error(tornado.websocket.WebSocketClosedError)
     def response_unkonwn_method(self):
@@ -220,35 +209,6 @@ class WSHandler(tornado.websocket.WebSocketHandler):
                 'deviceType': device_context.device_type
             }})
 
-    @skip_error(tornado.websocket.WebSocketClosedError)
-    def response_output_packet_data(self):
-        '''
-        Response continous data
-        '''
-
-        # fetch data from output_packet_queue
-        collection_clone = self._output_packet_collection.copy()
-        # TODO: may have object sync issue because of multi thread
-        for packet_type in self._output_packet_collection:
-            self._output_packet_collection[packet_type] = []
-
-        for packet_type in collection_clone:
-            if len(collection_clone[packet_type]) > 0:
-                self.response_message('stream', {
-                    'packetType': packet_type,
-                    'data': collection_clone[packet_type]
-                })
-
-        if not self.is_streaming:
-            return
-
-        statistics_result = APP_CONTEXT.statistics.get_result()
-        if statistics_result:
-            self.response_message('stream', {
-                'packetType': 'statistics',
-                'data': statistics_result
-            })
-
     def response_device_isnot_connected(self):
         '''
         Response device is not connected
@@ -281,30 +241,93 @@ class WSHandler(tornado.websocket.WebSocketHandler):
         '''
         Start to send stream data
         '''
-        self._output_packet_collection = {}
         self.response_message('startStream', {'packetType': 'success'})
-        self.is_streaming = True
+        self.client.is_streaming = True
+        self._tunnel.stream_hub.update_subscriptions()
 
     def stop_stream(self, *args):  # pylint: disable=invalid-name
         '''
         Stop sending stream data
         '''
         self.response_message('stopStream', {'packetType': 'success'})
-        self.is_streaming = False
+        self.client.is_streaming = False
+        self._tunnel.stream_hub.update_subscriptions()
+
+    def subscribe(self, *args):  # pylint: disable=invalid-name
+        '''
+        Subscribe stream of packet types, parameters are packetTypes (all
+        if it is not set), maxRate (samples per second of a packet type, 0
+        is not decimated) and encoding ('json' or 'columnar')
+        '''
+        parameters = args[0] or {}
+        try:
+            self.client.subscribe(parameters.get('packetTypes'),
+                                  parameters.get('maxRate', 0),
+                                  parameters.get('encoding', 'json'))
+        except (ValueError, TypeError) as ex:
+            self.response_message('subscribe', {
+                'packetType': 'error',
+                'data': {'message': str(ex)}})
+            return
+
+        self._tunnel.stream_hub.update_subscriptions()
+        self.response_message('subscribe', {'packetType': 'success'})
+
+    def get_stream_status(self, *args):  # pylint: disable=invalid-name
+        '''
+        Count of sent and dropped stream frames of this client, and count
+        of samples dropped by overflow before they are flushed
+        '''
+        status = self.client.get_status()
+        status['overflow'] = self._tunnel.stream_hub.get_overflow_status()
+        self.response_message('getStreamStatus', {
+            'packetType': 'success', 'data': status})
+
+    def get_statistics(self, *args):  # pylint: disable=invalid-name
+        '''
+        Statistics of output packets of device
+        '''
+        device_id = args[1] if len(args) > 1 else None
+        device_context = APP_CONTEXT.get_device_context(device_id)
+        statistics = device_context.statistics if device_context \
+            else APP_CONTEXT.statistics
+        self.response_message('getStatistics', {
+            'packetType': 'statistics', 'data': statistics.snapshot()},
+            device_id)
+
+    def list_devices(self, *args):  # pylint: disable=invalid-name
+        '''
+        List devices of multi-device mode
+        '''
+        devices = []
+        for device_id, device_context in list(APP_CONTEXT.device_contexts.items()):
+            devices.append({
+                'deviceId': device_id,
+                'deviceType': device_context.device_type,
+                'connected': device_context.connected
+            })
+        self.response_message(
+            'listDevices', {'packetType': 'devices', 'data': devices})
 
     def start_log(self, *args):  # pylint: disable=invalid-name
         '''
         Start record log
         '''
         parameters = args[0]
-        device_context = APP_CONTEXT.device_context
+        device_id = args[1] if len(args) > 1 else None
+        device_context = APP_CONTEXT.get_device_context(device_id)
+        if device_context.device_id != self.logging_device_id:
+            self.file_logger = FileLoger(
+                device_context.properties, device_context.device_id)
+            self.logging_device_id = device_context.device_id
         self.file_logger.set_info(device_context.get_log_info)
         self.file_logger.set_user_id(parameters['id'])
         self.file_logger.set_user_access_token(parameters['access_token'])
         self.file_logger.start_user_log(parameters['fileName'], True)
         self.is_logging = True
         self.response_message(
-            'startLog', {'packetType': 'success', 'data': parameters['fileName']+'.csv'})
+            'startLog', {'packetType': 'success', 'data': parameters['fileName']+'.csv'},
+            self.logging_device_id)
 
     def stop_log(self, *args):  # pylint: disable=invalid-name
         '''
@@ -359,10 +382,14 @@ class UploadHandler(tornado.web.RequestHandler):
 
 
 class WebServer(TunnelBase):
-    ws_handler = None
+    ws_handlers = ()
+    stream_hub = None
     options = None
     http_server = None
     non_main_ioloop = None
+    async_request_handler = None
+    period_output_callback = None
+    _loop_thread_id = None
 
     def __init__(self, options, event_loop):
         super(WebServer, self).__init__()
@@ -371,23 +398,110 @@ class WebServer(TunnelBase):
             event_loop = tornado.ioloop.IOLoop.current()
 
         self.non_main_ioloop = event_loop
+        self.stream_hub = StreamHub()
+
+    def add_ws_handler(self, ws_handler):
+        # replaced instead of changed, it is iterated by device threads
+        self.ws_handlers = self.ws_handlers + (ws_handler,)
+        self.stream_hub.add_client(ws_handler.client)
+
+    def remove_ws_handler(self, ws_handler):
+        self.ws_handlers = tuple([handler for handler in self.ws_handlers
+                                  if handler is not ws_handler])
+        self.stream_hub.remove_client(ws_handler.client)
+
+    def handle_continous_data(self, packet_type, data, device_id=None):
+        '''
+        Listenr for receive output packet
+        '''
+        if packet_type in OPERATION_PACKET_TYPES:
+            return self.stream_hub.broadcast(encode_message('stream', {
+                'packetType': packet_type,
+                'data': data
+            }, device_id), is_droppable=False)
+
+        if packet_type == 'upgrade_progress':
+            return self.stream_hub.collect_latest(device_id, packet_type, data)
+
+        # output packets of devices are collected separately
+        self.stream_hub.collect(device_id, packet_type, data)
+
+        for ws_handler in self.ws_handlers:
+            ws_handler.log_continous_data(packet_type, data, device_id)
+
+    def response_output_packet_data(self):
+        '''
+        Response continous data
+        '''
+        self.stream_hub.flush()
+
+        if not self.stream_hub.has_streaming_client():
+            return
+
+        device_contexts = APP_CONTEXT.device_contexts
+        if len(device_contexts) == 0:
+            statistics_result = APP_CONTEXT.statistics.get_result()
+            if statistics_result:
+                self.stream_hub.broadcast(encode_message('stream', {
+                    'packetType': 'statistics',
+                    'data': statistics_result
+                }), is_streaming_only=True)
+            return
+
+        for device_id, device_context in list(device_contexts.items()):
+            statistics_result = device_context.statistics.get_result()
+            if statistics_result:
+                self.stream_hub.broadcast(encode_message('stream', {
+                    'packetType': 'statistics',
+                    'data': statistics_result
+                }, device_id), is_streaming_only=True)
+
+    def set_async_request_handler(self, handler):
+        '''
+        Set coroutine function to handle request instead of Request event
+        '''
+        self.async_request_handler = handler
 
     def notify(self, notify_type, *other):
-        if self.ws_handler is None:
+        if len(self.ws_handlers) == 0:
+            return
+
+        # output packets are only collected, others are responded on the loop
+        is_collect_only = notify_type == 'continous' and \
+            other[0] not in OPERATION_PACKET_TYPES
+        if not is_collect_only and \
+                threading.get_ident() != self._loop_thread_id:
+            self.non_main_ioloop.add_callback(
+                self.notify, notify_type, *other)
             return
 
         if notify_type == 'continous':
-            return self.ws_handler.handle_continous_data(*other)
+            return self.handle_continous_data(*other)
 
         if notify_type == 'discovered':
+            device_id = other[0] if len(other) > 0 else None
+            if device_id is not None and \
+                    APP_CONTEXT.get_device_context() is not \
+                    APP_CONTEXT.get_device_context(device_id):
+                # server info is about the default device
+                return
             device_context = APP_CONTEXT.device_context
-            return self.ws_handler.handle_device_found(device_context)
+            for ws_handler in self.ws_handlers:
+                ws_handler.handle_device_found(device_context)
+            return
 
         if notify_type == 'lost':
-            return self.ws_handler.response_device_lost(*other)
+            for ws_handler in self.ws_handlers:
+                ws_handler.response_device_lost(*other)
+            return
 
         if notify_type == 'invoke':
-            return self.ws_handler.response_invoke(*other)
+            request_client = REQUEST_CLIENT.get()
+            if request_client in self.ws_handlers:
+                return request_client.response_invoke(*other)
+            # the request is not known, such as it is from other thread
+            for ws_handler in self.ws_handlers:
+                ws_handler.response_invoke(*other)
 
     def setup(self):
         try:
@@ -414,6 +528,10 @@ class WebServer(TunnelBase):
                 self.http_server.listen(self.options.port)
                 activated_port = self.options.port
             print('[Info] Websocket server is started on port', activated_port)
+            self._loop_thread_id = threading.get_ident()
+            self.period_output_callback = tornado.ioloop.PeriodicCallback(
+                self.response_output_packet_data, SERVER_UPDATE_RATE)
+            self.period_output_callback.start()
             self.non_main_ioloop.start()
             # tornado.ioloop.IOLoop.current().start()
         except Exception as ex:
@@ -0,0 +1,285 @@
+import uuid
+import asyncio
+import datetime
+import collections
+
+from .base import EventBase
+from .message_center import (
+    DeviceMessage, EVENT_TYPE, match_inflight_message)
+from .decorator import (format_message_result, is_device_message_list)
+
+
+def _get_running_loop():
+    if hasattr(asyncio, 'get_running_loop'):
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+    return asyncio._get_running_loop()  # pylint: disable=protected-access
+
+
+class AsyncDeviceMessageCenter(EventBase):
+    '''
+    Device message center on an asyncio loop, it has the same interface as
+    DeviceMessageCenter. Data is received by the transport of communicator,
+    timeout of message is scheduled on the loop, so no thread is started.
+    Methods could be called from other threads, they are run on the loop.
+    '''
+
+    def __init__(self, communicator, loop, pipeline_window=1):
+        super(AsyncDeviceMessageCenter, self).__init__()
+        self._communicator = communicator
+        self._loop = loop
+        self._transport = None
+        self._parser = None
+        self._is_ready = False
+        self._is_pause = False
+        self._is_stop = False
+        self._run_id = None
+        self._last_timeout_command = None
+        self._pipeline_window = max(pipeline_window, 1)
+        # messages written to device and waiting for response, in write order
+        self._inflight_messages = []
+        self._prerun_messages = collections.deque()
+        self._timeout_handles = {}
+        self._read_block_count = 0
+        self._read_byte_count = 0
+
+    @property
+    def paused(self):
+        ''' Check if the message center is paused
+        '''
+        return self._is_pause
+
+    def is_ready(self):
+        '''Check if message center is setuped
+        '''
+        return self._is_ready
+
+    def set_parser(self, parser):
+        self._parser = parser
+        self._parser.on('crc_failure', self.on_crc_failure)
+        self._parser.on('command', self.on_command_receive)
+        self._parser.on('continuous_message',
+                        self.on_continuous_messageReceive)
+
+    def get_parser(self):
+        return self._parser
+
+    def build(self, command, timeout=3):
+        return DeviceMessage(self, command, timeout)
+
+    def set_pipeline_window(self, size):
+        '''
+        Set max count of messages waiting for response at the same time
+        '''
+        self._call_soon(self._set_pipeline_window, size)
+
+    def request_run(self, message):
+        self._call_soon(self._request_run, message)
+
+    def setup(self):
+        self._is_stop = False
+        self._call_soon(self._start_transport)
+        self._is_ready = True
+
+    def pause(self):
+        self._is_pause = True
+        self._call_soon(self._pause_transport)
+
+    def resume(self):
+        self._is_pause = False
+        self._communicator.reset_buffer()
+        self._call_soon(self._start_transport)
+
+    def stop(self):
+        self._is_stop = True
+        self._call_soon(self._stop)
+
+    def get_statistics(self):
+        ''' Get statistics of receive pipeline
+        '''
+        return {
+            'inflight_count': len(self._inflight_messages),
+            'pending_count': len(self._prerun_messages),
+            'read_block_count': self._read_block_count,
+            'read_byte_count': self._read_byte_count
+        }
+
+    def on_command_receive(self, *args, **kwargs):
+        if len(self._inflight_messages) > 0:
+            message = match_inflight_message(
+                self._inflight_messages,
+                kwargs.get('packet_type'), kwargs.get('data'))
+            if message:
+                self._remove_inflight(message)
+                message.finish(**kwargs)
+        self._run_post()
+
+    def on_continuous_messageReceive(self, *args, **kwargs):
+        self.emit(EVENT_TYPE.CONTINUOUS_MESSAGE, **kwargs)
+
+    def on_crc_failure(self, *args, **kwargs):
+        self.emit(EVENT_TYPE.CRC_FAILURE, **kwargs)
+
+    # methods run on the loop
+    def _call_soon(self, func, *args):
+        if _get_running_loop() is self._loop:
+            func(*args)
+        else:
+            self._loop.call_soon_threadsafe(func, *args)
+
+    def _set_pipeline_window(self, size):
+        self._pipeline_window = max(size, 1)
+        self._run_post()
+
+    def _request_run(self, message):
+        if len(self._inflight_messages) < self._pipeline_window and \
+                len(self._prerun_messages) == 0:
+            self._run(message)
+        else:
+            self._prerun_messages.append(message)
+
+    def _run(self, message):
+        if len(self._inflight_messages) == 0:
+            self._run_id = str(uuid.uuid1())
+
+        self._inflight_messages.append(message)
+        message.set_start_time(datetime.datetime.now())
+        message.set_deadline(self._loop.time() + message.get_timeout())
+        message.set_key(self._parser.get_command_key(message.get_command()))
+        self._timeout_handles[message] = self._loop.call_at(
+            message.get_deadline(), self._on_timeout, message)
+
+        self._parser.set_run_command(message.get_command())
+        self._communicator.write(message.get_command())
+
+    def _run_post(self):
+        while len(self._inflight_messages) < self._pipeline_window and \
+                len(self._prerun_messages) > 0:
+            self._run(self._prerun_messages.popleft())
+
+        if len(self._inflight_messages) == 0:
+            self._run_id = None
+
+    def _remove_inflight(self, message):
+        self._inflight_messages.remove(message)
+        handle = self._timeout_handles.pop(message, None)
+        if handle:
+            handle.cancel()
+
+    def _on_timeout(self, message):
+        if message not in self._inflight_messages:
+            return
+
+        self._remove_inflight(message)
+        # cancelled message is already finished
+        if not message.get_finished():
+            timeout_command = message.get_command()
+            print('command timeout',
+                  timeout_command,
+                  message.get_timeout(), message.get_start_time(),
+                  datetime.datetime.now())
+            packet_info = self._parser.get_packet_info(timeout_command)
+            self._last_timeout_command = packet_info
+            self._last_timeout_command['run_id'] = self._run_id
+            message.finish(error='Timeout', **packet_info)
+        self._run_post()
+
+    def _start_transport(self):
+        if self._is_stop or self._is_pause:
+            return
+
+        if self._transport is None:
+            # communicators import devices, so it is imported when used
+            from ..framework.communicators.async_transport import \
+                create_transport
+            self._transport = create_transport(
+                self._communicator, self._loop,
+                self._on_data, self._on_transport_error)
+        self._transport.start()
+
+    def _pause_transport(self):
+        if self._transport:
+            self._transport.pause()
+
+    def _stop(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+        pending_messages = self._inflight_messages + \
+            list(self._prerun_messages)
+        for message in self._inflight_messages[:]:
+            self._remove_inflight(message)
+        self._prerun_messages.clear()
+        self._run_id = None
+
+        # wake up the callers waiting for response
+        for message in pending_messages:
+            message.cancel('Stopped')
+
+    def _on_data(self, data):
+        self._read_block_count += 1
+        self._read_byte_count += len(data)
+        self.emit(EVENT_TYPE.READ_BLOCK, data)
+        if self._parser:
+            self._parser.analyse(data)
+
+    def _on_transport_error(self, ex):
+        print('Transport:receiver error:', ex)
+        # a new transport is created when resume
+        self._transport = None
+        self.emit(EVENT_TYPE.ERROR, 'app', 'communicator read error')
+
+
+async def wait_device_message(device_message):
+    '''
+    Wait the device message finished on the running loop, the message
+    could be finished by either message center
+    '''
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    def set_result():
+        if not future.done():
+            future.set_result(format_message_result(device_message))
+
+    def on_finished(**kwargs):  # pylint: disable=unused-argument
+        loop.call_soon_threadsafe(set_result)
+
+    device_message.on('finished', on_finished)
+    if device_message.get_finished():
+        set_result()
+    return await future
+
+
+async def execute_device_message(generator_func):
+    '''
+    Run the generator of a method decorated by with_device_message, it works
+    the same as with_device_message, but awaits the device messages
+    '''
+    try:
+        device_message = generator_func.send(None)
+        while True:
+            if isinstance(device_message, DeviceMessage):
+                device_message.send()
+                result = await wait_device_message(device_message)
+            elif is_device_message_list(device_message):
+                for item in device_message:
+                    item.send()
+                result = await asyncio.gather(
+                    *[wait_device_message(item) for item in device_message])
+                result = list(result)
+            else:
+                return device_message
+            device_message = generator_func.send(result)
+    except StopIteration as ex:
+        value = {
+            'packetType': 'error',
+            'data': 'No Response'
+        }
+
+        if hasattr(ex, 'value'):
+            value = ex.value
+        return value
@@ -1,7 +1,10 @@
+import struct
 from abc import ABCMeta, abstractmethod
 from . import EventBase
 from ...framework.utils import helper
 
+PARAMETER_COMMANDS = ['gP']
+
 class MessageParserBase(EventBase):
     '''
         Message parser base
@@ -43,3 +46,18 @@ class MessageParserBase(EventBase):
             'data': payload,
             'raw': raw_command
         }
+
+    def get_command_key(self, raw_command):
+        '''
+        Build the key to match a response with its command,
+        it is (packet type, param id), param id is None if not required
+        '''
+        packet_type, payload, error = helper.parse_command_packet(raw_command)
+        if error:
+            return None
+
+        param_id = None
+        if packet_type in PARAMETER_COMMANDS and len(payload) >= 4:
+            param_id = struct.unpack(
+                '<I', bytes(bytearray(payload[0:4])))[0]
+        return packet_type, param_id
@@ -1,24 +1,30 @@
 from abc import ABCMeta, abstractmethod
 import os
 import sys
+import asyncio
+import functools
+import inspect
 import threading
 import uuid
-import time
 import struct
 import traceback
 from pathlib import Path
 from azure.storage.blob import BlockBlobService
 from . import EventBase
 from ...framework.context import APP_CONTEXT
+from ...core.packet_statistics import get_device_time
 from ...framework.utils import (helper, resource)
+from ...framework.utils.firmware_parser import FirmwareBundle
 from ...framework.file_storage import FileLoger
 from ...framework.configuration import get_config
 from ...framework.ans_platform_api import AnsPlatformAPI
 from ...framework.progress_bar import ProgressBar
 from ...framework.constants import INTERFACES
 from ..message_center import (DeviceMessageCenter, EVENT_TYPE)
+from ..async_message_center import (
+    AsyncDeviceMessageCenter, execute_device_message)
 from ..parser_manager import ParserManager
-from ..upgrade_center import UpgradeCenter
+from ..upgrade_center import (UpgradeCenter, format_timing_report)
 
 if sys.version_info[0] > 2:
     from queue import Queue
@@ -52,9 +58,19 @@ class OpenDeviceBase(EventBase):
         self.enable_data_log = True
         self.cli_options = None
         self._message_center = None
+        # count of commands waiting for response at the same time
+        self.message_pipeline_window = 1
+        # max count of read blocks waiting to be parsed, 0 is unbounded
+        self.message_queue_size = 0
+        # message center runs on the loop if it is set
+        self._event_loop = None
+        # set in multi-device mode, see set_device_id
+        self.device_id = None
+        self._statistics = None
         self.sessionId = None
         self.ans_platform = AnsPlatformAPI()
         self._pbar = None
+        self._upgrade_center = None
         self._device_info_string = ''
         self.with_upgrade_error = False
 
@@ -62,6 +78,12 @@ class OpenDeviceBase(EventBase):
     def is_in_bootloader(self):
         return False
 
+    @property
+    def statistics(self):
+        ''' Packet statistics of the device, it is shared if not set
+        '''
+        return self._statistics or APP_CONTEXT.statistics
+
     @abstractmethod
     def load_properties(self):
         '''
@@ -116,8 +138,15 @@ class OpenDeviceBase(EventBase):
         '''
 
     def _setup_message_center(self):
+        if not self._message_center and self._event_loop:
+            self._message_center = AsyncDeviceMessageCenter(
+                self.communicator, self._event_loop,
+                self.message_pipeline_window)
+
         if not self._message_center:
-            self._message_center = DeviceMessageCenter(self.communicator)
+            self._message_center = DeviceMessageCenter(
+                self.communicator, self.message_pipeline_window,
+                self.message_queue_size)
 
         if not self._message_center.is_ready():
             parser = ParserManager.build(
@@ -136,6 +165,10 @@ class OpenDeviceBase(EventBase):
             self._message_center.get_parser().set_configuration(self.properties)
             self._message_center.setup()
 
+    def _build_file_logger(self):
+        log_format = getattr(self.cli_options, 'log_format', None) or 'csv'
+        return FileLoger(self.properties, self.device_id, log_format)
+
     def setup(self, options):
         ''' Setup components
         1. load properties
@@ -143,8 +176,8 @@ class OpenDeviceBase(EventBase):
         3. log raw data
         '''
         self.load_properties()
-        self._logger = FileLoger(self.properties)
         self.cli_options = options
+        self._logger = self._build_file_logger()
 
         with_data_log = options and options.with_data_log
 
@@ -171,7 +204,11 @@ class OpenDeviceBase(EventBase):
         event handler after got continuous message
         '''
         # collect output packet data for statistics
-        APP_CONTEXT.statistics.collect('success', packet_type, event_time)
+        self.statistics.collect('success', packet_type, event_time)
+        device_time = get_device_time(data)
+        if device_time is not None:
+            self.statistics.collect_device_time(
+                packet_type, device_time, event_time)
 
         if isinstance(data, list):
             for item in data:
@@ -186,7 +223,7 @@ class OpenDeviceBase(EventBase):
         event handler when got crc failure
         '''
         # save store crc data in app context
-        APP_CONTEXT.statistics.collect('fail', packet_type, event_time)
+        self.statistics.collect('fail', packet_type, event_time)
 
     @abstractmethod
     def on_read_raw(self, data):
@@ -262,11 +299,16 @@ class OpenDeviceBase(EventBase):
 
     def thread_do_upgrade_framework(self, file):
         '''
-        Do upgrade firmware
+        Do upgrade firmware, file is a firmware file name or a loaded
+        FirmwareBundle
         '''
         try:
-            # Download firmware
-            can_download, firmware_content = self.download_firmware(file)
+            if isinstance(file, FirmwareBundle):
+                # firmware is loaded once for devices of a fleet upgrade
+                can_download, firmware_content = True, file
+            else:
+                # Download firmware
+                can_download, firmware_content = self.download_firmware(file)
             if not can_download:
                 self.handle_upgrade_error('cannot find firmware file')
                 return
@@ -274,6 +316,7 @@ class OpenDeviceBase(EventBase):
             workers = self.get_upgrade_workers(firmware_content)
 
             upgrade_center = UpgradeCenter()
+            self._upgrade_center = upgrade_center
             upgrade_center.register_workers(workers)
             upgrade_center.on('progress', self.handle_upgrade_process)
             upgrade_center.on('error', self.handle_upgrade_error)
@@ -354,8 +397,8 @@ class OpenDeviceBase(EventBase):
         self.is_upgrading = False
 
         self.load_properties()
-        self._logger = FileLoger(self.properties)
         self.cli_options = options
+        self._logger = self._build_file_logger()
 
         self._message_center.get_parser().set_configuration(self.properties)
         self._message_center.resume()
@@ -378,7 +421,7 @@ class OpenDeviceBase(EventBase):
             return False
 
         if self._logger is None:
-            self._logger = FileLoger(self.properties)
+            self._logger = self._build_file_logger()
 
         log_result = self._logger.start_user_log('data')
         if log_result == 1 or log_result == 2:
@@ -418,7 +461,12 @@ class OpenDeviceBase(EventBase):
     def handle_upgrade_complete(self):
         if self._pbar:
             self._pbar.close()
-        time.sleep(8)
+        # jump application worker waits until application responds, or for
+        # the whole wait after command if it has no probe, then the device
+        # is detected again
+        if self._upgrade_center:
+            print(format_timing_report(
+                self._upgrade_center.get_timing_report()))
         self.restart()
 
     def connect_log(self, params):
@@ -440,8 +488,59 @@ class OpenDeviceBase(EventBase):
         }
 
     def reset_statistics(self, *args):
-        APP_CONTEXT.statistics.reset()
+        self.statistics.reset()
 
         return {
             'packetType': 'success'
         }
+
+    def set_event_loop(self, loop):
+        '''
+        Run message center on the asyncio loop, it should be set before setup
+        '''
+        self._event_loop = loop
+
+    def set_device_id(self, device_id, statistics):
+        '''
+        Work as one of devices in multi-device mode, it should be set before
+        setup. Statistics is owned by the device, and data is logged in the
+        sub folder of device id.
+        '''
+        self.device_id = device_id
+        self._statistics = statistics
+        data_folder = getattr(self, 'data_folder', None)
+        if data_folder and os.path.basename(data_folder) != device_id:
+            self.data_folder = os.path.join(data_folder, device_id)
+            if not os.path.isdir(self.data_folder):
+                os.makedirs(self.data_folder)
+
+    async def get_params_async(self, *args):
+        return await self._run_device_message_async('get_params', *args)
+
+    async def set_params_async(self, params, *args):
+        return await self._run_device_message_async(
+            'set_params', params, *args)
+
+    async def get_device_info_async(self, *args):
+        return self.get_device_info(*args)
+
+    async def execute_async(self, method, *args):
+        '''
+        Execute method on the running loop. The device messages of a method
+        decorated by with_device_message are awaited, other methods run in
+        executor.
+        '''
+        async_method = getattr(self, method + '_async', None)
+        if async_method:
+            return await async_method(*args)
+        return await self._run_device_message_async(method, *args)
+
+    async def _run_device_message_async(self, method, *args):
+        generator_func = getattr(
+            getattr(type(self), method, None), '__wrapped__', None)
+        if generator_func and inspect.isgeneratorfunction(generator_func):
+            return await execute_device_message(generator_func(self, *args))
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(getattr(self, method), *args))
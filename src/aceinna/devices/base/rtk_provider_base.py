@@ -610,6 +610,22 @@ class RTKProviderBase(OpenDeviceBase):
     def after_jump_app_command(self):
         self.communicator.serial_port.baudrate = self.original_baudrate
 
+    def is_bootloader_ready(self):
+        # application responds ping too, only bootloader has its name in
+        # app version, as is_in_bootloader checks
+        self.communicator.serial_port.baudrate = self.bootloader_baudrate
+        payload = helper.probe_payload(
+            self.communicator, helper.build_input_packet('gV'), 'gV')
+        return payload is not None and \
+            'bootloader' in bytes(payload).decode('utf-8', 'ignore').lower()
+
+    def is_application_ready(self):
+        # bootloader responds ping too, it has its name in app version
+        payload = helper.probe_payload(
+            self.communicator, helper.build_input_packet('gV'), 'gV')
+        return payload is not None and 'bootloader' not in \
+            bytes(payload).decode('utf-8', 'ignore').lower()
+
     def get_upgrade_workers(self, firmware_content):
         workers = []
         rules = [
@@ -647,7 +663,8 @@ class RTKProviderBase(OpenDeviceBase):
             self.communicator,
             command=jump_bootloader_command,
             listen_packet='JI',
-            wait_timeout_after_command=3)
+            wait_timeout_after_command=3,
+            ready_probe=self.is_bootloader_ready)
         jumpBootloaderWorker.group = UPGRADE_GROUP.BEFORE_ALL
 
         jump_application_command = helper.build_bootloader_input_packet('JA')
@@ -655,7 +672,8 @@ class RTKProviderBase(OpenDeviceBase):
             self.communicator,
             command=jump_application_command,
             listen_packet='JA',
-            wait_timeout_after_command=3)
+            wait_timeout_after_command=3,
+            ready_probe=self.is_application_ready)
         jumpApplicationWorker.group = UPGRADE_GROUP.AFTER_ALL
 
         jumpApplicationWorker.on(
@@ -1,4 +1,6 @@
+import time
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
 from . import EventBase
 
 
@@ -14,6 +16,8 @@ class UpgradeWorkerBase(EventBase):
         self._key = None
         self._group = None
         self._is_stopped = False
+        # list of (phase, seconds), in the order of phases
+        self.phase_timings = []
 
     @property
     def name(self):
@@ -43,6 +47,25 @@ class UpgradeWorkerBase(EventBase):
     def is_stopped(self):
         return self._is_stopped
 
+    @contextmanager
+    def timing(self, phase):
+        '''
+        Measure wall time of a phase, such as waiting for bootloader ready
+        '''
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.record_phase(phase, started)
+
+    def record_phase(self, phase, started):
+        '''
+        Record a phase started at time, return the time it ends
+        '''
+        ended = time.time()
+        self.phase_timings.append((phase, ended - started))
+        return ended
+
     @abstractmethod
     def get_upgrade_content_size(self):
         '''get the size of upgrade content'''
@@ -1,51 +1,74 @@
+import datetime
 import functools
 from .message_center import (DeviceMessage)
 
+WAIT_INTERVAL = 0.5
+WAIT_GRACE = 1
+
+
+def _wait_device_message(device_message):
+    '''
+    Wait the device message finished without spinning. The message center
+    times out a running message, the grace period covers a stalled center.
+    '''
+    while not device_message.wait(WAIT_INTERVAL):
+        start_time = device_message.get_start_time()
+        if not start_time:
+            continue
+
+        span = datetime.datetime.now() - start_time
+        if span.total_seconds() > device_message.get_timeout() + WAIT_GRACE:
+            device_message.cancel('Timeout')
+
+    return format_message_result(device_message)
+
+
+def format_message_result(device_message):
+    '''
+    Format the result of finished device message
+    '''
+    result = device_message.result
+    return {
+        'packet_type': result['packet_type'],
+        'data': result['data'],
+        'error': result['error'],
+        'raw': result['raw']
+    }
+
+
+def is_device_message_list(value):
+    return isinstance(value, list) and len(value) > 0 and \
+        all(isinstance(item, DeviceMessage) for item in value)
+
 
 def with_device_message(func):
     '''
     This is a decorator for method with DeviceMessage, it would looks like
     code: yield message_center.build(command=command_line)
+    Yield a list of DeviceMessage to send them together, the results are
+    returned as a list in the same order.
+    Each call waits on its own messages, so it is safe to call from
+    different threads.
     '''
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         generator_func = func(*args, **kwargs)
-        global generator_result
-        generator_result = None
-
-        def check_result():
-            global generator_result
-            while not generator_result:
-                continue
-
-            if generator_result:
-                next_device_message = generator_func.send(generator_result)
-                if isinstance(next_device_message, DeviceMessage):
-                    generator_result = None
-                    next_device_message.on('finished', on_resolve)
-                    next_device_message.send()
-                    return check_result()
-                else:
-                    return next_device_message
-
-        def on_resolve(*args, **kwargs):
-            global generator_result
-            generator_result = {
-                'packet_type': kwargs['packet_type'],
-                'data': kwargs['data'],
-                'error': kwargs['error'],
-                'raw': kwargs['raw']
-            }
 
         try:
             device_message = generator_func.send(None)
-            if isinstance(device_message, DeviceMessage):
-                device_message.on('finished', on_resolve)
-                device_message.send()
-                return check_result()
-            else:
-                return device_message
+            while True:
+                if isinstance(device_message, DeviceMessage):
+                    device_message.send()
+                    result = _wait_device_message(device_message)
+                elif is_device_message_list(device_message):
+                    for item in device_message:
+                        item.send()
+                    result = [_wait_device_message(item)
+                              for item in device_message]
+                else:
+                    return device_message
+                device_message = generator_func.send(result)
         except StopIteration as ex:
             value = {
                 'packetType': 'error',
@@ -52,12 +52,14 @@ class DeviceManager:
         device_info = ping_info['device_info']
         app_info = ping_info['app_info']
 
+        device_id = getattr(communicator, 'device_id', None)
         provider = None
         # find provider from cached device_list
         for index in range(len(DeviceManager.device_list)):
             exist_device = DeviceManager.device_list[index]
             if exist_device['device_type'] == device_type and \
-                    exist_device['communicator_type'] == communicator.type:
+                    exist_device['communicator_type'] == communicator.type and \
+                    exist_device['device_id'] == device_id:
                 provider = exist_device['provider']
                 provider.communicator = communicator
                 break
@@ -71,6 +73,7 @@ class DeviceManager:
                 'device_type': device_type,
                 'device_info': device_info,
                 'communicator_type': communicator.type,
+                'device_id': device_id,
                 'provider': provider
             })
 
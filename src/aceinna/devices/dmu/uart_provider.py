@@ -1,6 +1,5 @@
 import os
 import re
-import time
 import json
 import struct
 import datetime
@@ -35,6 +34,9 @@ class Provider(OpenDeviceBase):
         self.is_logging = False
         self.is_mag_align = False
         self.bootloader_baudrate = 57600
+        # blocks in flight during upgrade, set it above 1 for a bootloader
+        # acking blocks with their address
+        self.upgrade_window_size = 1
         # self.device_info = None
         # self.app_info = None
         self.app_config_folder = ''
@@ -220,11 +222,10 @@ class Provider(OpenDeviceBase):
     def get_upgrade_workers(self, firmware_content):
         firmware_worker = FirmwareUpgradeWorker(
             self.communicator, firmware_content,
-            self.firmware_write_command_generator)
+            self.firmware_write_command_generator,
+            window_size=self.upgrade_window_size)
         firmware_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                            lambda: self.before_write_content())
-        firmware_worker.on(
-            UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(8))
 
         jump_bootloader_command = helper.build_bootloader_input_packet(
             'JI')
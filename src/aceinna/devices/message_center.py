@@ -10,9 +10,15 @@ from .base import EventBase
 from ..framework.utils import helper
 from ..framework.constants import INTERFACES
 if sys.version_info[0] > 2:
-    from queue import Queue
+    from queue import (Queue, Empty, Full)
 else:
-    from Queue import Queue
+    from Queue import (Queue, Empty, Full)
+
+IS_PY2 = sys.version_info[0] < 3
+CLOCK = getattr(time, 'monotonic', time.time)
+QUEUE_GET_TIMEOUT = 0.5
+# count of preallocated read buffers, when communicator is high throughput
+READ_BUFFER_COUNT = 16
 
 
 class EVENT_TYPE:
@@ -25,6 +31,25 @@ class EVENT_TYPE:
     CRC_FAILURE = 'crc_failure'
 
 
+def match_inflight_message(messages, packet_type, data):
+    '''
+    Find the earliest message the response belongs to. A response of
+    other packet type, such as an error reply, goes to the earliest
+    message. A response of an already timeout parameter is dropped.
+    '''
+    param_id = data.get('paramId') if isinstance(data, dict) else None
+    has_same_type = False
+    for message in messages:
+        key = message.get_key()
+        if key is None or key[0] != packet_type:
+            continue
+        has_same_type = True
+        if key[1] is None or param_id is None or key[1] == param_id:
+            return message
+
+    return None if has_same_type else messages[0]
+
+
 class DeviceMessage(EventBase):
     def __init__(self, message_center, command, timeout=1):
         super(DeviceMessage, self).__init__()
@@ -36,15 +61,37 @@ class DeviceMessage(EventBase):
         self._status = ''
         self._start_time = None
         self._timeout = timeout
+        self._deadline = None
+        self._key = None
         self._is_finished = False
+        self._finish_lock = threading.Lock()
+        self._finished_event = threading.Event()
 
     def send(self):
         self._message_center.request_run(self)
 
     def finish(self, **kwargs):
-        if not self._is_finished:
+        with self._finish_lock:
+            if self._is_finished:
+                return
             self._is_finished = True
-            self.emit('finished', **kwargs)
+            self.result = kwargs
+            self._finished_event.set()
+        self.emit('finished', **kwargs)
+
+    def cancel(self, error='Cancelled'):
+        '''
+        Finish the message with error, the late response of it is ignored
+        '''
+        packet_info = self._message_center.get_parser().get_packet_info(
+            self._command)
+        self.finish(error=error, **packet_info)
+
+    def wait(self, timeout=None):
+        '''
+        Block until the message is finished, return False if timeout
+        '''
+        return self._finished_event.wait(timeout)
 
     def set_status(self, status):
         self._status = status
@@ -55,6 +102,18 @@ class DeviceMessage(EventBase):
     def get_start_time(self):
         return self._start_time
 
+    def set_deadline(self, deadline):
+        self._deadline = deadline
+
+    def get_deadline(self):
+        return self._deadline
+
+    def set_key(self, key):
+        self._key = key
+
+    def get_key(self):
+        return self._key
+
     def get_command(self):
         return self._command
 
@@ -70,7 +129,7 @@ class DeviceMessageCenter(EventBase):
     Device message center, it handles status of message, and also work as a message factory
     '''
 
-    def __init__(self, communicator):
+    def __init__(self, communicator, pipeline_window=1, queue_size=0):
         super(DeviceMessageCenter, self).__init__()
         self.threads = []
         self._communicator = communicator
@@ -78,18 +137,34 @@ class DeviceMessageCenter(EventBase):
         self._is_pause = False
         self._receiving = False
         self._has_exception = False
-        self.data_queue = Queue()  # data container
-        self.data_lock = threading.Lock()
-        self.exception_lock = threading.Lock()
+        self._exception_count = 0
+        # data container, item is (put time, data, read buffer), receiver
+        # waits for parser when it is full, so memory of device is bounded
+        self.data_queue = Queue(queue_size)
+        # free read buffers, data is read into them if communicator supports
+        self._read_buffers = None
         self._is_running = False
         self.prerun_queue = Queue()
         self._parser = None
         self._running_message = None
+        # messages written to device and waiting for response, in write order
+        self._inflight_messages = []
+        self._pipeline_window = max(pipeline_window, 1)
         self._is_ready = False
         self._has_running_checker = False
         self._last_timeout_command = None
         self._run_id = None
         self.loop = None
+        # wakes the running checker when running message, exception or stop changes
+        self._run_condition = threading.Condition(threading.RLock())
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._max_queue_depth = 0
+        self._queue_full_count = 0
+        self._handoff_count = 0
+        self._handoff_latency_total = 0
+        self._handoff_latency_max = 0
+        self._handoff_latency_last = 0
 
     @property
     def paused(self):
@@ -115,34 +190,61 @@ class DeviceMessageCenter(EventBase):
     def build(self, command, timeout=3):
         return DeviceMessage(self, command, timeout)
 
+    def set_pipeline_window(self, size):
+        '''
+        Set max count of messages waiting for response at the same time
+        '''
+        with self._run_condition:
+            self._pipeline_window = max(size, 1)
+            self.run_post()
+
     def request_run(self, message):
-        if self._is_running:
-            self.prerun_queue.put(message)
-        else:
-            self.run(message)
+        with self._run_condition:
+            if len(self._inflight_messages) < self._pipeline_window and \
+                    self.prerun_queue.empty():
+                self.run(message)
+            else:
+                self.prerun_queue.put(message)
 
     def run(self, message):
-        if not self._is_running:
-            self._run_id = str(uuid.uuid1())
-
-        self._is_running = True
-        self._running_message = message
-        message.set_start_time(datetime.datetime.now())
-
-        self._parser.set_run_command(message.get_command())
-        self._communicator.write(message.get_command())
+        with self._run_condition:
+            if not self._is_running:
+                self._run_id = str(uuid.uuid1())
+
+            self._is_running = True
+            self._inflight_messages.append(message)
+            self._running_message = self._inflight_messages[0]
+            message.set_start_time(datetime.datetime.now())
+            message.set_deadline(CLOCK() + message.get_timeout())
+            message.set_key(self._parser.get_command_key(message.get_command()))
+            self._run_condition.notify_all()
+
+            # write under lock, so the device receives commands in run order
+            self._parser.set_run_command(message.get_command())
+            self._communicator.write(message.get_command())
         # print('run command', message.get_command())
 
     def run_post(self):
-        if self.prerun_queue.empty():
-            self._is_running = False
-            self._run_id = None
-        else:
-            next_message = self.prerun_queue.get()
-            self.run(next_message)
+        with self._run_condition:
+            while len(self._inflight_messages) < self._pipeline_window and \
+                    not self.prerun_queue.empty():
+                self.run(self.prerun_queue.get())
+
+            if len(self._inflight_messages) == 0:
+                self._is_running = False
+                self._run_id = None
+            else:
+                self._running_message = self._inflight_messages[0]
         # print('post')
 
     def setup(self):
+        if self._read_buffers is None and \
+                getattr(self._communicator, 'high_throughput', False):
+            self._read_buffers = Queue()
+            for _ in range(READ_BUFFER_COUNT):
+                self._read_buffers.put(
+                    bytearray(self._communicator.read_buffer_size))
+
         if not self._has_running_checker:
             thread = threading.Thread(target=self.thread_running_checker)
             thread.start()
@@ -158,29 +260,75 @@ class DeviceMessageCenter(EventBase):
         self._is_ready = True
 
     def pause(self):
+        self._resume_event.clear()
         self._is_pause = True
 
     def resume(self):
         self._has_exception = False
         self._is_pause = False
+        self._resume_event.set()
         self._communicator.reset_buffer()
         helper.clear_elements(self.threads)
 
     def stop(self):
         self._is_stop = True
+        self._resume_event.set()
+        self._wakeup_parser()
+        with self._run_condition:
+            pending_messages = self._inflight_messages
+            self._inflight_messages = []
+            while not self.prerun_queue.empty():
+                pending_messages.append(self.prerun_queue.get())
+            self._is_running = False
+            self._run_id = None
+            self._run_condition.notify_all()
+
+        # wake up the callers waiting for response
+        for message in pending_messages:
+            message.cancel('Stopped')
         # if self.loop:
         #     self.loop.close()
 
+    def get_statistics(self):
+        ''' Get statistics of receive pipeline, latency is in milliseconds
+        '''
+        handoff_count = self._handoff_count
+        handoff_latency_avg = self._handoff_latency_total / handoff_count \
+            if handoff_count > 0 else 0
+
+        statistics = {
+            'queue_depth': self.data_queue.qsize(),
+            'max_queue_depth': self._max_queue_depth,
+            'queue_full_count': self._queue_full_count,
+            'handoff_count': handoff_count,
+            'handoff_latency_last': self._handoff_latency_last * 1000,
+            'handoff_latency_avg': handoff_latency_avg * 1000,
+            'handoff_latency_max': self._handoff_latency_max * 1000
+        }
+
+        if hasattr(self._communicator, 'get_read_statistics'):
+            statistics.update(self._communicator.get_read_statistics())
+        return statistics
+
     def timeout_check(self):
-        if self._is_running:
-            timeout = self._running_message.get_timeout()
-            start_time = self._running_message.get_start_time()
-            current_time = datetime.datetime.now()
-
-            span = current_time - start_time
-            if span.total_seconds() > timeout and not \
-                    self._running_message.get_finished():
-                timeout_command = self._running_message.get_command()
+        with self._run_condition:
+            current_clock = CLOCK()
+            timeout_messages = [
+                message for message in self._inflight_messages
+                if message.get_deadline() <= current_clock]
+            if len(timeout_messages) == 0:
+                return
+
+            for message in timeout_messages:
+                self._inflight_messages.remove(message)
+                # cancelled message is already finished
+                if message.get_finished():
+                    continue
+
+                timeout = message.get_timeout()
+                start_time = message.get_start_time()
+                current_time = datetime.datetime.now()
+                timeout_command = message.get_command()
                 print('command timeout',
                       timeout_command,
                       timeout, start_time, current_time)
@@ -188,36 +336,28 @@ class DeviceMessageCenter(EventBase):
                     timeout_command)
                 self._last_timeout_command = packet_info
                 self._last_timeout_command['run_id'] = self._run_id
-                self._running_message.finish(
+                message.finish(
                     error='Timeout', **packet_info)
-                # print('timeout')
-                self.run_post()
+            # print('timeout')
+            self.run_post()
 
     def thread_running_checker(self):
         '''
-        Check running status
+        Check running status. It sleeps until the deadline of running message,
+        and is woken up when a message runs, an exception occurs or stopped
         '''
-        # if sys.version_info[0] > 2:
-        #     import asyncio
-        #     self.loop = asyncio.new_event_loop()
-        #     asyncio.set_event_loop(self.loop)
-
-        while True:
-            self.exception_lock.acquire()
-            if self._has_exception:
+        reported_exception_count = 0
+        while not self._is_stop:
+            with self._run_condition:
+                if self._exception_count == reported_exception_count and \
+                        not self._is_stop:
+                    self._run_condition.wait(self._get_checker_wait_time())
+                exception_count = self._exception_count
+                self.timeout_check()
+
+            if exception_count > reported_exception_count:
                 self.emit(EVENT_TYPE.ERROR, 'app', 'communicator read error')
-            self.exception_lock.release()
-
-            # Exit running checker
-            if self._is_stop:
-                return
-
-            self.timeout_check()
-
-            try:
-                time.sleep(0.1)
-            except KeyboardInterrupt:  # response for KeyboardInterrupt such as Ctrl+C
-                return True
+            reported_exception_count = exception_count
 
     def thread_receiver(self, *args, **kwargs):
         ''' receive data and push data into data_queue.
@@ -233,73 +373,145 @@ class DeviceMessageCenter(EventBase):
                 return
 
             if self._is_pause:
-                time.sleep(0.1)
+                self._resume_event.wait(QUEUE_GET_TIMEOUT)
                 continue
 
             data = None
+            buffer = None
             try:
                 self._receiving = True
-                data = self._communicator.read(1000)
+                if self._read_buffers:
+                    buffer = self._get_read_buffer()
+                    if buffer is None:
+                        self._receiving = False
+                        continue
+                    data = memoryview(buffer)[
+                        :self._communicator.read_into(buffer)]
+                else:
+                    data = self._communicator.read(1000)
                 # print('thread_receiver:', data)
             except Exception as ex:  # pylint: disable=broad-except
                 self._receiving = False
+                self._release_read_buffer(buffer)
                 print('Thread:receiver error:', ex)
-                self.exception_lock.acquire()
-                self._has_exception = True  # Notice thread paser to exit.
-                self.exception_lock.release()
+                with self._run_condition:
+                    self._has_exception = True  # Notice thread paser to exit.
+                    self._exception_count += 1
+                    self._run_condition.notify_all()
+                self._wakeup_parser()
                 return  # exit thread receiver
 
             if data and len(data) > 0:
+                # data read into buffer is a memoryview, it is valid until parsed
                 self.emit(EVENT_TYPE.READ_BLOCK, data)
-                self.data_lock.acquire()
-                self.data_queue.put(data)
-                self.data_lock.release()
+                if not self._put_data((CLOCK(), data, buffer)):
+                    self._release_read_buffer(buffer)
+                queue_depth = self.data_queue.qsize()
+                if queue_depth > self._max_queue_depth:
+                    self._max_queue_depth = queue_depth
             else:
-                time.sleep(0.01)
+                self._release_read_buffer(buffer)
+                # read into buffer blocks until data arrives or timeout
+                if buffer is None:
+                    time.sleep(0.01)
 
             self._receiving = False
 
     def thread_parser(self, *args, **kwargs):
         ''' get data from data_queue and parse data into one whole frame.
+            block on data_queue until data arrives,
             return when occur Exception or set as stop.
         '''
-        # if sys.version_info[0] > 2:
-        #     import asyncio
-        #     loop = asyncio.new_event_loop()
-        #     asyncio.set_event_loop(loop)
         while True:
             if self._has_exception or self._is_stop:
                 return
 
-            self.exception_lock.acquire()
-            if self._has_exception:
-                self.exception_lock.release()
-                return  # exit thread parser
-            self.exception_lock.release()
-
             if self._is_pause:
-                time.sleep(0.1)
+                self._resume_event.wait(QUEUE_GET_TIMEOUT)
                 continue
 
-            self.data_lock.acquire()
-            if self.data_queue.empty():
-                self.data_lock.release()
-                time.sleep(0.001)
+            try:
+                put_time, data, buffer = self.data_queue.get(
+                    timeout=QUEUE_GET_TIMEOUT)
+            except Empty:
                 continue
-            else:
-                data = self.data_queue.get()
-                self.data_lock.release()
 
-            if self._parser:
-                if sys.version_info[0] < 3:
-                    data = ord(data)
-                self._parser.analyse(data)
+            if data is None:
+                continue
+
+            self._collect_handoff(CLOCK() - put_time)
+
+            try:
+                if self._parser:
+                    if IS_PY2:
+                        data = ord(data)
+                    self._parser.analyse(data)
+            finally:
+                # the buffer is reused after parsed
+                self._release_read_buffer(buffer)
+
+    def _get_checker_wait_time(self):
+        if len(self._inflight_messages) == 0:
+            return None
+        deadline = min([message.get_deadline()
+                        for message in self._inflight_messages])
+        return max(deadline - CLOCK(), 0)
+
+    def _put_data(self, item):
+        '''
+        Put item into data queue, wait for parser if queue is full.
+        Returns False if stopped before put.
+        '''
+        try:
+            self.data_queue.put_nowait(item)
+            return True
+        except Full:
+            self._queue_full_count += 1
+
+        while not self._is_stop and not self._has_exception:
+            try:
+                self.data_queue.put(item, timeout=QUEUE_GET_TIMEOUT)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _wakeup_parser(self):
+        try:
+            self.data_queue.put_nowait((CLOCK(), None, None))
+        except Full:
+            # parser is busy with queued data, it checks the flags after get
+            pass
+
+    def _get_read_buffer(self):
+        try:
+            return self._read_buffers.get(timeout=QUEUE_GET_TIMEOUT)
+        except Empty:
+            # all buffers are waiting to be parsed
+            return None
+
+    def _release_read_buffer(self, buffer):
+        if buffer is not None:
+            self._read_buffers.put(buffer)
+
+    def _collect_handoff(self, latency):
+        self._handoff_count += 1
+        self._handoff_latency_total += latency
+        self._handoff_latency_last = latency
+        if latency > self._handoff_latency_max:
+            self._handoff_latency_max = latency
 
     def on_command_receive(self, *args, **kwargs):
-        # TODO: should do timeout command check
-        if self._running_message:
-            self._running_message.finish(**kwargs)
-        self.run_post()
+        with self._run_condition:
+            if len(self._inflight_messages) > 0:
+                message = match_inflight_message(
+                    self._inflight_messages,
+                    kwargs.get('packet_type'), kwargs.get('data'))
+                if message:
+                    self._inflight_messages.remove(message)
+                    message.finish(**kwargs)
+                    self._run_condition.notify_all()
+            self.run_post()
 
     def on_continuous_messageReceive(self, *args, **kwargs):
         # save data
@@ -42,6 +42,9 @@ class Provider(OpenDeviceBase):
         self.is_logging = False
         self.is_mag_align = False
         self.bootloader_baudrate = 57600
+        # blocks in flight during upgrade, set it above 1 for a bootloader
+        # acking blocks with their address
+        self.upgrade_window_size = 1
         self.device_info = None
         self.app_info = None
         self.app_config_folder = ''
@@ -247,6 +250,22 @@ class Provider(OpenDeviceBase):
     def after_jump_app_command(self):
         self.communicator.serial_port.baudrate = self.original_baudrate
 
+    def is_bootloader_ready(self):
+        # application responds ping too, only bootloader has its name in
+        # device info, as is_in_bootloader checks
+        self.communicator.serial_port.baudrate = self.bootloader_baudrate
+        payload = helper.probe_payload(
+            self.communicator, helper.build_input_packet('pG'), 'pG')
+        return payload is not None and \
+            'bootloader' in bytes(payload).decode('utf-8', 'ignore').lower()
+
+    def is_application_ready(self):
+        # bootloader responds ping too, it has its name in device info
+        payload = helper.probe_payload(
+            self.communicator, helper.build_input_packet('pG'), 'pG')
+        return payload is not None and 'bootloader' not in \
+            bytes(payload).decode('utf-8', 'ignore').lower()
+
     def before_write_content(self):
         self.communicator.serial_port.baudrate = self.bootloader_baudrate
         self.communicator.serial_port.reset_input_buffer()
@@ -262,11 +281,10 @@ class Provider(OpenDeviceBase):
     def get_upgrade_workers(self, firmware_content):
         firmware_worker = FirmwareUpgradeWorker(
             self.communicator, firmware_content,
-            self.firmware_write_command_generator)
+            self.firmware_write_command_generator,
+            window_size=self.upgrade_window_size)
         firmware_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                            lambda: self.before_write_content())
-        firmware_worker.on(
-            UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(8))
 
         jump_bootloader_command = helper.build_bootloader_input_packet(
             'JI')
@@ -274,14 +292,16 @@ class Provider(OpenDeviceBase):
             self.communicator,
             command=jump_bootloader_command,
             listen_packet='JI',
-            wait_timeout_after_command=3)
+            wait_timeout_after_command=3,
+            ready_probe=self.is_bootloader_ready)
 
         jump_application_command = helper.build_bootloader_input_packet('JA')
         jump_application_worker = JumpApplicationWorker(
             self.communicator,
             command=jump_application_command,
             listen_packet='JA',
-            wait_timeout_after_command=3)
+            wait_timeout_after_command=3,
+            ready_probe=self.is_application_ready)
         jump_application_worker.on(
             UPGRADE_EVENT.BEFORE_COMMAND, self.before_jump_app_command)
         jump_application_worker.on(
@@ -19,6 +19,7 @@ from ..decorator import with_device_message
 from ...models import InternalCombineAppParseRule
 from ..parsers.open_field_parser import encode_value
 from ...framework.utils.print import (print_yellow, print_green)
+from ..ping.ins401 import try_parse_app_mode
 from ..upgrade_workers import (
     EthernetSDK9100UpgradeWorker,
     FirmwareUpgradeWorker,
@@ -29,6 +30,12 @@ from ..upgrade_workers import (
 )
 
 GPZDA_DATA_LEN = 39
+# seconds to wait for response of set core command
+CORE_RESPONSE_TIMEOUT = 0.5
+# seconds to probe bootloader with set core command
+BOOTLOADER_READY_TIMEOUT = 10
+# seconds to probe application after upgrade
+APPLICATION_READY_TIMEOUT = 15
 
 class Provider(OpenDeviceBase):
     '''
@@ -39,6 +46,8 @@ class Provider(OpenDeviceBase):
         super(Provider, self).__init__(communicator)
         self.type = 'INS401'
         self.server_update_rate = 100
+        # get parameter commands are sent in batch, see get_params
+        self.message_pipeline_window = 8
         self.sky_data = []
         self.pS_data = []
         self.app_config_folder = ''
@@ -363,16 +372,14 @@ class Provider(OpenDeviceBase):
             command_CS, message_bytes,
             use_length_as_protocol=self.communicator.use_length_as_protocol)
 
-        self.communicator.reset_buffer()
+        # command is sent again until bootloader is ready
+        is_ready = helper.wait_until(
+            lambda: helper.probe_response(
+                self.communicator, command, command_CS,
+                CORE_RESPONSE_TIMEOUT),
+            BOOTLOADER_READY_TIMEOUT)
 
-        time.sleep(2)
-        self.communicator.write(command.actual_command)
-        time.sleep(1)
-
-        result = helper.read_untils_have_data(
-            self.communicator, command_CS, 1000, 50)
-
-        if not result == []:
+        if not is_ready:
             raise Exception('Cannot run set core command')
 
     def ins_firmware_write_command_generator(self, data_len, current, data):
@@ -414,6 +421,19 @@ class Provider(OpenDeviceBase):
             bytes([0x02, 0xaa]),
             use_length_as_protocol=self.communicator.use_length_as_protocol)
 
+    def is_application_ready(self):
+        # bootloader responds ping too, only application has its app info
+        # in the response, as ping checks
+        payload = helper.probe_payload(
+            self.communicator, helper.build_ethernet_packet(
+                self.communicator.get_dst_mac(),
+                self.communicator.get_src_mac(), [0x01, 0xcc]),
+            [0x01, 0xcc])
+        if payload is None:
+            return False
+        return try_parse_app_mode(
+            bytes(payload).decode('utf-8', 'ignore'))[0]
+
     def imu_jump_bootloader_command_generator(self):
         return helper.build_ethernet_packet(
             self.communicator.get_dst_mac(),
@@ -436,8 +456,6 @@ class Provider(OpenDeviceBase):
                 self.ins_firmware_write_command_generator,
                 192)
             rtk_upgrade_worker.name = 'MAIN_RTK'
-            rtk_upgrade_worker.on(
-                UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(15))
             rtk_upgrade_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                                   lambda: self.before_write_content('0', len(content)))
             return rtk_upgrade_worker
@@ -450,8 +468,6 @@ class Provider(OpenDeviceBase):
                 192)
             ins_upgrade_worker.name = 'MAIN_RTK'
             ins_upgrade_worker.group = UPGRADE_GROUP.FIRMWARE
-            ins_upgrade_worker.on(
-                UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(15))
             ins_upgrade_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                                   lambda: self.before_write_content('1', len(content)))
             return ins_upgrade_worker
@@ -471,8 +487,6 @@ class Provider(OpenDeviceBase):
                 192)
             imu_upgrade_worker.name = 'SUB_IMU'
             imu_upgrade_worker.group = UPGRADE_GROUP.FIRMWARE
-            imu_upgrade_worker.on(
-                UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(8))
             return imu_upgrade_worker
 
     def get_upgrade_workers(self, firmware_content):
@@ -519,7 +533,8 @@ class Provider(OpenDeviceBase):
             self.communicator,
             command=self.ins_jump_application_command_generator,
             listen_packet=[0x02, 0xaa],
-            wait_timeout_after_command=4)
+            wait_timeout_after_command=4,
+            ready_probe=self.is_application_ready)
         ins_jump_application_worker.group = UPGRADE_GROUP.FIRMWARE
         ins_jump_application_worker.on(
             UPGRADE_EVENT.AFTER_COMMAND, self.do_reshake)
@@ -542,7 +557,7 @@ class Provider(OpenDeviceBase):
             self.communicator,
             command=self.imu_jump_bootloader_command_generator,
             listen_packet=[0x4a, 0x49],
-            wait_timeout_after_command=8,)
+            wait_timeout_after_command=8)
         imu_jump_bootloader_worker.on(
             UPGRADE_EVENT.BEFORE_COMMAND, self.do_reshake)
         imu_jump_bootloader_worker.group = UPGRADE_GROUP.FIRMWARE
@@ -658,6 +673,12 @@ class Provider(OpenDeviceBase):
                           indent=4,
                           ensure_ascii=False)
 
+    def handle_upgrade_complete(self):
+        # SDK and IMU are not probed after they jump to application, the
+        # device is detected again once INS application responds
+        helper.wait_until(self.is_application_ready, APPLICATION_READY_TIMEOUT)
+        super(Provider, self).handle_upgrade_complete()
+
     def after_upgrade_completed(self):
         # start ntrip client
         if self.properties["initial"].__contains__(
@@ -737,12 +758,18 @@ class Provider(OpenDeviceBase):
         has_error = False
         parameter_values = []
 
-        for parameter in self.properties['userConfiguration']:
-            if parameter['paramId'] == 0:
-                continue
-
-            result = self.get_param(parameter)
-            if result['packetType'] == 'error':
+        messages = [
+            self._message_center.build(
+                command=self._build_get_param_command(parameter['paramId']),
+                timeout=5)
+            for parameter in self.properties['userConfiguration']
+            if parameter['paramId'] != 0]
+        # commands are written in a window of message center, the responses
+        # are matched by param id
+        results = yield messages
+
+        for result in results:
+            if result['error'] or not result['data']:
                 has_error = True
                 break
 
@@ -754,18 +781,22 @@ class Provider(OpenDeviceBase):
 
         yield {'packetType': 'error', 'data': 'No Response'}
 
-    @with_device_message
-    def get_param(self, params, *args):  # pylint: disable=unused-argument
-        '''
-        Update paramter value
-        '''
+    def _build_get_param_command(self, param_id):
         gP = b'\x02\xcc'
         message_bytes = []
-        message_bytes.extend(encode_value('uint32', params['paramId']))
+        message_bytes.extend(encode_value('uint32', param_id))
         command_line = helper.build_ethernet_packet(
             self.communicator.get_dst_mac(), self.communicator.get_src_mac(),
             gP, message_bytes)
-        result = yield self._message_center.build(command=command_line.actual_command, timeout=5)
+        return command_line.actual_command
+
+    @with_device_message
+    def get_param(self, params, *args):  # pylint: disable=unused-argument
+        '''
+        Update paramter value
+        '''
+        result = yield self._message_center.build(
+            command=self._build_get_param_command(params['paramId']), timeout=5)
         #print(result, len(self.communicator.receive_cache))
         data = result['data']
         error = result['error']
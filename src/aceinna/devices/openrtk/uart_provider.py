@@ -89,8 +89,6 @@ class Provider(RTKProviderBase):
                 self.firmware_write_command_generator)
             firmware_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                                lambda: self.before_write_content())
-            firmware_worker.on(
-                UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(8))
             return firmware_worker
 
         if rule == 'sdk':
@@ -2,9 +2,9 @@ import collections
 import operator
 import time
 from ..base.message_parser_base import MessageParserBase
-from ...framework.utils import helper
+from ...framework.utils.crc import crc16
 from .dum_packet_parser import (
-    match_command_handler, match_continuous_handler)
+    match_command_handler, match_continuous_handler, build_continuous_codecs)
 from ...framework.context import APP_CONTEXT
 
 MSG_HEADER = [0x55, 0x55]
@@ -69,9 +69,8 @@ class DMUPacket:
         self._raw_data_bytes.append(byte_data)
 
     def check_crc(self):
-        crc_calculate_value = helper.calc_crc(self._raw_data_bytes[2:-2])
-        crc_value = self._raw_data_bytes[-2:]
-        return crc_calculate_value == crc_value
+        crc_value = (self._raw_data_bytes[-2] << 8) | self._raw_data_bytes[-1]
+        return crc16(self._raw_data_bytes[2:-2]) == crc_value
 
 
 # class UartMessageParser(MessageParserBase):
@@ -215,11 +214,16 @@ class UartMessageParser(MessageParserBase):
         self.sync_pattern = collections.deque(2*[0], 2)
         self.find_header = False
         self.payload_len = 0
+        self._codecs = build_continuous_codecs(configuration)
         # command,continuous_message
 
     def set_run_command(self, command):
         self.run_command = ''.join(['%c' % x for x in command[2:4]])
 
+    def set_configuration(self, configuration):
+        super(UartMessageParser, self).set_configuration(configuration)
+        self._codecs = build_continuous_codecs(configuration)
+
     def analyse(self, data):
         for data_block in data:
             if self.find_header:
@@ -231,8 +235,8 @@ class UartMessageParser(MessageParserBase):
                     packet_type = ''.join(
                         ["%c" % x for x in self.frame[PACKET_TYPE_INDEX:4]])
                     self.find_header = False
-                    result = helper.calc_crc(self.frame[2:-2])
-                    if result[0] == self.frame[-2] and result[1] == self.frame[-1]:
+                    crc_value = (self.frame[-2] << 8) | self.frame[-1]
+                    if crc16(self.frame[2:-2]) == crc_value:
                         # find a whole frame
                         # self._parse_frame(self.frame, self.payload_len)
                         self._parse_message(
@@ -292,7 +296,8 @@ class UartMessageParser(MessageParserBase):
              if x['name'] == packet_type), None)
         scaling = self.properties['scaling']
 
-        data = payload_parser(payload, output_packet_config, scaling)
+        data = payload_parser(payload, output_packet_config, scaling,
+                              self._codecs.get(packet_type))
 
         if not data:
             APP_CONTEXT.get_logger().logger.info(
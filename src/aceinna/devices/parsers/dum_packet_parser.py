@@ -3,6 +3,7 @@ import collections
 from ..dmu.configuration_field import CONFIGURATION_FIELD_DEFINES_SINGLETON
 from ..dmu.eeprom_field import EEPROM_FIELD_DEFINES_SINGLETON
 from .dmu_field_parser import decode_value
+from . import open_packet_parser
 
 
 class DMU_PACKET_STATUS(object):
@@ -147,59 +148,44 @@ def version_data_parser(payload, *args):
     }
 
 
-def common_continuous_parser(payload, configuration, scaling):
+class ContinuousPacketCodec(open_packet_parser.ContinuousPacketCodec):
     '''
-    Unpack output packet
+    Precompiled decoder of a DMU output packet, output packets of DMU are
+    big endian
+    '''
+
+    def __init__(self, configuration):
+        super(ContinuousPacketCodec, self).__init__(configuration, '>')
+        self.time_field = _extract_time_field(configuration)
+
+
+def build_continuous_codecs(properties):
+    '''
+    Build codecs of all DMU output packets defined in device configuration
+    '''
+    return open_packet_parser.build_continuous_codecs(
+        properties, ContinuousPacketCodec)
+
+
+def common_continuous_parser(payload, configuration, scaling, codec=None):
+    '''
+    Unpack output packet, the codec is built from configuration if the
+    caller does not keep one
     '''
     if configuration is None:
         return
 
-    data = None
-    length = 0
-    pack_fmt = '>'
-    for value in configuration['payload']:
-        if value['type'] == 'float':
-            pack_fmt += 'f'
-            length += 4
-        elif value['type'] == 'uint32':
-            pack_fmt += 'I'
-            length += 4
-        elif value['type'] == 'int32':
-            pack_fmt += 'i'
-            length += 4
-        elif value['type'] == 'int16':
-            pack_fmt += 'h'
-            length += 2
-        elif value['type'] == 'uint16':
-            pack_fmt += 'H'
-            length += 2
-        elif value['type'] == 'double':
-            pack_fmt += 'd'
-            length += 8
-        elif value['type'] == 'int64':
-            pack_fmt += 'q'
-            length += 8
-        elif value['type'] == 'uint64':
-            pack_fmt += 'Q'
-            length += 8
-        elif value['type'] == 'char':
-            pack_fmt += 'c'
-            length += 1
-        elif value['type'] == 'uchar':
-            pack_fmt += 'B'
-            length += 1
-        elif value['type'] == 'uint8':
-            pack_fmt += 'B'
-            length += 1
-    len_fmt = '{0}B'.format(length)
+    if codec is None:
+        codec = ContinuousPacketCodec(configuration)
 
     format_data = None
     try:
-        pack_item = struct.pack(len_fmt, *payload)
-        data = struct.unpack(pack_fmt, pack_item)
+        if codec.error:
+            raise ValueError(codec.error)
+        data = codec.struct.unpack(bytes(payload))
         out = []
 
-        time_field = _extract_time_field(configuration)
+        time_field = codec.time_field
 
         for idx, item in enumerate(configuration['payload']):
             if item == time_field:
@@ -3,7 +3,7 @@ import operator
 import time
 import struct
 from ..base.message_parser_base import MessageParserBase
-from ...framework.utils import helper
+from ...framework.utils.crc import crc16
 from ...framework.context import APP_CONTEXT
 from .ins401_packet_parser import (
     match_command_handler, common_continuous_parser, other_output_parser)
@@ -11,6 +11,8 @@ from .ins401_packet_parser import (
 MSG_HEADER = [0x55, 0x55]
 PACKET_TYPE_INDEX = 2
 PAYLOAD_LEN_INDEX = 8
+ETHERNET_HEADER_LEN = 14
+GET_PARAMETER_PACKET = b'\x02\xcc'
 INPUT_PACKETS = [
     b'\x01\xcc',  # Get device information
     b'\x02\xcc',  # Get parameter
@@ -36,6 +38,19 @@ class EthernetMessageParser(MessageParserBase):
     def set_run_command(self, command):
         pass
 
+    def get_command_key(self, raw_command):
+        command = bytes(raw_command[ETHERNET_HEADER_LEN:])
+        if list(command[0:2]) != MSG_HEADER:
+            return None
+
+        packet_type = command[PACKET_TYPE_INDEX:4]
+        param_id = None
+        if packet_type == GET_PARAMETER_PACKET and \
+                len(command) >= PAYLOAD_LEN_INDEX + 4:
+            param_id = struct.unpack(
+                '<I', command[PAYLOAD_LEN_INDEX:PAYLOAD_LEN_INDEX + 4])[0]
+        return packet_type, param_id
+
     def analyse(self, data):
         sync_pattern = data[0:2]
         if operator.eq(list(sync_pattern), MSG_HEADER) and len(data) >= PAYLOAD_LEN_INDEX:
@@ -55,9 +70,10 @@ class EthernetMessageParser(MessageParserBase):
                             event_time=time.time())
                 return
 
-            result = helper.calc_crc(data[2:PAYLOAD_LEN_INDEX+payload_len])
+            crc_index = PAYLOAD_LEN_INDEX + payload_len
+            crc_value = (data[crc_index] << 8) | data[crc_index + 1]
 
-            if result[0] == data[PAYLOAD_LEN_INDEX + payload_len] and result[1] == data[PAYLOAD_LEN_INDEX + payload_len + 1]:
+            if crc16(data[2:crc_index]) == crc_value:
                 self._parse_message(packet_type_byte, payload_len, data)
             else:
                 APP_CONTEXT.get_logger().logger.info(
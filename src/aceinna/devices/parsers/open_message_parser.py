@@ -1,14 +1,14 @@
-import collections
-import operator
 import time
 from ..base.message_parser_base import MessageParserBase
-from ...framework.utils import helper
+from ...framework.utils.crc import crc16
 from ...framework.context import APP_CONTEXT
 from .open_packet_parser import (
-    match_command_handler, common_continuous_parser, other_output_parser)
+    match_command_handler, build_continuous_codecs, other_output_parser)
 
 MSG_HEADER = [0x55, 0x55]
+MSG_HEADER_BYTES = bytes(bytearray(MSG_HEADER))
 PACKET_TYPE_INDEX = 2
+PAYLOAD_LEN_INDEX = 4
 PRIVATE_PACKET_TYPE = ['RE', 'WE', 'UE', 'LE', 'SR']
 INPUT_PACKETS = ['pG', 'uC', 'uP', 'uA', 'uB',
                  'sC', 'rD',
@@ -71,9 +71,8 @@ class OpenDevicePacket:
         self._raw_data_bytes.append(byte_data)
 
     def check_crc(self):
-        crc_calculate_value = helper.calc_crc(self._raw_data_bytes[2:-2])
-        crc_value = self._raw_data_bytes[-2:]
-        return crc_calculate_value == crc_value
+        crc_value = (self._raw_data_bytes[-2] << 8) | self._raw_data_bytes[-1]
+        return crc16(self._raw_data_bytes[2:-2]) == crc_value
 
 
 # class UartMessageParser(MessageParserBase):
@@ -201,66 +200,90 @@ class OpenDevicePacket:
 
 
 class UartMessageParser(MessageParserBase):
+    '''
+    OpenIMU/OpenRTK message parser, scans the received bytes block by block
+    '''
+
     def __init__(self, configuration):
         super(UartMessageParser, self).__init__(configuration)
-        self.frame = []
-        self.payload_len_idx = 5
-        self.sync_pattern = collections.deque(2*[0], 2)
-        self.find_header = False
-        self.payload_len = 0
+        # bytes of an incomplete frame are kept here until the next read
+        self._buffer = bytearray()
+        self._codecs = build_continuous_codecs(configuration)
         # command,continuous_message
 
     def set_run_command(self, command):
         pass
 
+    def set_configuration(self, configuration):
+        super(UartMessageParser, self).set_configuration(configuration)
+        self._codecs = build_continuous_codecs(configuration)
+
     def analyse(self, data):
-        for data_block in data:
-            if self.find_header:
-                self.frame.append(data_block)
-                if self.payload_len_idx == len(self.frame):
-                    self.payload_len = data_block
-
-                elif 5 + self.payload_len + 2 == len(self.frame):
-                    packet_type = ''.join(
-                        ["%c" % x for x in self.frame[PACKET_TYPE_INDEX:4]])
-                    self.find_header = False
-                    result = helper.calc_crc(self.frame[2:-2])
-                    if result[0] == self.frame[-2] and result[1] == self.frame[-1]:
-                        # find a whole frame
-                        # self._parse_frame(self.frame, self.payload_len)
-                        self._parse_message(
-                            packet_type, self.payload_len, self.frame)
-
-                        self.find_header = False
-                        self.payload_len = 0
-                        self.sync_pattern = collections.deque(2*[0], 2)
-                    else:
-                        APP_CONTEXT.get_logger().logger.info(
-                            "crc check error! packet_type:{0}".format(packet_type))
-
-                        self.emit('crc_failure', packet_type=packet_type,
-                                event_time=time.time())
-                        input_packet_config = next(
-                            (x for x in self.properties['userMessages']['inputPackets']
-                            if x['name'] == packet_type), None)
-                        if input_packet_config:
-                            self.emit('command',
-                                    packet_type=packet_type,
-                                    data=[],
-                                    error=True,
-                                    raw=self.frame)
-            else:
-                self.sync_pattern.append(data_block)
-                if operator.eq(list(self.sync_pattern), MSG_HEADER):
-                    self.frame = MSG_HEADER[:]  # header_tp.copy()
-                    self.find_header = True
+        buffer = self._buffer
+        buffer.extend(data)
+        buffer_len = len(buffer)
+        read_index = 0
+
+        with memoryview(buffer) as buffer_view:
+            while True:
+                header_index = buffer.find(MSG_HEADER_BYTES, read_index)
+                if header_index < 0:
+                    # keep a trailing 0x55, it may be the start of a header
+                    read_index = buffer_len - 1 \
+                        if buffer_len > 0 and buffer[-1] == MSG_HEADER[0] \
+                        else buffer_len
+                    break
+
+                if header_index + PAYLOAD_LEN_INDEX >= buffer_len:
+                    read_index = header_index
+                    break
+
+                payload_len = buffer[header_index + PAYLOAD_LEN_INDEX]
+                frame_end = header_index + PAYLOAD_LEN_INDEX + 1 + payload_len + 2
+                if frame_end > buffer_len:
+                    read_index = header_index
+                    break
+
+                frame = buffer_view[header_index:frame_end]
+                packet_type = bytes(
+                    frame[PACKET_TYPE_INDEX:PAYLOAD_LEN_INDEX]).decode('latin-1')
+                if crc16(frame[2:-2]) == (frame[-2] << 8) | frame[-1]:
+                    # find a whole frame
+                    self._parse_message(packet_type, payload_len, frame)
+                    read_index = frame_end
+                else:
+                    self._handle_crc_failure(packet_type, frame)
+                    # resync from the byte after the broken header
+                    read_index = header_index + 1
+
+                frame.release()
+
+        # views handed to listeners stay valid on the old buffer
+        self._buffer = buffer[read_index:]
+
+    def _handle_crc_failure(self, packet_type, frame):
+        APP_CONTEXT.get_logger().logger.info(
+            "crc check error! packet_type:{0}".format(packet_type))
+
+        self.emit('crc_failure', packet_type=packet_type,
+                  event_time=time.time())
+        input_packet_config = next(
+            (x for x in self.properties['userMessages']['inputPackets']
+             if x['name'] == packet_type), None)
+        if input_packet_config:
+            self.emit('command',
+                      packet_type=packet_type,
+                      data=[],
+                      error=True,
+                      raw=list(frame))
 
     def _parse_message(self, packet_type, payload_len, frame):
         payload = frame[5:payload_len+5]
         # parse interactive commands
         is_interactive_cmd = INPUT_PACKETS.__contains__(packet_type)
         if is_interactive_cmd:
-            self._parse_input_packet(packet_type, payload, frame)
+            # command responses outlive the read buffer, copy them out
+            self._parse_input_packet(packet_type, list(payload), list(frame))
         else:
             # consider as output packet, parse output Messages
             self._parse_output_packet(packet_type, payload)
@@ -289,12 +312,12 @@ class UartMessageParser(MessageParserBase):
             data = payload_parser(payload)
             return
 
-        payload_parser = common_continuous_parser
+        codec = self._codecs.get(packet_type)
+        if codec is None:
+            return
 
-        output_packet_config = next(
-            (x for x in self.properties['userMessages']['outputPackets']
-                if x['name'] == packet_type), None)
-        data = payload_parser(payload, output_packet_config)
+        # payload is a view of the frame, decode it without copy
+        data = codec.decode(payload)
 
         if not data:
             # APP_CONTEXT.get_logger().logger.info(
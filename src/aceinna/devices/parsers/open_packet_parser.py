@@ -204,96 +204,148 @@ def read_eeprom_parser(payload, user_configuration=None):
 # output packet
 
 
-def common_continuous_parser(payload, configuration):
+CONTINUOUS_FIELD_FORMATS = {
+    'float': 'f',
+    'uint32': 'I',
+    'int32': 'i',
+    'int16': 'h',
+    'uint16': 'H',
+    'double': 'd',
+    'int64': 'q',
+    'uint64': 'Q',
+    'char': 'c',
+    'uchar': 'B',
+    'uint8': 'B'
+}
+
+NAN_FILTER_TYPES = ['float', 'double']
+
+# dict keeps insertion order since python 3.7
+RECORD_TYPE = dict if sys.version_info >= (3, 7) else collections.OrderedDict
+
+
+def _handle_decode_error(ex):
+    global error_decode_packet
+    error_decode_packet = error_decode_packet + 1
+    if error_decode_packet == 100 or error_decode_packet == 400 or error_decode_packet == 700:
+        print_yellow(
+            "warning: your firmware may not suitable for this driver, pls update firmware or driver")
+
+    if error_decode_packet % 300 == 0:
+        APP_CONTEXT.get_logger().logger.warning(
+            "error happened when decode the payload of packets, pls restart driver: {0}"
+            .format(ex))
+
+
+class ContinuousPacketCodec(object):
     '''
-    Unpack output packet
+    Precompiled decoder of an output packet, built from the payload
+    definition in device configuration, fields are little endian by default
     '''
-    if configuration is None:
-        return
 
-    data = None
-    is_list = 0
-    length = 0
-    pack_fmt = '<'
-    for value in configuration['payload']:
-        if value['type'] == 'float':
-            pack_fmt += 'f'
-            length += 4
-        elif value['type'] == 'uint32':
-            pack_fmt += 'I'
-            length += 4
-        elif value['type'] == 'int32':
-            pack_fmt += 'i'
-            length += 4
-        elif value['type'] == 'int16':
-            pack_fmt += 'h'
-            length += 2
-        elif value['type'] == 'uint16':
-            pack_fmt += 'H'
-            length += 2
-        elif value['type'] == 'double':
-            pack_fmt += 'd'
-            length += 8
-        elif value['type'] == 'int64':
-            pack_fmt += 'q'
-            length += 8
-        elif value['type'] == 'uint64':
-            pack_fmt += 'Q'
-            length += 8
-        elif value['type'] == 'char':
-            pack_fmt += 'c'
-            length += 1
-        elif value['type'] == 'uchar':
-            pack_fmt += 'B'
-            length += 1
-        elif value['type'] == 'uint8':
-            pack_fmt += 'B'
-            length += 1
-    len_fmt = '{0}B'.format(length)
-
-    has_list = configuration.__contains__('isList')
-    if has_list:
-        is_list = configuration['isList']
-
-    if is_list == 1:
-        packet_num = len(payload) // length
-        data = []
-        for i in range(packet_num):
-            payload_c = payload[i*length:(i+1)*length]
-            try:
-                pack_item = struct.pack(len_fmt, *payload_c)
-                item = struct.unpack(pack_fmt, pack_item)
-                out = [(value['name'], item[idx])
-                       for idx, value in enumerate(configuration['payload'])]
-                item = collections.OrderedDict(out)
-                data.append(item)
-            except Exception as ex:  # pylint: disable=broad-except
-                print(
-                    "error happened when decode the payload, pls restart driver: {0}"
-                    .format(ex))
-    else:
+    def __init__(self, configuration, byte_order='<'):
+        self.configuration = configuration
+        self.name = configuration['name']
+        self.field_names = tuple([value['name']
+                                  for value in configuration['payload']])
+        self.is_list = configuration.get('isList', 0) == 1
+        self.error = None
+
+        pack_fmt = byte_order
+        for value in configuration['payload']:
+            field_format = CONTINUOUS_FIELD_FORMATS.get(value['type'])
+            if field_format is None:
+                self.error = 'unsupported type {0} of field {1}'.format(
+                    value['type'], value['name'])
+                break
+            pack_fmt += field_format
+
+        self.struct = struct.Struct(pack_fmt)
+        self.size = self.struct.size
+
+        # list packet keeps the raw value, as what it did before
+        self.nan_filter_indexes = tuple([
+            idx for idx, value in enumerate(configuration['payload'])
+            if value['type'] in NAN_FILTER_TYPES
+        ]) if not self.is_list else ()
+
+    def decode(self, payload, offset=0, length=None):
+        '''
+        Decode the payload starts from offset, payload could be any
+        object supports buffer protocol
+        '''
+        if isinstance(payload, list):
+            payload = bytearray(payload)
+
+        if length is None:
+            length = len(payload) - offset
+
+        if self.is_list:
+            return self._decode_list(payload, offset, length)
+
         try:
-            pack_item = struct.pack(len_fmt, *payload)
-            data = struct.unpack(pack_fmt, pack_item)
-            out = [(
-                value['name'],
-                filter_nan(data[idx])
-            ) for idx, value in enumerate(configuration['payload'])]
-
-            data = collections.OrderedDict(out)
+            if self.error:
+                raise ValueError(self.error)
+            if length != self.size:
+                raise ValueError(
+                    'unpack requires a buffer of {0} bytes'.format(self.size))
+            return self._to_dict(self.struct.unpack_from(payload, offset))
         except Exception as ex:  # pylint: disable=broad-except
-            global error_decode_packet
-            error_decode_packet = error_decode_packet + 1
-            if error_decode_packet == 100 or error_decode_packet == 400 or error_decode_packet == 700:
-                print_yellow(
-                    "warning: your firmware may not suitable for this driver, pls update firmware or driver")
-
-            if error_decode_packet % 300 == 0:
-                APP_CONTEXT.get_logger().logger.warning(
-                    "error happened when decode the payload of packets, pls restart driver: {0}"
-                    .format(ex))
-
-    return data
+            _handle_decode_error(ex)
+            return None
+
+    def _decode_list(self, payload, offset, length):
+        data = []
+        if self.error or self.size == 0:
+            print(
+                "error happened when decode the payload, pls restart driver: {0}"
+                .format(self.error))
+            return data
+
+        unpack_from = self.struct.unpack_from
+        field_names = self.field_names
+        for item_offset in range(offset, offset + length - self.size + 1, self.size):
+            data.append(RECORD_TYPE(
+                zip(field_names, unpack_from(payload, item_offset))))
+        return data
+
+    def _to_dict(self, values):
+        for idx in self.nan_filter_indexes:
+            value = values[idx]
+            # NaN is the only value not equal to itself
+            if value != value:
+                values = [filter_nan(item) for item in values]
+                break
+
+        return RECORD_TYPE(zip(self.field_names, values))
+
+
+def build_continuous_codecs(properties, codec_class=ContinuousPacketCodec):
+    '''
+    Build codecs of all output packets defined in device configuration
+    '''
+    codecs = {}
+    if not properties or not properties.__contains__('userMessages'):
+        return codecs
+
+    for configuration in properties['userMessages'].get('outputPackets', []):
+        codecs[configuration['name']] = codec_class(configuration)
+
+    return codecs
+
+
+def common_continuous_parser(payload, configuration, codec=None):
+    '''
+    Unpack output packet, the codec is built from configuration if
+    the caller does not keep one
+    '''
+    if configuration is None:
+        return
+
+    if codec is None:
+        codec = ContinuousPacketCodec(configuration)
+
+    return codec.decode(payload)
 
 
 def other_output_parser(payload):
@@ -13,6 +13,11 @@ from ...framework.utils import (
 )
 from ...framework.utils.print import print_red
 
+# seconds to wait for response of set core command
+CORE_RESPONSE_TIMEOUT = 0.5
+# seconds to probe bootloader with set core command
+BOOTLOADER_READY_TIMEOUT = 10
+
 
 def build_content(content):
     len_mod = len(content) % 16
@@ -82,13 +87,13 @@ class Provider(RTKProviderBase):
         message_bytes.extend(struct.pack('>I', content_len))
 
         command_line = helper.build_packet('CS', message_bytes)
-        time.sleep(3)  # sleep 3s, to wait for bootloader ready
-        self.communicator.write(command_line, True)
-        time.sleep(2)
-        result = helper.read_untils_have_data(
-            self.communicator, 'CS', 1000, 50)
+        # command is sent again until bootloader is ready
+        is_ready = helper.wait_until(
+            lambda: helper.probe_response(
+                self.communicator, command_line, 'CS', CORE_RESPONSE_TIMEOUT),
+            BOOTLOADER_READY_TIMEOUT)
 
-        if not result:
+        if not is_ready:
             raise Exception('Cannot run set core command')
 
     def reopen_rtcm_serial_port(self, *args):
@@ -111,8 +116,6 @@ class Provider(RTKProviderBase):
                 lambda: helper.format_firmware_content(content),
                 self.firmware_write_command_generator,
                 192)
-            rtk_upgrade_worker.on(
-                UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(15))
             rtk_upgrade_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                                   lambda: self.before_write_content('0', len(content)))
             return rtk_upgrade_worker
@@ -123,8 +126,6 @@ class Provider(RTKProviderBase):
                 lambda: helper.format_firmware_content(content),
                 self.firmware_write_command_generator,
                 192)
-            ins_upgrade_worker.on(
-                UPGRADE_EVENT.FIRST_PACKET, lambda: time.sleep(15))
             ins_upgrade_worker.on(UPGRADE_EVENT.BEFORE_WRITE,
                                   lambda: self.before_write_content('1', len(content)))
             return ins_upgrade_worker
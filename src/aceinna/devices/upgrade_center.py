@@ -17,6 +17,9 @@ class UpgradeCenter(EventBase):
         self.current = 0
         self.total = 0
         self.data_lock = threading.Lock()
+        # wall time of upgrade, from start to finish or error
+        self.started_time = None
+        self.ended_time = None
 
         self.before_run_group = None
         self.after_run_group = None
@@ -43,6 +46,7 @@ class UpgradeCenter(EventBase):
             return False
 
         self.is_processing = True
+        self.started_time = time.time()
 
         self.split_workers()
 
@@ -155,6 +159,7 @@ class UpgradeCenter(EventBase):
         for worker in self.workers.values():
             worker['executor'].stop()
 
+        self.ended_time = time.time()
         self.emit(UPGRADE_EVENT.ERROR, message)
 
     def handle_before_run_worker_done(self, worker_key):
@@ -170,8 +175,7 @@ class UpgradeCenter(EventBase):
         self.run_status.append(worker_key)
         if len(self.run_status) == len(self.normal_workers):
             if not self.after_run_group:
-                # wait a time, output data to client
-                time.sleep(.5)
+                self.ended_time = time.time()
                 self.emit(UPGRADE_EVENT.FINISH)
             else:
                 self.after_run()
@@ -179,5 +183,36 @@ class UpgradeCenter(EventBase):
     def handle_after_run_worker_done(self, worker_key):
         self.after_run_status.append(worker_key)
         if len(self.after_run_status) == len(self.after_run_group):
-            time.sleep(.5)
+            self.ended_time = time.time()
             self.emit(UPGRADE_EVENT.FINISH)
+
+    def get_timing_report(self):
+        ''' Wall time of phases of each worker in seconds, phases of workers
+            running in threads are overlapped
+        '''
+        phases = []
+        for worker_key, worker in self.workers.items():
+            executor = worker['executor']
+            for phase, duration in executor.phase_timings:
+                phases.append({
+                    'worker': executor.name or worker_key,
+                    'phase': phase,
+                    'duration': round(duration, 3)
+                })
+
+        total = 0
+        if self.started_time is not None:
+            total = (self.ended_time or time.time()) - self.started_time
+
+        return {
+            'total': round(total, 3),
+            'phases': phases
+        }
+
+
+def format_timing_report(report):
+    lines = ['Upgrade time: {0:.1f}s'.format(report['total'])]
+    for item in report['phases']:
+        lines.append('  {0} {1}: {2:.1f}s'.format(
+            item['worker'], item['phase'], item['duration']))
+    return '\n'.join(lines)
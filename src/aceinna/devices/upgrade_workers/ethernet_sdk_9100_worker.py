@@ -883,6 +883,13 @@ JG = [0x06, 0xaa]
 WS = [0x07, 0xaa]
 WP = [0x08, 0xaa]
 
+# seconds to wait for response of JS and JG
+JUMP_RESPONSE_TIMEOUT = 4
+# seconds to ping and sync SDK bootloader after JS
+BOOTLOADER_READY_TIMEOUT = 15
+# seconds to wait for response of a ping
+PING_TIMEOUT = 0.5
+
 
 class SDKUpgradeWorker(UpgradeWorkerBase):
     '''
@@ -1022,12 +1029,11 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
         self.send_packet([], send_method=JS)
         #command_line = helper.build_bootloader_input_packet('JS')
         # self.write_wrapper(command_line)
-        time.sleep(2)
 
         #response = helper.read_untils_have_data(self._uart, 'JS')
         # print(rev_data)
-        response = helper.read_untils_have_data(
-            self._communicator, JS, retry_times=200)
+        response = helper.wait_response(
+            self._communicator, JS, JUMP_RESPONSE_TIMEOUT)
         # print('JS result', response)
         return True  # if response is not None else False
 
@@ -1038,9 +1044,8 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
         self.send_packet([], send_method=JG)
         # command_line = helper.build_bootloader_input_packet('JG')
         # self.write_wrapper(command_line)
-        time.sleep(2)
-        response = helper.read_untils_have_data(
-            self._communicator, JG, retry_times=200)
+        response = helper.wait_response(
+            self._communicator, JG, JUMP_RESPONSE_TIMEOUT)
         # print('JG result', response)
         return True if response is not None else False
 
@@ -1049,19 +1054,25 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
             return False
 
         sync = [0xfd, 0xc6, 0x49, 0x28]
-        retry_times = 10
+        deadline = time.time() + BOOTLOADER_READY_TIMEOUT
         is_matched = False
 
-        for i in range(retry_times):
+        while not is_matched and time.time() < deadline:
+            if self._is_stopped:
+                return False
             self.send_packet(sync)
-            time.sleep(0.1)
-
-            is_matched = self.read_until([0x3A, 0x54, 0x2C, 0xA6], 10)
-            if is_matched:
-                break
+            is_matched = self.read_until([0x3A, 0x54, 0x2C, 0xA6], 20)
 
         return is_matched
 
+    def ping_device(self):
+        self._communicator.reset_buffer()
+        self.write_wrapper(
+            bytes([int(x, 16) for x in 'ff:ff:ff:ff:ff:ff'.split(':')]),
+            self._communicator.get_src_mac(), pG, [])
+        return helper.wait_response(
+            self._communicator, pG, PING_TIMEOUT) is not None
+
     def send_change_baud_cmd(self):
         if self._is_stopped:
             return False
@@ -1096,11 +1107,9 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
             return False
 
         check_baud = [0x38]
-        time.sleep(0.01)
         self.send_packet(check_baud)
-        time.sleep(0.5)
 
-        return self.read_until(0xCC, 10, 1)
+        return self.read_until(0xCC, 60, 1)
 
     def is_host_ready(self):
         if self._is_stopped:
@@ -1144,14 +1153,7 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
         self.send_packet(boot_part1)
         self.send_packet(boot_part2)
 
-        for _ in range(10):
-            is_match = self.read_until(0xCC, 10, 1)
-            if is_match:
-                return True
-            time.sleep(1)
-
-        return False
-        # return self.read_until(0xCC, 100, 1)
+        return self.read_until(0xCC, 1100, 1)
 
     def send_write_flash_cmd(self):
         if self._is_stopped:
@@ -1160,21 +1162,20 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
 
         # self.write_wrapper(write_cmd)
         self.send_packet(write_cmd)
-        time.sleep(2)
-        return self.read_until(0xCC, 10, 1)
+        return self.read_until(0xCC, 210, 1)
 
     def send_bin_info(self, bin_info_list):
         if self._is_stopped:
             return False
         # self.write_wrapper(bin_info_list)
         self.send_packet(bin_info_list, buffer_size=512)
-        time.sleep(8)
 
-        self.read_until(0xCC, 1)
-        self.read_until(0xCC, 1)
-        self.read_until(0xCC, 1)
+        # responded once device is initialized and flash is erased
+        self.read_until(0xCC, 800)
+        self.read_until(0xCC, 800)
+        self.read_until(0xCC, 800)
 
-        return self.read_until(0xCC, 1)
+        return self.read_until(0xCC, 800)
 
     def get_bin_info_list(self, fs_len, bin_data):
         bootMode = 0x01
@@ -1316,24 +1317,17 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
         fs_len = len(self._file_content)
         bin_info_list = self.get_bin_info_list(fs_len, self._file_content)
 
+        started = time.time()
         if not self.send_sdk_cmd_JS():
             return self._raise_error('Send sdk command failed')
-        time.sleep(8)
 
-        # need a device ping command, ping 5 times
-        self._communicator.reset_buffer()
-        for i in range(5):
-            self.write_wrapper(
-                bytes([int(x, 16) for x in 'ff:ff:ff:ff:ff:ff'.split(':')]),
-                self._communicator.get_src_mac(), pG, [])
-            time.sleep(.5)
-            response = helper.read_untils_have_data(
-                self._communicator, pG)
-            if response:
-                break
+        # ping device until it responds, then sync until SDK bootloader is
+        # ready
+        helper.wait_until(self.ping_device, BOOTLOADER_READY_TIMEOUT)
 
         if not self.send_sync():
             return self._raise_error('Sync failed')
+        started = self.record_phase('sync', started)
 
         self.flash_write_pre(self._file_content)
         time.sleep(0.1)
@@ -1352,6 +1346,7 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
 
         if not self.send_boot():
             return self._raise_error('SDK boot failed')
+        started = self.record_phase('boot', started)
 
         if not self.send_write_flash_cmd():
             return self._raise_error('Prepare flash change command failed')
@@ -1367,16 +1362,19 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
 
         # if not self.erase_nvm_wait():
         #     return self._raise_error('Wait nvm failed')
+        started = self.record_phase('erase', started)
 
-        time.sleep(2)
         if not self.flash_write(fs_len, self._file_content):
             return self._raise_error('Write flash failed')
+        started = self.record_phase('write', started)
 
         if not self.flash_crc():
             return self._raise_error('CRC check fail')
+        started = self.record_phase('crc', started)
 
         if not self.send_sdk_cmd_JG():
             return self._raise_error('Send sdk command JG fail')
         else:
+            self.record_phase('jump', started)
             # self._uart.close()
             self.emit(UPGRADE_EVENT.FINISH, self._key)
@@ -1,20 +1,45 @@
 import time
+import struct
+import collections
 from ..base.upgrade_worker_base import UpgradeWorkerBase
 from ...framework.utils import helper
 from ...framework.command import Command
+from ...framework.constants import INTERFACES
 from . import (UPGRADE_EVENT, UPGRADE_GROUP)
 
+ACK_READ_LENGTH = 12
+# seconds to wait for ack of the oldest block in flight
+ACK_TIMEOUT = 2
+# seconds to wait for ack of the first block, bootloader erases flash before
+# it acks the first block
+FIRST_ACK_TIMEOUT = 20
+# times a block could be sent again
+MAX_RETRIES = 3
+NAK_PACKET_TYPE = b'\x15\x15'
+
 
 class FirmwareUpgradeWorker(UpgradeWorkerBase):
-    '''Firmware upgrade worker
+    '''Firmware upgrade worker. A block is written after the previous one is
+    acked, or up to window_size blocks are in flight if the bootloader acks
+    blocks with their address. The first block is acked once flash is
+    erased, it is waited for up to first_ack_timeout.
     '''
 
-    def __init__(self, communicator, file_content, command_generator, block_size=240):
+    def __init__(self, communicator, file_content, command_generator,
+                 block_size=240, window_size=1, ack_timeout=ACK_TIMEOUT,
+                 first_ack_timeout=FIRST_ACK_TIMEOUT):
         super(FirmwareUpgradeWorker, self).__init__()
         self._communicator = communicator
         self.current = 0
         #self._baudrate = baudrate
         self.max_data_len = block_size  # custom
+        self.window_size = max(window_size, 1)
+        self.ack_timeout = ack_timeout
+        self.first_ack_timeout = first_ack_timeout
+        # start time of the current phase of writing
+        self._phase_started = None
+        # count of blocks sent again on NAK or timeout
+        self.retransmit_count = 0
         self._group = UPGRADE_GROUP.FIRMWARE
 
         self._command_generator = command_generator
@@ -69,31 +94,144 @@ class FirmwareUpgradeWorker(UpgradeWorkerBase):
                           'Fail in first packet: {0}'.format(ex))
                 return False
 
-        response = helper.read_untils_have_data(
-            self._communicator, listen_packet, 12, 200, payload_length_format)
+        if current == 0:
+            response = helper.wait_response(
+                self._communicator, listen_packet, self.first_ack_timeout,
+                ACK_READ_LENGTH, payload_length_format)
+            self._phase_started = self.record_phase(
+                'erase', self._phase_started)
+        else:
+            response = helper.read_untils_have_data(
+                self._communicator, listen_packet, ACK_READ_LENGTH, 200,
+                payload_length_format)
 
         if response is None:
             return False
         return True
 
-    def work(self):
-        '''Upgrades firmware of connected device to file provided in argument
+    def is_windowed(self):
         '''
-        if self._is_stopped:
-            return
-        if self.current == 0 and self.total == 0:
-            self.emit(UPGRADE_EVENT.ERROR, self._key, 'Invalid file content')
-            return
+        Blocks are kept in flight on serial port, which is framed by 1 byte
+        payload length
+        '''
+        return self.window_size > 1 and \
+            getattr(self._communicator, 'type', None) != \
+            INTERFACES.ETH_100BASE_T1
+
+    def send_block(self, address, is_retransmit=False):
+        '''
+        Send block at address without waiting for ack, error is emitted if
+        it fails
+        '''
+        data_len = min(self.max_data_len, self.total - address)
+        data = self._file_content[address:address + data_len]
+        command = self._command_generator(data_len, address, data)
+        if isinstance(command, Command):
+            command = command.actual_command
 
         try:
-            self.emit(UPGRADE_EVENT.BEFORE_WRITE)
-        except Exception as ex:
+            self._communicator.write(command, True)
+        except Exception as ex:  # pylint: disable=broad-except
             self.emit(UPGRADE_EVENT.ERROR, self._key,
-                      'Fail in before write: {0}'.format(ex))
-            return
+                      'Fail in write block at {0}: {1}'.format(address, ex))
+            return False
+
+        if address == 0 and not is_retransmit:
+            try:
+                self.emit(UPGRADE_EVENT.FIRST_PACKET)
+            except Exception as ex:
+                self.emit(UPGRADE_EVENT.ERROR, self._key,
+                          'Fail in first packet: {0}'.format(ex))
+                return False
+        return True
+
+    def write_windowed(self):
+        '''
+        Write blocks with a window of blocks in flight, acks are matched by
+        the address in ack payload. The first block is sent alone, if its
+        ack has no address, the rest is written in stop-and-wait. On NAK or
+        timeout, blocks are sent again from the oldest one in flight, and
+        window falls back to 1.
+        '''
+        scanner = helper.ResponseScanner(check_crc=True)
+        # (address, sent time) of blocks in flight
+        inflight = collections.deque()
+        retries = collections.Counter()
+        next_address = self.current
+        window = 1
+        is_negotiated = False
+
+        while self.current < self.total:
+            if self._is_stopped:
+                return False
+
+            while len(inflight) < window and next_address < self.total:
+                is_retransmit = retries[next_address] > 0
+                # error is emitted by send_block
+                if not self.send_block(next_address, is_retransmit):
+                    return False
+                inflight.append((next_address, time.time()))
+                next_address += min(self.max_data_len,
+                                    self.total - next_address)
+
+            read_data = helper.read_available(
+                self._communicator, ACK_READ_LENGTH)
+            if not read_data:
+                self._communicator.wait_readable(0.001)
+
+            is_failed = False
+            for packet_type, payload in scanner.feed(read_data):
+                address = struct.unpack('>I', bytes(payload[0:4]))[0] \
+                    if len(payload) >= 4 else None
+                if packet_type == NAK_PACKET_TYPE:
+                    is_failed = True
+                    break
+                if packet_type != b'WA':
+                    continue
+
+                if not is_negotiated:
+                    is_negotiated = True
+                    window = self.window_size if address is not None else 1
+                    self._phase_started = self.record_phase(
+                        'erase', self._phase_started)
+
+                if address is None:
+                    address = inflight[0][0] if inflight else None
+                for index, (block_address, _) in enumerate(inflight):
+                    if block_address == address:
+                        del inflight[index]
+                        break
+
+            ack_timeout = self.ack_timeout if is_negotiated \
+                else self.first_ack_timeout
+            if not is_failed and inflight and \
+                    time.time() - inflight[0][1] > ack_timeout:
+                is_failed = True
+
+            if is_failed and inflight:
+                # send again from the oldest block in flight
+                oldest_address = inflight[0][0]
+                retries[oldest_address] += 1
+                if retries[oldest_address] > MAX_RETRIES:
+                    self.emit(UPGRADE_EVENT.ERROR, self._key,
+                              'Write firmware operation failed')
+                    return False
+                self.retransmit_count += 1
+                next_address = oldest_address
+                inflight.clear()
+                window = 1
+
+            current = inflight[0][0] if inflight else next_address
+            if current > self.current:
+                self.current = current
+                self.emit(UPGRADE_EVENT.PROGRESS, self._key,
+                          self.current, self.total)
+        return True
+
+    def write_stop_and_wait(self):
         while self.current < self.total:
             if self._is_stopped:
-                return
+                return False
 
             packet_data_len = self.max_data_len if (
                 self.total - self.current) > self.max_data_len else (self.total - self.current)
@@ -105,14 +243,43 @@ class FirmwareUpgradeWorker(UpgradeWorkerBase):
             if not write_result:
                 self.emit(UPGRADE_EVENT.ERROR, self._key,
                           'Write firmware operation failed')
-                return
+                return False
 
             self.current += packet_data_len
             self.emit(UPGRADE_EVENT.PROGRESS, self._key,
                       self.current, self.total)
+        return True
+
+    def work(self):
+        '''Upgrades firmware of connected device to file provided in argument
+        '''
+        if self._is_stopped:
+            return
+        if self.current == 0 and self.total == 0:
+            self.emit(UPGRADE_EVENT.ERROR, self._key, 'Invalid file content')
+            return
+
+        try:
+            with self.timing('prepare'):
+                self.emit(UPGRADE_EVENT.BEFORE_WRITE)
+        except Exception as ex:
+            self.emit(UPGRADE_EVENT.ERROR, self._key,
+                      'Fail in before write: {0}'.format(ex))
+            return
+
+        # the first block is timed as erase, the rest as write
+        self._phase_started = time.time()
+        if self.is_windowed():
+            is_written = self.write_windowed()
+        else:
+            is_written = self.write_stop_and_wait()
+        if not is_written:
+            return
+        self.record_phase('write', self._phase_started)
 
         try:
-            self.emit(UPGRADE_EVENT.AFTER_WRITE)
+            with self.timing('complete'):
+                self.emit(UPGRADE_EVENT.AFTER_WRITE)
         except Exception as ex:
             self.emit(UPGRADE_EVENT.ERROR, self._key,
                       'Fail in after write: {0}'.format(ex))
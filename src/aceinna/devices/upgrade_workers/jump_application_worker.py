@@ -4,13 +4,22 @@ from ...framework.utils import helper
 from ...framework.command import Command
 from . import (UPGRADE_EVENT, UPGRADE_GROUP)
 
+# seconds to probe if application is ready after jump
+READY_TIMEOUT = 15
+
 
 class JumpApplicationWorker(UpgradeWorkerBase):
     '''Firmware upgrade worker
     '''
     _command = None
     _listen_packet = None
+    # seconds to wait for application after the command, if it is not
+    # probed
     _wait_timeout_after_command = 3
+    # a callable returns True if application is ready, it is probed until
+    # ready_timeout after the command
+    _ready_probe = None
+    _ready_timeout = READY_TIMEOUT
 
     def __init__(self, communicator, *args, **kwargs):
         super(JumpApplicationWorker, self).__init__()
@@ -29,6 +38,12 @@ class JumpApplicationWorker(UpgradeWorkerBase):
             self._wait_timeout_after_command = kwargs.get(
                 'wait_timeout_after_command')
 
+        if kwargs.get('ready_probe'):
+            self._ready_probe = kwargs.get('ready_probe')
+
+        if kwargs.get('ready_timeout'):
+            self._ready_timeout = kwargs.get('ready_timeout')
+
     def stop(self):
         self._is_stopped = True
 
@@ -58,25 +73,28 @@ class JumpApplicationWorker(UpgradeWorkerBase):
 
             self.emit(UPGRADE_EVENT.BEFORE_COMMAND)
 
-            self._communicator.reset_buffer()
-            self._communicator.write(actual_command)
+            with self.timing('jump'):
+                self._communicator.reset_buffer()
+                self._communicator.write(actual_command)
+                deadline = time.time() + self._wait_timeout_after_command
 
-            time.sleep(self._wait_timeout_after_command)
-
-            helper.read_untils_have_data(
-                self._communicator, self._listen_packet, 1000, 50, payload_length_format)
+                helper.wait_response(
+                    self._communicator, self._listen_packet,
+                    self._wait_timeout_after_command, 1000,
+                    payload_length_format)
 
             self.emit(UPGRADE_EVENT.AFTER_COMMAND)
 
-        # ping device
-        # can_ping = False
-        # self._communicator.serial_port.baudrate = self._original_baudrate
-
-        # while not can_ping:
-        #     self._communicator.reset_buffer()  # clear input and output buffer
-        #     info = ping(self._communicator, None)
-        #     if info:
-        #         can_ping = True
-        #     time.sleep(0.5)
+            # bootloader acks the command before it jumps, the whole wait
+            # after command is taken if application is not probed
+            if not self._ready_probe:
+                with self.timing('application ready'):
+                    time.sleep(max(deadline - time.time(), 0))
+
+        # ping device, device is detected again after upgrade, so it is not
+        # an error if application is not ready in time
+        if self._ready_probe:
+            with self.timing('application ready'):
+                helper.wait_until(self._ready_probe, self._ready_timeout)
 
         self.emit(UPGRADE_EVENT.FINISH, self._key)
@@ -1,18 +1,21 @@
-from array import array
 import time
-
 from ..base.upgrade_worker_base import UpgradeWorkerBase
 from ...framework.utils import helper
 from ...framework.command import Command
 from . import (UPGRADE_EVENT, UPGRADE_GROUP)
 
 
+
 class JumpBootloaderWorker(UpgradeWorkerBase):
     '''Firmware upgrade worker
     '''
     _command = None
     _listen_packet = None
+    # seconds to wait for bootloader after the command
     _wait_timeout_after_command = 3
+    # a callable returns True if the response identifies bootloader, the
+    # wait after command is ended once it is True
+    _ready_probe = None
 
     def __init__(self, communicator, *args, **kwargs):
         super(JumpBootloaderWorker, self).__init__()
@@ -31,6 +34,9 @@ class JumpBootloaderWorker(UpgradeWorkerBase):
             self._wait_timeout_after_command = kwargs.get(
                 'wait_timeout_after_command')
 
+        if kwargs.get('ready_probe'):
+            self._ready_probe = kwargs.get('ready_probe')
+
     def stop(self):
         self._is_stopped = True
 
@@ -59,14 +65,25 @@ class JumpBootloaderWorker(UpgradeWorkerBase):
 
             self.emit(UPGRADE_EVENT.BEFORE_COMMAND)
 
-            self._communicator.reset_buffer()
-            self._communicator.write(actual_command)
+            with self.timing('jump'):
+                self._communicator.reset_buffer()
+                self._communicator.write(actual_command)
+                deadline = time.time() + self._wait_timeout_after_command
 
-            time.sleep(self._wait_timeout_after_command)
-
-            response = helper.read_untils_have_data(
-                self._communicator, self._listen_packet, 1000, 50, payload_length_format)
+                helper.wait_response(
+                    self._communicator, self._listen_packet,
+                    self._wait_timeout_after_command, 1000,
+                    payload_length_format)
 
             self.emit(UPGRADE_EVENT.AFTER_COMMAND)
 
+            # it is not an error if the probe fails, the whole wait after
+            # command is taken as before
+            with self.timing('bootloader ready'):
+                if self._ready_probe:
+                    helper.wait_until(
+                        self._ready_probe, max(deadline - time.time(), 0))
+                else:
+                    time.sleep(max(deadline - time.time(), 0))
+
         self.emit(UPGRADE_EVENT.FINISH, self._key)
@@ -983,7 +983,9 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
         super(SDKUpgradeWorker, self).__init__()
         self._uart = uart
         self._file_content = file_content
-        self.sync_repeat_count = 100
+        # sync is sent until it is responded or bootloader is not ready in
+        # wait_bootloader ms
+        self.wait_bootloader = 15000
         self.wait_sync = 100
         self.wait_ack = 3500
         self.wait_read_driver = 100
@@ -1077,17 +1079,14 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
             return False
 
         sync = [0xfd, 0xc6, 0x49, 0x28]
-        retry_times = self.sync_repeat_count
+        deadline = time.time() + self.wait_bootloader / 1000
         is_matched = False
 
-        for i in range(retry_times):
-            # self._uart.write([0x00, 0x00, 0x00, 0x00])
+        while not is_matched and time.time() < deadline:
+            if self._is_stopped:
+                return False
             self._uart.write(sync)
-            # self._uart.write(sync)
-            # time.sleep(0.5)
             is_matched = self.read_until([0x3A, 0x54, 0x2C, 0xA6], self.wait_read_driver)
-            if is_matched:
-                break
 
         return is_matched
 
@@ -1343,13 +1342,16 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
         self._uart.close()
         # if not self.connect_serail_port():
         #     return self._raise_error('Connect serial Port failed')
-        time.sleep(5)  # Wait for bootloader ready
         self._uart.open()
         self._uart.reset_input_buffer()
 
-        if not self.send_sync():
+        # bootloader is ready when sync is responded
+        with self.timing('sync'):
+            is_synced = self.send_sync()
+        if not is_synced:
             return self._raise_error('Sync failed')
 
+        started = time.time()
         # if not self.send_change_baud_cmd():
         #     return self._raise_error('Prepare baudrate change command failed')
 
@@ -1366,6 +1368,7 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
 
         if not self.send_boot():
             return self._raise_error('SDK boot failed')
+        started = self.record_phase('boot', started)
 
         if not self.send_write_flash_cmd():
             return self._raise_error('Prepare flash change command failed')
@@ -1378,12 +1381,15 @@ class SDKUpgradeWorker(UpgradeWorkerBase):
 
         if not self.erase_wait():
             return self._raise_error('Wait erase failed')
+        started = self.record_phase('erase', started)
 
         if not self.flash_write(fs_len, self._file_content):
             return self._raise_error('Write flash failed')
+        started = self.record_phase('write', started)
 
         if not self.flash_crc():
             return self._raise_error('CRC check fail')
         else:
+            self.record_phase('crc', started)
             # self._uart.close()
             self.emit(UPGRADE_EVENT.FINISH, self._key)
@@ -0,0 +1,249 @@
+'''
+Binary columnar log of output packets. Each packet type is saved in its own
+file, a small JSON header describes the fields, it is followed by fixed-width
+records. Records are appended in chunks, and could be loaded into numpy
+arrays without parsing, see load_columnar_log.
+'''
+import os
+import json
+import struct
+import operator
+import threading
+
+MAGIC = b'ACECOL'
+VERSION = 1
+# magic, version, header length
+PREFIX = struct.Struct('<6sHI')
+# records start at the aligned offset, so they could be memory mapped
+HEADER_ALIGNMENT = 8
+CHUNK_RECORDS = 1024
+FILE_EXTENSION = '.clog'
+
+# struct format and numpy dtype of payload field types
+FIELD_TYPES = {
+    'uint8': ('B', 'u1'),
+    'int8': ('b', 'i1'),
+    'uint16': ('H', '<u2'),
+    'int16': ('h', '<i2'),
+    'uint32': ('I', '<u4'),
+    'int32': ('i', '<i4'),
+    'uint64': ('Q', '<u8'),
+    'int64': ('q', '<i8'),
+    'float': ('f', '<f4'),
+    'double': ('d', '<f8'),
+    'char': ('c', 'S1'),
+    'uchar': ('c', 'S1')
+}
+# scaled value and unknown type are saved as double
+DEFAULT_FIELD_TYPE = ('d', '<f8')
+CHAR_FORMAT = 'c'
+
+
+def build_record_fields(output_packet):
+    '''
+    Build fields of record from payload of output packet
+    '''
+    fields = []
+    for field in output_packet['payload']:
+        if 'scaling' in field:
+            field_format, dtype = DEFAULT_FIELD_TYPE
+        else:
+            field_format, dtype = FIELD_TYPES.get(
+                field['type'], DEFAULT_FIELD_TYPE)
+        fields.append({
+            'name': field['name'],
+            'unit': field.get('unit', ''),
+            'type': field['type'],
+            'format': field_format,
+            'dtype': dtype
+        })
+    return fields
+
+
+def build_header(output_packet):
+    fields = build_record_fields(output_packet)
+    record_format = '<' + ''.join([field['format'] for field in fields])
+    return {
+        'packetType': output_packet['name'],
+        'recordFormat': record_format,
+        'recordSize': struct.calcsize(record_format),
+        'fields': fields
+    }
+
+
+def encode_header(header):
+    content = json.dumps(header).encode('utf-8')
+    padding = -(PREFIX.size + len(content)) % HEADER_ALIGNMENT
+    content += b' ' * padding
+    return PREFIX.pack(MAGIC, VERSION, len(content)) + content
+
+
+def read_header(file_obj):
+    '''
+    Read header of columnar log, returns header and offset of records
+    '''
+    prefix = file_obj.read(PREFIX.size)
+    if len(prefix) < PREFIX.size:
+        raise ValueError('Not a columnar log')
+
+    magic, version, header_len = PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError('Not a columnar log')
+    if version != VERSION:
+        raise ValueError('Unsupported columnar log version {0}'.format(version))
+
+    header = json.loads(file_obj.read(header_len).decode('utf-8'))
+    return header, PREFIX.size + header_len
+
+
+class ColumnarLogWriter(object):
+    '''
+    Append rows of one packet type as fixed-width records. Records are
+    packed into a chunk, the chunk is written when it is full. Rows are
+    appended in the receive thread, while the writer could be closed in
+    another thread, such as the log is stopped by websocket.
+    '''
+
+    def __init__(self, file_path, output_packet, chunk_records=CHUNK_RECORDS):
+        self.header = build_header(output_packet)
+        self.record_count = 0
+        self.dropped_count = 0
+        fields = self.header['fields']
+        self._record = struct.Struct(self.header['recordFormat'])
+        self._chunk = bytearray(self._record.size * chunk_records)
+        self._chunk_view = memoryview(self._chunk)
+        self._chunk_records = chunk_records
+        self._chunk_count = 0
+        names = [field['name'] for field in fields]
+        if len(names) == 1:
+            self._get_values = lambda data: (data[names[0]],)
+        else:
+            self._get_values = operator.itemgetter(*names)
+        self._char_indexes = [index for index, field in enumerate(fields)
+                              if field['format'] == CHAR_FORMAT]
+        self._lock = threading.Lock()
+        self._file = open(file_path, 'wb')
+        self._file.write(encode_header(self.header))
+
+    def append(self, data):
+        '''
+        Pack row into chunk, row without all fields of packet is dropped
+        '''
+        with self._lock:
+            if self._file.closed:
+                # the row arrives when log is stopping
+                self.dropped_count += 1
+                return
+
+            try:
+                values = self._get_values(data)
+                if self._char_indexes:
+                    values = self._encode_chars(values)
+                self._record.pack_into(
+                    self._chunk, self._chunk_count * self._record.size,
+                    *values)
+            except (KeyError, TypeError, struct.error):
+                self.dropped_count += 1
+                return
+
+            self._chunk_count += 1
+            self.record_count += 1
+            if self._chunk_count == self._chunk_records:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+
+    def _flush(self):
+        if self._chunk_count > 0:
+            self._file.write(
+                self._chunk_view[:self._chunk_count * self._record.size])
+            self._chunk_count = 0
+        self._file.flush()
+
+    def _encode_chars(self, values):
+        values = list(values)
+        for index in self._char_indexes:
+            value = values[index]
+            if not isinstance(value, bytes):
+                values[index] = str(value).encode('utf-8')[:1] or b'\x00'
+        return values
+
+
+def read_columnar_log(file_path):
+    '''
+    Read columnar log without numpy, returns header and list of records,
+    each record is a tuple of field values
+    '''
+    with open(file_path, 'rb') as file_obj:
+        header, _ = read_header(file_obj)
+        content = file_obj.read()
+
+    record = struct.Struct(header['recordFormat'])
+    # a record of interrupted write is ignored
+    content_len = len(content) - len(content) % record.size
+    return header, list(record.iter_unpack(content[:content_len]))
+
+
+def load_columnar_log(file_path, mmap_mode='r'):
+    '''
+    Load columnar log into numpy structured array, fields are accessed by
+    name, such as records['time']. The file is memory mapped by default,
+    mmap_mode None loads it into memory. numpy is required.
+    '''
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('numpy is required to load columnar log')
+
+    with open(file_path, 'rb') as file_obj:
+        header, offset = read_header(file_obj)
+
+    dtype = numpy.dtype([(str(field['name']), field['dtype'])
+                         for field in header['fields']])
+    count = (os.path.getsize(file_path) - offset) // dtype.itemsize
+    if mmap_mode is None or count == 0:
+        return numpy.fromfile(file_path, dtype=dtype, count=count,
+                              offset=offset)
+    return numpy.memmap(file_path, dtype=dtype, mode=mmap_mode,
+                        offset=offset, shape=(count,))
+
+
+def export_csv(file_path, csv_path=None):
+    '''
+    Convert columnar log to the CSV written by FileLoger, returns CSV path
+    '''
+    # file_storage writes columnar log, so it is imported when used
+    from .file_storage import compile_row_formatter
+
+    header, records = read_columnar_log(file_path)
+    output_packet = {
+        'name': header['packetType'],
+        'payload': header['fields']
+    }
+    names = [field['name'] for field in header['fields']]
+    char_indexes = [index for index, field in enumerate(header['fields'])
+                    if field['format'] == CHAR_FORMAT]
+    csv_header, format_row = compile_row_formatter(output_packet, names)
+
+    if csv_path is None:
+        csv_path = os.path.splitext(file_path)[0] + '.csv'
+
+    with open(csv_path, 'w') as csv_file:
+        csv_file.write(csv_header)
+        for record in records:
+            if char_indexes:
+                record = [value.decode('utf-8', 'replace')
+                          if index in char_indexes else value
+                          for index, value in enumerate(record)]
+            csv_file.write(format_row(dict(zip(names, record))))
+    return csv_path
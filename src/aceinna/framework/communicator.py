@@ -2,6 +2,7 @@
 Communicator
 """
 import os
+import time
 from abc import ABCMeta, abstractmethod
 from ..devices import DeviceManager
 from .constants import (BAUDRATE_LIST, INTERFACES)
@@ -27,6 +28,9 @@ class CommunicatorFactory:
         elif method == INTERFACES.ETH_100BASE_T1:
             from .communicators import Ethernet
             return Ethernet(options)
+        elif method == INTERFACES.REPLAY:
+            from .communicators import Replay
+            return Replay(options)
         else:
             raise Exception('no matched communicator')
 
@@ -47,6 +51,8 @@ class Communicator(object):
         self.device = None
         self.threadList = []
         self.type = 'Unknown'
+        # set in multi-device mode, provider is cached by it
+        self.device_id = None
 
     @abstractmethod
     def find_device(self, callback, retries=0, not_found_handler=None):
@@ -74,6 +80,13 @@ class Communicator(object):
         read
         '''
 
+    def wait_readable(self, timeout):
+        '''
+        Wait until data could be read or timeout. Read of serial port blocks
+        until data arrives, others without a signal of arrival poll shortly.
+        '''
+        time.sleep(min(timeout, 0.001))
+
     def reset_buffer(self):
         '''
         reset data in buffer area
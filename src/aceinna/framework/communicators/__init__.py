@@ -1,3 +1,4 @@
 from .serialport import SerialPort
 from .lan import LAN
 from .ethernet_100base_t1 import Ethernet
+from .replay import Replay
@@ -0,0 +1,231 @@
+'''
+Asyncio transports of communicators. A transport delivers received data to
+a callback on the event loop, so no reader thread is required.
+'''
+import asyncio
+from abc import ABCMeta, abstractmethod
+from ..constants import INTERFACES
+
+READ_SIZE = 4096
+
+
+class AsyncTransport(object):
+    '''
+    Transport base, call on_data(data) on the loop for each received block,
+    call on_error(ex) once when the connection is broken
+    '''
+    __metaclass__ = ABCMeta
+
+    def __init__(self, communicator, loop, on_data, on_error=None):
+        self._communicator = communicator
+        self._loop = loop
+        self._on_data = on_data
+        self._on_error = on_error
+        self._is_reading = False
+        self._is_closed = False
+
+    @property
+    def reading(self):
+        return self._is_reading
+
+    def start(self):
+        ''' Start reading, it should be called on the loop
+        '''
+        if self._is_closed or self._is_reading:
+            return
+        self._is_reading = True
+        self._start_reading()
+
+    def pause(self):
+        ''' Stop reading, it should be called on the loop
+        '''
+        if not self._is_reading:
+            return
+        self._is_reading = False
+        self._stop_reading()
+
+    def close(self):
+        self.pause()
+        self._is_closed = True
+
+    def write(self, data):
+        return self._communicator.write(data)
+
+    @abstractmethod
+    def _start_reading(self):
+        '''
+        Start to deliver received data
+        '''
+
+    @abstractmethod
+    def _stop_reading(self):
+        '''
+        Stop delivering received data
+        '''
+
+    def _handle_data(self, data):
+        if self._is_reading and data:
+            self._on_data(data)
+
+    def _handle_error(self, ex):
+        self.close()
+        if self._on_error:
+            self._on_error(ex)
+
+
+class FileDescriptorTransport(AsyncTransport):
+    '''
+    Read the file descriptor when the loop reports it is readable
+    '''
+
+    @abstractmethod
+    def _get_fileno(self):
+        '''
+        File descriptor watched by the loop
+        '''
+
+    @abstractmethod
+    def _read_available(self):
+        '''
+        Read data available without blocking
+        '''
+
+    def _start_reading(self):
+        self._loop.add_reader(self._get_fileno(), self._on_readable)
+
+    def _stop_reading(self):
+        self._loop.remove_reader(self._get_fileno())
+
+    def _on_readable(self):
+        try:
+            data = self._read_available()
+        except Exception as ex:  # pylint: disable=broad-except
+            self._handle_error(ex)
+            return
+        self._handle_data(data)
+
+
+class SerialPortTransport(FileDescriptorTransport):
+    '''
+    Transport of SerialPort, works on posix serial ports
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(SerialPortTransport, self).__init__(*args, **kwargs)
+        # data is parsed on the loop before next read, so one buffer is reused
+        self._read_buffer = None
+        if getattr(self._communicator, 'high_throughput', False):
+            self._read_buffer = bytearray(self._communicator.read_buffer_size)
+
+    def _get_fileno(self):
+        return self._communicator.serial_port.fileno()
+
+    def _read_available(self):
+        if self._read_buffer is not None:
+            return memoryview(self._read_buffer)[
+                :self._communicator.read_into(self._read_buffer)]
+
+        serial_port = self._communicator.serial_port
+        return serial_port.read(serial_port.in_waiting or 1)
+
+
+class LANTransport(FileDescriptorTransport):
+    '''
+    Transport of LAN, reads the accepted socket
+    '''
+
+    def _get_fileno(self):
+        return self._communicator.sock.fileno()
+
+    def _start_reading(self):
+        self._communicator.sock.setblocking(False)
+        super(LANTransport, self)._start_reading()
+
+    def _stop_reading(self):
+        super(LANTransport, self)._stop_reading()
+        self._communicator.sock.setblocking(True)
+
+    def _read_available(self):
+        try:
+            data = self._communicator.sock.recv(READ_SIZE)
+        except BlockingIOError:
+            return None
+
+        if not data:
+            raise ConnectionError('Device is disconnected.')
+        return data
+
+
+class EthernetTransport(AsyncTransport):
+    '''
+    Transport of 100BASE-T1 Ethernet, the packets captured by sniffer are
+    handed over to the loop
+    '''
+
+    def _start_reading(self):
+        self._communicator.set_receive_handler(self._on_packet)
+
+    def _stop_reading(self):
+        self._communicator.set_receive_handler(None)
+
+    def _on_packet(self, data):
+        # called from sniffer thread
+        self._loop.call_soon_threadsafe(self._handle_data, data)
+
+
+class ExecutorTransport(AsyncTransport):
+    '''
+    Fallback transport, runs blocking communicator.read in executor
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(ExecutorTransport, self).__init__(*args, **kwargs)
+        self._read_task = None
+
+    def _start_reading(self):
+        # a paused read loop keeps running if it is not finished yet
+        if self._read_task is None or self._read_task.done():
+            self._read_task = self._loop.create_task(self._read_loop())
+
+    def _stop_reading(self):
+        pass
+
+    async def _read_loop(self):
+        while self._is_reading:
+            try:
+                data = await self._loop.run_in_executor(
+                    None, self._communicator.read, READ_SIZE)
+            except Exception as ex:  # pylint: disable=broad-except
+                self._handle_error(ex)
+                return
+
+            if data:
+                self._handle_data(data)
+            else:
+                await asyncio.sleep(0.01)
+
+
+def _can_add_reader(loop):
+    return hasattr(loop, 'add_reader') and \
+        not isinstance(loop, getattr(asyncio, 'ProactorEventLoop', ()))
+
+
+def create_transport(communicator, loop, on_data, on_error=None):
+    '''
+    Create the transport of communicator
+    '''
+    transport_cls = ExecutorTransport
+
+    if communicator.type == INTERFACES.ETH_100BASE_T1 and \
+            hasattr(communicator, 'set_receive_handler'):
+        transport_cls = EthernetTransport
+    elif communicator.type == INTERFACES.ETH and \
+            getattr(communicator, 'sock', None) is not None and \
+            _can_add_reader(loop):
+        transport_cls = LANTransport
+    elif communicator.type == INTERFACES.UART and \
+            hasattr(getattr(communicator, 'serial_port', None), 'fileno') and \
+            _can_add_reader(loop):
+        transport_cls = SerialPortTransport
+
+    return transport_cls(communicator, loop, on_data, on_error)
@@ -1,10 +1,15 @@
 import time
+import threading
 import collections
 from scapy.all import sendp, conf, AsyncSniffer
 from ..constants import (BAUDRATE_LIST, INTERFACES)
+from ..context import APP_CONTEXT
 from ..utils.print import (print_red)
 from ..utils import helper
 from ..communicator import Communicator
+from . import packet_socket
+
+HARD_CODE_MAC = '04:00:00:00:00:04'
 
 
 class Ethernet(Communicator):
@@ -24,8 +29,16 @@ class Ethernet(Communicator):
 
         self.iface_confirmed = False
         self.receive_cache = collections.deque(maxlen=1000)
+        # set when a packet is appended to receive cache
+        self.receive_cache_readable = threading.Event()
         self.use_length_as_protocol = True
         self.async_sniffer = None
+        # AF_PACKET receiver on linux, scapy sniffer is the fallback
+        self.packet_receiver = None
+        self._cache_received_count = 0
+        self._cache_dropped_count = 0
+        # set by asyncio transport, receives packets instead of the cache
+        self.receive_handler = None
 
         if options and options.device_type != 'auto':
             self.filter_device_type = options.device_type
@@ -113,6 +126,10 @@ class Ethernet(Communicator):
         if self.async_sniffer and self.async_sniffer.running:
             self.async_sniffer.stop()
 
+        if self.packet_receiver:
+            self.packet_receiver.stop()
+            self.packet_receiver = None
+
         self.iface_confirmed = False
         dst_mac_str = 'FF:FF:FF:FF:FF:FF'
 
@@ -148,15 +165,53 @@ class Ethernet(Communicator):
         '''
         The different mac address make the filter very hard to match
         '''
-        hard_code_mac = '04:00:00:00:00:04'
+        if self.start_packet_receiver([self.dst_mac, HARD_CODE_MAC]):
+            return
+
         filter_exp = 'ether src host {0} or {1}'.format(
-            self.dst_mac, hard_code_mac)
+            self.dst_mac, HARD_CODE_MAC)
 
         self.async_sniffer = AsyncSniffer(
             iface=self.iface, prn=self.handle_recive_packet, filter=filter_exp, store=0)
         self.async_sniffer.start()
         time.sleep(0.1)
 
+    def start_packet_receiver(self, src_macs):
+        '''
+        Receive frames by AF_PACKET socket, return False if not supported
+        '''
+        if not packet_socket.is_supported():
+            return False
+
+        receiver = packet_socket.PacketSocketReceiver(self.iface, src_macs)
+        receiver.on_frame = self.handle_receive_frame
+        try:
+            receiver.start()
+        except OSError as ex:
+            APP_CONTEXT.get_logger().logger.info(
+                'AF_PACKET receiver is not available: %s', ex)
+            return False
+
+        self.packet_receiver = receiver
+        return True
+
+    def handle_receive_frame(self, frame, length):
+        '''
+        Handle frame received by AF_PACKET receiver, return True to keep it
+        in the ring for read
+        '''
+        if frame[16:18] == b'\x01\xcc':
+            self.dst_mac = packet_socket.bytes_to_mac(frame[6:12])
+
+            if frame[12:14] == b'\x00\x00':
+                self.use_length_as_protocol = False
+
+        if self.receive_handler:
+            self.receive_handler(
+                bytes(frame[packet_socket.ETHERNET_HEADER_LEN:length]))
+            return False
+        return True
+
     def handle_recive_packet(self, packet):
         packet_raw = bytes(packet)[12:]
         packet_raw_length = packet_raw[0:2]
@@ -168,7 +223,20 @@ class Ethernet(Communicator):
             if packet_raw_length == b'\x00\x00':
                 self.use_length_as_protocol = False
 
-        self.receive_cache.append(packet_raw[2:])
+        if self.receive_handler:
+            self.receive_handler(packet_raw[2:])
+        else:
+            self._cache_received_count += 1
+            if len(self.receive_cache) == self.receive_cache.maxlen:
+                self._cache_dropped_count += 1
+            self.receive_cache.append(packet_raw[2:])
+            self.receive_cache_readable.set()
+
+    def set_receive_handler(self, handler):
+        '''
+        Hand over received packets to handler, None to use read
+        '''
+        self.receive_handler = handler
 
     def open(self):
         '''
@@ -199,16 +267,55 @@ class Ethernet(Communicator):
         '''
         read
         '''
+        if self.packet_receiver:
+            data = self.packet_receiver.ring.pop(
+                packet_socket.ETHERNET_HEADER_LEN)
+            return data if data is not None else []
+
         if len(self.receive_cache) > 0:
             return self.receive_cache.popleft()
         return []
 
+    def wait_readable(self, timeout):
+        '''
+        Wait until a packet is received or timeout
+        '''
+        if self.packet_receiver:
+            queue, readable = self.packet_receiver.ring, \
+                self.packet_receiver.ring.readable
+        else:
+            queue, readable = self.receive_cache, self.receive_cache_readable
+
+        # cleared before checking, so a packet received after check sets it
+        readable.clear()
+        if len(queue) > 0:
+            return
+        readable.wait(timeout)
+
     def reset_buffer(self):
         '''
         reset buffer
         '''
+        if self.packet_receiver:
+            self.packet_receiver.ring.clear()
         self.receive_cache.clear()
 
+    def get_read_statistics(self):
+        '''
+        Statistics of received frames, dropped count is the frames dropped
+        because reader lags
+        '''
+        if self.packet_receiver:
+            statistics = self.packet_receiver.get_statistics()
+            statistics['backend'] = 'af_packet'
+            return statistics
+
+        return {
+            'backend': 'scapy',
+            'received_count': self._cache_received_count,
+            'dropped_count': self._cache_dropped_count
+        }
+
     def get_src_mac(self):
         return bytes([int(x, 16) for x in self.src_mac.split(':')])
 
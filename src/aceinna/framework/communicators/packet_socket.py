@@ -0,0 +1,263 @@
+'''
+Linux AF_PACKET receiver of 100BASE-T1 Ethernet frames. Frames are filtered
+by a BPF program in kernel, and received into a ring of preallocated buffers.
+'''
+import sys
+import socket
+import struct
+import select
+import ctypes
+import threading
+
+ETH_P_ALL = 0x0003
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+SO_ATTACH_FILTER = 26
+
+# classic BPF instructions
+BPF_LD_B_ABS = 0x30
+BPF_LD_H_ABS = 0x28
+BPF_LD_W_ABS = 0x20
+BPF_JEQ_K = 0x15
+BPF_RET_K = 0x06
+BPF_ACCEPT = 0x40000
+# ancillary data offset of packet type, SKF_AD_OFF + SKF_AD_PKTTYPE
+BPF_PKTTYPE_OFFSET = (-0x1000 + 4) & 0xffffffff
+PACKET_OUTGOING = 4
+
+ETHERNET_HEADER_LEN = 14
+SRC_MAC_OFFSET = 6
+MAX_FRAME_SIZE = 1536
+RING_CAPACITY = 4096
+RECEIVE_TIMEOUT = 0.1
+
+
+class SockFilter(ctypes.Structure):
+    ''' struct sock_filter '''
+    _fields_ = [('code', ctypes.c_uint16),
+                ('jt', ctypes.c_uint8),
+                ('jf', ctypes.c_uint8),
+                ('k', ctypes.c_uint32)]
+
+
+class SockFprog(ctypes.Structure):
+    ''' struct sock_fprog '''
+    _fields_ = [('len', ctypes.c_uint16),
+                ('filter', ctypes.POINTER(SockFilter))]
+
+
+def is_supported():
+    '''
+    Check if AF_PACKET socket is available on this platform
+    '''
+    return sys.platform.startswith('linux') and hasattr(socket, 'AF_PACKET')
+
+
+def mac_to_bytes(mac):
+    return bytes([int(x, 16) for x in mac.split(':')])
+
+
+def bytes_to_mac(mac_bytes):
+    return ':'.join(['{0:02x}'.format(x) for x in bytearray(mac_bytes)])
+
+
+def build_src_mac_filter(macs):
+    '''
+    Build BPF program accepts frames sent from one of macs, same as
+    'ether src host <mac> or <mac>'. Frames sent by this host are dropped.
+    Returns list of (code, jt, jf, k).
+    '''
+    accept_index = 2 + len(macs) * 4
+    drop_index = accept_index + 1
+    program = [
+        (BPF_LD_B_ABS, 0, 0, BPF_PKTTYPE_OFFSET),
+        (BPF_JEQ_K, drop_index - 2, 0, PACKET_OUTGOING)
+    ]
+    for index, mac in enumerate(macs):
+        mac_bytes = mac_to_bytes(mac)
+        mac_high, = struct.unpack('>H', mac_bytes[0:2])
+        mac_low, = struct.unpack('>I', mac_bytes[2:6])
+        # each mac takes 4 instructions, not matched goes to next mac
+        base = 2 + index * 4
+        next_index = base + 4 if index < len(macs) - 1 else drop_index
+        program.extend([
+            (BPF_LD_H_ABS, 0, 0, SRC_MAC_OFFSET),
+            (BPF_JEQ_K, 0, next_index - (base + 2), mac_high),
+            (BPF_LD_W_ABS, 0, 0, SRC_MAC_OFFSET + 2),
+            (BPF_JEQ_K, accept_index - (base + 4),
+             next_index - (base + 4), mac_low)
+        ])
+
+    program.extend([
+        (BPF_RET_K, 0, 0, BPF_ACCEPT),
+        (BPF_RET_K, 0, 0, 0)
+    ])
+    return program
+
+
+class FrameRing(object):
+    '''
+    Bounded ring of preallocated frame buffers, for one producer and one
+    consumer. A frame is dropped and counted when the ring is full.
+    '''
+
+    def __init__(self, capacity=RING_CAPACITY, frame_size=MAX_FRAME_SIZE):
+        self._capacity = capacity
+        self._views = [memoryview(bytearray(frame_size))
+                       for _ in range(capacity)]
+        self._lengths = [0] * capacity
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._discard_view = memoryview(bytearray(frame_size))
+        self.dropped_count = 0
+        # set when a frame is committed
+        self.readable = threading.Event()
+
+    def __len__(self):
+        return self._count
+
+    def reserve(self):
+        '''
+        Get the buffer to receive next frame, a discard buffer is returned
+        when ring is full
+        '''
+        if self._count >= self._capacity:
+            return self._discard_view
+        return self._views[(self._head + self._count) % self._capacity]
+
+    def commit(self, view, length):
+        '''
+        Commit the frame received into the reserved buffer
+        '''
+        if view is self._discard_view:
+            self.dropped_count += 1
+            return
+        with self._lock:
+            self._lengths[(self._head + self._count) % self._capacity] = length
+            self._count += 1
+        self.readable.set()
+
+    def pop(self, offset=0):
+        '''
+        Get bytes of the earliest frame from offset, None if ring is empty
+        '''
+        if self._count == 0:
+            return None
+        data = bytes(self._views[self._head][offset:self._lengths[self._head]])
+        with self._lock:
+            self._head = (self._head + 1) % self._capacity
+            self._count -= 1
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._head = (self._head + self._count) % self._capacity
+            self._count = 0
+
+
+class PacketSocketReceiver(object):
+    '''
+    Receive frames of iface sent from filter macs, call on_frame(view, length)
+    in receive thread for each frame. on_frame returns False if the frame is
+    not kept, so the buffer is reused.
+    '''
+
+    def __init__(self, iface, src_macs, ring=None):
+        self.iface = iface
+        self.src_macs = src_macs
+        self.ring = ring or FrameRing()
+        self.received_count = 0
+        self.kernel_dropped_count = 0
+        self.batch_count = 0
+        self.on_frame = None
+        self._sock = None
+        self._filter = None
+        self._thread = None
+        self._is_stop = True
+
+    @property
+    def running(self):
+        return not self._is_stop
+
+    def start(self):
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        try:
+            self._attach_filter(sock)
+            # bind after filter attached, so no frame is received unfiltered
+            sock.bind((self.iface, ETH_P_ALL))
+        except Exception:
+            sock.close()
+            raise
+
+        self._sock = sock
+        self._is_stop = False
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stop = True
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def get_statistics(self):
+        return {
+            'received_count': self.received_count,
+            'dropped_count': self.ring.dropped_count,
+            'kernel_dropped_count': self.kernel_dropped_count,
+            'batch_count': self.batch_count,
+            'ring_depth': len(self.ring)
+        }
+
+    def _attach_filter(self, sock):
+        program = build_src_mac_filter(self.src_macs)
+        instructions = (SockFilter * len(program))(
+            *[SockFilter(*item) for item in program])
+        fprog = SockFprog(len(program), instructions)
+        # keep the program alive while the socket is open
+        self._filter = (instructions, fprog)
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER,
+                        ctypes.string_at(ctypes.addressof(fprog),
+                                         ctypes.sizeof(fprog)))
+
+    def _collect_kernel_statistics(self):
+        try:
+            _, drops = struct.unpack('II', self._sock.getsockopt(
+                SOL_PACKET, PACKET_STATISTICS, 8))
+            # the kernel statistics is reset after read
+            self.kernel_dropped_count += drops
+        except OSError:
+            pass
+
+    def _receive(self):
+        sock = self._sock
+        while not self._is_stop:
+            try:
+                readable, _, _ = select.select([sock], [], [], RECEIVE_TIMEOUT)
+            except (OSError, ValueError):
+                return
+
+            if not readable:
+                continue
+
+            # drain the frames queued in kernel as one batch
+            self.batch_count += 1
+            while not self._is_stop:
+                view = self.ring.reserve()
+                try:
+                    length = sock.recv_into(view, 0, socket.MSG_DONTWAIT)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    return
+
+                self.received_count += 1
+                if self.on_frame and not self.on_frame(view, length):
+                    continue
+                self.ring.commit(view, length)
+
+            self._collect_kernel_statistics()
@@ -0,0 +1,314 @@
+'''
+Replay recorded data through the communicator contract, so the live pipeline
+runs without hardware
+'''
+import os
+import mmap
+import time
+import struct
+from ..constants import INTERFACES
+from ..context import APP_CONTEXT
+from ..utils.print import (print_green, print_red)
+from ..communicator import Communicator
+from ...devices import DeviceManager
+
+# the connected device of replay, interface is the one it is recorded from
+REPLAY_DEVICES = {
+    'INS401': {
+        'interface': INTERFACES.ETH_100BASE_T1,
+        'device_info': 'INS401 RTK_INS 5020-4007-01 SN:2179000001',
+        'app_info': 'RTK_INS App v28.04 Bootloader v01.02'
+    },
+    'OpenRTK': {
+        'interface': INTERFACES.UART,
+        'device_info': 'OpenRTK330L OpenIMU330BI 5020-3021-01 1.1.8 SN:1975000034',
+        'app_info': 'RTK_INS App v2.0.0, BootLoader v1.1.1'
+    },
+    'OpenIMU': {
+        'interface': INTERFACES.UART,
+        'device_info': 'OpenIMU300ZA 5020-3885-02 1.1.2 SN:1808400528',
+        'app_info': 'OpenIMU300ZI IMU 1.1.3'
+    }
+}
+
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9)
+}
+PCAP_HEADER_LEN = 24
+PCAP_RECORD_HEADER_LEN = 16
+ETHERNET_HEADER_LEN = 14
+
+PACKET_HEADER = b'\x55\x55'
+# header, packet type and payload length
+PACKET_PREFIX_LEN = 8
+PACKET_CRC_LEN = 2
+NMEA_HEADER = b'$'
+NMEA_END = b'\r\n'
+
+CLOCK = getattr(time, 'monotonic', time.time)
+
+STREAM_CHUNK_SIZE = 256
+# byte rate of 460800 baud, used to pace the data without timestamp
+DEFAULT_BYTE_RATE = 46080
+# sleep is split, so stop is not delayed by a long gap in record
+MAX_PACE_SLEEP = 0.1
+
+
+def read_pcap_records(content):
+    '''
+    Yield (timestamp, payload) of each frame in pcap, payload starts after
+    ethernet header, the same as Ethernet.read
+    '''
+    magic = bytes(content[0:4])
+    if magic not in PCAP_MAGIC:
+        raise ValueError('Unsupported pcap format, pcapng is not supported')
+
+    endian, resolution = PCAP_MAGIC[magic]
+    record_header = struct.Struct(endian + 'IIII')
+    offset = PCAP_HEADER_LEN
+    content_len = len(content)
+    while offset + PCAP_RECORD_HEADER_LEN <= content_len:
+        ts_sec, ts_frac, incl_len, _ = record_header.unpack_from(
+            content, offset)
+        offset += PCAP_RECORD_HEADER_LEN
+        frame = content[offset:offset + incl_len]
+        offset += incl_len
+        if len(frame) > ETHERNET_HEADER_LEN:
+            yield ts_sec + ts_frac * resolution, frame[ETHERNET_HEADER_LEN:]
+
+
+def read_packet_records(content, byte_rate):
+    '''
+    Yield (timestamp, packet) of INS401 user log, it is concatenated 0x5555
+    packets and NMEA sentences. Timestamp is paced by byte rate.
+    '''
+    offset = 0
+    content_len = len(content)
+    while offset < content_len:
+        start = offset
+        if content[offset:offset + 2] == PACKET_HEADER and \
+                offset + PACKET_PREFIX_LEN <= content_len:
+            payload_len, = struct.unpack_from('<I', content, offset + 4)
+            offset += PACKET_PREFIX_LEN + payload_len + PACKET_CRC_LEN
+        elif content[offset:offset + 1] == NMEA_HEADER:
+            end = content.find(NMEA_END, offset)
+            offset = content_len if end == -1 else end + len(NMEA_END)
+        else:
+            # skip to next known header
+            next_packet = content.find(PACKET_HEADER, offset + 1)
+            next_nmea = content.find(NMEA_HEADER, offset + 1)
+            candidates = [x for x in [next_packet, next_nmea] if x > -1]
+            offset = min(candidates) if candidates else content_len
+            continue
+
+        yield float(start) / byte_rate, content[start:min(offset, content_len)]
+
+
+def read_stream_records(content, byte_rate, chunk_size=STREAM_CHUNK_SIZE):
+    '''
+    Yield (timestamp, chunk) of raw stream, such as uart user log or rtcm log
+    '''
+    for offset in range(0, len(content), chunk_size):
+        yield float(offset) / byte_rate, content[offset:offset + chunk_size]
+
+
+class Replay(Communicator):
+    '''
+    Replay recorded file. Speed 1 plays in real time, N plays N times faster,
+    0 plays as fast as possible.
+    '''
+
+    def __init__(self, options=None):
+        super(Replay, self).__init__()
+        self.file_path = getattr(options, 'replay_file', None)
+        self.device_type = getattr(options, 'replay_device', 'INS401')
+        self.speed = float(getattr(options, 'replay_speed', 1))
+        self.byte_rate = DEFAULT_BYTE_RATE
+        baudrate = getattr(options, 'baudrate', 'auto')
+        if isinstance(baudrate, int):
+            self.byte_rate = baudrate / 10
+
+        if self.device_type not in REPLAY_DEVICES:
+            raise ValueError('Replay device should be one of {0}'.format(
+                list(REPLAY_DEVICES.keys())))
+
+        self.type = REPLAY_DEVICES[self.device_type]['interface']
+        self.format = None
+        self._file = None
+        self._content = None
+        self._records = None
+        self._first_timestamp = None
+        self._start_clock = None
+        self._end_clock = None
+        self._record_count = 0
+        self._byte_count = 0
+        self._write_count = 0
+        self._is_close = False
+
+    def find_device(self, callback, retries=0, not_found_handler=None):
+        self.device = None
+        self._is_close = False
+
+        try:
+            self.open()
+        except (IOError, ValueError) as ex:
+            print_red('Cannot replay file {0}: {1}'.format(self.file_path, ex))
+            if not_found_handler:
+                not_found_handler()
+            return
+
+        device_setting = REPLAY_DEVICES[self.device_type]
+        self.device = DeviceManager.build_provider(self, self, {
+            'device_type': self.device_type,
+            'device_info': device_setting['device_info'],
+            'app_info': device_setting['app_info']
+        })
+        if self.device:
+            callback(self.device)
+
+    def open(self):
+        '''
+        Open the replay file and start from beginning
+        '''
+        self.close()
+        self._is_close = False
+        self._file = open(self.file_path, 'rb')
+        if os.path.getsize(self.file_path) > 0:
+            self._content = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._content = b''
+
+        self.format = self._detect_format()
+        if self.format == 'pcap':
+            self._records = read_pcap_records(self._content)
+        elif self.format == 'packet':
+            self._records = read_packet_records(self._content, self.byte_rate)
+        else:
+            self._records = read_stream_records(self._content, self.byte_rate)
+
+        self._first_timestamp = None
+        self._start_clock = None
+        self._end_clock = None
+        self._record_count = 0
+        self._byte_count = 0
+
+    def close(self):
+        self._is_close = True
+        self._records = None
+        if isinstance(self._content, mmap.mmap):
+            self._content.close()
+        self._content = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def can_write(self):
+        return False
+
+    def write(self, data, is_flush=False):
+        '''
+        Commands are dropped, there is no device to respond
+        '''
+        self._write_count += 1
+        return len(data)
+
+    def read(self, size=100):
+        '''
+        Read next record, it blocks until the time of record is reached
+        '''
+        if self._records is None:
+            return []
+
+        try:
+            timestamp, data = next(self._records)
+        except StopIteration:
+            self._finish()
+            return []
+
+        current_clock = CLOCK()
+        if self._start_clock is None:
+            self._start_clock = current_clock
+            self._first_timestamp = timestamp
+
+        self._pace(timestamp)
+        self._record_count += 1
+        self._byte_count += len(data)
+        return bytes(data)
+
+    def reset_buffer(self):
+        '''
+        reset buffer
+        '''
+
+    def get_src_mac(self):
+        return bytes(6)
+
+    def get_dst_mac(self):
+        return bytes(6)
+
+    def reshake_hand(self):
+        return True
+
+    def get_read_statistics(self):
+        '''
+        Throughput of replay, it is the end of run report when finished
+        '''
+        end_clock = self._end_clock or CLOCK()
+        packet_statistics = self.device.statistics if self.device \
+            else APP_CONTEXT.statistics
+        elapsed = end_clock - self._start_clock if self._start_clock else 0
+        statistics = {
+            'replay_format': self.format,
+            'replay_speed': self.speed,
+            'replay_finished': self._end_clock is not None,
+            'replay_elapsed': elapsed,
+            'replay_record_count': self._record_count,
+            'replay_byte_count': self._byte_count,
+            'replay_records_per_second': self._record_count / elapsed
+            if elapsed > 0 else 0,
+            'replay_bytes_per_second': self._byte_count / elapsed
+            if elapsed > 0 else 0,
+            'parsed_packet_count': packet_statistics.get_received_count()
+        }
+        statistics['parsed_packets_per_second'] = \
+            statistics['parsed_packet_count'] / elapsed if elapsed > 0 else 0
+        return statistics
+
+    def _detect_format(self):
+        if bytes(self._content[0:4]) in PCAP_MAGIC:
+            return 'pcap'
+        if self.type == INTERFACES.ETH_100BASE_T1:
+            return 'packet'
+        return 'stream'
+
+    def _pace(self, timestamp):
+        if self.speed <= 0:
+            return
+
+        target_clock = self._start_clock + \
+            (timestamp - self._first_timestamp) / self.speed
+        while not self._is_close:
+            wait_time = target_clock - CLOCK()
+            if wait_time <= 0:
+                return
+            time.sleep(min(wait_time, MAX_PACE_SLEEP))
+
+    def _finish(self):
+        self._records = None
+        self._end_clock = CLOCK()
+        statistics = self.get_read_statistics()
+        print_green(
+            '[Replay] {0} records, {1} bytes in {2:.3f}s, '
+            '{3:.1f} records/s, {4:.1f} bytes/s, '
+            '{5} packets parsed, {6:.1f} packets/s'.format(
+                statistics['replay_record_count'],
+                statistics['replay_byte_count'],
+                statistics['replay_elapsed'],
+                statistics['replay_records_per_second'],
+                statistics['replay_bytes_per_second'],
+                statistics['parsed_packet_count'],
+                statistics['parsed_packets_per_second']))
@@ -8,6 +8,16 @@ from ..constants import (BAUDRATE_LIST, INTERFACES)
 from ..context import APP_CONTEXT
 from ..communicator import Communicator
 
+# bits on the line for one byte, start + 8 data + stop
+BITS_PER_BYTE = 10
+# time span of data expected in one read of high throughput mode
+READ_PERIOD = 0.01
+MIN_READ_SIZE = 64
+READ_BUFFER_SIZE = 8192
+# period to refresh the observed byte rate
+RATE_WINDOW = 1
+CLOCK = getattr(time, 'monotonic', time.time)
+
 
 class StoppableThread(threading.Thread):
     def __init__(self, *args, **kwargs):
@@ -45,7 +55,16 @@ class SerialPort(Communicator):
         self.filter_device_type = None
         self.filter_device_type_assigned = False
         self._connection_history = None
-
+        self.high_throughput = False
+        self.read_buffer_size = READ_BUFFER_SIZE
+        self._read_call_count = 0
+        self._read_byte_count = 0
+        self._rate_start_clock = None
+        self._rate_start_byte_count = 0
+        self._observed_byte_rate = 0
+
+        if options and getattr(options, 'high_throughput_read', False):
+            self.high_throughput = True
         if options and options.baudrate != 'auto':
             self.baudrate_list = [options.baudrate]
             self.baudrate_assigned = True
@@ -444,7 +463,9 @@ class SerialPort(Communicator):
         return type: bytes
         '''
         try:
-            return self.serial_port.read(size)
+            data = self.serial_port.read(size)
+            self._collect_read(len(data))
+            return data
         except serial.SerialException:
             print(
                 'Serial Exception! Please check the serial port connector is stable or not.\n')
@@ -453,6 +474,76 @@ class SerialPort(Communicator):
             # print(e)
             raise
 
+    def read_into(self, buffer):
+        '''
+        read available bytes into a preallocated buffer, it is used in high
+        throughput mode. Block until the first byte arrives or timeout, then
+        read what is waiting in the port, no more than the adaptive read size.
+        parameters: buffer - writable bytearray or memoryview.
+        returns: count of bytes read into buffer.
+        '''
+        view = memoryview(buffer)
+        try:
+            read_size = min(len(view), self.get_read_size())
+            waiting = self.serial_port.in_waiting
+            if waiting > 0:
+                count = self.serial_port.readinto(
+                    view[:min(waiting, read_size)])
+            else:
+                count = self.serial_port.readinto(view[:1])
+                waiting = self.serial_port.in_waiting
+                if count > 0 and waiting > 0 and read_size > 1:
+                    count += self.serial_port.readinto(
+                        view[1:min(waiting + 1, read_size)])
+            self._collect_read(count)
+            return count
+        except serial.SerialException:
+            print(
+                'Serial Exception! Please check the serial port connector is stable or not.\n')
+            raise
+
+    def get_read_size(self):
+        '''
+        Max bytes of one read in high throughput mode. It covers the data of
+        READ_PERIOD, at the observed byte rate, limited by the baudrate.
+        '''
+        baud = self.serial_port.baudrate if self.serial_port else 0
+        byte_rate = float(baud) / BITS_PER_BYTE
+        if self._observed_byte_rate > 0:
+            byte_rate = min(byte_rate, self._observed_byte_rate) \
+                if byte_rate > 0 else self._observed_byte_rate
+
+        read_size = int(byte_rate * READ_PERIOD)
+        return max(MIN_READ_SIZE, min(read_size, self.read_buffer_size))
+
+    def get_read_statistics(self):
+        '''
+        Statistics of read, byte rate is observed in the last RATE_WINDOW
+        '''
+        return {
+            'read_call_count': self._read_call_count,
+            'read_byte_count': self._read_byte_count,
+            'bytes_per_second': self._observed_byte_rate,
+            'read_size': self.get_read_size()
+        }
+
+    def _collect_read(self, count):
+        self._read_call_count += 1
+        self._read_byte_count += count
+
+        current_clock = CLOCK()
+        if self._rate_start_clock is None:
+            self._rate_start_clock = current_clock
+            self._rate_start_byte_count = self._read_byte_count
+            return
+
+        duration = current_clock - self._rate_start_clock
+        if duration >= RATE_WINDOW:
+            self._observed_byte_rate = \
+                (self._read_byte_count - self._rate_start_byte_count) / duration
+            self._rate_start_clock = current_clock
+            self._rate_start_byte_count = self._read_byte_count
+
     def open(self, port=False, baud=57600):
         return self.open_serial_port(port, baud, timeout=0.1)
 
@@ -14,6 +14,8 @@ class INTERFACES(object):
     UART = 'uart'
     ETH = 'eth'
     ETH_100BASE_T1 = '100base-t1'
+    REPLAY = 'replay'
 
     def list():
-        return [INTERFACES.UART, INTERFACES.ETH, INTERFACES.ETH_100BASE_T1]
+        return [INTERFACES.UART, INTERFACES.ETH, INTERFACES.ETH_100BASE_T1,
+                INTERFACES.REPLAY]
@@ -12,6 +12,7 @@ class AppContext:
     _logger = None
     _print_logger = None
     _device_context = None
+    _device_contexts = None
     _statistics = None
     _mode = None
     _para_path = None
@@ -51,6 +52,30 @@ class AppContext:
     def device_context(self, value):
         self._device_context = value
 
+    @property
+    def device_contexts(self):
+        ''' Retrieve device contexts of multi-device mode, keyed by device id
+        '''
+        if self._device_contexts is None:
+            self._device_contexts = {}
+        return self._device_contexts
+
+    def set_device_context(self, device_id, value):
+        '''
+        Save device context of device id, the first one is also the default
+        '''
+        self.device_contexts[device_id] = value
+        if not self._device_context:
+            self._device_context = value
+
+    def get_device_context(self, device_id=None):
+        '''
+        Get device context by device id, default one is returned without id
+        '''
+        if device_id is None:
+            return self._device_context
+        return self.device_contexts.get(device_id)
+
     @property
     def statistics(self):
         ''' Retrieve statistics service
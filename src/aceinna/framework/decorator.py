@@ -15,8 +15,10 @@ T = TypeVar('T')
 
 INTERFACE_LIST = INTERFACES.list()
 MODES = ['default', 'cli', 'receiver']
-TYPES_OF_LOG = ['openrtk', 'rtkl', 'ins401']
+TYPES_OF_LOG = ['openrtk', 'rtkl', 'ins401', 'columnar']
 KML_RATES = [1, 2, 5, 10]
+REPLAY_DEVICE_TYPES = ['INS401', 'OpenRTK', 'OpenIMU']
+LOG_FORMATS = ['csv', 'binary']
 
 
 def _build_args():
@@ -35,18 +37,34 @@ def _build_args():
                         help="Baudrate for uart. Allowed one of values: {0}".format(BAUDRATE_LIST), choices=BAUDRATE_LIST)
     parser.add_argument("-c", "--com-port", dest="com_port", metavar='', type=str,
                         help="COM Port")
+    parser.add_argument("--com-ports", dest="com_ports", metavar='', type=str,
+                        help="Comma separated COM Ports of multiple devices (UART only)")
     parser.add_argument("--console-log", dest='console_log', action='store_true',
                         help="Output log on console", default=False)
     parser.add_argument("--debug", dest='debug', action='store_true',
                         help="Log debug information", default=False)
     parser.add_argument("--with-data-log", dest='with_data_log', action='store_true',
                         help="Contains internal data log (OpenIMU only)", default=False)
+    parser.add_argument("--log-format", dest="log_format", type=str, metavar='',
+                        help="Format of data log. Allowed one of values: {0}".format(LOG_FORMATS),
+                        default='csv', choices=LOG_FORMATS)
     parser.add_argument("-s", "--set-user-para", dest='set_user_para', action='store_true',
                         help="Set user parameters (OpenRTK only)", default=False)
     parser.add_argument("--para-path", dest="para_path", type=str,
                         metavar='')
     parser.add_argument("--cli", dest='use_cli', action='store_true',
                         help="start as cli mode", default=False)
+    parser.add_argument("--use-asyncio", dest='use_asyncio', action='store_true',
+                        help="Run device communication on the webserver event loop", default=False)
+    parser.add_argument("--high-throughput-read", dest='high_throughput_read', action='store_true',
+                        help="Read serial port into reusable buffers (UART only)", default=False)
+    parser.add_argument("--replay-file", dest="replay_file", type=str, metavar='',
+                        help="Recorded user/rtcm bin or pcap file (replay only)")
+    parser.add_argument("--replay-device", dest="replay_device", type=str, metavar='',
+                        help="Device of recorded file. Allowed one of values: {0}".format(REPLAY_DEVICE_TYPES),
+                        default='INS401', choices=REPLAY_DEVICE_TYPES)
+    parser.add_argument("--replay-speed", dest="replay_speed", type=float, metavar='',
+                        help="Replay speed, 1 is real time, 0 is as fast as possible", default=1)
 
     subparsers = parser.add_subparsers(
         title='Sub commands', help='use `<command> -h` to get sub command help', dest="sub_command")
@@ -60,6 +78,8 @@ def _build_args():
         "-p", type=str, help="The folder path of logs", default='./data', metavar='', dest="path")
     parse_log_action.add_argument(
         "-i", type=int, help="Ins kml rate(hz). Allowed one of values: {0}".format(KML_RATES), default=5, metavar='', dest="kml_rate", choices=KML_RATES)
+    parse_log_action.add_argument(
+        "-j", "--jobs", type=int, help="Count of processes parse logs in parallel, 0 is count of CPU cores", default=0, metavar='', dest="jobs")
 
     return parser.parse_args()
 
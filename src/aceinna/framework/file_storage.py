@@ -4,6 +4,7 @@ import os
 import time
 import datetime
 import json
+import operator
 import threading
 import requests
 from azure.storage.blob import AppendBlobService
@@ -12,11 +13,160 @@ from .utils import resource
 from .configuration import get_config
 from .ans_platform_api import AnsPlatformAPI
 from .context import APP_CONTEXT
+from .columnar_log import (ColumnarLogWriter, FILE_EXTENSION)
+
+# buffered rows are written every interval(seconds) or when size is reached
+FLUSH_INTERVAL = 1
+FLUSH_SIZE = 64 * 1024
+
+INTEGER_TYPES = ['uint32', 'int32', 'uint16', 'int16', 'uint64', 'int64']
+CHAR_TYPES = ['uchar', 'char', 'string']
+
+
+def get_value_format(field):
+    '''
+    Get format of value by the type of payload field
+    '''
+    field_type = field['type']
+    if 'scaling' in field or field_type in INTEGER_TYPES:
+        return '{}'
+    if field_type == 'double':
+        return '{:0.8f}'  # 15.12
+    if field_type == 'float':
+        return '{:0.4f}'  # 12.8
+    if field_type == 'uint8':
+        return '{:d}'
+    if field_type in CHAR_TYPES:
+        return '{:}'
+    # unknown
+    return '{:3.5f}'
+
+
+def compile_row_formatter(output_packet, keys):
+    '''
+    Compile header and row formatter of output packet, keys are from the
+    first row. The value of key is formatted by the payload field at the
+    same index, keys not in payload are skipped.
+    '''
+    payload = output_packet['payload']
+    fields = set([field['name'] for field in payload])
+    labels = []
+    formats = []
+    columns = []
+    for i, key in enumerate(keys):
+        if key not in fields:
+            continue
+        field = payload[i]
+        if field['unit'] == '':
+            labels.append(field['name'])
+        else:
+            labels.append('{0:s} ({1:s})'.format(field['name'], field['unit']))
+        formats.append(get_value_format(field))
+        columns.append(key)
+
+    template = ','.join(formats) + '\n'
+    if len(columns) == 0:
+        def get_values(data):
+            return ()
+    elif len(columns) == 1:
+        def get_values(data):
+            return (data[columns[0]],)
+    else:
+        get_values = operator.itemgetter(*columns)
+
+    def format_row(data):
+        return template.format(*get_values(data))
+
+    return ','.join(labels) + '\n', format_row
+
+
+class BufferedLogWriter(object):
+    '''
+    Write rows of log files in a background thread. Rows are buffered and
+    written every flush interval, or earlier when buffered size exceeds
+    flush size. All rows written before stop are saved.
+    '''
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, flush_size=FLUSH_SIZE):
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        self._files = {}
+        self._buffers = {}
+        self._buffered_size = 0
+        self._lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._thread = None
+        self._is_stop = True
+
+    def add_file(self, key, file_obj):
+        with self._lock:
+            self._files[key] = file_obj
+            self._buffers[key] = []
+
+    def start(self):
+        self._is_stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, key, text):
+        '''
+        Buffer text of file, returns False if writer is stopped
+        '''
+        with self._lock:
+            if self._is_stop:
+                return False
+            self._buffers[key].append(text)
+            self._buffered_size += len(text)
+            if self._buffered_size >= self._flush_size:
+                self._flush_event.set()
+        return True
+
+    def stop(self):
+        '''
+        Stop accepting rows, and wait for buffered rows are written
+        '''
+        with self._lock:
+            self._is_stop = True
+        self._flush_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        # rows are already written if the writer thread exits normally
+        self._flush()
+
+    def _run(self):
+        while True:
+            self._flush_event.wait(self._flush_interval)
+            self._flush_event.clear()
+            self._flush()
+            if self._is_stop:
+                return
+
+    def _flush(self):
+        with self._lock:
+            buffers = self._buffers
+            self._buffers = dict([(key, []) for key in buffers])
+            self._buffered_size = 0
+
+        for key, rows in buffers.items():
+            if len(rows) == 0:
+                continue
+            try:
+                file_obj = self._files[key]
+                file_obj.write(''.join(rows))
+                file_obj.flush()
+            except ValueError:
+                APP_CONTEXT.get_logger().logger.error(
+                    'I/O Exception, file may be closed before using')
+            except Exception as ex:  # pylint: disable=broad-except
+                APP_CONTEXT.get_logger().logger.error(ex)
 
 
 class FileLoger():
-    def __init__(self, device_properties):
-        '''Initialize and create a CSV file
+    def __init__(self, device_properties, sub_folder=None, log_format='csv'):
+        '''Initialize and create a CSV file, logs are saved in sub folder of
+        data if it is set, such as device id. Log format 'binary' saves
+        columnar log instead of CSV, see columnar_log.
         '''
         start_time = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
         self.device_properties = device_properties
@@ -25,8 +175,10 @@ class FileLoger():
             os._exit(1)
 
         self.root_folder = os.path.join(resource.get_executor_path(), r'data')
+        if sub_folder:
+            self.root_folder = os.path.join(self.root_folder, sub_folder)
         if not os.path.exists(self.root_folder):
-            os.mkdir(self.root_folder)
+            os.makedirs(self.root_folder)
         self.output_packets = self.device_properties['userMessages']['outputPackets']
         self.log_file_rows = {}
         self.log_file_names = {}
@@ -34,6 +186,12 @@ class FileLoger():
         self.log_files = {}
         self.user_file_name = ''  # the prefix of log file name.
         self.msgs_need_to_log = []
+        # compiled row formatter of packet type, see compile_row_formatter
+        self.row_formatters = {}
+        self.log_writer = None
+        self.log_format = log_format
+        self.is_binary = False
+        self.columnar_writers = {}
         self.ws = False
         # azure app.
         self.user_id = ''
@@ -68,6 +226,11 @@ class FileLoger():
             self.ws = ws
             self.exit_thread = False
             self.user_file_name = file_name
+            self.row_formatters.clear()
+            self.log_writer = BufferedLogWriter()
+            # logs uploaded to azure are CSV
+            self.is_binary = self.log_format == 'binary' and not ws
+            file_extension = FILE_EXTENSION if self.is_binary else '.csv'
             start_time = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
             current_path = os.path.join(self.root_folder, start_time)
             if not os.path.exists(current_path):
@@ -86,15 +249,26 @@ class FileLoger():
                 self.log_file_rows[packet['name']] = 0
                 if self.user_file_name == '':
                     self.log_file_names[packet['name']
-                                        ] = packet['name'] + '.csv'
+                                        ] = packet['name'] + file_extension
                 else:
                     self.log_file_names[packet['name']] = self.user_file_name + \
-                        '_' + packet['name'] + '.csv'
+                        '_' + packet['name'] + file_extension
                 self.log_files[packet['name']
                                ] = self.log_file_names[packet['name']]
 
+                if self.is_binary:
+                    self.columnar_writers[packet['name']] = ColumnarLogWriter(
+                        current_path + '/' + self.log_file_names[packet['name']],
+                        packet)
+                    continue
+
                 self.log_files_obj[packet['name']] = open(
                     current_path + '/' + self.log_file_names[packet['name']], 'w')
+                self.log_writer.add_file(
+                    packet['name'], self.log_files_obj[packet['name']])
+
+            if not self.is_binary:
+                self.log_writer.start()
 
             if self.ws:
                 self.get_sas_token()
@@ -121,8 +295,13 @@ class FileLoger():
         try:
             if len(self.log_file_rows) == 0:
                 return 1  # driver hasn't started logging files yet.
+            # buffered rows are written before files are closed
+            self.log_writer.stop()
             for i, (k, v) in enumerate(self.log_files_obj.items()):
                 v.close()
+            for writer in self.columnar_writers.values():
+                writer.close()
+            self.columnar_writers.clear()
             self.log_file_rows.clear()
             self.log_file_names.clear()
             self.log_files_obj.clear()
@@ -251,81 +430,32 @@ class FileLoger():
             the json properties file to create a header and specify the precision
             of the data in the resulting data file.
         '''
-        output_packet = next(
-            (x for x in self.output_packets if x['name'] == packet_type), None)
-
-        fields = [field['name'] for field in output_packet['payload']]
-        '''Write row of CSV file based on data received.  Uses dictionary keys for column titles
-        '''
-        if self.log_file_rows[packet_type] == 0:
-            # Loop through each item in the data dictionary and create a header from the json
-            #   properties that correspond to the items in the dictionary
-            labels = ''
-            # for key in data:
-            for i, (k, v) in enumerate(data.items()):
-                '''dataStr = output_packet['payload'][i]['name'] + \
-                          ' [' + \
-                          output_packet['payload'][i]['unit'] + \
-                          ']'''
-                if not fields.__contains__(k):
-                    continue
-                data_str = output_packet['payload'][i]['name']
-                unit_str = output_packet['payload'][i]['unit']
-                if unit_str == '':
-                    labels = labels + '{0:s},'.format(data_str)
-                else:
-                    labels = labels + \
-                        '{0:s} ({1:s}),'.format(data_str, unit_str)
+        if self.is_binary:
+            writer = self.columnar_writers.get(packet_type)
+            if writer is None:
+                # log is stopped, writers are closed in another thread
+                return
+            writer.append(data)
+            if packet_type in self.log_file_rows:
+                self.log_file_rows[packet_type] += 1
+            return
 
-            # Remove the comma at the end of the string and append a new-line character
-            labels = labels[:-1]
-            header = labels + '\n'
-        else:
-            header = ''
+        header = ''
+        format_row = self.row_formatters.get(packet_type)
+        if format_row is None:
+            # header and formatter are built from the first row
+            output_packet = next(
+                (x for x in self.output_packets if x['name'] == packet_type), None)
+            header, format_row = compile_row_formatter(
+                output_packet, list(data.keys()))
+            self.row_formatters[packet_type] = format_row
 
         self.log_file_rows[packet_type] += 1
 
-        # Loop through the items in the data dictionary and append to an output string
-        #   (with precision based on the data type defined in the json properties file)
-        write_str = ''
-        for i, (k, v) in enumerate(data.items()):
-            if not fields.__contains__(k):
-                continue
-            output_packet_type = output_packet['payload'][i]['type']
-
-            if output_packet['payload'][i].__contains__('scaling'):
-                write_str += '{0},'.format(v)
-            else:
-                if output_packet_type == 'uint32' or output_packet_type == 'int32' or \
-                        output_packet_type == 'uint16' or output_packet_type == 'int16' or \
-                        output_packet_type == 'uint64' or output_packet_type == 'int64':
-                    # integers and unsigned integers
-                    write_str += '{0},'.format(v)
-                elif output_packet_type == 'double':
-                    # double
-                    write_str += '{0:0.8f},'.format(v)  # 15.12
-                elif output_packet_type == 'float':
-                    write_str += '{0:0.4f},'.format(v)  # 12.8
-                elif output_packet_type == 'uint8':
-                    # byte
-                    write_str += '{0:d},'.format(v)
-                elif output_packet_type == 'uchar' or output_packet_type == 'char' or output_packet_type == 'string':
-                    # character
-                    write_str += '{:},'.format(v)
-                else:
-                    # unknown
-                    write_str += '{0:3.5f},'.format(v)
-        #
-        write_str = header + write_str[:-1] + '\n'
-
-        try:
-            self.log_files_obj[packet_type].write(write_str)
-            self.log_files_obj[packet_type].flush()
-        except ValueError:
+        write_str = header + format_row(data)
+        if not self.log_writer.write(packet_type, write_str):
             APP_CONTEXT.get_logger().logger.error(
                 'I/O Exception, file may be closed before using')
-        except Exception as ex:
-            APP_CONTEXT.get_logger().logger.error(ex)
 
         if self.ws:
             self.data_lock.acquire()
@@ -0,0 +1,95 @@
+"""
+CRC
+"""
+import binascii
+
+CRC16_INIT = 0x1D0F
+
+
+def _to_buffer(data):
+    # bytes, bytearray and memoryview are taken as they are
+    if isinstance(data, (list, tuple)):
+        return bytearray(data)
+    return data
+
+
+def crc16(data, crc=CRC16_INIT):
+    '''
+    Calculates 16-bit CRC-CCITT(poly 0x1021) seeded with 0x1D0F,
+    return an integer. Pass the previous result as crc to continue.
+    '''
+    # crc_hqx is the table driven CCITT implementation of python
+    return binascii.crc_hqx(_to_buffer(data), crc)
+
+
+def crc16_tuple(data, crc=CRC16_INIT):
+    '''
+    Calculates 16-bit CRC-CCITT, return (msb, lsb)
+    '''
+    value = binascii.crc_hqx(_to_buffer(data), crc)
+    return (value >> 8, value & 0xFF)
+
+
+class CRC16(object):
+    '''
+    Incremental 16-bit CRC-CCITT, used to checksum data as it arrives
+    '''
+
+    def __init__(self, crc=CRC16_INIT):
+        self._init = crc
+        self._crc = crc
+
+    def update(self, data):
+        '''
+        Append data to the checksum
+        '''
+        self._crc = binascii.crc_hqx(_to_buffer(data), self._crc)
+        return self
+
+    def reset(self):
+        '''
+        Reset the checksum to the initial value
+        '''
+        self._crc = self._init
+
+    @property
+    def value(self):
+        '''
+        Checksum as integer
+        '''
+        return self._crc
+
+    def to_tuple(self):
+        '''
+        Checksum as (msb, lsb)
+        '''
+        return (self._crc >> 8, self._crc & 0xFF)
+
+
+CRC24Q_POLY = 0x1864CFB
+
+
+def _build_crc24q_table():
+    table = []
+    for index in range(256):
+        crc = index << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= CRC24Q_POLY
+        table.append(crc & 0xFFFFFF)
+    return tuple(table)
+
+
+CRC24Q_TABLE = _build_crc24q_table()
+
+
+def crc24q(data, crc=0):
+    '''
+    Calculates 24-bit CRC-24Q used by RTCM3, return an integer.
+    Pass the previous result as crc to continue.
+    '''
+    table = CRC24Q_TABLE
+    for byte_data in _to_buffer(data):
+        crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ byte_data]
+    return crc
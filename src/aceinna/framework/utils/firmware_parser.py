@@ -1,4 +1,5 @@
 import struct
+import threading
 
 
 def parse_data_len(data_len):
@@ -8,8 +9,12 @@ def parse_data_len(data_len):
 
 
 def parser(content, parser_rules):
-    ''' content is a bytes like input
+    ''' content is a bytes like input, parts of a FirmwareBundle are parsed
+    once
     '''
+    if isinstance(content, FirmwareBundle):
+        return content.parse(parser_rules)
+
     current_pos = 0
     parsed_content = {}
 
@@ -17,7 +22,8 @@ def parser(content, parser_rules):
         part_start_str_pos = current_pos + len(rule.start_str)
         part_data_len_pos = part_start_str_pos + rule.data_len_count
 
-        part_start_str = bytes.decode(content[current_pos: part_start_str_pos])
+        part_start_str = bytes(
+            content[current_pos: part_start_str_pos]).decode()
         if part_start_str == rule.start_str:
             part_data_len = parse_data_len(
                 content[part_start_str_pos: part_data_len_pos])
@@ -29,3 +35,28 @@ def parser(content, parser_rules):
             parsed_content[rule.name] = b''
 
     return parsed_content
+
+
+class FirmwareBundle(bytes):
+    '''
+    Firmware content shared by devices of a fleet upgrade. It is read once,
+    parts are split once for each set of rules, and they are memoryviews of
+    the content, so devices upgrade from the same read-only memory.
+    '''
+
+    def __new__(cls, content):
+        bundle = super(FirmwareBundle, cls).__new__(cls, content)
+        # rules: parsed content
+        bundle._parsed_contents = {}
+        bundle._parse_lock = threading.Lock()
+        return bundle
+
+    def parse(self, parser_rules):
+        key = tuple([(rule.name, rule.start_str, rule.data_len_count)
+                     for rule in parser_rules])
+        with self._parse_lock:
+            parsed_content = self._parsed_contents.get(key)
+            if parsed_content is None:
+                parsed_content = parser(memoryview(self), parser_rules)
+                self._parsed_contents[key] = parsed_content
+        return parsed_content
@@ -8,11 +8,7 @@ import time
 from .dict_extend import Dict
 from ..constants import INTERFACES
 from ..command import Command
-
-if sys.version_info[0] > 2:
-    from queue import Queue
-else:
-    from Queue import Queue
+from .crc import (crc16, crc16_tuple)
 
 COMMAND_START = [0x55, 0x55]
 PACKET_FOUND_INIT_STATE = 0
@@ -20,6 +16,10 @@ PACKET_FOUND_START_STATE = 1
 PACKET_FOUND_TYPE_STATE = 2
 PACKET_FOUND_LENGTH_STATE = 3
 PACKET_FOUND_PAYLOAD_STATE = 4
+# seconds to wait for data between reads of read_untils_have_data
+READ_WAIT_INTERVAL = 0.001
+# seconds between two probes of device readiness
+PROBE_INTERVAL = 0.2
 
 
 def build_packet(message_type, message_bytes=[]):
@@ -247,23 +247,9 @@ def parse_command_packet(raw_command):
 
 def calc_crc(payload):
     '''
-    Calculates 16-bit CRC-CCITT
+    Calculates 16-bit CRC-CCITT, return [msb, lsb]
     '''
-    crc = 0x1D0F
-    for bytedata in payload:
-        crc = crc ^ (bytedata << 8)
-        i = 0
-        while i < 8:
-            if crc & 0x8000:
-                crc = (crc << 1) ^ 0x1021
-            else:
-                crc = crc << 1
-            i += 1
-
-    crc = crc & 0xffff
-    crc_msb = (crc & 0xFF00) >> 8
-    crc_lsb = (crc & 0x00FF)
-    return [crc_msb, crc_lsb]
+    return list(crc16_tuple(payload))
 
 
 def clear_elements(list_instance):
@@ -311,74 +297,6 @@ def name_convert_camel_to_snake(camel_name):
     return ''.join(chars)
 
 
-def _parse_buffer(data_buffer):
-    response = {
-        'parsed': False,
-        'parsed_end_index': 0,
-        'result': []
-    }
-    data_queue = Queue()
-    data_queue.queue.extend(data_buffer)
-
-    command_start = [0x55, 0x55]
-    parsed_data = []
-    is_header_found = False
-    packet_type = ''
-    data_buffer_len = len(data_buffer)
-
-    while not data_queue.empty():
-        if is_header_found:
-            # if matched packet, is_header_found = False, parsed_data = []
-            if not data_queue.empty():
-                packet_type_start = data_queue.get()
-            else:
-                break
-
-            if not data_queue.empty():
-                packet_type_end = data_queue.get()
-            else:
-                break
-
-            if not data_queue.empty():
-                packet_len = data_queue.get()
-                packet_type = ''.join(
-                    ["%c" % x for x in [packet_type_start, packet_type_end]])
-                packet_data = []
-
-                if data_queue.qsize() >= packet_len:
-                    # take packet
-                    for _ in range(packet_len):
-                        packet_data.append(data_queue.get())
-                else:
-                    break
-                # update response
-                response['parsed'] = True
-                response['result'].append({
-                    'type': packet_type,
-                    'data': packet_data
-                })
-                response['parsed_end_index'] += data_buffer_len - \
-                    data_queue.qsize()
-                data_buffer_len = data_queue.qsize()
-                parsed_data = []
-                is_header_found = False
-            else:
-                break
-        else:
-            byte_item = data_queue.get()
-            parsed_data.append(byte_item)
-
-            if len(parsed_data) > 2:
-                parsed_data = parsed_data[-2:]
-
-            if parsed_data == command_start:
-                # find message start
-                is_header_found = True
-                parsed_data = []
-
-    return response
-
-
 def _parse_eth_100base_t1_buffer(data_buffer, payload_length_format='<I'):
     response = {
         'parsed': False,
@@ -450,49 +368,205 @@ def _parse_eth_100base_t1_buffer(data_buffer, payload_length_format='<I'):
     return response
 
 
+class ResponseScanner(object):
+    '''
+    Scan response packets from bytes read from communicator. Parse state is
+    kept across reads, bytes of an incomplete packet are kept and only new
+    bytes are scanned. Payload length is 1 byte on serial port, it is of
+    payload_length_format on 100BASE-T1. Crc is not checked by default.
+    '''
+
+    def __init__(self, payload_length_format='B', check_crc=False):
+        self._length_struct = struct.Struct(payload_length_format)
+        self._header_len = 4 + self._length_struct.size
+        self._check_crc = check_crc
+        self._buffer = bytearray()
+        # bytes of crc to skip after a packet
+        self._skip = 0
+        # count of bytes of the last read, 0 if nothing is read
+        self.last_read_count = 0
+
+    def feed(self, data):
+        '''
+        Return list of (packet type, payload) completed by data, packet type
+        is bytes
+        '''
+        packets = []
+        buffer = self._buffer
+        if data:
+            buffer.extend(data)
+        if self._skip:
+            skip = min(self._skip, len(buffer))
+            del buffer[:skip]
+            self._skip -= skip
+
+        consumed = 0
+        start = buffer.find(b'\x55\x55')
+        while start >= 0 and start + self._header_len <= len(buffer):
+            payload_start = start + self._header_len
+            payload_end = payload_start + self._length_struct.unpack_from(
+                buffer, start + 4)[0]
+            if payload_end + (2 if self._check_crc else 0) > len(buffer):
+                break
+
+            if self._check_crc and \
+                    crc16(buffer[start + 2:payload_end]) != \
+                    (buffer[payload_end] << 8 | buffer[payload_end + 1]):
+                start = buffer.find(b'\x55\x55', start + 1)
+                continue
+
+            packets.append((bytes(buffer[start + 2:start + 4]),
+                            buffer[payload_start:payload_end]))
+            consumed = min(payload_end + 2, len(buffer))
+            self._skip = payload_end + 2 - consumed
+            start = buffer.find(b'\x55\x55', consumed)
+
+        if start < 0:
+            # a 0x55 at the end could be the start of next packet, if it is
+            # not the crc of a scanned packet
+            start = max(len(buffer) - 1, consumed, 0)
+        del buffer[:start]
+        return packets
+
+    def wait_packet(self, communicator, packet_type, timeout, read_length=200):
+        '''
+        Read until a packet of packet type is scanned or timeout, return the
+        payload, or None if timeout
+        '''
+        deadline = time.time() + timeout
+        while True:
+            payload = self.read_packet(communicator, packet_type, read_length)
+            if payload is not None:
+                return payload
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            if self.last_read_count == 0:
+                wait_readable(communicator, remaining)
+
+    def read_packet(self, communicator, packet_type, read_length=200):
+        '''
+        Read once, return payload of packet type as list if it is scanned
+        '''
+        expected_type = _to_packet_type_bytes(packet_type)
+        read_data = read_available(communicator, read_length)
+        self.last_read_count = len(read_data) if read_data else 0
+        for scanned_type, payload in self.feed(read_data):
+            if scanned_type == expected_type:
+                return list(payload)
+        return None
+
+
+def _to_packet_type_bytes(packet_type):
+    if isinstance(packet_type, str):
+        return packet_type.encode('latin-1')
+    return bytes(packet_type)
+
+
+def read_available(communicator, read_length):
+    '''
+    Read bytes of communicator, serial port returns when the first byte
+    arrives instead of waiting for read length
+    '''
+    if hasattr(communicator, 'read_into'):
+        read_buffer = bytearray(read_length)
+        count = communicator.read_into(read_buffer)
+        return read_buffer[:count]
+    return communicator.read(read_length)
+
+
+def wait_readable(communicator, timeout):
+    '''
+    Wait until communicator could be read or timeout. Ping reads the raw
+    device access, such as serial port or socket, which does not signal
+    arrival of data, so it polls shortly.
+    '''
+    if hasattr(communicator, 'wait_readable'):
+        communicator.wait_readable(timeout)
+    else:
+        time.sleep(min(timeout, READ_WAIT_INTERVAL))
+
+
 def read_untils_have_data(communicator,
                           packet_type,
                           read_length=200,
                           retry_times=20,
                           payload_length_format='<I'):
     '''
-    Get data from limit times of read
+    Get payload of packet type from limit times of read, it waits for data
+    between reads without data
     '''
-    result = None
-    trys = 0
-    data_buffer = []
+    if getattr(communicator, 'type', None) == INTERFACES.ETH_100BASE_T1:
+        scanner = ResponseScanner(payload_length_format)
+    else:
+        scanner = ResponseScanner()
 
-    while trys < retry_times:
-        read_data = communicator.read(read_length)
-        time.sleep(0.001)
-        if read_data is None:
-            trys += 1
-            continue
+    for _ in range(retry_times):
+        payload = scanner.read_packet(communicator, packet_type, read_length)
+        if payload is not None:
+            return payload
+        if scanner.last_read_count == 0:
+            wait_readable(communicator, READ_WAIT_INTERVAL)
 
-        data_buffer_per_time = bytearray(read_data)
-        data_buffer.extend(data_buffer_per_time)
-        if hasattr(communicator, 'type') and communicator.type == INTERFACES.ETH_100BASE_T1:
-            response = _parse_eth_100base_t1_buffer(
-                data_buffer, payload_length_format)
-        else:
-            response = _parse_buffer(data_buffer)
+    return None
 
-        if response['parsed']:
-            matched_packet = next(
-                (packet['data'] for packet in response['result']
-                 if packet['type'] == packet_type), None)
-            if matched_packet is not None:
-                result = matched_packet
-            else:
-                # clear buffer to parsed index
-                data_buffer = data_buffer[response['parsed_end_index']:]
 
-        if result is not None:
-            break
+def wait_response(communicator,
+                  packet_type,
+                  timeout,
+                  read_length=200,
+                  payload_length_format='<I'):
+    '''
+    Get payload of packet type, it returns as soon as the packet is read, or
+    None if it is not read before timeout
+    '''
+    if getattr(communicator, 'type', None) == INTERFACES.ETH_100BASE_T1:
+        scanner = ResponseScanner(payload_length_format)
+    else:
+        scanner = ResponseScanner()
 
-        trys += 1
+    return scanner.wait_packet(communicator, packet_type, timeout, read_length)
 
-    return result
+
+def probe_payload(communicator, command, packet_type, timeout=PROBE_INTERVAL):
+    '''
+    Send command and wait for its response, payload of the response is
+    returned, or None if device does not respond
+    '''
+    if isinstance(command, Command):
+        payload_length_format = command.payload_length_format
+        command = command.actual_command
+    else:
+        payload_length_format = '<I'
+
+    communicator.reset_buffer()
+    communicator.write(command)
+    return wait_response(communicator, packet_type, timeout,
+                         payload_length_format=payload_length_format)
+
+
+def probe_response(communicator, command, packet_type, timeout=PROBE_INTERVAL):
+    '''
+    Send command and wait for its response, True if device responds
+    '''
+    return probe_payload(
+        communicator, command, packet_type, timeout) is not None
+
+
+def wait_until(probe, timeout, interval=PROBE_INTERVAL):
+    '''
+    Call probe until it returns a true value or timeout, the result of the
+    last call is returned. Probe is called at least once.
+    '''
+    deadline = time.time() + timeout
+    while True:
+        started = time.time()
+        result = probe()
+        if result or started >= deadline:
+            return result
+        time.sleep(max(min(interval - (time.time() - started),
+                           deadline - time.time()), 0))
 
 
 def collection_to_dict(collection, key):
@@ -512,4 +586,5 @@ def format_firmware_content(content):
         return content
 
     fill_bytes = bytes(16-len_mod)
-    return content + fill_bytes
+    # content could be a memoryview of shared firmware
+    return bytes(content) + fill_bytes
@@ -12,7 +12,8 @@ class KeyValuesArgumentBase(object):
 
     def _prepare_value(self, input_args, key):
         value = input_args.get(key)
-        if not value:
+        # 0 is a valid value, such as replay speed
+        if value is None:
             value = self.default_values.get(key)
         return value
 
@@ -35,13 +36,20 @@ class WebserverArgs(KeyValuesArgumentBase):
         'port': 'auto',
         'baudrate': 'auto',
         'com_port': 'auto',
+        'com_ports': None,
         'debug': False,
         'with_data_log': False,
+        'log_format': 'csv',
         'console_log': False,
         'set_user_para': False,
         'ntrip_client': False,
         'force_bootloader': False,
-        'para_path': None
+        'para_path': None,
+        'use_asyncio': False,
+        'high_throughput_read': False,
+        'replay_file': None,
+        'replay_device': 'INS401',
+        'replay_speed': 1
     }
 
 
@@ -64,5 +72,6 @@ class LogParserArgs(KeyValuesArgumentBase):
         'log_type': 'openrtk',
         'path': '.',
         'kml_rate': 5,
-        'powerdr': 'false'
+        'powerdr': 'false',
+        'jobs': 0
     }
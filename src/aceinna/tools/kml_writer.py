@@ -0,0 +1,328 @@
+'''
+Stream KML of GNSS and INS solutions. Track coordinates are written as points
+are added, placemarks are spooled into a temporary file and appended after the
+track when the writer is closed, so memory does not grow with the log.
+
+A part of log parsed by a worker is written by a part writer into a track file
+and a placemark file, which are appended to the KML of whole log in part order.
+'''
+import os
+import math
+import shutil
+import datetime
+import tempfile
+import functools
+import collections
+from abc import ABCMeta, abstractmethod
+
+GPS_EPOCH_ORDINAL = datetime.date(1980, 1, 6).toordinal()
+SECONDS_OF_DAY = 86400
+SECONDS_OF_WEEK = 7 * SECONDS_OF_DAY
+LEAP_SECONDS = -18
+
+# white-cyan, red, purple, light-yellow, green, yellow
+GNSS_COLORS = ["ffffffff", "ff0000ff", "ffff00ff",
+               "50FF78F0", "ff00ff00", "ff00aaff"]
+INS_COLORS = ["ffffffff", "50FF78F0", "ffff00ff",
+              "ff0000ff", "ff00ff00", "ff00aaff"]
+GNSS_POSTYPE = ["NONE", "PSRSP", "PSRDIFF",
+                "UNDEFINED", "RTKFIXED", "RTKFLOAT"]
+INS_STATUS = ["INS_INACTIVE", "INS_ALIGNING", "INS_HIGH_VARIANCE",
+              "INS_SOLUTION_GOOD", "INS_SOLUTION_FREE", "INS_ALIGNMENT_COMPLETE"]
+INS_POSTYPE = ["INS_NONE", "INS_PSRSP", "INS_PSRDIFF",
+               "INS_PROPOGATED", "INS_RTKFIXED", "INS_RTKFLOAT"]
+
+KML_START = '<?xml version="1.0" encoding="UTF-8"?>\n'\
+    '<kml xmlns="http://www.opengis.net/kml/2.2">\n'\
+    '<Document>\n'
+STYLE = '<Style id="P%d">\r\n'\
+    '<IconStyle>\r\n'\
+    '<color>%s</color>\n'\
+    '<scale>0.3</scale>\n'\
+    '<Icon><href>http://maps.google.com/mapfiles/kml/shapes/track.png</href></Icon>\n'\
+    '</IconStyle>\n'\
+    '</Style>\n'
+TRACK_START = '<Placemark>\n'\
+    '<name>Rover Track</name>\n'\
+    '<Style>\n'\
+    '<LineStyle>\n'\
+    '<color>%s</color>\n'\
+    '</LineStyle>\n'\
+    '</Style>\n'\
+    '<LineString>\n'\
+    '<coordinates>\n'
+TRACK_END = '</coordinates>\n'\
+    '</LineString>\n'\
+    '</Placemark>\n'\
+    '<Folder>\n'\
+    '<name>Rover Position</name>\n'
+KML_END = '</Folder>\n'\
+    '</Document>\n'\
+    '</kml>\n'
+COORDINATES = '%.9f,%.9f,%.3f\n'
+PART_PLACEMARKS = '{0}.placemarks'
+# placemarks of the first points of log are named Start
+PART_HEAD_COUNT = 2
+PLACEMARK = '<Placemark>\n'\
+    '%s'\
+    '<TimeStamp><when>%04d-%02d-%02dT%02d:%02d:%02d.%02dZ</when></TimeStamp>\n'\
+    '<description><![CDATA[\n'\
+    '<TABLE border="1" width="100%%" Align="center">\n'\
+    '<TR ALIGN=RIGHT>\n'\
+    '<TR ALIGN=RIGHT><TD ALIGN=LEFT>Time:</TD><TD>%s</TD><TD>%.3f</TD><TD>'\
+    '%2d:%2d:%7.4f</TD><TD>%4d/%2d/%2d</TD></TR>\n'\
+    '<TR ALIGN=RIGHT><TD ALIGN=LEFT>Position:</TD><TD>%s</TD><TD>%s</TD><TD>'\
+    '%.4f</TD><TD>(DMS,m)</TD></TR>\n'\
+    '<TR ALIGN=RIGHT><TD ALIGN=LEFT>Vel(N,E,D):</TD><TD>%.4f</TD><TD>%.4f</TD><TD>'\
+    '%.4f</TD><TD>(m/s)</TD></TR>\n'\
+    '<TR ALIGN=RIGHT><TD ALIGN=LEFT>Att(r,p,h):</TD><TD>%s</TD><TD>%s</TD><TD>'\
+    '%.4f</TD><TD>(deg,approx)</TD></TR>\n'\
+    '<TR ALIGN=RIGHT><TD ALIGN=LEFT>Mode:</TD><TD>%s</TD><TD>%s</TD><TR>\n'\
+    '</TABLE>\n'\
+    ']]></description>\n'\
+    '<styleUrl>#P%s</styleUrl>\n'\
+    '<Style>\n'\
+    '<IconStyle>\n'\
+    '<heading>%.4f</heading>\n'\
+    '</IconStyle>\n'\
+    '</Style>\n'\
+    '<Point>\n'\
+    '<coordinates>%.9f,%.9f,%.3f</coordinates>\n'\
+    '</Point>\n'\
+    '</Placemark>\n'
+
+# seconds is time of week in seconds, ms is milliseconds of the second,
+# velocities are in m/s, angles are in degrees
+GnssPoint = collections.namedtuple('GnssPoint', [
+    'week', 'seconds', 'ms', 'postype', 'lat', 'lon', 'height',
+    'north_vel', 'east_vel', 'up_vel'])
+InsPoint = collections.namedtuple('InsPoint', [
+    'week', 'seconds', 'ms', 'ins_status', 'postype', 'lat', 'lon', 'height',
+    'north_vel', 'east_vel', 'up_vel', 'roll', 'pitch', 'heading'])
+# files written by a part writer, count of points, the first points and the
+# last point, whose placemarks depend on their index in the whole log
+KmlPart = collections.namedtuple('KmlPart', [
+    'track_path', 'placemark_path', 'count', 'head_points', 'last_point'])
+
+
+def gps_to_utc_seconds(week, seconds, leap_seconds=LEAP_SECONDS):
+    '''
+    Whole seconds from GPS epoch to the UTC time of GPS week and seconds.
+    Seconds is rounded to microseconds then truncated, as datetime does.
+    '''
+    return week * SECONDS_OF_WEEK + \
+        round((seconds + leap_seconds) * 1000000) // 1000000
+
+
+@functools.lru_cache(maxsize=8)
+def _utc_date(days):
+    date = datetime.date.fromordinal(GPS_EPOCH_ORDINAL + days)
+    return date.year, date.month, date.day
+
+
+def utc_time(utc_seconds):
+    '''
+    (year, month, day, hour, minute, second) of whole seconds from GPS epoch
+    '''
+    days, seconds = divmod(utc_seconds, SECONDS_OF_DAY)
+    hour, seconds = divmod(seconds, 3600)
+    minute, second = divmod(seconds, 60)
+    return _utc_date(days) + (hour, minute, second)
+
+
+def build_header(colors):
+    return KML_START + ''.join([STYLE % (i, color)
+                                for i, color in enumerate(colors)])
+
+
+def placemark_name(index, is_last, utc, second):
+    '''
+    Name of placemark, the first points are Start, the last point is End,
+    and a point at every 30 seconds is named by its time
+    '''
+    if index <= 1:
+        return '<name>Start</name>\n'
+    if is_last:
+        return '<name>End</name>\n'
+    if math.fmod(second + 0.025, 30) < 0.05:
+        return '<name>%02d%02d%02d</name>\n' % utc[3:6]
+    return ''
+
+
+class KmlWriter(object):
+    '''
+    Write points into KML file incrementally. Subclass formats a point by
+    format_coordinates(point) and format_placemark(point, index, is_last),
+    which return empty string if the point is skipped. The placemark of a
+    point is formatted when the next point is added, so the last point is
+    known.
+
+    A part writer writes only track coordinates into file path, and the
+    placemarks of points except the first and the last ones into the
+    placemark file next to it. get_part returns the part after it is
+    closed, which is added to the writer of whole log by add_part.
+    '''
+    __metaclass__ = ABCMeta
+
+    def __init__(self, file_path, header, track_color, is_part=False):
+        self.count = 0
+        self.is_part = is_part
+        self._last_point = None
+        self._head_points = []
+        self._file = open(file_path, 'w')
+        if is_part:
+            self._placemarks = open(PART_PLACEMARKS.format(file_path), 'w')
+            return
+
+        self._placemarks = tempfile.TemporaryFile('w+')
+        self._file.write(header)
+        self._file.write(TRACK_START % track_color)
+
+    def add(self, point):
+        self._file.write(self.format_coordinates(point))
+        if self.is_part and len(self._head_points) < PART_HEAD_COUNT:
+            # index of point in the whole log is not known in a part
+            self._head_points.append(point)
+            self.count += 1
+            return
+        self._add_placemark(point)
+
+    def extend(self, points):
+        for point in points:
+            self.add(point)
+
+    def get_part(self):
+        '''
+        Part written by a closed part writer
+        '''
+        return KmlPart(self._file.name, self._placemarks.name, self.count,
+                       self._head_points, self._last_point)
+
+    def add_part(self, part):
+        '''
+        Append a part written by a part writer, parts are added in order.
+        Files of the part are removed.
+        '''
+        with open(part.track_path) as track_file:
+            shutil.copyfileobj(track_file, self._file)
+        for point in part.head_points:
+            self._add_placemark(point)
+
+        if part.last_point is not None:
+            # placemarks between were formatted by the part writer, their
+            # indexes are not less than head count in the whole log as well
+            self._flush_placemark(False)
+            with open(part.placemark_path) as placemark_file:
+                shutil.copyfileobj(placemark_file, self._placemarks)
+            self.count += part.count - len(part.head_points) - 1
+            self._add_placemark(part.last_point)
+
+        os.remove(part.track_path)
+        os.remove(part.placemark_path)
+
+    def _add_placemark(self, point):
+        self._flush_placemark(False)
+        self._last_point = point
+        self.count += 1
+
+    def _flush_placemark(self, is_last):
+        if self._last_point is not None:
+            self._placemarks.write(self.format_placemark(
+                self._last_point, self.count - 1, is_last))
+            self._last_point = None
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        if self.is_part:
+            self._file.close()
+            self._placemarks.close()
+            return
+
+        self._flush_placemark(True)
+        self._file.write(TRACK_END)
+        self._placemarks.seek(0)
+        shutil.copyfileobj(self._placemarks, self._file)
+        self._placemarks.close()
+        self._file.write(KML_END)
+        self._file.close()
+
+    @abstractmethod
+    def format_coordinates(self, point):
+        '''
+        Coordinates of point in the track
+        '''
+
+    @abstractmethod
+    def format_placemark(self, point, index, is_last):
+        '''
+        Placemark of point, the last one is marked as end
+        '''
+
+
+class GnssKmlWriter(KmlWriter):
+    '''
+    KML of GNSS solution, points without position are skipped
+    '''
+
+    def __init__(self, file_path, is_part=False):
+        super(GnssKmlWriter, self).__init__(
+            file_path, build_header(GNSS_COLORS), 'ffffffff', is_part)
+
+    def format_coordinates(self, point):
+        if point.postype == 0:
+            return ''
+        return COORDINATES % (point.lon, point.lat, point.height)
+
+    def format_placemark(self, point, index, is_last):
+        if point.postype == 0:
+            return ''
+
+        utc = utc_time(gps_to_utc_seconds(point.week, point.seconds))
+        second = utc[5] + point.ms / 1000
+        track_ground = math.atan2(
+            point.east_vel, point.north_vel) * (57.295779513082320)
+        return PLACEMARK % (
+            (placemark_name(index, is_last, utc, second),) + utc +
+            (point.ms / 10, point.week, point.seconds, utc[3], utc[4], second,
+             utc[0], utc[1], utc[2], '%.8f' % point.lat, '%.8f' % point.lon,
+             point.height, point.north_vel, point.east_vel, -point.up_vel,
+             '0', '0', track_ground, '0', GNSS_POSTYPE[point.postype],
+             point.postype, track_ground, point.lon, point.lat, point.height))
+
+
+class InsKmlWriter(KmlWriter):
+    '''
+    KML of INS solution, the track and placemarks are decimated to
+    kml_rate(hz), decimation is checked before a point is formatted
+    '''
+
+    def __init__(self, file_path, kml_rate, is_part=False):
+        super(InsKmlWriter, self).__init__(
+            file_path, build_header(INS_COLORS), 'ff0000ff', is_part)
+        self.interval = 1 / kml_rate
+
+    def format_coordinates(self, point):
+        utc_second = gps_to_utc_seconds(point.week, point.seconds) % 60
+        if math.fmod(utc_second + point.ms / 1000 + 0.0005,
+                     self.interval) >= 0.005:
+            return ''
+        return COORDINATES % (point.lon, point.lat, point.height)
+
+    def format_placemark(self, point, index, is_last):
+        if not (index == 0 or is_last or
+                math.fmod(point.seconds + 0.0005, self.interval) < 0.005):
+            return ''
+
+        utc = utc_time(gps_to_utc_seconds(point.week, point.seconds))
+        second = utc[5] + point.ms / 1000
+        return PLACEMARK % (
+            (placemark_name(index, is_last, utc, second),) + utc +
+            (point.ms / 10, point.week, point.seconds, utc[3], utc[4], second,
+             utc[0], utc[1], utc[2], '%.8f' % point.lat, '%.8f' % point.lon,
+             point.height, point.north_vel, point.east_vel, -point.up_vel,
+             '%.4f' % point.roll, '%.4f' % point.pitch, point.heading,
+             INS_STATUS[point.ins_status], INS_POSTYPE[point.postype],
+             point.postype if 0 <= point.postype <= 5 else 0,
+             point.heading, point.lon, point.lat, point.height))
@@ -1,34 +1,77 @@
 import os
-import sys
+import re
 import argparse
-import time
 from time import sleep
 import datetime
 import collections
 import struct
 import json
 import math
+import functools
 from ..framework.utils import resource
-from ..framework.utils.print import (print_green, print_red)
+from ..framework.utils.crc import crc16
+from .parallel_parse import (
+    FileRange, get_part_folder, merge_part_folders, parse_files)
+from .kml_writer import (GnssKmlWriter, InsKmlWriter, GnssPoint, InsPoint)
+
+# log file is parsed in chunks, so memory does not grow with file size
+READ_SIZE = 1024 * 1024
+
+# packet length and payload end of zou packets, packet ends with 'ed'
+ZOU_PACKETS = {
+    'fmim': (52, 48),
+    'fmig': (95, 91),
+    'fmin': (100, 96)
+}
+ZOU_PACKET_END = b'ed'
+ZOU_MESSAGE_ID_LEN = 4
+
+# 0x5555, packet type(2), payload length(1), payload, crc(2)
+USER_PACKET_PREAMBLE = b'\x55\x55'
+USER_PACKET_HEADER_LEN = 5
+USER_PACKET_CRC_LEN = 2
+NMEA_START = b'$'
+NMEA_END = b'\r\n'
+NMEA_HEADER_LEN = 6
+# max length of a sentence with its end, a sentence without end in it is
+# skipped
+NMEA_MAX_LEN = 256
+
+
+def merge_log_parts(path, part_count):
+    '''
+    Merge outputs of parts into the folder of output path
+    '''
+    folder = os.path.dirname(path)
+    merge_part_folders([get_part_folder(folder, index)
+                        for index in range(part_count)], folder)
+
 
-is_later_py_3 = sys.version_info > (3, 0)
+def parse_in_chunks(data_file, parse_buffer, read_size=READ_SIZE):
+    '''
+    Read data file in chunks and parse them with parse_buffer. parse_buffer
+    returns the length of parsed bytes, the rest is kept for next chunk.
+    '''
+    buffer = bytearray()
+    while True:
+        data = data_file.read(read_size)
+        if not data:
+            break
+        buffer += data
+        parsed_len = parse_buffer(buffer)
+        del buffer[:parsed_len]
 
 
 class ZouParse:
     def __init__(self, data_file, path, json_setting):
-        self.zoudata = []
-        if is_later_py_3:
-            self.zoudata = data_file.read()
-        else:
-            self.filedata = data_file.read()
-            for c in self.filedata:
-                self.zoudata.append(ord(c))
+        self.data_file = data_file
         self.path = path
 
-        self.packet_buffer = []
-        self.sync_state = 0
-        self.sync_pattern = collections.deque(4*[0], 4)
+        self.packet_buffer = b''
+        self.cur_message_id = None
+        self.sync_regex = None
         self.zouPacketsTypeList = []
+        self.zou_outputs = {}
 
         self.log_files = {}
         self.fp_all = None
@@ -39,49 +82,100 @@ class ZouParse:
 
         with open(json_setting) as json_data:
             self.rtk_properties = json.load(json_data)
+        self.load_packet_formats()
 
-    def start_pasre(self):
+    def load_packet_formats(self):
         self.zouPacketsTypeList = self.rtk_properties['zouPacketsTypeList']
-        for i, new_byte in enumerate(self.zoudata):
-            self.sync_pattern.append(new_byte)
-            if self.sync_state == 1:
-                self.packet_buffer.append(new_byte)
-                if (self.cur_message_id == 'fmim' and len(self.packet_buffer) == 52) or\
-                    (self.cur_message_id == 'fmig' and len(self.packet_buffer) == 95) or\
-                        (self.cur_message_id == 'fmin' and len(self.packet_buffer) == 100):
-                    if (self.packet_buffer[-1]) == ord('d') and self.packet_buffer[-2] == ord('e'):
-                        head_time = self.packet_buffer[5:13]
-                        len_fmt = '{0}B'.format(8)
-                        pack_fmt = 'd'
-                        b = struct.pack(len_fmt, *head_time)
-                        self.time_tag = struct.unpack(pack_fmt, b)
-                        self.parse_output_packet_payload(packet_type)
-
-                        self.packet_buffer = []
-                        self.sync_state = 0
-                    else:
-                        self.err_count = self.err_count + 1
-                        #print('debug data crc err. type {0} count{1}'.format(packet_type, self.err_count))
-                        self.sync_state = 0  # CRC did not match
-            else:
-                for message_id in self.zouPacketsTypeList:
-                    message_id_list = []
-                    message_id_list = list(message_id)
-                    self.cur_message_id = message_id
-                    message_id_list_int = []
-                    for ele in message_id_list:
-                        message_id_list_int.append(ord(ele))
-                    if list(self.sync_pattern) == message_id_list_int:  # packet type
-                        packet_type = message_id
-                        self.packet_buffer = message_id_list_int
-                        self.sync_state = 1
-                        break
-                    #test = input()
+        for x in self.rtk_properties['zouOutputPackets']:
+            self.zou_outputs.setdefault(x['messageId'], x)
+        # only the packets with known length could be parsed
+        message_ids = [x for x in self.zouPacketsTypeList if x in ZOU_PACKETS]
+        if len(message_ids) > 0:
+            self.sync_regex = re.compile(b'|'.join(
+                [re.escape(x.encode()) for x in message_ids]))
+
+    def start_pasre(self):
+        if self.sync_regex is not None:
+            parse_in_chunks(self.data_file, self.parse_buffer)
+        self.close_files()
+
+    def parse_part(self):
+        '''
+        Parse a part of log, outputs of parts are appended in order
+        '''
+        self.start_pasre()
+
+    def merge_parts(self, results):
+        merge_log_parts(self.path, len(results))
+
+    def close_files(self):
         for i, (k, v) in enumerate(self.log_files.items()):
             v.close()
         self.log_files.clear()
         if self.fp_all is not None:
             self.fp_all.close()
+            self.fp_all = None
+
+    def find_sync(self, buffer):
+        '''
+        Find the first packet in buffer which is followed by another packet,
+        returns its offset, or -1 if it is not found
+        '''
+        if self.sync_regex is None:
+            return -1
+
+        pos = 0
+        while True:
+            packet_start, packet_end = self._find_packet(buffer, pos)
+            if packet_start == -1:
+                return -1
+            if self._find_packet(buffer, packet_end)[0] == packet_end:
+                return packet_start
+            pos = packet_start + 1
+
+    def _find_packet(self, buffer, pos):
+        '''
+        Find the first complete packet from pos, returns its start and end
+        '''
+        while True:
+            match = self.sync_regex.search(buffer, pos)
+            if match is None:
+                return -1, -1
+            packet_start = match.start()
+            packet_end = packet_start + \
+                ZOU_PACKETS[match.group().decode()][0]
+            if packet_end <= len(buffer) and \
+                    buffer[packet_end - 2:packet_end] == ZOU_PACKET_END:
+                return packet_start, packet_end
+            pos = packet_start + 1
+
+    def parse_buffer(self, buffer):
+        '''
+        Parse the zou packets in buffer, returns the length of parsed bytes
+        '''
+        pos = 0
+        while True:
+            match = self.sync_regex.search(buffer, pos)
+            if match is None:
+                # the end may be the beginning of a message id
+                return max(pos, len(buffer) - ZOU_MESSAGE_ID_LEN + 1)
+
+            start = match.start()
+            message_id = match.group().decode()
+            packet_end = start + ZOU_PACKETS[message_id][0]
+            if packet_end > len(buffer):
+                return start
+
+            packet = bytes(buffer[start:packet_end])
+            if packet.endswith(ZOU_PACKET_END):
+                self.cur_message_id = message_id
+                self.packet_buffer = packet
+                self.time_tag = struct.unpack('d', packet[5:13])
+                self.parse_output_packet_payload(message_id)
+                pos = packet_end
+            else:
+                self.err_count = self.err_count + 1
+                pos = start + 1
 
     def start_log(self, output):
         if self.fp_all is None:
@@ -182,16 +276,9 @@ class ZouParse:
 
     def parse_output_packet_payload(self, message_id):
         '''zou packet'''
-        if message_id == 'fmim':
-            payload = self.packet_buffer[len(message_id):48]
-        elif message_id == 'fmig':
-            #print('het fmig')
-            payload = self.packet_buffer[len(message_id):91]
-        elif message_id == "fmin":
-            #print('get fmin')
-            payload = self.packet_buffer[len(message_id):96]
-        output = next(
-            (x for x in self.rtk_properties['zouOutputPackets'] if x['messageId'] == str(message_id)), None)
+        payload_end = ZOU_PACKETS[message_id][1]
+        payload = self.packet_buffer[len(message_id):payload_end]
+        output = self.zou_outputs.get(message_id)
         if output != None:
             self.start_log(output)
             data = self.openrtk_unpack_output_packet(output, payload)
@@ -404,25 +491,22 @@ class ZouParse:
         return ulCRC
 
 
-class UserRawParse:
+class UserPacketParse(object):
+    '''
+    Parse user packets and NMEA sentences of user log. Subclass logs the
+    packets and saves KML.
+    '''
+
     def __init__(self, data_file, path, inskml_rate, json_setting):
-        self.rawdata = []
-        if is_later_py_3:
-            self.rawdata = data_file.read()
-        else:
-            self.filedata = data_file.read()
-            for c in self.filedata:
-                self.rawdata.append(ord(c))
+        self.data_file = data_file
         self.path = path
-        self.inskml_rate = 1/inskml_rate
-        self.packet_buffer = []
-        self.sync_state = 0
-        self.sync_pattern = collections.deque(4*[0], 4)
+        self.inskml_rate = inskml_rate
+        self.packet_buffer = b''
         self.userPacketsTypeList = []
         self.userNMEAList = []
-        self.nmea_pattern = collections.deque(6*[0], 6)
-        self.nmea_buffer = []
-        self.nmea_sync = 0
+        self.packet_types = {}
+        self.user_outputs = {}
+        self.nmea_headers = set()
         self.log_files = {}
         self.f_nmea = None
         self.f_process = None
@@ -430,20 +514,25 @@ class UserRawParse:
         self.f_odo = None
         self.f_gnssposvel = None
         self.f_ins = None
-        self.f_gnss_kml = None
-        self.f_ins_kml = None
-        self.gnssdata = []
-        self.insdata = []
+        self.gnss_kml = None
+        self.ins_kml = None
         self.pkfmt = {}
         self.last_time = 0
 
         with open(json_setting) as json_data:
             self.rtk_properties = json.load(json_data)
+        self.load_packet_formats()
 
-    def start_pasre(self):
+    def load_packet_formats(self):
         self.userPacketsTypeList = self.rtk_properties['userPacketsTypeList']
         self.userNMEAList = self.rtk_properties['userNMEAList']
+        # packet type is looked up by the 2 bytes after preamble
+        self.packet_types = dict(
+            [(x.encode(), x) for x in self.userPacketsTypeList])
+        self.nmea_headers = set(
+            [x[:NMEA_HEADER_LEN].encode() for x in self.userNMEAList])
         for x in self.rtk_properties['userOutputPackets']:
+            self.user_outputs.setdefault(x['name'], x)
             length = 0
             pack_fmt = '<'
             for value in x['payload']:
@@ -485,319 +574,171 @@ class UserRawParse:
             fmt_dic['len'] = length
             fmt_dic['len_b'] = len_fmt
             fmt_dic['pack'] = pack_fmt
+            fmt_dic['struct'] = struct.Struct(pack_fmt)
             self.pkfmt[x['name']] = fmt_dic
 
+    def open_files(self):
         self.f_process = open(self.path[0:-1] + '-process', 'w')
         self.f_gnssposvel = open(self.path[0:-1] + '-gnssposvel.txt', 'w')
         self.f_imu = open(self.path[0:-1] + '-imu.txt', 'w')
         self.f_odo = open(self.path[0:-1] + '-odo.txt', 'w')
         self.f_ins = open(self.path[0:-1] + '-ins.txt', 'w')
         self.f_nmea = open(self.path[0:-1] + '-nmea', 'wb')
-        self.f_gnss_kml = open(self.path[0:-1] + '-gnss.kml', 'w')
-        self.f_ins_kml = open(self.path[0:-1] + '-ins.kml', 'w')
-
-        packet_type = ''
-        nmea_header_len = 0
-        for i, new_byte in enumerate(self.rawdata):
-            self.sync_pattern.append(new_byte)
-            if self.sync_state == 1:
-                self.packet_buffer.append(new_byte)
-                # packet len
-                if len(self.packet_buffer) == self.packet_buffer[2] + 5:
-                    packet_crc = 256 * \
-                        self.packet_buffer[-2] + self.packet_buffer[-1]
-                    # packet crc
-                    if packet_crc == self.calc_crc(self.packet_buffer[:-2]):
-                        self.parse_output_packet_payload(packet_type)
-                        self.packet_buffer = []
-                        self.sync_state = 0
-                    else:
-                        #print('user data crc err!')
-                        self.sync_state = 0  # CRC did not match
-            else:
-                for packet_type in self.userPacketsTypeList:
-                    packet_type_0 = ord(packet_type[0])
-                    packet_type_1 = ord(packet_type[1])
-                    # packet type
-                    if list(self.sync_pattern) == [0x55, 0x55, packet_type_0, packet_type_1]:
-                        self.packet_buffer = [packet_type_0, packet_type_1]
-                        self.sync_state = 1
-                        break
-                # nmea detect
-                if self.nmea_sync == 0:
-                    if new_byte == 0x24:
-                        self.nmea_buffer = []
-                        self.nmea_pattern = []
-                        self.nmea_sync = 1
-                        self.nmea_buffer.append(new_byte)
-                        self.nmea_pattern.append(new_byte)
-                        nmea_header_len = 1
-                elif self.nmea_sync == 1:
-                    self.nmea_buffer.append(new_byte)
-                    self.nmea_pattern.append(new_byte)
-                    nmea_header_len = nmea_header_len + 1
-                    if nmea_header_len == 6:
-                        for nmea_type in self.userNMEAList:
-                            nmea_type_0 = ord(nmea_type[0])
-                            nmea_type_1 = ord(nmea_type[1])
-                            nmea_type_2 = ord(nmea_type[2])
-                            nmea_type_3 = ord(nmea_type[3])
-                            nmea_type_4 = ord(nmea_type[4])
-                            nmea_type_5 = ord(nmea_type[5])
-                            if list(self.nmea_pattern) == [nmea_type_0, nmea_type_1, nmea_type_2, nmea_type_3, nmea_type_4, nmea_type_5]:
-                                self.nmea_sync = 2
-                                break
-                        if self.nmea_sync != 2:
-                            self.nmea_sync = 0
-                elif self.nmea_sync == 2:
-                    self.nmea_buffer.append(new_byte)
-                    if self.nmea_buffer[-1] == 0x0A and self.nmea_buffer[-2] == 0x0D:
-                        self.f_nmea.write(bytes(self.nmea_buffer))
-                        self.nmea_sync = 0
-        self.save_gnss_kml()
-        self.save_ins_kml()
-        self.close_files()
 
-    def weeksecondstoutc(self, gpsweek, gpsseconds, leapseconds):
-        import datetime
-        import calendar
-        datetimeformat = "%Y-%m-%d %H:%M:%S"
-        epoch = datetime.datetime.strptime(
-            "1980-01-06 00:00:00", datetimeformat)
-        elapsed = datetime.timedelta(
-            days=(gpsweek*7), seconds=(gpsseconds+leapseconds))
-        return datetime.datetime.strftime(epoch + elapsed, datetimeformat)
-
-    def save_gnss_kml(self):
-        color = ["ffffffff", "ff0000ff", "ffff00ff",
-                 "50FF78F0", "ff00ff00", "ff00aaff"]
-        kml_header = "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"\
-            + "<kml xmlns=\"http://www.opengis.net/kml/2.2\">\n"\
-            + "<Document>\n"
-        for i in range(6):
-            kml_header += "<Style id=\"P" + str(i) + "\">\r\n"\
-                + "<IconStyle>\r\n"\
-                + "<color>" + color[i] + "</color>\n"\
-                + "<scale>0.3</scale>\n"\
-                + "<Icon><href>http://maps.google.com/mapfiles/kml/shapes/track.png</href></Icon>\n"\
-                + "</IconStyle>\n"\
-                + "</Style>\n"
-        self.f_gnss_kml.write(kml_header)
-
-        gnss_postype = ["NONE", "PSRSP", "PSRDIFF",
-                        "UNDEFINED", "RTKFIXED", "RTKFLOAT"]
-
-        gnss_track = "<Placemark>\n"\
-            + "<name>Rover Track</name>\n"\
-            + "<Style>\n"\
-            + "<LineStyle>\n"\
-            + "<color>ffffffff</color>\n"\
-            + "</LineStyle>\n"\
-            + "</Style>\n"\
-            + "<LineString>\n"\
-            + "<coordinates>\n"
-
-        for pos in self.gnssdata:
-            if pos[2] == 0:
-                continue
-
-            gnss_track += format(pos[4], ".9f") + ',' + format(pos[3],
-                                                               ".9f") + ',' + format(pos[5], ".3f") + '\n'
-
-        gnss_track += "</coordinates>\n"\
-            + "</LineString>\n"\
-            + "</Placemark>\n"
-
-        gnss_track += "<Folder>\n"\
-            + "<name>Rover Position</name>\n"
+    def start_pasre(self):
+        self.open_files()
+        self.open_kml()
+        parse_in_chunks(self.data_file, self.parse_buffer)
+        self.close_files()
+        self.close_kml()
 
-        for i, pos in enumerate(self.gnssdata):
-            ep = self.weeksecondstoutc(pos[0], pos[1]/1000, -18)
-            ep_sp = time.strptime(ep, "%Y-%m-%d %H:%M:%S")
+    def parse_part(self):
+        '''
+        Parse a part of log, KML of the part is written into the part folder,
+        returns the KML parts, which are added to KML by merge_parts after
+        all parts are parsed
+        '''
+        self.open_files()
+        self.open_kml(True)
+        parse_in_chunks(self.data_file, self.parse_buffer)
+        self.close_files()
+        return self.close_kml()
 
-            if pos[2] == 0:
-                pass
-            else:
-                track_ground = math.atan2(
-                    pos[14], pos[13]) * (57.295779513082320)
-
-                gnss_track += "<Placemark>\n"
-                if i <= 1:
-                    gnss_track += "<name>Start</name>\n"
-                elif i == len(self.gnssdata)-1:
-                    gnss_track += "<name>End</name>\n"
-                else:
-                    if math.fmod(ep_sp[5]+(pos[1] % 1000)/1000+0.025, 30) < 0.05:
-                        gnss_track += "<name>"\
-                            + "%02d" % ep_sp[3] + "%02d" % ep_sp[4] + "%02d" % ep_sp[5]\
-                            + "</name>\n"
-
-                gnss_track += "<TimeStamp><when>"\
-                    + time.strftime("%Y-%m-%dT%H:%M:%S.", ep_sp)\
-                    + "%02dZ" % ((pos[1] % 1000)/10)\
-                    + "</when></TimeStamp>\n"
-
-                gnss_track += "<description><![CDATA[\n"\
-                    + "<TABLE border=\"1\" width=\"100%\" Align=\"center\">\n"\
-                    + "<TR ALIGN=RIGHT>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Time:</TD><TD>"\
-                    + str(pos[0]) + "</TD><TD>" + "%.3f" % (pos[1]/1000) + "</TD><TD>"\
-                    + "%2d:%2d:%7.4f" % (ep_sp[3], ep_sp[4], ep_sp[5]+(pos[1] % 1000)/1000) + "</TD><TD>"\
-                    + "%4d/%2d/%2d" % (ep_sp[0], ep_sp[1], ep_sp[2]) + "</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Position:</TD><TD>"\
-                    + "%.8f" % pos[3] + "</TD><TD>" + "%.8f" % pos[4] + "</TD><TD>" + "%.4f" % pos[5] + "</TD><TD>(DMS,m)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Vel(N,E,D):</TD><TD>"\
-                    + "%.4f" % pos[13] + "</TD><TD>" + "%.4f" % pos[14] + "</TD><TD>" + "%.4f" % (-pos[15]) + "</TD><TD>(m/s)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Att(r,p,h):</TD><TD>"\
-                    + "0" + "</TD><TD>" + "0" + "</TD><TD>" + "%.4f" % track_ground + "</TD><TD>(deg,approx)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Mode:</TD><TD>"\
-                    + "0" + "</TD><TD>" + gnss_postype[pos[2]] + "</TD><TR>\n"\
-                    + "</TABLE>\n"\
-                    + "]]></description>\n"
-
-                gnss_track += "<styleUrl>#P" + str(pos[2]) + "</styleUrl>\n"\
-                    + "<Style>\n"\
-                    + "<IconStyle>\n"\
-                    + "<heading>" + "%.4f" % track_ground + "</heading>\n"\
-                    + "</IconStyle>\n"\
-                    + "</Style>\n"
-
-                gnss_track += "<Point>\n"\
-                    + "<coordinates>" + "%.9f,%.9f,%.3f" % (pos[4], pos[3], pos[5]) + "</coordinates>\n"\
-                    + "</Point>\n"
-
-                gnss_track += "</Placemark>\n"
-
-        gnss_track += "</Folder>\n"\
-            + "</Document>\n"\
-            + "</kml>\n"
-
-        self.f_gnss_kml.write(gnss_track)
-
-    def save_ins_kml(self):
+    def merge_parts(self, results):
+        '''
+        Save KML of the KML parts returned by parse_part, then merge outputs
+        of parts, in part order
+        '''
+        self.open_kml()
+        for gnss_part, ins_part in results:
+            self.gnss_kml.add_part(gnss_part)
+            self.ins_kml.add_part(ins_part)
+        self.close_kml()
+        merge_log_parts(self.path, len(results))
+
+    def open_kml(self, is_part=False):
+        self.gnss_kml = GnssKmlWriter(self.path[0:-1] + '-gnss.kml', is_part)
+        self.ins_kml = InsKmlWriter(
+            self.path[0:-1] + '-ins.kml', self.inskml_rate, is_part)
+
+    def close_kml(self):
+        '''
+        Close KML writers, returns their parts if they are part writers
+        '''
+        self.gnss_kml.close()
+        self.ins_kml.close()
+        parts = None
+        if self.gnss_kml.is_part:
+            parts = (self.gnss_kml.get_part(), self.ins_kml.get_part())
+        self.gnss_kml = None
+        self.ins_kml = None
+        return parts
+
+    def add_gnss_point(self, point):
+        self.gnss_kml.add(point)
+
+    def add_ins_point(self, point):
+        self.ins_kml.add(point)
+
+    def find_sync(self, buffer):
+        '''
+        Find the first packet in buffer which is followed by another packet,
+        returns its offset, or -1 if it is not found
+        '''
+        pos = 0
+        while True:
+            packet_start = buffer.find(USER_PACKET_PREAMBLE, pos)
+            if packet_start == -1:
+                return -1
+            packet_end = self.check_packet(buffer, packet_start)
+            if packet_end is not None and \
+                    self.check_packet(buffer, packet_end) is not None:
+                return packet_start
+            pos = packet_start + 1
+
+    def check_packet(self, buffer, packet_start):
+        '''
+        Check the packet at packet_start, returns the end of packet if it is
+        complete and CRC matched
         '''
+        header_end = packet_start + USER_PACKET_HEADER_LEN
+        if header_end > len(buffer) or bytes(
+                buffer[packet_start + 2:packet_start + 4]) not in self.packet_types:
+            return None
+        packet_end = header_end + \
+            buffer[header_end - 1] + USER_PACKET_CRC_LEN
+        if packet_end > len(buffer):
+            return None
+        if crc16(buffer[packet_start + 2:packet_end - 2]) != \
+                256 * buffer[packet_end - 2] + buffer[packet_end - 1]:
+            return None
+        return packet_end
+
+    def parse_buffer(self, buffer):
         '''
-        # white-cyan, red, purple, light-yellow, green, yellow
-        color = ["ffffffff", "50FF78F0", "ffff00ff",
-                 "ff0000ff", "ff00ff00", "ff00aaff"]
-        kml_header = "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"\
-            + "<kml xmlns=\"http://www.opengis.net/kml/2.2\">\n"\
-            + "<Document>\n"
-        for i in range(6):
-            kml_header += "<Style id=\"P" + str(i) + "\">\r\n"\
-                + "<IconStyle>\r\n"\
-                + "<color>" + color[i] + "</color>\n"\
-                + "<scale>0.3</scale>\n"\
-                + "<Icon><href>http://maps.google.com/mapfiles/kml/shapes/track.png</href></Icon>\n"\
-                + "</IconStyle>\n"\
-                + "</Style>\n"
-        self.f_ins_kml.write(kml_header)
-
-        ins_track = "<Placemark>\n"\
-            + "<name>Rover Track</name>\n"\
-            + "<Style>\n"\
-            + "<LineStyle>\n"\
-            + "<color>ff0000ff</color>\n"\
-            + "</LineStyle>\n"\
-            + "</Style>\n"\
-            + "<LineString>\n"\
-            + "<coordinates>\n"
-
-        ins_status = ["INS_INACTIVE", "INS_ALIGNING", "INS_HIGH_VARIANCE",
-                      "INS_SOLUTION_GOOD", "INS_SOLUTION_FREE", "INS_ALIGNMENT_COMPLETE"]
-        ins_postype = ["INS_NONE", "INS_PSRSP", "INS_PSRDIFF",
-                       "INS_PROPOGATED", "INS_RTKFIXED", "INS_RTKFLOAT"]
-
-        for ins in self.insdata:
-            ep = self.weeksecondstoutc(ins[0], ins[1]/1000, -18)
-            ep_sp = time.strptime(ep, "%Y-%m-%d %H:%M:%S")
-
-            if math.fmod(ep_sp[5]+(ins[1] % 1000)/1000+0.0005, self.inskml_rate) < 0.005:
-                if abs(ins[5]*ins[4]) < 0.00000001:
+        Parse the user packets and NMEA sentences in buffer, returns the
+        length of parsed bytes
+        '''
+        pos = 0
+        buffer_len = len(buffer)
+        while True:
+            packet_start = buffer.find(USER_PACKET_PREAMBLE, pos)
+            nmea_start = buffer.find(NMEA_START, pos) \
+                if self.nmea_headers else -1
+
+            if nmea_start != -1 and \
+                    (packet_start == -1 or nmea_start < packet_start):
+                if buffer_len - nmea_start < NMEA_HEADER_LEN:
+                    return nmea_start
+                nmea_header = bytes(
+                    buffer[nmea_start:nmea_start + NMEA_HEADER_LEN])
+                if nmea_header not in self.nmea_headers:
+                    pos = nmea_start + 1
+                    continue
+                # the end is searched in max length of sentence, so a
+                # truncated sentence does not swallow the packets after it
+                nmea_end = buffer.find(NMEA_END, nmea_start + NMEA_HEADER_LEN,
+                                       nmea_start + NMEA_MAX_LEN)
+                if nmea_end == -1:
+                    if buffer_len - nmea_start < NMEA_MAX_LEN:
+                        return nmea_start
+                    # resync from the next byte
+                    pos = nmea_start + 1
                     continue
+                nmea_end += len(NMEA_END)
+                self.f_nmea.write(buffer[nmea_start:nmea_end])
+                pos = nmea_end
+                continue
+
+            if packet_start == -1:
+                # the last byte may be the beginning of preamble
+                return max(pos, buffer_len - 1)
+
+            header_end = packet_start + USER_PACKET_HEADER_LEN
+            if header_end > buffer_len:
+                return packet_start
+            packet_type = self.packet_types.get(
+                bytes(buffer[packet_start + 2:packet_start + 4]))
+            if packet_type is None:
+                pos = packet_start + 1
+                continue
+
+            packet_end = header_end + \
+                buffer[header_end - 1] + USER_PACKET_CRC_LEN
+            if packet_end > buffer_len:
+                return packet_start
+
+            # packet type, length and payload, without preamble
+            packet = bytes(buffer[packet_start + 2:packet_end])
+            packet_crc = 256 * packet[-2] + packet[-1]
+            if packet_crc != crc16(packet[:-2]):
+                # CRC did not match, search from the next byte
+                pos = packet_start + 1
+                continue
 
-                ins_track += format(ins[5], ".9f") + ',' + format(ins[4],
-                                                                  ".9f") + ',' + format(ins[6], ".3f") + '\n'
-
-        ins_track += "</coordinates>\n"\
-            + "</LineString>\n"\
-            + "</Placemark>\n"
-
-        ins_track += "<Folder>\n"\
-            + "<name>Rover Position</name>\n"
-
-        for i, ins in enumerate(self.insdata):
-            ep = self.weeksecondstoutc(ins[0], ins[1]/1000, -18)
-            ep_sp = time.strptime(ep, "%Y-%m-%d %H:%M:%S")
-
-            if i == 0 or i == len(self.insdata)-1 or math.fmod(ins[1]/1000 + 0.0005, self.inskml_rate) < 0.005:
-                ins_track += "<Placemark>\n"
-                if i <= 1:
-                    ins_track += "<name>Start</name>\n"
-                elif i == len(self.insdata)-1:
-                    ins_track += "<name>End</name>\n"
-                else:
-                    if math.fmod(ep_sp[5]+(ins[1] % 1000)/1000+0.025, 30) < 0.05:
-                        ins_track += "<name>"\
-                            + "%02d" % ep_sp[3] + "%02d" % ep_sp[4] + "%02d" % ep_sp[5]\
-                            + "</name>\n"
-
-                ins_track += "<TimeStamp><when>"\
-                    + time.strftime("%Y-%m-%dT%H:%M:%S.", ep_sp)\
-                    + "%02dZ" % ((ins[1] % 1000)/10)\
-                    + "</when></TimeStamp>\n"
-
-                ins_track += "<description><![CDATA[\n"\
-                    + "<TABLE border=\"1\" width=\"100%\" Align=\"center\">\n"\
-                    + "<TR ALIGN=RIGHT>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Time:</TD><TD>"\
-                    + str(ins[0]) + "</TD><TD>" + "%.3f" % (ins[1]/1000) + "</TD><TD>"\
-                    + "%2d:%2d:%7.4f" % (ep_sp[3], ep_sp[4], ep_sp[5]+(ins[1] % 1000)/1000) + "</TD><TD>"\
-                    + "%4d/%2d/%2d" % (ep_sp[0], ep_sp[1], ep_sp[2]) + "</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Position:</TD><TD>"\
-                    + "%.8f" % ins[4] + "</TD><TD>" + "%.8f" % ins[5] + "</TD><TD>" + "%.4f" % ins[6] + "</TD><TD>(DMS,m)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Vel(N,E,D):</TD><TD>"\
-                    + "%.4f" % ins[7] + "</TD><TD>" + "%.4f" % ins[8] + "</TD><TD>" + "%.4f" % (-ins[9]) + "</TD><TD>(m/s)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Att(r,p,h):</TD><TD>"\
-                    + "%.4f" % ins[10] + "</TD><TD>" + "%.4f" % ins[11] + "</TD><TD>" + "%.4f" % ins[12] + "</TD><TD>(deg,approx)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Mode:</TD><TD>"\
-                    + ins_status[ins[2]] + "</TD><TD>" + ins_postype[ins[3]] + "</TD><TR>\n"\
-                    + "</TABLE>\n"\
-                    + "]]></description>\n"
-
-                pcolor = 0
-                if ins[3] == 0:     # "INS_INACTIVE"
-                    pcolor = 0
-                elif ins[3] == 1:   # "SPP/INS_SPP"
-                    pcolor = 1
-                elif ins[3] == 2:   # "PSRDIFF/INS_PSRDIFF (RTD)"
-                    pcolor = 2
-                elif ins[3] == 3:   # "INS_DR"
-                    pcolor = 3
-                elif ins[3] == 4:   # "RTK_FIX/INS_RTKFIXED"
-                    pcolor = 4
-                elif ins[3] == 5:   # "RTK_FLOAT/INS_RTKFLOAT"
-                    pcolor = 5
-                # pcolor = 4
-
-                ins_track += "<styleUrl>#P" + str(pcolor) + "</styleUrl>\n"\
-                    + "<Style>\n"\
-                    + "<IconStyle>\n"\
-                    + "<heading>" + "%.4f" % ins[12] + "</heading>\n"\
-                    + "</IconStyle>\n"\
-                    + "</Style>\n"
-
-                ins_track += "<Point>\n"\
-                    + "<coordinates>" + "%.9f,%.9f,%.3f" % (ins[5], ins[4], ins[6]) + "</coordinates>\n"\
-                    + "</Point>\n"
-
-                ins_track += "</Placemark>\n"
-
-        ins_track += "</Folder>\n"\
-            + "</Document>\n"\
-            + "</kml>\n"
-
-        self.f_ins_kml.write(ins_track)
+            self.packet_buffer = packet
+            self.parse_output_packet_payload(packet_type)
+            pos = packet_end
 
     def close_files(self):
         for i, (k, v) in enumerate(self.log_files.items()):
@@ -808,10 +749,46 @@ class UserRawParse:
         self.f_imu.close()
         self.f_odo.close()
         self.f_ins.close()
-        self.f_gnss_kml.close()
-        self.f_ins_kml.close()
         self.log_files.clear()
 
+    def parse_output_packet_payload(self, packet_type):
+        payload_lenth = self.packet_buffer[2]
+        payload = self.packet_buffer[3:payload_lenth+3]
+        output = self.user_outputs.get(packet_type)
+        if output != None:
+            self.openrtk_unpack_output_packet(output, payload, payload_lenth)
+        else:
+            print('no packet type {0} in json'.format(packet_type))
+
+    def openrtk_unpack_output_packet(self, output, payload, payload_lenth):
+        fmt = self.pkfmt[output['name']]
+        pack_struct = fmt['struct']
+        if output['isList']:
+            length = fmt['len']
+            packet_num = payload_lenth // length
+            for i in range(packet_num):
+                try:
+                    data = pack_struct.unpack_from(payload, i*length)
+                    self.log(output, data)
+                except Exception as e:
+                    print("error happened when decode the {0} {1}".format(
+                        output['name'], e))
+        else:
+            try:
+                data = pack_struct.unpack(payload)
+                self.log(output, data)
+            except Exception as e:
+                print("error happened when decode the {0} {1}".format(
+                    output['name'], e))
+
+    def write_titlebar(self, file, output):
+        for value in output['payload']:
+            file.write(value['name']+'('+value['unit']+')')
+            file.write(",")
+        file.write("\n")
+
+
+class UserRawParse(UserPacketParse):
     def log(self, output, data):
         if output['name'] not in self.log_files.keys():
             self.log_files[output['name']] = open(
@@ -949,7 +926,9 @@ class UserRawParse:
                                      output['payload'][14]['format']) + "\n"
             self.f_gnssposvel.write(buffer)
 
-            self.gnssdata.append(data)
+            self.add_gnss_point(GnssPoint(
+                data[0], data[1]/1000, data[1] % 1000, data[2], data[3],
+                data[4], data[5], data[13], data[14], data[15]))
 
         elif output['name'] == 'o1':
             buffer = '$GPODO,'
@@ -1041,60 +1020,10 @@ class UserRawParse:
                 self.f_ins.write(buffer)
 
                 if abs(data[5]*data[4]) > 0.00000001:
-                    self.insdata.append(data)
-
-    def parse_output_packet_payload(self, packet_type):
-        payload_lenth = self.packet_buffer[2]
-        payload = self.packet_buffer[3:payload_lenth+3]
-        output = next(
-            (x for x in self.rtk_properties['userOutputPackets'] if x['name'] == packet_type), None)
-        if output != None:
-            self.openrtk_unpack_output_packet(output, payload, payload_lenth)
-        else:
-            print('no packet type {0} in json'.format(packet_type))
-
-    def openrtk_unpack_output_packet(self, output, payload, payload_lenth):
-        fmt = self.pkfmt[output['name']]
-        len_fmt = fmt['len_b']
-        pack_fmt = fmt['pack']
-        if output['isList']:
-            length = fmt['len']
-            packet_num = payload_lenth // length
-            for i in range(packet_num):
-                payload_c = payload[i*length:(i+1)*length]
-                try:
-                    b = struct.pack(len_fmt, *payload_c)
-                    data = struct.unpack(pack_fmt, b)
-                    self.log(output, data)
-                except Exception as e:
-                    print(
-                        "error happened when decode the payload {0}".format(e))
-        else:
-            try:
-                b = struct.pack(len_fmt, *payload)
-                data = struct.unpack(pack_fmt, b)
-                self.log(output, data)
-            except Exception as e:
-                print("error happened when decode the payload {0}".format(e))
-
-    def write_titlebar(self, file, output):
-        for value in output['payload']:
-            file.write(value['name']+'('+value['unit']+')')
-            file.write(",")
-        file.write("\n")
-
-    def calc_crc(self, payload):
-        crc = 0x1D0F
-        for bytedata in payload:
-            crc = crc ^ (bytedata << 8)
-            for i in range(0, 8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc = crc << 1
-
-        crc = crc & 0xffff
-        return crc
+                    self.add_ins_point(InsPoint(
+                        data[0], data[1]/1000, data[1] % 1000, data[2],
+                        data[3], data[4], data[5], data[6], data[7],
+                        data[8], data[9], data[10], data[11], data[12]))
 
 
 def mkdir(file_path):
@@ -1138,24 +1067,61 @@ def prepare_setting_folder(setting_file):
     return config_path
 
 
-def do_parse(folder_path, kml_rate, setting_file):
+def is_log_file(fname):
+    return (fname.startswith('user') and fname.endswith('.bin')) or \
+        fname.endswith('.log')
+
+
+def create_parse(kml_rate, setting_path, file_path, data_file=None,
+                 folder=None):
+    '''
+    Create parser of log file, outputs are saved in the folder of log file
+    by default
+    '''
+    fname = os.path.basename(file_path)
+    if folder is None:
+        folder = mkdir(file_path)
+    if fname.startswith('user'):
+        return UserRawParse(
+            data_file, folder + '/' + fname[:-4] + '_', kml_rate, setting_path)
+    return ZouParse(
+        data_file, folder + '/' + fname.rstrip(".log") + '_', setting_path)
+
+
+def parse_file(kml_rate, setting_path, file_path):
+    '''
+    Parse the whole log file into the folder of log file, it is run in
+    worker process
+    '''
+    with open(file_path, 'rb') as fp_rawdata:
+        parse = create_parse(kml_rate, setting_path, file_path, fp_rawdata)
+        parse.start_pasre()
+
+
+def parse_part(kml_rate, setting_path, file_path, part_index, start, end):
+    '''
+    Parse bytes from start to end of log file into the part folder, it is
+    run in worker process
+    '''
+    folder = get_part_folder(mkdir(file_path), part_index)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(file_path, 'rb') as fp_rawdata:
+        parse = create_parse(kml_rate, setting_path, file_path,
+                             FileRange(fp_rawdata, start, end), folder)
+        return parse.parse_part()
+
+
+def do_parse(folder_path, kml_rate, setting_file, jobs=1):
     setting_path = prepare_setting_folder(setting_file)
+    file_paths = []
     for root, _, file_name in os.walk(folder_path):
         for fname in file_name:
-            if (fname.startswith('user') or fname.startswith('debug')) and fname.endswith('.bin') or (fname.startswith('IMU')) or (fname.endswith('.log')):
-                file_path = os.path.join(root, fname)
-                print_green(
-                    'Parse is started. File path: {0}'.format(file_path))
-                path = mkdir(file_path)
-                try:
-                    with open(file_path, 'rb') as fp_rawdata:
-                        if fname.startswith('user'):
-                            parse = UserRawParse(
-                                fp_rawdata, path + '/' + fname[:-4] + '_', kml_rate, setting_path)
-                        elif fname.endswith('.log'):
-                            parse = ZouParse(
-                                fp_rawdata, path + '/' + fname.rstrip(".log") + '_', setting_path)
-                        parse.start_pasre()
-                        print_green('Parse done.')
-                except Exception as e:
-                    print_red(e)
+            if is_log_file(fname):
+                file_paths.append(os.path.join(root, fname))
+
+    parse_files(file_paths,
+                functools.partial(create_parse, kml_rate, setting_path),
+                functools.partial(parse_file, kml_rate, setting_path),
+                functools.partial(parse_part, kml_rate, setting_path),
+                jobs)
@@ -0,0 +1,211 @@
+'''
+Parse log files in parallel. Files are fanned out across a process pool, a
+large file is split at verified packet boundaries and its parts are parsed
+by different workers, then outputs of parts are merged in order.
+'''
+import os
+import time
+import shutil
+import traceback
+from concurrent.futures import (ProcessPoolExecutor, as_completed)
+from ..framework.utils.print import (print_green, print_red)
+
+# a file is split into parts not smaller than this
+SPLIT_SIZE = 32 * 1024 * 1024
+# bytes read from split point to find the next packet boundary
+SYNC_WINDOW = 1024 * 1024
+PART_FOLDER = '.part{0}'
+# output files start with a title line, which is kept once when merged
+TITLE_EXTENSIONS = ('.csv',)
+
+
+def resolve_jobs(jobs):
+    '''
+    Count of worker processes, all cores are used when jobs is not given
+    '''
+    if not jobs or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def get_part_folder(folder, part_index):
+    return os.path.join(folder, PART_FOLDER.format(part_index))
+
+
+class FileRange(object):
+    '''
+    Read bytes of file from start to end
+    '''
+
+    def __init__(self, file_obj, start, end):
+        self._file = file_obj
+        self._file.seek(start)
+        self._remain = end - start
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remain:
+            size = self._remain
+        data = self._file.read(size)
+        self._remain -= len(data)
+        return data
+
+
+def split_file(file_path, parts, find_sync, window=SYNC_WINDOW):
+    '''
+    Split file into ranges of (start, end). Each range except the first
+    starts at a packet found by find_sync(buffer), which returns offset of
+    the packet in buffer or -1. A split point without packet is skipped.
+    '''
+    size = os.path.getsize(file_path)
+    offsets = [0]
+    with open(file_path, 'rb') as file_obj:
+        for index in range(1, parts):
+            target = max(size * index // parts, offsets[-1] + 1)
+            file_obj.seek(target)
+            pos = find_sync(file_obj.read(window))
+            if pos == -1 or target + pos >= size:
+                continue
+            offsets.append(target + pos)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def merge_part_folders(part_folders, folder):
+    '''
+    Append output files of part folders to the files of same name in folder,
+    in order of parts. The part folders are removed.
+    '''
+    merged_names = set()
+    for part_folder in part_folders:
+        if not os.path.isdir(part_folder):
+            continue
+
+        for name in sorted(os.listdir(part_folder)):
+            part_path = os.path.join(part_folder, name)
+            output_path = os.path.join(folder, name)
+            if name not in merged_names:
+                os.replace(part_path, output_path)
+                merged_names.add(name)
+                continue
+
+            with open(part_path, 'rb') as part_file, \
+                    open(output_path, 'ab') as output_file:
+                if name.endswith(TITLE_EXTENSIONS):
+                    part_file.readline()
+                shutil.copyfileobj(part_file, output_file)
+        shutil.rmtree(part_folder)
+
+
+class ParseProgress(object):
+    '''
+    Report parsed tasks and bytes
+    '''
+
+    def __init__(self, task_count, total_size):
+        self.task_count = task_count
+        self.total_size = total_size
+        self.done_count = 0
+        self.done_size = 0
+        self._start_time = time.time()
+
+    def update(self, name, size):
+        self.done_count += 1
+        self.done_size += size
+        percent = 100.0 * self.done_size / self.total_size \
+            if self.total_size > 0 else 100.0
+        print_green('[{0}/{1}] {2:.0f}% {3:.1f}s Parsed {4}'.format(
+            self.done_count, self.task_count, percent,
+            time.time() - self._start_time, name))
+
+
+def _run_task(func, args):
+    try:
+        return True, func(*args)
+    except Exception:  # pylint: disable=broad-except
+        return False, traceback.format_exc()
+
+
+def run_tasks(tasks, jobs=1, progress=None):
+    '''
+    Run tasks of (func, args, size, name), func and args should be picklable.
+    Tasks are run in this process if jobs is 1. Returns list of
+    (is_success, result or error) in task order.
+    '''
+    if progress is None:
+        progress = ParseProgress(
+            len(tasks), sum([task[2] for task in tasks]))
+
+    results = [None] * len(tasks)
+    if jobs <= 1 or len(tasks) <= 1:
+        for index, (func, args, size, name) in enumerate(tasks):
+            results[index] = _run_task(func, args)
+            progress.update(name, size)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = dict([(executor.submit(_run_task, func, args), index)
+                        for index, (func, args, _, _) in enumerate(tasks)])
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                # such as the worker is killed
+                results[index] = (False, str(ex))
+            progress.update(tasks[index][3], tasks[index][2])
+    return results
+
+
+def parse_files(file_paths, create_parse, parse_file, parse_part, jobs=1,
+                split_size=SPLIT_SIZE):
+    '''
+    Parse files on a pool of jobs processes.
+
+    parse_file(file_path) parses a file which is not split in worker process,
+    outputs are streamed into the folder of file.
+
+    A large file is split by find_sync(buffer) of the parser created by
+    create_parse(file_path) in this process. parse_part(file_path,
+    part_index, start, end) parses bytes from start to end of file in worker
+    process, and writes outputs into part folder. merge_parts(results) of the
+    parser is called with results of parts in order when all parts are
+    parsed.
+    '''
+    jobs = resolve_jobs(jobs)
+    tasks = []
+    file_parts = []
+    for file_path in file_paths:
+        size = os.path.getsize(file_path)
+        parts = min(jobs, max(size // split_size, 1))
+        ranges = [(0, size)]
+        if parts > 1:
+            parse = create_parse(file_path)
+            ranges = split_file(file_path, parts, parse.find_sync)
+
+        if len(ranges) == 1:
+            # a file not split is parsed without part folder
+            file_parts.append((file_path, None, [len(tasks)]))
+            tasks.append((parse_file, (file_path,), size, file_path))
+            continue
+
+        task_indexes = []
+        for part_index, (start, end) in enumerate(ranges):
+            task_indexes.append(len(tasks))
+            name = '{0} part {1}/{2}'.format(
+                file_path, part_index + 1, len(ranges))
+            tasks.append((parse_part, (file_path, part_index, start, end),
+                          end - start, name))
+        file_parts.append((file_path, parse, task_indexes))
+
+    results = run_tasks(tasks, jobs)
+
+    for file_path, parse, task_indexes in file_parts:
+        errors = [results[index][1] for index in task_indexes
+                  if not results[index][0]]
+        if len(errors) > 0:
+            print_red('Parse failed. File path: {0}\n{1}'.format(
+                file_path, errors[0]))
+            continue
+        if parse is not None:
+            parse.merge_parts([results[index][1] for index in task_indexes])
+        print_green('Parse done. File path: {0}'.format(file_path))
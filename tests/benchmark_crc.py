@@ -0,0 +1,45 @@
+'''
+Benchmark of CRC16, compares the bit by bit implementation with the crc
+module.
+usage: python tests/benchmark_crc.py
+'''
+import sys
+import time
+
+try:
+    from aceinna.framework.utils.crc import crc16
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.utils.crc import crc16
+
+FRAME_SIZES = [7, 60, 262]
+LOOPS = 5000
+
+
+def bitwise_crc(payload):
+    crc = 0x1D0F
+    for bytedata in payload:
+        crc = crc ^ (bytedata << 8)
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ 0x1021
+            else:
+                crc = crc << 1
+    return crc & 0xffff
+
+
+def measure(func, payload):
+    start = time.time()
+    for _ in range(LOOPS):
+        func(payload)
+    return (time.time() - start) / LOOPS * 1e6
+
+
+if __name__ == '__main__':
+    for frame_size in FRAME_SIZES:
+        frame = bytearray(range(256)) * 2
+        payload = memoryview(frame)[:frame_size]
+        before = measure(bitwise_crc, list(payload))
+        after = measure(crc16, payload)
+        print('{0:>4} bytes: {1:>8.2f} us -> {2:>5.2f} us, x{3:.0f}'.format(
+            frame_size, before, after, before / after))
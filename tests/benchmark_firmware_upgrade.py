@@ -0,0 +1,56 @@
+'''
+Benchmark of writing a firmware image to the simulated bootloader, compares
+stop-and-wait with windowed blocks in flight.
+usage: python tests/benchmark_firmware_upgrade.py
+'''
+import os
+import sys
+import time
+import struct
+
+try:
+    from aceinna.devices.upgrade_workers import FirmwareUpgradeWorker
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    sys.path.append('./tests')
+    from aceinna.devices.upgrade_workers import FirmwareUpgradeWorker
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+
+CONTENT = os.urandom(240 * 200)
+WINDOWS = [1, 4, 8, 16]
+
+
+def write_command_generator(data_len, current, data):
+    message_bytes = []
+    message_bytes.extend(struct.pack('>I', current))
+    message_bytes.extend(struct.pack('B', data_len))
+    message_bytes.extend(data)
+    return helper.build_packet('WA', message_bytes)
+
+
+def measure(window):
+    communicator = MockCommunicator(options={'device': 'BOOTLOADER'})
+    bootloader = communicator.device_access._app
+    worker = FirmwareUpgradeWorker(
+        communicator, CONTENT, write_command_generator, window_size=window)
+
+    start = time.time()
+    worker.work()
+    span = time.time() - start
+
+    communicator.close()
+    if bytes(bootloader.flash) != CONTENT:
+        print('window {0}: content is not matched'.format(window))
+    return span
+
+
+if __name__ == '__main__':
+    baseline = None
+    for window in WINDOWS:
+        span = measure(window)
+        baseline = baseline or span
+        print('window {0:>2}: {1} bytes in {2:>6.2f} s, x{3:.1f}'.format(
+            window, len(CONTENT), span, baseline / span))
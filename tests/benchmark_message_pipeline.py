@@ -0,0 +1,72 @@
+'''
+Benchmark of reading all parameters from the simulated OpenIMU device,
+compares one command at a time with pipelined commands.
+usage: python tests/benchmark_message_pipeline.py
+'''
+import os
+import sys
+import json
+import time
+
+try:
+    from aceinna.devices.message_center import DeviceMessageCenter
+    from aceinna.devices.parser_manager import ParserManager
+    from aceinna.devices.decorator import with_device_message
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    sys.path.append('./tests')
+    from aceinna.devices.message_center import DeviceMessageCenter
+    from aceinna.devices.parser_manager import ParserManager
+    from aceinna.devices.decorator import with_device_message
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+
+DEVICE_TYPE = 'IMU'
+APP_FILE_PATH = os.path.join(
+    os.getcwd(), 'src', 'aceinna', 'setting', 'OpenIMU300ZI', 'IMU', 'openimu.json')
+WINDOWS = [1, 4, 8, 16]
+ROUNDS = 3
+
+with open(APP_FILE_PATH) as json_data:
+    PROPERTIES = json.load(json_data)
+
+
+def measure(window):
+    communicator = MockCommunicator(options={'device': DEVICE_TYPE})
+    message_center = DeviceMessageCenter(communicator, window)
+    message_center.set_parser(
+        ParserManager.build(DEVICE_TYPE, 'uart', PROPERTIES))
+    message_center.setup()
+
+    @with_device_message
+    def get_params():
+        results = yield [
+            message_center.build(command=helper.build_input_packet(
+                'gP', properties=PROPERTIES, param=item['paramId']))
+            for item in PROPERTIES['userConfiguration']
+            if item['paramId'] != 0]
+        return results
+
+    spans = []
+    for _ in range(ROUNDS):
+        start = time.time()
+        results = get_params()
+        spans.append(time.time() - start)
+        errors = [item for item in results if item['error']]
+        if errors:
+            print('window {0}: {1} errors'.format(window, len(errors)))
+
+    message_center.stop()
+    communicator.close()
+    return len(results), min(spans)
+
+
+if __name__ == '__main__':
+    baseline = None
+    for window in WINDOWS:
+        count, span = measure(window)
+        baseline = baseline or span
+        print('window {0:>2}: {1} parameters in {2:>6.1f} ms, x{3:.1f}'.format(
+            window, count, span * 1000, baseline / span))
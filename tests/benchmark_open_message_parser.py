@@ -0,0 +1,109 @@
+'''
+Benchmark of open device message parser, compares the byte walking parser
+with the block scanner.
+usage: python tests/benchmark_open_message_parser.py
+'''
+import os
+import sys
+import json
+import time
+import operator
+import collections
+
+try:
+    from aceinna.devices.parsers.open_message_parser import (
+        UartMessageParser, MSG_HEADER)
+    from aceinna.framework.utils import helper
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.parsers.open_message_parser import (
+        UartMessageParser, MSG_HEADER)
+    from aceinna.framework.utils import helper
+
+APP_FILE_PATH = os.path.join(
+    os.getcwd(), 'src', 'aceinna', 'setting', 'OpenIMU300ZI', 'IMU', 'openimu.json')
+RAW_FILES = ['z1.raw', 's1.raw']
+READ_SIZE = 1000
+REPEAT = 5
+
+
+class ByteWalkingMessageParser(UartMessageParser):
+    '''
+    The former implementation, walks every received byte
+    '''
+
+    def __init__(self, configuration):
+        super(ByteWalkingMessageParser, self).__init__(configuration)
+        self.frame = []
+        self.payload_len_idx = 5
+        self.sync_pattern = collections.deque(2*[0], 2)
+        self.find_header = False
+        self.payload_len = 0
+
+    def analyse(self, data):
+        for data_block in data:
+            if self.find_header:
+                self.frame.append(data_block)
+                if self.payload_len_idx == len(self.frame):
+                    self.payload_len = data_block
+
+                elif 5 + self.payload_len + 2 == len(self.frame):
+                    packet_type = ''.join(
+                        ["%c" % x for x in self.frame[2:4]])
+                    self.find_header = False
+                    result = helper.calc_crc(self.frame[2:-2])
+                    if result[0] == self.frame[-2] and result[1] == self.frame[-1]:
+                        self._parse_message(
+                            packet_type, self.payload_len, self.frame)
+                        self.find_header = False
+                        self.payload_len = 0
+                        self.sync_pattern = collections.deque(2*[0], 2)
+                    else:
+                        self.emit('crc_failure', packet_type=packet_type,
+                                  event_time=time.time())
+            else:
+                self.sync_pattern.append(data_block)
+                if operator.eq(list(self.sync_pattern), MSG_HEADER):
+                    self.frame = MSG_HEADER[:]
+                    self.find_header = True
+
+
+def load_raw_data():
+    raw_data = bytearray()
+    for file_name in RAW_FILES:
+        file_path = os.path.join(
+            os.getcwd(), 'tests', 'mocker', 'devices', file_name)
+        with open(file_path, 'rb') as raw_file:
+            raw_data.extend(raw_file.read())
+    return bytes(raw_data)
+
+
+def run(parser_cls, properties, raw_data):
+    counter = {'packets': 0}
+
+    def handle_message(*args, **kwargs):
+        counter['packets'] += 1
+
+    parser = parser_cls(properties)
+    parser.on('continuous_message', handle_message)
+
+    start = time.time()
+    for _ in range(REPEAT):
+        for i in range(0, len(raw_data), READ_SIZE):
+            parser.analyse(raw_data[i:i+READ_SIZE])
+    duration = time.time() - start
+
+    return len(raw_data) * REPEAT / duration, counter['packets']
+
+
+if __name__ == '__main__':
+    with open(APP_FILE_PATH) as json_data:
+        PROPERTIES = json.load(json_data)
+
+    RAW_DATA = load_raw_data()
+
+    for name, cls in [('byte walking', ByteWalkingMessageParser),
+                      ('block scanner', UartMessageParser)]:
+        bytes_per_second, packets = run(cls, PROPERTIES, RAW_DATA)
+        print('{0:>14}: {1:>12.0f} bytes/s, {2} packets'.format(
+            name, bytes_per_second, packets))
@@ -0,0 +1,80 @@
+'''
+Benchmark of continuous packet decoding, compares the per packet format
+building parser with the precompiled codecs.
+usage: python tests/benchmark_open_packet_parser.py
+'''
+import os
+import sys
+import json
+import time
+import struct
+import collections
+
+try:
+    from aceinna.devices.parsers import filter_nan
+    from aceinna.devices.parsers.open_packet_parser import build_continuous_codecs
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.parsers import filter_nan
+    from aceinna.devices.parsers.open_packet_parser import build_continuous_codecs
+
+SETTING_PATH = os.path.join(os.getcwd(), 'src', 'aceinna', 'setting')
+DEVICE_FILES = [
+    ('OpenIMU300ZI', 'IMU', 'openimu.json'),
+    ('OpenRTK330L', 'RTK_INS', 'openrtk.json')
+]
+LOOPS = 20000
+
+FORMATS = {
+    'float': ('f', 4), 'uint32': ('I', 4), 'int32': ('i', 4),
+    'int16': ('h', 2), 'uint16': ('H', 2), 'double': ('d', 8),
+    'int64': ('q', 8), 'uint64': ('Q', 8), 'char': ('c', 1),
+    'uchar': ('B', 1), 'uint8': ('B', 1)
+}
+
+
+def format_building_parser(payload, configuration):
+    '''
+    The former implementation, builds the format for every packet
+    '''
+    pack_fmt = '<'
+    length = 0
+    for value in configuration['payload']:
+        fmt, size = FORMATS[value['type']]
+        pack_fmt += fmt
+        length += size
+    len_fmt = '{0}B'.format(length)
+
+    pack_item = struct.pack(len_fmt, *payload)
+    data = struct.unpack(pack_fmt, pack_item)
+    out = [(value['name'], filter_nan(data[idx]))
+           for idx, value in enumerate(configuration['payload'])]
+    return collections.OrderedDict(out)
+
+
+def measure(func, payload, configuration):
+    start = time.time()
+    for _ in range(LOOPS):
+        func(payload, configuration)
+    return (time.time() - start) / LOOPS * 1e6
+
+
+if __name__ == '__main__':
+    for device_files in DEVICE_FILES:
+        with open(os.path.join(SETTING_PATH, *device_files)) as json_data:
+            properties = json.load(json_data)
+
+        codecs = build_continuous_codecs(properties)
+
+        for configuration in properties['userMessages']['outputPackets']:
+            if configuration.get('isList'):
+                continue
+            codec = codecs[configuration['name']]
+            payload = bytes(codec.size)
+
+            before = measure(format_building_parser,
+                             list(payload), configuration)
+            after = measure(lambda data, _: codec.decode(data),
+                            memoryview(payload), configuration)
+            print('{0:>4}: {1:>6.2f} us -> {2:>5.2f} us, x{3:.1f}'.format(
+                configuration['name'], before, after, before / after))
@@ -0,0 +1,101 @@
+'''
+Benchmark of the receive pipeline, replays a recorded file through message
+center and parser as fast as possible.
+usage: python tests/benchmark_replay.py [file] [device]
+A simulated INS401 user log is used if no file is given.
+'''
+import os
+import sys
+import json
+import time
+import struct
+import tempfile
+
+try:
+    from aceinna.devices.message_center import (
+        DeviceMessageCenter, EVENT_TYPE)
+    from aceinna.devices.parser_manager import ParserManager
+    from aceinna.framework.communicators.replay import (
+        Replay, REPLAY_DEVICES)
+    from aceinna.framework.utils.crc import crc16
+    from aceinna.models import WebserverArgs
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.message_center import (
+        DeviceMessageCenter, EVENT_TYPE)
+    from aceinna.devices.parser_manager import ParserManager
+    from aceinna.framework.communicators.replay import (
+        Replay, REPLAY_DEVICES)
+    from aceinna.framework.utils.crc import crc16
+    from aceinna.models import WebserverArgs
+
+SETTING_PATH = os.path.join(os.getcwd(), 'src', 'aceinna', 'setting')
+PROPERTIES_PATH = {
+    'INS401': os.path.join(SETTING_PATH, 'INS401', 'RTK_INS', 'ins401.json'),
+    'OpenRTK': os.path.join(SETTING_PATH, 'OpenRTK330L', 'RTK_INS', 'openrtk.json'),
+    'OpenIMU': os.path.join(SETTING_PATH, 'OpenIMU300ZI', 'IMU', 'openimu.json')
+}
+# IMU and INS packets of INS401, 1 second at 100hz
+SIMULATED_PACKETS = [(b'\x01\n', 30), (b'\x03\n', 108)]
+SIMULATED_SECONDS = 100
+
+
+def build_packet(packet_type, payload):
+    packet = bytearray(b'\x55\x55' + packet_type +
+                       struct.pack('<I', len(payload)) + payload)
+    crc = crc16(packet[2:])
+    return bytes(packet) + bytes([crc >> 8, crc & 0xff])
+
+
+def create_simulated_log():
+    packets = [build_packet(packet_type, bytes(payload_len))
+               for packet_type, payload_len in SIMULATED_PACKETS]
+    with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as log_file:
+        log_file.write(b''.join(packets) * 100 * SIMULATED_SECONDS)
+        return log_file.name
+
+
+def run(file_path, device_type):
+    with open(PROPERTIES_PATH[device_type]) as json_data:
+        properties = json.load(json_data)
+
+    communicator = Replay(WebserverArgs(
+        replay_file=file_path, replay_device=device_type, replay_speed=0))
+    communicator.open()
+    message_center = DeviceMessageCenter(communicator)
+    message_center.set_parser(ParserManager.build(
+        device_type, REPLAY_DEVICES[device_type]['interface'], properties))
+
+    packet_counter = {'count': 0}
+
+    def on_continuous_message(**kwargs):
+        packet_counter['count'] += 1
+
+    message_center.on(EVENT_TYPE.CONTINUOUS_MESSAGE, on_continuous_message)
+
+    start = time.time()
+    message_center.setup()
+    while not communicator.get_read_statistics()['replay_finished'] or \
+            message_center.get_statistics()['queue_depth'] > 0:
+        time.sleep(0.01)
+    span = time.time() - start
+    message_center.stop()
+
+    statistics = communicator.get_read_statistics()
+    print('records: {0}, bytes: {1}, packets parsed: {2}'.format(
+        statistics['replay_record_count'], statistics['replay_byte_count'],
+        packet_counter['count']))
+    print('span: {0:.3f}s, {1:.0f} records/s, {2:.0f} packets/s'.format(
+        span, statistics['replay_record_count'] / span,
+        packet_counter['count'] / span))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else 'INS401')
+    else:
+        simulated_file_path = create_simulated_log()
+        try:
+            run(simulated_file_path, 'INS401')
+        finally:
+            os.remove(simulated_file_path)
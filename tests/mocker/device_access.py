@@ -4,6 +4,7 @@ import threading
 import struct
 import termios
 import time
+from mocker.devices.helper import split_commands
 
 MOTION_DATA = []
 
@@ -89,6 +90,9 @@ class DeviceAccess(object):
         elif app_name == 'DMU':
             from mocker.devices.dmu import DMUMocker
             cls = DMUMocker
+        elif app_name == 'BOOTLOADER':
+            from mocker.devices.bootloader import BootloaderMocker
+            cls = BootloaderMocker
         else:
             raise NotImplementedError("No matched device")
         self._app = cls()
@@ -113,11 +117,15 @@ class DeviceAccess(object):
         except:
             command = None
         # print('stop',self._is_stop)
-        if command:
+        if not command:
+            return
+
+        # pipelined commands may arrive together, answer them in order
+        for cli in split_commands(command):
             response = None
             try:
                 # do handle command
-                response = self._app.handle_command(command)
+                response = self._app.handle_command(cli)
             except Exception as ex:
                 print(ex)
                 response = None
@@ -0,0 +1,51 @@
+import time
+import struct
+from .base import DeviceBase
+from .helper import (parse_command_packet, build_output_packet)
+
+
+class BootloaderMocker(DeviceBase):
+    '''A mocker runing bootloader, blocks written by WA are kept in flash'''
+
+    def __init__(self, **kwargs):
+        super(BootloaderMocker, self).__init__()
+        self.flash = bytearray()
+        self.write_count = 0
+        # ack of WA carries address and length of the block
+        self.is_ack_with_address = True
+        # address of blocks responded with NAK at the first time
+        self.nak_addresses = set()
+        # seconds to erase flash before the first block is acked
+        self.erase_delay = 0
+
+    def handle_command(self, cli):
+        packet_type, payload, error, _ = parse_command_packet(cli)
+
+        if error:
+            return build_output_packet('\x00\x00', bytes([]))
+
+        if packet_type == 'WA':
+            address = struct.unpack('>I', payload[0:4])[0]
+            data_len = payload[4]
+            if address in self.nak_addresses:
+                self.nak_addresses.remove(address)
+                return build_output_packet('\x15\x15', bytes(payload[0:5]))
+
+            if address == 0 and self.erase_delay:
+                time.sleep(self.erase_delay)
+
+            if len(self.flash) < address + data_len:
+                self.flash.extend(
+                    bytes(address + data_len - len(self.flash)))
+            self.flash[address:address + data_len] = payload[5:5 + data_len]
+            self.write_count += 1
+            return build_output_packet(
+                'WA', bytes(payload[0:5]) if self.is_ack_with_address
+                else bytes([]))
+
+        return build_output_packet(packet_type, bytes([]))
+
+    def gen_sensor_data(self):
+        # no output packet in bootloader
+        while True:
+            yield bytes([])
@@ -50,6 +50,26 @@ def parse_command_packet(data, is_open=True):
     return packet_type, payload, error, delay
 
 
+def split_commands(data):
+    '''
+    Split received bytes into command packets, the bytes following a packet
+    which are not a packet start are kept with it as delay.
+    '''
+    commands = []
+    start = 0
+    while start + 5 <= len(data) and is_command_start(data[start:start+2]):
+        end = start + data[start+4] + 7
+        next_start = data.find(b'\x55\x55', end)
+        if next_start < 0:
+            next_start = len(data)
+        commands.append(data[start:next_start])
+        start = next_start
+
+    if start < len(data):
+        commands.append(data[start:])
+    return commands
+
+
 def build_output_packet(packet_type, payload):
     packed_command_start = struct.pack('2B', *[0x55, 0x55])
     packed_packet_type = packet_type.encode()
@@ -0,0 +1,164 @@
+import sys
+import socket
+import asyncio
+import threading
+import unittest
+
+try:
+    from aceinna.devices.base.message_parser_base import MessageParserBase
+    from aceinna.devices.message_center import EVENT_TYPE
+    from aceinna.devices.async_message_center import (
+        AsyncDeviceMessageCenter, execute_device_message)
+    from aceinna.devices.decorator import with_device_message
+    from aceinna.framework.constants import INTERFACES
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.base.message_parser_base import MessageParserBase
+    from aceinna.devices.message_center import EVENT_TYPE
+    from aceinna.devices.async_message_center import (
+        AsyncDeviceMessageCenter, execute_device_message)
+    from aceinna.devices.decorator import with_device_message
+    from aceinna.framework.constants import INTERFACES
+
+
+class SocketCommunicator(object):
+    '''
+    LAN like communicator, the device replies 'ack' + command with '\\n'
+    as frame end, a command ends with '!' is not replied
+    '''
+
+    def __init__(self):
+        self.type = INTERFACES.ETH
+        self.sock, self.device_sock = socket.socketpair()
+        self.written = []
+
+    def write(self, data, is_flush=False):
+        self.written.append(data)
+        if not data.endswith(b'!'):
+            self.device_sock.send(b'ack' + data + b'\n')
+
+    def read(self, size=100):
+        return self.sock.recv(size)
+
+    def reset_buffer(self):
+        pass
+
+    def close(self):
+        self.sock.close()
+        self.device_sock.close()
+
+
+class LineParser(MessageParserBase):
+    def __init__(self):
+        super(LineParser, self).__init__(None)
+        self._buffer = b''
+
+    def set_run_command(self, command):
+        pass
+
+    def get_packet_info(self, command):
+        return {'packet_type': command, 'data': None, 'raw': command}
+
+    def get_command_key(self, command):
+        items = command.rstrip(b'!').split(b':')
+        return items[0], int(items[1]) if len(items) > 1 else None
+
+    def analyse(self, data):
+        self._buffer += data
+        while b'\n' in self._buffer:
+            line, self._buffer = self._buffer.split(b'\n', 1)
+            items = line[3:].split(b':')
+            response_data = {'paramId': int(items[1])} \
+                if len(items) > 1 else []
+            self.emit('command', packet_type=items[0], data=response_data,
+                      error=False, raw=line)
+
+
+class TestAsyncDeviceMessageCenter(unittest.TestCase):
+    '''
+    Test message center on asyncio loop
+    '''
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.communicator = SocketCommunicator()
+        self.message_center = AsyncDeviceMessageCenter(
+            self.communicator, self.loop)
+        self.message_center.set_parser(LineParser())
+        self.errors = []
+        self.message_center.on(
+            EVENT_TYPE.ERROR, lambda *args: self.errors.append(args))
+
+    def tearDown(self):
+        self.message_center.stop()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+        self.communicator.close()
+
+    def run_loop(self, coroutine):
+        async def setup_and_run():
+            self.message_center.setup()
+            return await coroutine
+        return self.loop.run_until_complete(setup_and_run())
+
+    def test_command_without_thread(self):
+        message_center = self.message_center
+
+        def get_version():
+            result = yield message_center.build(command=b'gV')
+            return result
+
+        thread_count = threading.active_count()
+        result = self.run_loop(execute_device_message(get_version()))
+
+        self.assertEqual(result['packet_type'], b'gV')
+        self.assertFalse(result['error'])
+        self.assertEqual(threading.active_count(), thread_count)
+
+    def test_pipelined_messages(self):
+        message_center = self.message_center
+        message_center.set_pipeline_window(4)
+
+        def get_params():
+            results = yield [message_center.build(
+                command='gP:{0}'.format(i).encode()) for i in range(10)]
+            return results
+
+        results = self.run_loop(execute_device_message(get_params()))
+
+        self.assertEqual([item['raw'] for item in results],
+                         ['ackgP:{0}'.format(i).encode() for i in range(10)])
+
+    def test_timeout_on_loop(self):
+        message_center = self.message_center
+
+        def get_lost():
+            result = yield message_center.build(command=b'gL!', timeout=0.1)
+            return result
+
+        result = self.run_loop(execute_device_message(get_lost()))
+        self.assertEqual(result['error'], 'Timeout')
+
+    def test_blocking_call_from_other_thread(self):
+        message_center = self.message_center
+
+        @with_device_message
+        def ping():
+            result = yield message_center.build(command=b'pG')
+            return result
+
+        result = self.run_loop(self.loop.run_in_executor(None, ping))
+        self.assertEqual(result['packet_type'], b'pG')
+
+    def test_transport_error(self):
+        async def close_device():
+            await asyncio.sleep(0.05)
+            self.communicator.device_sock.close()
+            await asyncio.sleep(0.05)
+
+        self.run_loop(close_device())
+        self.assertEqual(len(self.errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    from aceinna.framework.columnar_log import (
+        ColumnarLogWriter, read_columnar_log, load_columnar_log, export_csv)
+    from aceinna.framework.file_storage import compile_row_formatter
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.columnar_log import (
+        ColumnarLogWriter, read_columnar_log, load_columnar_log, export_csv)
+    from aceinna.framework.file_storage import compile_row_formatter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+OUTPUT_PACKET = {
+    'name': 'z1',
+    'payload': [
+        {'type': 'uint32', 'name': 'time', 'unit': 'ms'},
+        {'type': 'double', 'name': 'latitude', 'unit': 'deg'},
+        {'type': 'float', 'name': 'xAccel', 'unit': 'm/s^2'},
+        {'type': 'uint8', 'name': 'status', 'unit': ''},
+        {'type': 'int16', 'name': 'scaled', 'unit': '', 'scaling': 0.1}
+    ]
+}
+
+
+def build_row(index):
+    return {
+        'time': index,
+        'latitude': 31.123456789 + index,
+        'xAccel': 9.75,
+        'status': index % 256,
+        'scaled': index * 0.1
+    }
+
+
+# pylint: disable=missing-class-docstring
+class TestColumnarLog(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, 'z1.clog')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, rows, chunk_records=16):
+        writer = ColumnarLogWriter(
+            self.file_path, OUTPUT_PACKET, chunk_records)
+        for row in rows:
+            writer.append(row)
+        writer.close()
+        return writer
+
+    def test_read_records_across_chunks(self):
+        writer = self._write([build_row(i) for i in range(100)])
+
+        header, records = read_columnar_log(self.file_path)
+        self.assertEqual(writer.record_count, 100)
+        self.assertEqual(header['packetType'], 'z1')
+        self.assertEqual([field['name'] for field in header['fields']],
+                         ['time', 'latitude', 'xAccel', 'status', 'scaled'])
+        self.assertEqual(len(records), 100)
+        self.assertEqual(records[99][0], 99)
+        self.assertEqual(records[99][1], 31.123456789 + 99)
+        self.assertEqual(records[99][4], 99 * 0.1)
+
+    def test_drop_incomplete_row(self):
+        writer = self._write([build_row(0), {'time': 1}, build_row(2)])
+
+        _, records = read_columnar_log(self.file_path)
+        self.assertEqual(writer.dropped_count, 1)
+        self.assertEqual([record[0] for record in records], [0, 2])
+
+    def test_close_while_appending(self):
+        writer = ColumnarLogWriter(self.file_path, OUTPUT_PACKET, 4)
+        errors = []
+
+        def append_rows():
+            try:
+                for index in range(20000):
+                    writer.append(build_row(index))
+            except Exception as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+        thread = threading.Thread(target=append_rows)
+        thread.start()
+        writer.close()
+        thread.join()
+
+        _, records = read_columnar_log(self.file_path)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(records), writer.record_count)
+        self.assertEqual(writer.record_count + writer.dropped_count, 20000)
+
+    def test_export_csv_same_as_live_log(self):
+        rows = [build_row(i) for i in range(20)]
+        self._write(rows)
+
+        csv_path = export_csv(self.file_path)
+        with open(csv_path) as csv_file:
+            content = csv_file.read()
+
+        header, format_row = compile_row_formatter(
+            OUTPUT_PACKET, list(rows[0].keys()))
+        self.assertEqual(
+            content, header + ''.join([format_row(row) for row in rows]))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_load_into_numpy(self):
+        self._write([build_row(i) for i in range(100)])
+
+        records = load_columnar_log(self.file_path)
+        self.assertEqual(len(records), 100)
+        self.assertEqual(int(records['time'][-1]), 99)
+        self.assertEqual(int(records['status'].sum()),
+                         sum([i % 256 for i in range(100)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import random
+import unittest
+
+try:
+    from aceinna.framework.utils import helper
+    from aceinna.framework.utils.crc import (CRC16, crc16, crc16_tuple)
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.utils import helper
+    from aceinna.framework.utils.crc import (CRC16, crc16, crc16_tuple)
+
+
+def bitwise_crc(payload):
+    '''
+    The former bit by bit implementation
+    '''
+    crc = 0x1D0F
+    for bytedata in payload:
+        crc = crc ^ (bytedata << 8)
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ 0x1021
+            else:
+                crc = crc << 1
+    return crc & 0xffff
+
+
+class TestCRC16(unittest.TestCase):
+    '''
+    Test CRC16 is same as the bit by bit implementation
+    '''
+
+    def setUp(self):
+        random.seed(1)
+        self.samples = [bytes(bytearray(random.randint(0, 255)
+                                        for _ in range(length)))
+                        for length in [0, 1, 2, 7, 64, 255, 1024]]
+
+    def test_equivalence(self):
+        for sample in self.samples:
+            expect = bitwise_crc(bytearray(sample))
+            self.assertEqual(crc16(sample), expect)
+            self.assertEqual(crc16(bytearray(sample)), expect)
+            self.assertEqual(crc16(memoryview(sample)), expect)
+            self.assertEqual(crc16(list(bytearray(sample))), expect)
+            self.assertEqual(crc16_tuple(sample), (expect >> 8, expect & 0xFF))
+
+    def test_memoryview_slice(self):
+        sample = self.samples[-1]
+        view = memoryview(sample)
+        self.assertEqual(crc16(view[10:100]),
+                         bitwise_crc(bytearray(sample[10:100])))
+
+    def test_update(self):
+        for sample in self.samples:
+            crc = CRC16()
+            for i in range(0, len(sample), 5):
+                crc.update(sample[i:i+5])
+            self.assertEqual(crc.value, crc16(sample))
+            self.assertEqual(crc.to_tuple(), crc16_tuple(sample))
+
+        crc.reset()
+        self.assertEqual(crc.value, crc16(b''))
+
+    def test_helper_calc_crc(self):
+        for sample in self.samples:
+            expect = bitwise_crc(bytearray(sample))
+            self.assertEqual(helper.calc_crc(list(bytearray(sample))),
+                             [expect >> 8, expect & 0xFF])
+
+
+if __name__ == '__main__':
+    unittest.main()
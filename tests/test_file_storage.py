@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+try:
+    from aceinna.framework.file_storage import (
+        FileLoger, BufferedLogWriter, compile_row_formatter)
+    from aceinna.framework.columnar_log import read_columnar_log
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.file_storage import (
+        FileLoger, BufferedLogWriter, compile_row_formatter)
+    from aceinna.framework.columnar_log import read_columnar_log
+
+OUTPUT_PACKET = {
+    'name': 'z1',
+    'payload': [
+        {'type': 'uint32', 'name': 'time', 'unit': 'ms'},
+        {'type': 'double', 'name': 'latitude', 'unit': 'deg'},
+        {'type': 'float', 'name': 'xAccel', 'unit': 'm/s^2'},
+        {'type': 'uint8', 'name': 'status', 'unit': ''},
+        {'type': 'char', 'name': 'mode', 'unit': ''},
+        {'type': 'int16', 'name': 'scaled', 'unit': '', 'scaling': 0.1},
+        {'type': 'unknown', 'name': 'other', 'unit': ''}
+    ]
+}
+
+ROW = {
+    'time': 1000,
+    'latitude': 31.123456789,
+    'xAccel': 9.80665,
+    'status': 1,
+    'mode': 'A',
+    'scaled': 1.5,
+    'other': 2.5
+}
+
+
+# pylint: disable=missing-class-docstring
+class TestRowFormatter(unittest.TestCase):
+    def test_format_by_payload_type(self):
+        header, format_row = compile_row_formatter(
+            OUTPUT_PACKET, list(ROW.keys()))
+
+        self.assertEqual(
+            header,
+            'time (ms),latitude (deg),xAccel (m/s^2),status,mode,scaled,other\n')
+        self.assertEqual(
+            format_row(ROW),
+            '1000,31.12345679,9.8066,1,A,1.5,2.50000\n')
+
+    def test_skip_keys_not_in_payload(self):
+        keys = ['time', 'extra']
+        header, format_row = compile_row_formatter(OUTPUT_PACKET, keys)
+
+        self.assertEqual(header, 'time (ms)\n')
+        self.assertEqual(format_row({'time': 1, 'extra': 2}), '1\n')
+
+
+class TestFileLoger(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_rows_saved_on_stop(self):
+        file_logger = FileLoger(
+            {'userMessages': {'outputPackets': [OUTPUT_PACKET]}})
+        file_logger.root_folder = self.folder
+        self.assertEqual(file_logger.start_user_log('test'), 0)
+
+        for i in range(1000):
+            row = dict(ROW)
+            row['time'] = i
+            file_logger.append('z1', row)
+
+        self.assertEqual(file_logger.stop_user_log(), 0)
+
+        log_folder = os.path.join(self.folder, os.listdir(self.folder)[0])
+        with open(os.path.join(log_folder, 'test_z1.csv')) as log_file:
+            lines = log_file.readlines()
+        self.assertEqual(len(lines), 1001)
+        self.assertTrue(lines[0].startswith('time (ms),'))
+        self.assertTrue(lines[-1].startswith('999,'))
+
+    def test_binary_log(self):
+        file_logger = FileLoger(
+            {'userMessages': {'outputPackets': [OUTPUT_PACKET]}},
+            log_format='binary')
+        file_logger.root_folder = self.folder
+        self.assertEqual(file_logger.start_user_log('test'), 0)
+
+        for i in range(100):
+            row = dict(ROW)
+            row['time'] = i
+            file_logger.append('z1', row)
+
+        self.assertEqual(file_logger.stop_user_log(), 0)
+
+        log_folder = os.path.join(self.folder, os.listdir(self.folder)[0])
+        _, records = read_columnar_log(
+            os.path.join(log_folder, 'test_z1.clog'))
+        self.assertEqual([record[0] for record in records], list(range(100)))
+
+
+class TestBufferedLogWriter(unittest.TestCase):
+    def test_flush_when_size_reached(self):
+        folder = tempfile.mkdtemp()
+        file_path = os.path.join(folder, 'log.csv')
+        file_obj = open(file_path, 'w')
+        writer = BufferedLogWriter(flush_interval=60, flush_size=10)
+        writer.add_file('log', file_obj)
+        writer.start()
+
+        writer.write('log', '0123456789\n')
+        for _ in range(100):
+            with open(file_path) as reader:
+                if reader.read() == '0123456789\n':
+                    break
+            time.sleep(0.01)
+        else:
+            self.fail('rows are not flushed by size')
+
+        writer.stop()
+        self.assertFalse(writer.write('log', 'after stop'))
+        file_obj.close()
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
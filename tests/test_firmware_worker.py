@@ -0,0 +1,116 @@
+import sys
+import struct
+import unittest
+
+try:
+    from aceinna.devices.upgrade_workers import (
+        FirmwareUpgradeWorker, UPGRADE_EVENT)
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    sys.path.append('./tests')
+    from aceinna.devices.upgrade_workers import (
+        FirmwareUpgradeWorker, UPGRADE_EVENT)
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+
+
+def write_command_generator(data_len, current, data):
+    message_bytes = []
+    message_bytes.extend(struct.pack('>I', current))
+    message_bytes.extend(struct.pack('B', data_len))
+    message_bytes.extend(data)
+    return helper.build_packet('WA', message_bytes)
+
+
+def upgrade(bootloader_setup, content, window_size):
+    communicator = MockCommunicator({'device': 'BOOTLOADER'})
+    bootloader = communicator.device_access._app
+    bootloader_setup(bootloader)
+    worker = FirmwareUpgradeWorker(
+        communicator, content, write_command_generator,
+        window_size=window_size, ack_timeout=0.5)
+    results = []
+    worker.on(UPGRADE_EVENT.FINISH, lambda *args: results.append('finish'))
+    worker.on(UPGRADE_EVENT.ERROR, lambda *args: results.append(args[1]))
+    try:
+        worker.work()
+    finally:
+        communicator.close()
+    return worker, bootloader, results
+
+
+# pylint: disable=missing-class-docstring
+class TestFirmwareWorker(unittest.TestCase):
+    def setUp(self):
+        self.content = bytes([index % 251 for index in range(240 * 20 + 100)])
+
+    def test_windowed(self):
+        worker, bootloader, results = upgrade(
+            lambda bootloader: None, self.content, 8)
+
+        self.assertEqual(results, ['finish'])
+        self.assertEqual(bytes(bootloader.flash), self.content)
+        self.assertEqual(worker.retransmit_count, 0)
+
+    def test_stop_and_wait_without_ack_address(self):
+        def setup(bootloader):
+            bootloader.is_ack_with_address = False
+
+        worker, bootloader, results = upgrade(setup, self.content, 8)
+
+        self.assertEqual(results, ['finish'])
+        self.assertEqual(bytes(bootloader.flash), self.content)
+        # one block is written at a time
+        self.assertEqual(bootloader.write_count, 21)
+
+    def test_retransmit_on_nak(self):
+        def setup(bootloader):
+            bootloader.nak_addresses = set([240 * 5])
+
+        worker, bootloader, results = upgrade(setup, self.content, 8)
+
+        self.assertEqual(results, ['finish'])
+        self.assertEqual(bytes(bootloader.flash), self.content)
+        self.assertEqual(worker.retransmit_count, 1)
+
+    def test_first_block_waits_for_erase(self):
+        def setup(bootloader):
+            bootloader.erase_delay = 0.8
+
+        for window_size in [1, 8]:
+            worker, bootloader, results = upgrade(
+                setup, self.content, window_size)
+
+            self.assertEqual(results, ['finish'])
+            self.assertEqual(bytes(bootloader.flash), self.content)
+            # the first ack is waited longer than ack timeout
+            self.assertEqual(worker.retransmit_count, 0)
+            phases = dict(worker.phase_timings)
+            self.assertEqual([phase for phase, _ in worker.phase_timings],
+                             ['prepare', 'erase', 'write', 'complete'])
+            self.assertGreaterEqual(phases['erase'], 0.8)
+            self.assertLess(phases['write'], 0.8)
+
+    def test_write_error_reported(self):
+        def write(data, is_flush=False):
+            raise IOError('port is closed')
+
+        communicator = MockCommunicator({'device': 'BOOTLOADER'})
+        communicator.write = write
+        worker = FirmwareUpgradeWorker(
+            communicator, self.content, write_command_generator,
+            window_size=8)
+        results = []
+        worker.on(UPGRADE_EVENT.ERROR, lambda *args: results.append(args[1]))
+        try:
+            worker.work()
+        finally:
+            communicator.close()
+
+        self.assertEqual(results, ['Fail in write block at 0: port is closed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
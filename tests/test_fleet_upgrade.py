@@ -0,0 +1,181 @@
+import sys
+import time
+import struct
+import threading
+import unittest
+
+try:
+    from aceinna.core.event_base import EventBase
+    from aceinna.core.driver import DriverEvents
+    from aceinna.core.fleet_upgrade import (FleetUpgrade, FleetUpgradeStatus)
+    from aceinna.framework.utils import helper
+    from aceinna.framework.utils.firmware_parser import (
+        parser, FirmwareBundle)
+    from aceinna.models import InternalCombineAppParseRule
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.core.event_base import EventBase
+    from aceinna.core.driver import DriverEvents
+    from aceinna.core.fleet_upgrade import (FleetUpgrade, FleetUpgradeStatus)
+    from aceinna.framework.utils import helper
+    from aceinna.framework.utils.firmware_parser import (
+        parser, FirmwareBundle)
+    from aceinna.models import InternalCombineAppParseRule
+
+PARSER_RULES = [
+    InternalCombineAppParseRule('rtk', 'rtk_start:', 4),
+    InternalCombineAppParseRule('ins', 'ins_start:', 4),
+]
+
+
+def build_firmware():
+    return b'rtk_start:' + struct.pack('<L', 20) + bytes(20) + \
+        b'ins_start:' + struct.pack('<L', 32) + bytes(range(32))
+
+
+class _Provider(object):
+    def __init__(self, connected=True):
+        self.connected = connected
+        self.is_upgrading = False
+        self.download_count = 0
+        self.contents = []
+
+    def download_firmware(self, file):
+        self.download_count += 1
+        return True, build_firmware()
+
+
+class _Driver(object):
+    def __init__(self, device_provider):
+        self.device_provider = device_provider
+
+
+class _MultiDriver(EventBase):
+    ''' Devices are upgraded in threads, it takes duration seconds
+    '''
+
+    def __init__(self, device_ids, duration=0.1, failed_ids=()):
+        super(_MultiDriver, self).__init__()
+        self.device_ids = device_ids
+        self.drivers = dict([(device_id, _Driver(_Provider()))
+                             for device_id in device_ids])
+        self.duration = duration
+        self.failed_ids = failed_ids
+        self.upgrading_ids = set()
+        # max count of devices upgrading at a time, and (device, others)
+        self.max_upgrading = 0
+        self.overlaps = []
+        self._lock = threading.Lock()
+
+    def get_driver(self, device_id):
+        return self.drivers.get(device_id)
+
+    def execute(self, method, parameters, device_id):
+        device_provider = self.drivers[device_id].device_provider
+        device_provider.contents.append(parser(
+            parameters['file'], PARSER_RULES))
+        with self._lock:
+            self.overlaps.append((device_id, set(self.upgrading_ids)))
+            self.upgrading_ids.add(device_id)
+            self.max_upgrading = max(
+                self.max_upgrading, len(self.upgrading_ids))
+        threading.Thread(target=self._upgrade, args=(device_id,)).start()
+        return {'packetType': 'success'}
+
+    def _upgrade(self, device_id):
+        self.emit(DriverEvents.Continous, 'upgrade_progress',
+                  {'addr': 26, 'fs_len': 52}, device_id)
+        time.sleep(self.duration)
+        with self._lock:
+            self.upgrading_ids.remove(device_id)
+        if device_id in self.failed_ids:
+            self.emit(DriverEvents.UpgradeFail, 'UPGRADE.FAILED.001',
+                      'write fail', device_id)
+        else:
+            self.emit(DriverEvents.UpgradeFinished, device_id)
+
+
+# pylint: disable=missing-class-docstring
+class TestFleetUpgrade(unittest.TestCase):
+    def test_bundle_parsed_once(self):
+        bundle = FirmwareBundle(build_firmware())
+        parsed_content = parser(bundle, PARSER_RULES)
+
+        self.assertIs(parser(bundle, PARSER_RULES), parsed_content)
+        self.assertIsInstance(parsed_content['ins'], memoryview)
+        self.assertIs(parsed_content['ins'].obj, bundle)
+        self.assertEqual(parsed_content, parser(build_firmware(), PARSER_RULES))
+        # parts not aligned are copied with padding
+        self.assertEqual(helper.format_firmware_content(
+            parsed_content['rtk']), bytes(32))
+        self.assertIs(helper.format_firmware_content(
+            parsed_content['ins']), parsed_content['ins'])
+
+    def test_bounded_workers(self):
+        device_ids = ['COM{0}'.format(index) for index in range(6)]
+        driver = _MultiDriver(device_ids)
+        fleet_upgrade = FleetUpgrade(driver)
+        statuses = []
+        fleet_upgrade.on('status', lambda device_id, status: statuses.append(
+            (device_id, status['status'])))
+
+        report = fleet_upgrade.run('firmware.bin', max_workers=3)
+
+        self.assertEqual(driver.max_upgrading, 3)
+        self.assertEqual([device['status'] for device in report['devices']],
+                         [FleetUpgradeStatus.Success] * 6)
+        self.assertEqual(report['devices'][0]['current'], 26)
+        self.assertLess(report['duration'], 1)
+        self.assertEqual(len(statuses), 12)
+        # firmware is loaded once, parts are shared by devices
+        providers = [driver.get_driver(device_id).device_provider
+                     for device_id in device_ids]
+        self.assertEqual(sum([item.download_count for item in providers]), 1)
+        self.assertTrue(all([item.contents[0] is providers[0].contents[0]
+                             for item in providers]))
+
+    def test_link_limit(self):
+        device_ids = ['COM1', 'COM2', 'COM3', 'COM4']
+        driver = _MultiDriver(device_ids)
+        fleet_upgrade = FleetUpgrade(driver)
+
+        report = fleet_upgrade.run(
+            build_firmware(), max_workers=4, link_limit=1,
+            links={'COM1': 'hub', 'COM2': 'hub', 'COM3': 'hub'})
+
+        self.assertEqual([device['link'] for device in report['devices']],
+                         ['hub', 'hub', 'hub', 'COM4'])
+        self.assertEqual(driver.max_upgrading, 2)
+        for device_id, others in driver.overlaps:
+            if device_id != 'COM4':
+                self.assertEqual(others - set(['COM4']), set())
+
+    def test_results_of_devices(self):
+        driver = _MultiDriver(['COM1', 'COM2', 'COM3'], failed_ids=['COM2'])
+        driver.get_driver('COM3').device_provider.connected = False
+        fleet_upgrade = FleetUpgrade(driver)
+        finished = []
+        fleet_upgrade.on('finish', finished.append)
+
+        self.assertTrue(fleet_upgrade.start('firmware.bin'))
+        self.assertFalse(fleet_upgrade.start('firmware.bin'))
+        while fleet_upgrade.is_running:
+            time.sleep(0.01)
+
+        devices = finished[0]['devices']
+        self.assertEqual([device['status'] for device in devices], [
+            FleetUpgradeStatus.Success, FleetUpgradeStatus.Failed,
+            FleetUpgradeStatus.Failed])
+        self.assertEqual(devices[1]['message'],
+                         'UPGRADE.FAILED.001: write fail')
+        self.assertEqual(devices[2]['message'], 'Device is not connected')
+        self.assertGreater(devices[0]['duration'], 0)
+        # upgrade of device out of fleet upgrade is not counted
+        driver.emit(DriverEvents.UpgradeFail, 'UPGRADE.FAILED.001', '',
+                    'COM1')
+        self.assertEqual(fleet_upgrade.get_report()['devices'][0]['status'],
+                         FleetUpgradeStatus.Success)
+
+
+if __name__ == '__main__':
+    unittest.main()
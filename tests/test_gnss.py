@@ -0,0 +1,78 @@
+import sys
+import struct
+import unittest
+
+try:
+    from aceinna.core.gnss import (RTCMParser, calc_crc)
+    from aceinna.framework.utils.crc import (CRC24Q_TABLE, crc24q)
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.core.gnss import (RTCMParser, calc_crc)
+    from aceinna.framework.utils.crc import (CRC24Q_TABLE, crc24q)
+
+
+def build_rtcm_frame(message_type, body_len):
+    payload = bytearray(struct.pack('>H', message_type << 4))
+    payload.extend(bytearray([i & 0xFF for i in range(body_len)]))
+    frame = bytearray([0xD3, len(payload) >> 8, len(payload) & 0xFF])
+    frame.extend(payload)
+    crc = crc24q(frame)
+    frame.extend([crc >> 16, (crc >> 8) & 0xFF, crc & 0xFF])
+    return bytes(frame)
+
+
+class TestRTCMParser(unittest.TestCase):
+    '''
+    Test RTCM3 framer
+    '''
+
+    def setUp(self):
+        self.parser = RTCMParser()
+        self.frames = []
+        self.parser.on('parsed', self.handle_parsed)
+
+    def handle_parsed(self, data):
+        self.frames.extend([bytes(item) for item in data])
+
+    def test_crc24q_table(self):
+        self.assertEqual(CRC24Q_TABLE[1], 0x864CFB)
+        self.assertEqual(CRC24Q_TABLE[255], 0xDD8538)
+        frame = build_rtcm_frame(1005, 17)
+        self.assertEqual(calc_crc(list(frame), len(frame) - 3),
+                         crc24q(frame[:-3]))
+
+    def test_parse_frames(self):
+        frames = [build_rtcm_frame(1005, 17), build_rtcm_frame(1074, 200),
+                  build_rtcm_frame(1077, 300)]
+        self.parser.receive(b'\x00\x01' + b''.join(frames))
+
+        self.assertEqual(self.frames, frames)
+
+    def test_parse_frames_across_chunks(self):
+        frames = [build_rtcm_frame(1087, 100), build_rtcm_frame(1127, 50)]
+        data = b'\xd3' + b''.join(frames)
+        for i in range(0, len(data), 7):
+            self.parser.receive(data[i:i+7])
+
+        self.assertEqual(self.frames, frames)
+
+    def test_statistics(self):
+        broken_frame = bytearray(build_rtcm_frame(1077, 10))
+        broken_frame[-1] ^= 0xFF
+        data = build_rtcm_frame(1005, 17) + build_rtcm_frame(1074, 20) + \
+            build_rtcm_frame(1074, 30) + bytes(broken_frame)
+        self.parser.receive(data)
+
+        statistics = self.parser.get_statistics()
+        self.assertEqual(statistics['valid_packet_count'], 3)
+        self.assertEqual(statistics['crc_failed_count'], 1)
+        message_statistics = statistics['message_statistics']
+        self.assertEqual(message_statistics[1005],
+                         {'packets': 1, 'bytes': 25, 'crc_failures': 0})
+        self.assertEqual(message_statistics[1074]['packets'], 2)
+        self.assertEqual(message_statistics[1074]['bytes'], 28 + 38)
+        self.assertEqual(message_statistics[1077]['crc_failures'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import shutil
+import datetime
+import tempfile
+import unittest
+
+try:
+    from aceinna.tools.kml_writer import (
+        GnssKmlWriter, InsKmlWriter, GnssPoint, InsPoint,
+        gps_to_utc_seconds, utc_time)
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.tools.kml_writer import (
+        GnssKmlWriter, InsKmlWriter, GnssPoint, InsPoint,
+        gps_to_utc_seconds, utc_time)
+
+
+def build_ins_point(tow):
+    return InsPoint(2100, tow/1000, tow % 1000, 3, 4, 31.1, 121.2, 10.0,
+                    1.0, 2.0, 0.5, 0.1, 0.2, 90.0)
+
+
+class TestKmlWriter(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _read(self, name):
+        with open(os.path.join(self.folder, name)) as kml_file:
+            return kml_file.read()
+
+    def test_gps_to_utc(self):
+        epoch = datetime.datetime(1980, 1, 6)
+        for week, seconds in [(2100, 380000.25), (2100, 10.5), (1, 0.0),
+                              (2200, 604799.9999999), (2100, 17.9999999)]:
+            expected = epoch + datetime.timedelta(
+                days=week*7, seconds=seconds - 18)
+            self.assertEqual(
+                utc_time(gps_to_utc_seconds(week, seconds)),
+                expected.timetuple()[:6])
+
+    def test_ins_kml_decimated(self):
+        kml_path = os.path.join(self.folder, 'ins.kml')
+        writer = InsKmlWriter(kml_path, 5)
+        # 10hz points, the last one is not at 5hz
+        for tow in range(380000000, 380001000, 100):
+            writer.add(build_ins_point(tow))
+        writer.add(build_ins_point(380001050))
+        writer.close()
+
+        kml = self._read('ins.kml')
+        track = kml[kml.index('<LineString>'):kml.index('</LineString>')]
+        self.assertEqual(track.count('121.200000000,31.100000000,10.000'), 5)
+        self.assertEqual(kml.count('<Placemark>\n<TimeStamp>'), 4)
+        self.assertEqual(kml.count('<name>Start</name>'), 1)
+        self.assertEqual(kml.count('<name>End</name>'), 1)
+        self.assertIn('<when>2020-04-09T09:33:03.05Z</when>', kml)
+        self.assertTrue(kml.endswith('</Folder>\n</Document>\n</kml>\n'))
+
+    def test_gnss_kml_skips_no_position(self):
+        kml_path = os.path.join(self.folder, 'gnss.kml')
+        writer = GnssKmlWriter(kml_path)
+        writer.add(GnssPoint(2100, 1.0, 0, 0, 0.0, 0.0, 0.0, 0, 0, 0))
+        writer.add(GnssPoint(2100, 2.0, 0, 4, 31.1, 121.2, 10.0, 1, 1, 0))
+        writer.close()
+
+        kml = self._read('gnss.kml')
+        self.assertEqual(kml.count('<Point>'), 1)
+        self.assertIn('<styleUrl>#P4</styleUrl>', kml)
+        self.assertIn('<heading>45.0000</heading>', kml)
+        self.assertIn('RTKFIXED', kml)
+
+    def test_parts_same_as_whole(self):
+        points = [build_ins_point(tow)
+                  for tow in range(380000000, 380002000, 100)]
+        whole = InsKmlWriter(os.path.join(self.folder, 'whole.kml'), 5)
+        whole.extend(points)
+        whole.close()
+
+        # parts of 1, 0, 2, 3 and 14 points
+        bounds = [0, 1, 1, 3, 6, 20]
+        parts = []
+        for index, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            part = InsKmlWriter(os.path.join(
+                self.folder, 'part{0}.kml'.format(index)), 5, True)
+            part.extend(points[start:end])
+            part.close()
+            parts.append(part.get_part())
+        merged = InsKmlWriter(os.path.join(self.folder, 'merged.kml'), 5)
+        for part in parts:
+            merged.add_part(part)
+        merged.close()
+
+        self.assertEqual(self._read('merged.kml'), self._read('whole.kml'))
+        self.assertEqual(merged.count, 20)
+        self.assertEqual(sorted(os.listdir(self.folder)),
+                         ['merged.kml', 'whole.kml'])
+
+
+if __name__ == '__main__':
+    unittest.main()
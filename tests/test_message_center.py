@@ -0,0 +1,377 @@
+import sys
+import time
+import threading
+import unittest
+
+try:
+    from aceinna.devices.base.message_parser_base import MessageParserBase
+    from aceinna.devices.message_center import (
+        DeviceMessageCenter, EVENT_TYPE, READ_BUFFER_COUNT)
+    from aceinna.devices.decorator import with_device_message
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.base.message_parser_base import MessageParserBase
+    from aceinna.devices.message_center import (
+        DeviceMessageCenter, EVENT_TYPE, READ_BUFFER_COUNT)
+    from aceinna.devices.decorator import with_device_message
+
+
+class FakeCommunicator(object):
+    def __init__(self):
+        self.type = 'uart'
+        self.read_count = 0
+        self.written = []
+        self._chunks = []
+        self._lock = threading.Lock()
+        self._raise = False
+        self.echo = False
+
+    def feed(self, data):
+        with self._lock:
+            self._chunks.append(data)
+
+    def fail(self):
+        self._raise = True
+
+    def write(self, data, is_flush=False):
+        self.written.append(data)
+        if self.echo:
+            self.feed(b'ack' + data)
+
+    def read(self, size=100):
+        self.read_count += 1
+        if self._raise:
+            raise Exception('read error')
+        with self._lock:
+            if self._chunks:
+                return self._chunks.pop(0)
+        return None
+
+    def reset_buffer(self):
+        pass
+
+
+class FakeBufferedCommunicator(FakeCommunicator):
+    def __init__(self):
+        super(FakeBufferedCommunicator, self).__init__()
+        self.high_throughput = True
+        self.read_buffer_size = 16
+        self.buffer_ids = set()
+
+    def read_into(self, buffer):
+        self.buffer_ids.add(id(buffer))
+        data = self.read()
+        if not data:
+            time.sleep(0.01)
+            return 0
+        buffer[:len(data)] = data
+        return len(data)
+
+    def get_read_statistics(self):
+        return {'read_call_count': self.read_count}
+
+
+class FakeParser(MessageParserBase):
+    '''
+    Command is packet type and optional param id split by ':',
+    response is 'ack' + command
+    '''
+
+    def __init__(self):
+        super(FakeParser, self).__init__(None)
+        self.analysed = []
+
+    def set_run_command(self, command):
+        pass
+
+    def get_packet_info(self, command):
+        return {'packet_type': command, 'data': None, 'raw': command}
+
+    def get_command_key(self, command):
+        items = command.split(b':')
+        return items[0], int(items[1]) if len(items) > 1 else None
+
+    def analyse(self, data):
+        # data read into buffer is a memoryview of reused buffer
+        data = bytes(data)
+        self.analysed.append(data)
+        if data[:3] == b'ack':
+            items = data[3:].split(b':')
+            response_data = {'paramId': int(items[1])} \
+                if len(items) > 1 else []
+            self.emit('command', packet_type=items[0], data=response_data,
+                      error=False, raw=data)
+
+
+class SlowParser(FakeParser):
+    def analyse(self, data):
+        time.sleep(0.005)
+        super(SlowParser, self).analyse(data)
+
+
+def wait_until(predicate, timeout=2):
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestDeviceMessageCenter(unittest.TestCase):
+    '''
+    Test receive pipeline and timeout scheduler of message center
+    '''
+
+    def setUp(self):
+        self.communicator = FakeCommunicator()
+        self.parser = FakeParser()
+        self.message_center = DeviceMessageCenter(self.communicator)
+        self.message_center.set_parser(self.parser)
+        self.errors = []
+        self.message_center.on(
+            EVENT_TYPE.ERROR, lambda *args: self.errors.append(args))
+        self.message_center.setup()
+
+    def tearDown(self):
+        self.message_center.stop()
+
+    def test_parse_in_order_with_metrics(self):
+        for i in range(50):
+            self.communicator.feed(bytes(bytearray([i])))
+
+        self.assertTrue(wait_until(lambda: len(self.parser.analysed) == 50))
+        self.assertEqual(self.parser.analysed,
+                         [bytes(bytearray([i])) for i in range(50)])
+
+        statistics = self.message_center.get_statistics()
+        self.assertEqual(statistics['handoff_count'], 50)
+        self.assertEqual(statistics['queue_depth'], 0)
+        self.assertTrue(statistics['max_queue_depth'] >= 1)
+        self.assertTrue(statistics['handoff_latency_max'] >=
+                        statistics['handoff_latency_avg'] >= 0)
+
+    def test_command_response(self):
+        results = []
+        message = self.message_center.build(command=b'pG', timeout=1)
+        message.on('finished', lambda **kwargs: results.append(kwargs))
+        message.send()
+        self.communicator.feed(b'ackpG')
+
+        self.assertTrue(wait_until(lambda: len(results) == 1))
+        self.assertFalse(results[0]['error'])
+        self.assertEqual(message.result['packet_type'], b'pG')
+
+    def test_command_timeout_on_deadline(self):
+        results = []
+        start_time = time.time()
+        message = self.message_center.build(command=b'gV', timeout=0.2)
+        message.on('finished',
+                   lambda **kwargs: results.append(time.time() - start_time))
+        message.send()
+
+        self.assertTrue(wait_until(lambda: len(results) == 1))
+        self.assertTrue(0.2 <= results[0] < 0.4)
+
+    def test_queued_commands_time_out_in_turn(self):
+        results = []
+        for command in [b'c1', b'c2']:
+            message = self.message_center.build(command=command, timeout=0.1)
+            message.on('finished', lambda **kwargs: results.append(kwargs))
+            message.send()
+
+        self.assertTrue(wait_until(lambda: len(results) == 2))
+        self.assertEqual([item['packet_type'] for item in results],
+                         [b'c1', b'c2'])
+        self.assertEqual(self.communicator.written, [b'c1', b'c2'])
+
+    def test_read_error_reported_once(self):
+        self.communicator.fail()
+
+        self.assertTrue(wait_until(lambda: len(self.errors) > 0))
+        time.sleep(0.3)
+        self.assertEqual(len(self.errors), 1)
+
+    def test_pause_stops_reading(self):
+        self.message_center.pause()
+        self.assertTrue(wait_until(lambda: self.message_center.paused))
+        read_count = self.communicator.read_count
+        time.sleep(0.2)
+        self.assertEqual(self.communicator.read_count, read_count)
+
+    def test_concurrent_device_message_callers(self):
+        self.communicator.echo = True
+        message_center = self.message_center
+
+        @with_device_message
+        def send_command(command):
+            result = yield message_center.build(command=command, timeout=1)
+            return result
+
+        results = {}
+
+        def run_commands(name):
+            results[name] = [
+                send_command(name + str(i).encode())['packet_type']
+                for i in range(20)]
+
+        threads = [threading.Thread(target=run_commands, args=(name,))
+                   for name in [b'a', b'b', b'c']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        for name in [b'a', b'b', b'c']:
+            self.assertEqual(results[name],
+                             [name + str(i).encode() for i in range(20)])
+
+    def test_device_message_cancel(self):
+        message = self.message_center.build(command=b'gV', timeout=5)
+        message.send()
+        self.assertFalse(message.wait(0.05))
+
+        message.cancel()
+        self.assertTrue(message.wait(0))
+        self.assertEqual(message.result['error'], 'Cancelled')
+
+    def test_stop_wakes_waiting_messages(self):
+        messages = [self.message_center.build(command=command, timeout=5)
+                    for command in [b'c1', b'c2']]
+        for message in messages:
+            message.send()
+
+        self.message_center.stop()
+        for message in messages:
+            self.assertTrue(message.wait(1))
+            self.assertEqual(message.result['error'], 'Stopped')
+
+    def test_pipeline_window(self):
+        self.message_center.set_pipeline_window(3)
+        results = []
+        messages = [self.message_center.build(command=command, timeout=2)
+                    for command in [b'c1', b'c2', b'c3', b'c4']]
+        for message in messages:
+            message.on('finished', lambda **kwargs: results.append(kwargs))
+            message.send()
+
+        # only the window is written before any response
+        self.assertEqual(self.communicator.written, [b'c1', b'c2', b'c3'])
+
+        self.communicator.feed(b'ackc1')
+        self.assertTrue(wait_until(lambda: len(results) == 1))
+        self.assertEqual(self.communicator.written,
+                         [b'c1', b'c2', b'c3', b'c4'])
+
+    def test_pipeline_match_response_by_param_id(self):
+        self.message_center.set_pipeline_window(4)
+        messages = [self.message_center.build(command=command, timeout=2)
+                    for command in [b'gP:1', b'gP:2', b'gP:3', b'pG']]
+        for message in messages:
+            message.send()
+
+        for response in [b'ackgP:3', b'ackpG', b'ackgP:1', b'ackgP:2']:
+            self.communicator.feed(response)
+
+        for message in messages:
+            self.assertTrue(message.wait(1))
+        self.assertEqual([message.result['raw'] for message in messages],
+                         [b'ackgP:1', b'ackgP:2', b'ackgP:3', b'ackpG'])
+
+    def test_pipeline_timeout_per_message(self):
+        self.message_center.set_pipeline_window(2)
+        results = []
+        for command, timeout in [(b'gP:1', 0.1), (b'gP:2', 0.4)]:
+            message = self.message_center.build(
+                command=command, timeout=timeout)
+            message.on('finished', lambda **kwargs: results.append(kwargs))
+            message.send()
+
+        self.assertTrue(wait_until(lambda: len(results) == 1))
+        self.assertEqual(results[0]['error'], 'Timeout')
+        # late response of the timeout message is dropped
+        self.communicator.feed(b'ackgP:1')
+        self.communicator.feed(b'ackgP:2')
+        self.assertTrue(wait_until(lambda: len(results) == 2))
+        self.assertEqual(results[1]['raw'], b'ackgP:2')
+        self.assertFalse(results[1]['error'])
+
+
+class TestDeviceMessageCenterReadBuffer(unittest.TestCase):
+    '''
+    Test read into preallocated buffers
+    '''
+
+    def setUp(self):
+        self.communicator = FakeBufferedCommunicator()
+        self.parser = FakeParser()
+        self.message_center = DeviceMessageCenter(self.communicator)
+        self.message_center.set_parser(self.parser)
+        self.message_center.setup()
+
+    def tearDown(self):
+        self.message_center.stop()
+
+    def test_parse_from_reused_buffers(self):
+        chunks = [str(i).encode() * 4 for i in range(100)]
+        for chunk in chunks:
+            self.communicator.feed(chunk)
+
+        self.assertTrue(wait_until(lambda: len(self.parser.analysed) == 100))
+        self.assertEqual(self.parser.analysed, chunks)
+        self.assertTrue(len(self.communicator.buffer_ids) <= READ_BUFFER_COUNT)
+        self.assertTrue(
+            self.message_center.get_statistics()['read_call_count'] >= 100)
+
+    def test_command_response(self):
+        message = self.message_center.build(command=b'pG', timeout=1)
+        message.send()
+        self.communicator.feed(b'ackpG')
+
+        self.assertTrue(message.wait(1))
+        self.assertFalse(message.result['error'])
+        self.assertEqual(message.result['raw'], b'ackpG')
+
+
+class TestDeviceMessageCenterBoundedQueue(unittest.TestCase):
+    '''
+    Test receiver waits for parser when data queue is full
+    '''
+
+    def setUp(self):
+        self.communicator = FakeCommunicator()
+        self.parser = SlowParser()
+        self.message_center = DeviceMessageCenter(
+            self.communicator, queue_size=4)
+        self.message_center.set_parser(self.parser)
+        self.message_center.setup()
+
+    def tearDown(self):
+        self.message_center.stop()
+
+    def test_parse_all_with_bounded_depth(self):
+        chunks = [bytes(bytearray([i])) for i in range(50)]
+        for chunk in chunks:
+            self.communicator.feed(chunk)
+
+        self.assertTrue(wait_until(lambda: len(self.parser.analysed) == 50))
+        self.assertEqual(self.parser.analysed, chunks)
+
+        statistics = self.message_center.get_statistics()
+        self.assertTrue(statistics['max_queue_depth'] <= 4)
+        self.assertTrue(statistics['queue_full_count'] > 0)
+
+    def test_stop_when_queue_is_full(self):
+        for i in range(50):
+            self.communicator.feed(bytes(bytearray([i])))
+        self.assertTrue(wait_until(
+            lambda: self.message_center.get_statistics()['queue_full_count'] > 0))
+
+        self.message_center.stop()
+        for thread in self.message_center.threads:
+            thread.join(2)
+            self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
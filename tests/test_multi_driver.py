@@ -0,0 +1,90 @@
+import sys
+import unittest
+
+try:
+    from aceinna.core.driver import DriverEvents
+    from aceinna.core.multi_driver import (
+        MultiDriver, parse_device_ports, build_device_id)
+    from aceinna.framework.context import AppContext
+    from aceinna.models import WebserverArgs
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.core.driver import DriverEvents
+    from aceinna.core.multi_driver import (
+        MultiDriver, parse_device_ports, build_device_id)
+    from aceinna.framework.context import AppContext
+    from aceinna.models import WebserverArgs
+
+
+# pylint: disable=missing-class-docstring
+class TestMultiDriver(unittest.TestCase):
+    def test_parse_device_ports(self):
+        self.assertEqual(parse_device_ports(None), [])
+        self.assertEqual(parse_device_ports('COM3, COM4,,COM3'),
+                         ['COM3', 'COM4'])
+        self.assertEqual(parse_device_ports(['/dev/ttyUSB0']),
+                         ['/dev/ttyUSB0'])
+
+    def test_build_device_id(self):
+        self.assertEqual(build_device_id('COM3'), 'COM3')
+        self.assertEqual(build_device_id('/dev/ttyUSB0'), 'ttyUSB0')
+        self.assertEqual(build_device_id('\\\\.\\COM10'), 'COM10')
+
+    def test_drivers_of_ports(self):
+        driver = MultiDriver(WebserverArgs(com_ports='COM3,/dev/ttyUSB0'))
+
+        self.assertEqual(driver.device_ids, ['COM3', 'ttyUSB0'])
+        self.assertEqual(driver.get_driver('ttyUSB0')._options.com_port,
+                         '/dev/ttyUSB0')
+        self.assertIsNone(driver.get_driver())
+        self.assertTrue(driver.select('ttyUSB0'))
+        self.assertFalse(driver.select('COM5'))
+        self.assertEqual(driver.get_driver().device_id, 'ttyUSB0')
+
+        result = driver.execute('list_devices')
+        self.assertEqual(result['packetType'], 'devices')
+        self.assertEqual([item['selected'] for item in result['data']],
+                         [False, True])
+
+        result = driver.execute('get_params', None, 'COM5')
+        self.assertEqual(result['packetType'], 'error')
+
+    def test_duplicate_device_id(self):
+        with self.assertRaises(ValueError):
+            MultiDriver(WebserverArgs(com_ports='/dev/ttyUSB0,/tmp/ttyUSB0'))
+
+    def test_forward_events_with_device_id(self):
+        driver = MultiDriver(WebserverArgs(com_ports='COM3,COM4'))
+        received = []
+        driver.on(DriverEvents.Continous,
+                  lambda *args: received.append(args))
+
+        driver.get_driver('COM4').emit(DriverEvents.Continous, 'z1', {})
+        self.assertEqual(received, [('z1', {}, 'COM4')])
+
+    def test_fleet_upgrade_parameters(self):
+        driver = MultiDriver(WebserverArgs(com_ports='COM3,COM4'))
+
+        result = driver.execute('fleet_upgrade', {'file': 'firmware.bin',
+                                                  'deviceIds': ['COM5']})
+        self.assertEqual(result, {'packetType': 'error',
+                                  'data': "Unknown devices ['COM5']"})
+        result = driver.execute('fleet_upgrade', {'deviceIds': ['COM3']})
+        self.assertEqual(result['packetType'], 'error')
+
+        result = driver.execute('get_fleet_upgrade_status')
+        self.assertEqual(result['data'], {
+            'running': False, 'duration': 0, 'devices': []})
+
+    def test_device_contexts(self):
+        app_context = AppContext()
+        app_context.set_device_context('COM3', 'context3')
+        app_context.set_device_context('COM4', 'context4')
+
+        self.assertEqual(app_context.get_device_context(), 'context3')
+        self.assertEqual(app_context.get_device_context('COM4'), 'context4')
+        self.assertIsNone(app_context.get_device_context('COM5'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import struct
+import unittest
+
+try:
+    from aceinna.devices.parsers.open_message_parser import UartMessageParser
+    from aceinna.framework.utils import helper
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.parsers.open_message_parser import UartMessageParser
+    from aceinna.framework.utils import helper
+
+APP_FILE_PATH = os.path.join(
+    os.getcwd(), 'src', 'aceinna', 'setting', 'OpenIMU300ZI', 'IMU', 'openimu.json')
+RAW_FILE_PATH = os.path.join(
+    os.getcwd(), 'tests', 'mocker', 'devices', 's1.raw')
+
+with open(APP_FILE_PATH) as json_data:
+    PROPERTIES = json.load(json_data)
+
+
+def build_s1_packet(time_cntr):
+    payload = list(bytearray(struct.pack(
+        '<Id10f', time_cntr, time_cntr / 100.0, *([0.5] * 10))))
+    return bytes(bytearray(helper.build_packet('s1', payload)))
+
+
+class TestOpenMessageParser(unittest.TestCase):
+    '''
+    Test block scanner of open device message parser
+    '''
+
+    def setUp(self):
+        self.parser = UartMessageParser(PROPERTIES)
+        self.messages = []
+        self.commands = []
+        self.failures = []
+        self.parser.on('continuous_message', self.handle_message)
+        self.parser.on('command', self.handle_command)
+        self.parser.on('crc_failure', self.handle_crc_failure)
+
+    def handle_message(self, packet_type, data, event_time):
+        self.messages.append((packet_type, data))
+
+    def handle_command(self, packet_type, data, error, raw):
+        self.commands.append((packet_type, data, error, raw))
+
+    def handle_crc_failure(self, packet_type, event_time):
+        self.failures.append(packet_type)
+
+    def test_parse_whole_frames(self):
+        data = b''.join([build_s1_packet(i) for i in range(3)])
+        self.parser.analyse(data)
+
+        self.assertEqual(len(self.messages), 3)
+        self.assertEqual([item[1]['timeCntr'] for item in self.messages],
+                         [0, 1, 2])
+
+    def test_parse_frames_across_chunks(self):
+        data = b'\x01\x55' + \
+            b''.join([build_s1_packet(i) for i in range(5)])
+        # feed one byte at a time to split header, length and crc
+        for i in range(len(data)):
+            self.parser.analyse(data[i:i+1])
+
+        # the stray 0x55 builds a broken frame, then scanner resyncs
+        self.assertEqual(len(self.failures), 1)
+        self.assertEqual([item[1]['timeCntr'] for item in self.messages],
+                         [0, 1, 2, 3, 4])
+
+    def test_parse_with_crc_failure(self):
+        broken_packet = bytearray(build_s1_packet(1))
+        broken_packet[-1] ^= 0xFF
+        data = build_s1_packet(0) + bytes(broken_packet) + build_s1_packet(2)
+        self.parser.analyse(data)
+
+        self.assertEqual(self.failures, ['s1'])
+        self.assertEqual([item[1]['timeCntr'] for item in self.messages],
+                         [0, 2])
+
+    def test_parse_command(self):
+        ping_str = b'OpenIMU300ZI'
+        data = bytes(bytearray(helper.build_packet('pG', list(ping_str))))
+        self.parser.analyse(data[:4])
+        self.parser.analyse(data[4:])
+
+        self.assertEqual(len(self.commands), 1)
+        packet_type, result, error, raw = self.commands[0]
+        self.assertEqual(packet_type, 'pG')
+        self.assertEqual(result, ping_str.decode())
+        self.assertFalse(error)
+        self.assertEqual(raw, list(data))
+
+    def test_parse_recorded_data(self):
+        with open(RAW_FILE_PATH, 'rb') as raw_file:
+            raw_data = raw_file.read()
+
+        for i in range(0, len(raw_data), 1000):
+            self.parser.analyse(raw_data[i:i+1000])
+
+        self.assertTrue(len(self.messages) > 0)
+        self.assertTrue(all(item[0] == 's1' for item in self.messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import sys
+import math
+import struct
+import unittest
+
+try:
+    from aceinna.devices.parsers.open_packet_parser import (
+        ContinuousPacketCodec, build_continuous_codecs, common_continuous_parser)
+    from aceinna.devices.parsers import (
+        ins401_packet_parser, dum_packet_parser)
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.devices.parsers.open_packet_parser import (
+        ContinuousPacketCodec, build_continuous_codecs, common_continuous_parser)
+    from aceinna.devices.parsers import (
+        ins401_packet_parser, dum_packet_parser)
+
+PACKET_CONFIGURATION = {
+    'name': 'e1',
+    'payload': [
+        {'type': 'uint32', 'name': 'timeCntr'},
+        {'type': 'double', 'name': 'time'},
+        {'type': 'float', 'name': 'roll'},
+        {'type': 'int16', 'name': 'temp'},
+        {'type': 'uint8', 'name': 'mode'}
+    ]
+}
+
+LIST_PACKET_CONFIGURATION = {
+    'name': 'sK',
+    'isList': 1,
+    'payload': [
+        {'type': 'uint16', 'name': 'week'},
+        {'type': 'float', 'name': 'value'}
+    ]
+}
+
+
+class TestContinuousPacketCodec(unittest.TestCase):
+    '''
+    Test precompiled codec of continuous output packet
+    '''
+
+    def test_decode(self):
+        codec = ContinuousPacketCodec(PACKET_CONFIGURATION)
+        payload = struct.pack('<IdfhB', 10, 1.5, 2.5, -3, 4)
+
+        data = codec.decode(memoryview(payload))
+
+        self.assertEqual(list(data.keys()),
+                         ['timeCntr', 'time', 'roll', 'temp', 'mode'])
+        self.assertEqual(list(data.values()), [10, 1.5, 2.5, -3, 4])
+        self.assertEqual(data, common_continuous_parser(
+            list(payload), PACKET_CONFIGURATION))
+
+    def test_decode_with_offset(self):
+        codec = ContinuousPacketCodec(PACKET_CONFIGURATION)
+        frame = b'\x55\x55e1' + struct.pack('<IdfhB', 1, 0.5, 0.5, 1, 1)
+
+        data = codec.decode(frame, 4, codec.size)
+
+        self.assertEqual(data['timeCntr'], 1)
+
+    def test_filter_nan(self):
+        codec = ContinuousPacketCodec(PACKET_CONFIGURATION)
+        payload = struct.pack('<IdfhB', 10, float('nan'), 2.5, -3, 4)
+
+        data = codec.decode(payload)
+
+        self.assertEqual(data['time'], 0)
+        self.assertEqual(data['roll'], 2.5)
+
+    def test_decode_invalid_length(self):
+        codec = ContinuousPacketCodec(PACKET_CONFIGURATION)
+        payload = struct.pack('<IdfhB', 10, 1.5, 2.5, -3, 4)
+
+        self.assertIsNone(codec.decode(payload[:-1]))
+
+    def test_decode_list(self):
+        codec = ContinuousPacketCodec(LIST_PACKET_CONFIGURATION)
+        payload = struct.pack('<HfHf', 1, 0.5, 2, float('nan'))
+
+        data = codec.decode(payload)
+
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]['week'], 1)
+        # list packet keeps raw values
+        self.assertTrue(math.isnan(data[1]['value']))
+
+    def test_build_codecs(self):
+        codecs = build_continuous_codecs({
+            'userMessages': {
+                'outputPackets': [PACKET_CONFIGURATION, LIST_PACKET_CONFIGURATION]
+            }
+        })
+
+        self.assertEqual(sorted(codecs.keys()), ['e1', 'sK'])
+        self.assertEqual(codecs['e1'].size, 19)
+
+    def test_ins401_parser_reuses_codec(self):
+        payload = list(struct.pack('<IdfhB', 10, 1.5, 2.5, -3, 4))
+        codec = ContinuousPacketCodec(PACKET_CONFIGURATION)
+
+        self.assertEqual(list(ins401_packet_parser.common_continuous_parser(
+            payload, PACKET_CONFIGURATION).values()), [10, 1.5, 2.5, -3, 4])
+        self.assertEqual(list(ins401_packet_parser.common_continuous_parser(
+            payload, PACKET_CONFIGURATION, codec).values()), [10, 1.5, 2.5, -3, 4])
+
+    def test_dmu_codec_big_endian(self):
+        configuration = {
+            'name': 'S2',
+            'payload': [
+                {'type': 'int16', 'name': 'xAccel', 'scaling': 'accel'},
+                {'type': 'uint16', 'name': 'counter'}
+            ]
+        }
+        payload = list(struct.pack('>hH', -200, 7))
+        codecs = dum_packet_parser.build_continuous_codecs({
+            'userMessages': {'outputPackets': [configuration]}
+        })
+
+        data = dum_packet_parser.common_continuous_parser(
+            payload, configuration, {'accel': '20/2**16'}, codecs['S2'])
+
+        self.assertEqual(list(data.items()),
+                         [('xAccel', -200 * 20 / 2**16), ('counter', 7)])
+        self.assertIsNone(dum_packet_parser.common_continuous_parser(
+            payload[:3], configuration, {'accel': '20/2**16'}))
+
+    def test_dmu_codec_unsupported_type(self):
+        configuration = {
+            'name': 'S2',
+            'payload': [
+                {'type': 'int16', 'name': 'xAccel'},
+                {'type': 'int24', 'name': 'counter'}
+            ]
+        }
+        codec = dum_packet_parser.ContinuousPacketCodec(configuration)
+
+        self.assertEqual(codec.error, 'unsupported type int24 of field counter')
+        self.assertIsNone(dum_packet_parser.common_continuous_parser(
+            list(struct.pack('>h', -200)), configuration, {}, codec))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import io
+import os
+import sys
+import json
+import struct
+import shutil
+import tempfile
+import unittest
+
+try:
+    from aceinna.tools.openrtk_parse import (
+        UserRawParse, ZouParse, parse_in_chunks)
+    from aceinna.framework.utils.crc import crc16
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.tools.openrtk_parse import (
+        UserRawParse, ZouParse, parse_in_chunks)
+    from aceinna.framework.utils.crc import crc16
+
+SETTING = {
+    'userPacketsTypeList': ['x1', 'x2'],
+    'userNMEAList': ['$GPGGA'],
+    'userOutputPackets': [
+        {'name': 'x1', 'isList': 0, 'payload': [
+            {'type': 'uint32', 'name': 'week', 'unit': '', 'format': 'd'},
+            {'type': 'uint32', 'name': 'tow', 'unit': 'ms', 'format': '.3f'},
+            {'type': 'float', 'name': 'value', 'unit': '', 'format': '.2f'}]},
+        {'name': 'x2', 'isList': 1, 'payload': [
+            {'type': 'int16', 'name': 'a', 'unit': '', 'format': 'd'},
+            {'type': 'uint8', 'name': 'b', 'unit': '', 'format': '.3f'}]}
+    ],
+    'zouPacketsTypeList': ['fmim'],
+    'zouOutputPackets': [
+        {'messageId': 'fmim', 'name': 'imu', 'payload':
+         [{'type': 'double', 'name': 'time', 'unit': 's',
+           'format': '.2f', 'need': 1}] +
+         [{'type': 'float', 'name': 'f{0}'.format(i), 'unit': '',
+           'format': '.1f', 'need': 1} for i in range(9)]}
+    ]
+}
+
+
+def build_user_packet(packet_type, payload):
+    content = packet_type + bytes([len(payload)]) + payload
+    crc = crc16(content)
+    return b'\x55\x55' + content + bytes([crc >> 8, crc & 0xFF])
+
+
+def build_zou_packet(time_value, end=b'ed'):
+    return b'fmim' + struct.pack('<d9f', time_value, *[1.5] * 9) + \
+        b'\x00\x00' + end
+
+
+class TestOpenRTKParse(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.setting_path = os.path.join(self.folder, 'setting.json')
+        with open(self.setting_path, 'w') as setting_file:
+            json.dump(SETTING, setting_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _read(self, name):
+        with open(os.path.join(self.folder, name), 'rb') as output_file:
+            return output_file.read()
+
+    def test_parse_in_chunks_keeps_unparsed_bytes(self):
+        received = []
+
+        def parse_buffer(buffer):
+            # parse complete lines only
+            end = buffer.rfind(b'\n') + 1
+            received.extend(bytes(buffer[:end]).splitlines())
+            return end
+
+        parse_in_chunks(io.BytesIO(b'ab\ncde\nfgh\n'), parse_buffer, 2)
+
+        self.assertEqual(received, [b'ab', b'cde', b'fgh'])
+
+    def test_parse_user_packets_across_chunks(self):
+        data = b'\x00\x55' + \
+            build_user_packet(b'x1', struct.pack('<IIf', 2000, 1500, 2.5)) + \
+            b'$GPGGA,1,2*00\r\n' + \
+            b'$GPXXX,skipped\r\n' + \
+            build_user_packet(b'x2', struct.pack('<hBhB', -1, 2, 3, 4))
+        bad_packet = bytearray(
+            build_user_packet(b'x1', struct.pack('<IIf', 1, 2, 3)))
+        bad_packet[-1] ^= 0xFF
+        data += bytes(bad_packet) + \
+            build_user_packet(b'x1', struct.pack('<IIf', 2001, 500, 1))
+
+        for read_size in [1, 5, 1024]:
+            # packets are split between small chunks
+            parse = UserRawParse(_ChunkReader(data, read_size),
+                                 os.path.join(self.folder, 'user_'),
+                                 5, self.setting_path)
+            parse.start_pasre()
+
+            self.assertEqual(self._read('user_x1.csv'),
+                             b'week(),tow(ms),value(),\n'
+                             b'2000,1.500,2.50\n'
+                             b'2001,0.500,1.00\n')
+            self.assertEqual(self._read('user_x2.csv'),
+                             b'a(),b(),\n'
+                             b'-1,0.002\n'
+                             b'3,0.004\n')
+            self.assertEqual(self._read('user-nmea'), b'$GPGGA,1,2*00\r\n')
+
+    def test_truncated_nmea_not_swallow_packets(self):
+        packets = [build_user_packet(b'x1', struct.pack('<IIf', 2000, i, 1))
+                   for i in range(20)]
+        data = b'$GPGGA,1,2' + b''.join(packets) + b'$GPGGA,3*00\r\n'
+
+        for read_size in [7, 1024]:
+            parse = UserRawParse(_ChunkReader(data, read_size),
+                                 os.path.join(self.folder, 'user_'),
+                                 5, self.setting_path)
+            parse.start_pasre()
+
+            self.assertEqual(
+                len(self._read('user_x1.csv').splitlines()), 21)
+            self.assertEqual(self._read('user-nmea'), b'$GPGGA,3*00\r\n')
+
+    def test_parse_zou_packets(self):
+        data = b'fmi' + build_zou_packet(1.0) + \
+            build_zou_packet(2.0, end=b'xx') + build_zou_packet(3.0)
+
+        parse = ZouParse(_ChunkReader(data, 7),
+                         os.path.join(self.folder, 'rec_'), self.setting_path)
+        parse.start_pasre()
+
+        lines = self._read('rec_imu.csv').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].startswith(b'3.00,1.5,'))
+        self.assertEqual(parse.err_count, 1)
+
+
+class _ChunkReader(io.BytesIO):
+    def __init__(self, data, read_size):
+        super(_ChunkReader, self).__init__(data)
+        self._read_size = read_size
+
+    def read(self, size=-1):
+        return super(_ChunkReader, self).read(min(size, self._read_size))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import sys
+import time
+import socket
+import unittest
+
+try:
+    from aceinna.framework.communicators import packet_socket
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.communicators import packet_socket
+
+DEVICE_MAC = '04:00:00:00:00:04'
+OTHER_MAC = '02:00:00:00:00:09'
+
+
+def build_frame(src_mac, payload):
+    return b'\xff' * 6 + packet_socket.mac_to_bytes(src_mac) + \
+        b'\x00\x00' + payload
+
+
+def run_filter(program, frame, packet_type=0):
+    '''
+    Run the BPF program on frame, supports the instructions in filter
+    '''
+    accumulator = 0
+    index = 0
+    while True:
+        code, jt, jf, k = program[index]
+        index += 1
+        if code == packet_socket.BPF_LD_B_ABS:
+            accumulator = packet_type
+        elif code == packet_socket.BPF_LD_H_ABS:
+            accumulator = int.from_bytes(frame[k:k + 2], 'big')
+        elif code == packet_socket.BPF_LD_W_ABS:
+            accumulator = int.from_bytes(frame[k:k + 4], 'big')
+        elif code == packet_socket.BPF_JEQ_K:
+            index += jt if accumulator == k else jf
+        elif code == packet_socket.BPF_RET_K:
+            return k
+
+
+def can_open_packet_socket():
+    if not packet_socket.is_supported():
+        return False
+    try:
+        socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0).close()
+        return True
+    except OSError:
+        return False
+
+
+# pylint: disable=missing-class-docstring
+class TestPacketSocketFilter(unittest.TestCase):
+    def test_filter_src_macs(self):
+        program = packet_socket.build_src_mac_filter(
+            ['00:11:22:33:44:55', DEVICE_MAC])
+
+        for mac, accepted in [('00:11:22:33:44:55', True),
+                              (DEVICE_MAC, True),
+                              ('00:11:22:33:44:56', False),
+                              ('04:00:00:00:00:05', False),
+                              ('00:11:00:00:00:04', False)]:
+            result = run_filter(program, build_frame(mac, b'\x01\xcc'))
+            self.assertEqual(result > 0, accepted, mac)
+
+        self.assertEqual(run_filter(program, build_frame(DEVICE_MAC, b''),
+                                    packet_socket.PACKET_OUTGOING), 0)
+
+
+class TestFrameRing(unittest.TestCase):
+    def test_pop_in_order_with_offset(self):
+        ring = packet_socket.FrameRing(capacity=4, frame_size=32)
+        for i in range(3):
+            view = ring.reserve()
+            view[0:3] = bytes([i, i, i])
+            ring.commit(view, 3)
+
+        self.assertEqual(len(ring), 3)
+        self.assertEqual([ring.pop(1) for _ in range(4)],
+                         [b'\x00\x00', b'\x01\x01', b'\x02\x02', None])
+
+    def test_drop_when_full(self):
+        ring = packet_socket.FrameRing(capacity=2, frame_size=8)
+        for i in range(5):
+            view = ring.reserve()
+            view[0] = i
+            ring.commit(view, 1)
+
+        self.assertEqual(ring.dropped_count, 3)
+        self.assertEqual(ring.pop(), b'\x00')
+
+        view = ring.reserve()
+        view[0] = 9
+        ring.commit(view, 1)
+        self.assertEqual([ring.pop(), ring.pop(), ring.pop()],
+                         [b'\x01', b'\x09', None])
+
+    def test_clear(self):
+        ring = packet_socket.FrameRing(capacity=2, frame_size=8)
+        view = ring.reserve()
+        ring.commit(view, 1)
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+        self.assertIsNone(ring.pop())
+
+
+@unittest.skipUnless(can_open_packet_socket(), 'AF_PACKET is not permitted')
+class TestPacketSocketReceiver(unittest.TestCase):
+    def test_receive_filtered_frames_on_loopback(self):
+        receiver = packet_socket.PacketSocketReceiver('lo', [DEVICE_MAC])
+        receiver.start()
+        sender = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+        sender.bind(('lo', 0))
+        try:
+            for i in range(10):
+                sender.send(build_frame(DEVICE_MAC, bytes([i]) * 50))
+                sender.send(build_frame(OTHER_MAC, bytes([i]) * 50))
+
+            end_time = time.time() + 2
+            while len(receiver.ring) < 10 and time.time() < end_time:
+                time.sleep(0.01)
+
+            frames = [receiver.ring.pop(packet_socket.ETHERNET_HEADER_LEN)
+                      for _ in range(10)]
+            self.assertEqual(frames, [bytes([i]) * 50 for i in range(10)])
+            self.assertIsNone(receiver.ring.pop())
+            self.assertEqual(receiver.get_statistics()['dropped_count'], 0)
+        finally:
+            sender.close()
+            receiver.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import sys
+import unittest
+
+try:
+    from aceinna.core.packet_statistics import (
+        PacketStatistics, get_device_time)
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.core.packet_statistics import (
+        PacketStatistics, get_device_time)
+
+
+# pylint: disable=missing-class-docstring
+class TestPacketStatistics(unittest.TestCase):
+    def test_collect(self):
+        statistics = PacketStatistics()
+        for i in range(10):
+            statistics.collect('success', 'z1', i * 0.1)
+        statistics.collect('fail', 'z1', 1)
+
+        result = statistics.get_result()
+        self.assertEqual(result['z1']['received'], 10)
+        self.assertEqual(result['z1']['failures'], 1)
+        self.assertEqual(statistics.get_received_count(), 10)
+
+    def test_collect_per_instance(self):
+        first = PacketStatistics()
+        second = PacketStatistics()
+        first.collect('success', 'z1', 0)
+        second.collect('fail', 's1', 0)
+
+        self.assertEqual(list(first.get_result().keys()), ['z1'])
+        self.assertEqual(list(second.get_result().keys()), ['s1'])
+        self.assertEqual(second.get_received_count(), 0)
+
+    def test_rate_at_1khz(self):
+        statistics = PacketStatistics()
+        # packets are received in bursts of 10 every 10ms
+        for i in range(5000):
+            statistics.collect('success', 'z1', 100 + (i // 10) * 0.01)
+
+        result = statistics.get_result()
+        self.assertEqual(result['z1']['received'], 5000)
+        self.assertAlmostEqual(result['z1']['rate'], 1000, delta=10)
+        self.assertEqual(result['z1']['interval']['p50'], 0)
+        self.assertEqual(result['z1']['interval']['p95'], 10)
+        # no change, no result
+        self.assertIsNone(statistics.get_result())
+
+    def test_interval_percentiles(self):
+        statistics = PacketStatistics()
+        event_time = 0
+        for i in range(100):
+            event_time += 0.05 if i % 20 == 19 else 0.01
+            statistics.collect('success', 's1', event_time)
+
+        interval = statistics.snapshot()['s1']['interval']
+        self.assertEqual(interval, {'p50': 10, 'p95': 50, 'p99': 50})
+
+    def test_failure_ratio_and_reset(self):
+        statistics = PacketStatistics()
+        for i in range(3):
+            statistics.collect('success', 'z1', i)
+        statistics.collect('fail', 'z1', 3)
+
+        self.assertEqual(statistics.snapshot()['z1']['failureRatio'], 0.25)
+
+        statistics.reset()
+        result = statistics.snapshot()['z1']
+        self.assertEqual((result['received'], result['failures'],
+                          result['rate'], result['failureRatio']), (0, 0, 0, 0))
+
+
+    def test_device_time(self):
+        self.assertEqual(get_device_time({'GPS_TimeOfWeek': 1500}), 1.5)
+        self.assertEqual(get_device_time([{'timeOfWeek': 2.5}]), 2.5)
+        self.assertIsNone(get_device_time({'xAccel': 0}))
+        self.assertIsNone(get_device_time([]))
+
+    def test_epochs_counted(self):
+        statistics = PacketStatistics()
+        # 100Hz tags in ms rolled over, from a host clock 100ppm faster
+        tags = list(range(604790000, 604800000, 10)) + list(range(0, 50000, 10))
+        # 3 missing, a duplicate and an out of order packet
+        del tags[100:103]
+        tags.insert(200, tags[199])
+        tags[300], tags[301] = tags[301], tags[300]
+        for tag in tags:
+            device_time = tag / 1000 + (604800 if tag < 604790000 else 0)
+            statistics.collect('success', 's1', 0)
+            statistics.collect_device_time(
+                's1', tag / 1000, 1000 + device_time * 1.0001)
+
+        epochs = statistics.snapshot()['s1']['epochs']
+        # the late one of swapped packets fills the gap, it is not missing
+        self.assertEqual(epochs['period'], 10)
+        self.assertEqual(epochs['missing'], 3)
+        self.assertEqual(epochs['duplicates'], 1)
+        self.assertEqual(epochs['outOfOrder'], 1)
+        self.assertEqual(epochs['restarts'], 0)
+        self.assertAlmostEqual(epochs['clockDrift'], 100, delta=1)
+
+    def test_late_packets_fill_gap(self):
+        statistics = PacketStatistics()
+        tags = list(range(0, 1000, 10))
+        # 3 packets of a gap arrive late, one is lost
+        late_tags = tags[50:53]
+        del tags[50:54]
+        tags[60:60] = late_tags
+        for tag in tags:
+            statistics.collect_device_time('s1', tag / 1000, tag / 1000)
+
+        epochs = statistics.snapshot()['s1']['epochs']
+        self.assertEqual(epochs['missing'], 1)
+        self.assertEqual(epochs['outOfOrder'], 3)
+
+    def test_epochs_after_rate_changed(self):
+        statistics = PacketStatistics()
+        device_time = 0
+        for period in [0.01] * 100 + [0.05] * 100:
+            device_time += period
+            statistics.collect_device_time('s1', device_time, device_time)
+
+        epochs = statistics.snapshot()['s1']['epochs']
+        self.assertEqual(epochs['period'], 50)
+        self.assertEqual(epochs['missing'], 0)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
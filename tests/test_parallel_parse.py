@@ -0,0 +1,156 @@
+import io
+import os
+import sys
+import json
+import struct
+import shutil
+import functools
+import tempfile
+import unittest
+
+try:
+    from aceinna.tools.parallel_parse import (
+        FileRange, split_file, merge_part_folders, get_part_folder,
+        run_tasks, parse_files)
+    from aceinna.tools import openrtk_parse
+    from aceinna.framework.utils.crc import crc16
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.tools.parallel_parse import (
+        FileRange, split_file, merge_part_folders, get_part_folder,
+        run_tasks, parse_files)
+    from aceinna.tools import openrtk_parse
+    from aceinna.framework.utils.crc import crc16
+
+SETTING = {
+    'userPacketsTypeList': ['x1'],
+    'userNMEAList': ['$GPGGA'],
+    'userOutputPackets': [
+        {'name': 'x1', 'isList': 0, 'payload': [
+            {'type': 'uint32', 'name': 'week', 'unit': '', 'format': 'd'},
+            {'type': 'uint32', 'name': 'tow', 'unit': 'ms', 'format': '.3f'},
+            {'type': 'float', 'name': 'value', 'unit': '', 'format': '.2f'}]}
+    ]
+}
+
+
+def build_user_packet(packet_type, payload):
+    content = packet_type + bytes([len(payload)]) + payload
+    crc = crc16(content)
+    return b'\x55\x55' + content + bytes([crc >> 8, crc & 0xFF])
+
+
+def multiply(value, factor):
+    return value * factor
+
+
+def fail():
+    raise ValueError('failed')
+
+
+class TestParallelParse(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, name, content):
+        file_path = os.path.join(self.folder, name)
+        with open(file_path, 'wb') as file_obj:
+            file_obj.write(content)
+        return file_path
+
+    def _read(self, file_path):
+        with open(file_path, 'rb') as file_obj:
+            return file_obj.read()
+
+    def test_file_range(self):
+        data_file = FileRange(io.BytesIO(b'0123456789'), 2, 7)
+
+        self.assertEqual(data_file.read(3), b'234')
+        self.assertEqual(data_file.read(), b'56')
+        self.assertEqual(data_file.read(), b'')
+
+    def test_split_file_at_sync(self):
+        file_path = self._write('log.bin', b'xxxxx|aaaaaaaaa|bbb')
+
+        ranges = split_file(file_path, 4,
+                            lambda buffer: buffer.find(b'|'), window=3)
+
+        # the second split point has no sync in window
+        self.assertEqual(ranges, [(0, 5), (5, 15), (15, 19)])
+
+    def test_merge_part_folders(self):
+        for index, content in enumerate([b'a,b\n1,2\n', b'a,b\n3,4\n']):
+            part_folder = get_part_folder(self.folder, index)
+            os.makedirs(part_folder)
+            with open(os.path.join(part_folder, 'x.csv'), 'wb') as csv_file:
+                csv_file.write(content)
+            with open(os.path.join(part_folder, 'x.txt'), 'wb') as txt_file:
+                txt_file.write(content)
+
+        merge_part_folders([get_part_folder(self.folder, 0),
+                            get_part_folder(self.folder, 1)], self.folder)
+
+        self.assertEqual(self._read(os.path.join(self.folder, 'x.csv')),
+                         b'a,b\n1,2\n3,4\n')
+        self.assertEqual(self._read(os.path.join(self.folder, 'x.txt')),
+                         b'a,b\n1,2\na,b\n3,4\n')
+        self.assertEqual(sorted(os.listdir(self.folder)), ['x.csv', 'x.txt'])
+        self.assertFalse(os.path.exists(get_part_folder(self.folder, 0)))
+
+    def test_run_tasks_in_order(self):
+        tasks = [(multiply, (index, 2), 1, str(index)) for index in range(5)]
+        tasks.append((fail, (), 1, 'fail'))
+
+        for jobs in [1, 2]:
+            results = run_tasks(tasks, jobs)
+            self.assertEqual([result for _, result in results[:5]],
+                             [0, 2, 4, 6, 8])
+            self.assertFalse(results[5][0])
+            self.assertIn('ValueError', results[5][1])
+
+    def test_parse_split_file_same_as_whole_file(self):
+        setting_path = os.path.join(self.folder, 'setting.json')
+        with open(setting_path, 'w') as setting_file:
+            json.dump(SETTING, setting_file)
+
+        data = b''
+        for index in range(300):
+            data += build_user_packet(
+                b'x1', struct.pack('<IIf', 2000, index * 100, index))
+            if index % 50 == 0:
+                data += b'$GPGGA,' + str(index).encode() + b'*00\r\n'
+        whole_path = self._write('user_whole.bin', data)
+        split_path = self._write('user_split.bin', data)
+
+        create_parse = functools.partial(
+            openrtk_parse.create_parse, 5, setting_path)
+        parse_file = functools.partial(
+            openrtk_parse.parse_file, 5, setting_path)
+        parse_part = functools.partial(
+            openrtk_parse.parse_part, 5, setting_path)
+        parse_files([whole_path], create_parse, parse_file, parse_part,
+                    jobs=1)
+        parse_files([split_path], create_parse, parse_file, parse_part,
+                    jobs=3, split_size=len(data) // 3)
+
+        whole_folder = os.path.join(self.folder, 'user_whole_p')
+        split_folder = os.path.join(self.folder, 'user_split_p')
+        for suffix in ['_x1.csv', '-nmea', '-ins.kml']:
+            whole = self._read(os.path.join(
+                whole_folder, 'user_whole' + suffix))
+            split = self._read(os.path.join(
+                split_folder, 'user_split' + suffix))
+            self.assertEqual(whole, split.replace(b'user_split', b'user_whole'))
+        self.assertEqual(
+            len(self._read(os.path.join(
+                split_folder, 'user_split_x1.csv')).splitlines()), 301)
+        self.assertEqual(sorted(os.listdir(whole_folder)),
+                         [name.replace('user_split', 'user_whole')
+                          for name in sorted(os.listdir(split_folder))])
+
+
+if __name__ == '__main__':
+    unittest.main()
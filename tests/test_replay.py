@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import struct
+import tempfile
+import unittest
+
+try:
+    from aceinna.framework.communicators.replay import (
+        Replay, read_packet_records, read_stream_records)
+    from aceinna.framework.constants import INTERFACES
+    from aceinna.models import WebserverArgs
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.communicators.replay import (
+        Replay, read_packet_records, read_stream_records)
+    from aceinna.framework.constants import INTERFACES
+    from aceinna.models import WebserverArgs
+
+
+def build_packet(packet_type, payload):
+    return b'\x55\x55' + packet_type + struct.pack('<I', len(payload)) + \
+        payload + b'\x00\x00'
+
+
+def build_pcap(frames):
+    content = struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+    for timestamp, frame in frames:
+        content += struct.pack('<IIII', int(timestamp),
+                               int(round(timestamp % 1 * 1e6)),
+                               len(frame), len(frame))
+        content += frame
+    return content
+
+
+def build_frame(payload):
+    return b'\xff' * 6 + b'\x04\x00\x00\x00\x00\x04' + b'\x00\x00' + payload
+
+
+# pylint: disable=missing-class-docstring
+class TestReplayRecords(unittest.TestCase):
+    def test_split_packets_and_nmea(self):
+        packets = [build_packet(b'\x01\n', b'\x01' * 10),
+                   b'$GPGGA,1*00\r\n',
+                   build_packet(b'\x03\n', b'\x02' * 20)]
+        content = b'\x00\x01' + b''.join(packets)
+
+        records = list(read_packet_records(content, 100))
+        self.assertEqual([data for _, data in records], packets)
+        self.assertEqual(records[0][0], 0.02)
+
+    def test_stream_chunks(self):
+        records = list(read_stream_records(b'a' * 10, 5, chunk_size=4))
+        self.assertEqual([(timestamp, len(data)) for timestamp, data in records],
+                         [(0, 4), (0.8, 4), (1.6, 2)])
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.file_path = None
+
+    def tearDown(self):
+        if self.file_path:
+            os.remove(self.file_path)
+
+    def _create_replay(self, content, **kwargs):
+        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+            temp_file.write(content)
+            self.file_path = temp_file.name
+
+        options = WebserverArgs(interface=INTERFACES.REPLAY,
+                                replay_file=self.file_path, **kwargs)
+        replay = Replay(options)
+        replay.open()
+        return replay
+
+    def _read_all(self, replay):
+        result = []
+        while True:
+            data = replay.read()
+            if not data:
+                return result
+            result.append(data)
+
+    def test_pcap_paced_by_speed(self):
+        replay = self._create_replay(build_pcap([
+            (100.0, build_frame(b'\x01' * 10)),
+            (100.1, build_frame(b'\x02' * 10)),
+            (100.2, build_frame(b'\x03' * 10))
+        ]), replay_speed=2)
+        self.assertEqual(replay.type, INTERFACES.ETH_100BASE_T1)
+
+        start_time = time.time()
+        records = self._read_all(replay)
+        self.assertTrue(0.09 <= time.time() - start_time < 0.2)
+        self.assertEqual(replay.format, 'pcap')
+        self.assertEqual(records, [b'\x01' * 10, b'\x02' * 10, b'\x03' * 10])
+
+    def test_as_fast_as_possible_with_report(self):
+        packets = [build_packet(b'\x01\n', bytes([i]) * 390)
+                   for i in range(100)]
+        replay = self._create_replay(b''.join(packets), replay_speed=0)
+
+        # it takes about 0.9s at default byte rate if paced
+        start_time = time.time()
+        self.assertEqual(self._read_all(replay), packets)
+        self.assertTrue(time.time() - start_time < 0.5)
+
+        statistics = replay.get_read_statistics()
+        self.assertTrue(statistics['replay_finished'])
+        self.assertEqual(statistics['replay_record_count'], 100)
+        self.assertEqual(statistics['replay_byte_count'], 40000)
+
+    def test_uart_stream(self):
+        replay = self._create_replay(b'\x55' * 1000, replay_device='OpenIMU',
+                                     replay_speed=0)
+        self.assertEqual(replay.type, INTERFACES.UART)
+        self.assertEqual(b''.join(self._read_all(replay)), b'\x55' * 1000)
+        self.assertEqual(replay.format, 'stream')
+
+
+if __name__ == '__main__':
+    unittest.main()
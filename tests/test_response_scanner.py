@@ -0,0 +1,119 @@
+import sys
+import time
+import struct
+import unittest
+
+try:
+    from aceinna.framework.utils import helper
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.framework.utils import helper
+
+
+class _Communicator(object):
+    def __init__(self, reads):
+        self.type = 'uart'
+        self.reads = list(reads)
+        self.read_count = 0
+        self.wait_count = 0
+
+    def read(self, size):
+        self.read_count += 1
+        return self.reads.pop(0) if self.reads else b''
+
+    def wait_readable(self, timeout):
+        self.wait_count += 1
+        time.sleep(min(timeout, 0.001))
+
+
+def build_packet(packet_type, payload):
+    return bytes(helper.build_packet(packet_type, list(payload)))
+
+
+# pylint: disable=missing-class-docstring
+class TestResponseScanner(unittest.TestCase):
+    def test_scan_across_reads(self):
+        scanner = helper.ResponseScanner()
+        packet = build_packet('WA', [0, 0, 0, 240, 240])
+
+        self.assertEqual(scanner.feed(b'\x01' + packet[:6]), [])
+        self.assertEqual(scanner.feed(packet[6:] + packet),
+                         [(b'WA', bytearray([0, 0, 0, 240, 240]))] * 2)
+
+    def test_crc_ends_with_sync_byte(self):
+        scanner = helper.ResponseScanner(check_crc=True)
+        address = next(address for address in range(0, 240 * 1000, 240)
+                       if build_packet('WA', struct.pack('>IB', address, 240))[-1] == 0x55)
+        packet = build_packet('WA', struct.pack('>IB', address, 240))
+
+        self.assertEqual(len(scanner.feed(packet)), 1)
+        self.assertEqual(len(scanner.feed(packet)), 1)
+        # corrupted packet is skipped
+        self.assertEqual(scanner.feed(packet[:-1] + b'\x00' + packet),
+                         [(b'WA', bytearray(packet[5:-2]))])
+
+    def test_scan_ethernet_packet(self):
+        scanner = helper.ResponseScanner('<I')
+        command = helper.build_ethernet_packet(
+            bytes(6), bytes([1] * 6), [0x01, 0xcc], list(b'INS401'))
+        frame = command.actual_command[14:]
+
+        self.assertEqual(scanner.feed(frame[:10]), [])
+        self.assertEqual(scanner.feed(frame[10:]),
+                         [(b'\x01\xcc', bytearray(b'INS401'))])
+
+    def test_read_untils_have_data(self):
+        packet = build_packet('pG', b'OpenIMU')
+        communicator = _Communicator(
+            [b'', build_packet('gV', b'1.0') + packet[:3], packet[3:]])
+
+        self.assertEqual(helper.read_untils_have_data(communicator, 'pG'),
+                         list(b'OpenIMU'))
+        # it waits only when nothing is read
+        self.assertEqual((communicator.read_count, communicator.wait_count),
+                         (3, 1))
+        self.assertIsNone(helper.read_untils_have_data(
+            _Communicator([]), 'pG', retry_times=5))
+
+    def test_read_device_access(self):
+        class DeviceAccess(object):
+            def read(self, size):
+                return b''
+
+        # ping reads device access, which has only read
+        self.assertIsNone(helper.read_untils_have_data(
+            DeviceAccess(), 'pG', retry_times=5))
+        self.assertIsNone(helper.ResponseScanner().wait_packet(
+            DeviceAccess(), 'pG', 0.01))
+
+    def test_wait_packet_with_deadline(self):
+        scanner = helper.ResponseScanner()
+        communicator = _Communicator([])
+
+        start = time.time()
+        self.assertIsNone(scanner.wait_packet(communicator, 'JI', 0.05))
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+        communicator.reads = [b'', b'', build_packet('JI', b'')]
+        self.assertEqual(scanner.wait_packet(communicator, 'JI', 1), [])
+
+    def test_wait_until_probed(self):
+        results = [False, False, True]
+        probe = lambda: results.pop(0)
+
+        start = time.time()
+        self.assertTrue(helper.wait_until(probe, 1, 0.01))
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(results, [])
+
+        # probed at the deadline for the last time
+        calls = []
+        start = time.time()
+        self.assertFalse(helper.wait_until(
+            lambda: calls.append(time.time()), 0.05, 0.02))
+        self.assertGreaterEqual(calls[-1] - start, 0.05)
+        self.assertLessEqual(len(calls), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import sys
+import json
+import threading
+import unittest
+from unittest import mock
+from concurrent.futures import Future
+
+try:
+    from aceinna.core.stream_hub import (StreamHub, HubClient, pick_evenly)
+except:  # pylint: disable=bare-except
+    sys.path.append('./src')
+    from aceinna.core.stream_hub import (StreamHub, HubClient, pick_evenly)
+
+
+class _Socket(object):
+    def __init__(self, is_slow=False):
+        self.messages = []
+        self.futures = []
+        self._is_slow = is_slow
+
+    def send(self, message):
+        self.messages.append(message)
+        if not self._is_slow:
+            return None
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def decoded(self):
+        return [json.loads(message)['result'] for message in self.messages]
+
+
+def add_client(hub, socket, max_queue=100, **subscription):
+    client = HubClient(socket.send, max_queue)
+    client.subscribe(**subscription)
+    client.is_streaming = True
+    hub.add_client(client)
+    return client
+
+
+# pylint: disable=missing-class-docstring
+class TestStreamHub(unittest.TestCase):
+    def test_subscribed_packets_encoded_once(self):
+        hub = StreamHub()
+        first, second, other = _Socket(), _Socket(), _Socket()
+        add_client(hub, first)
+        add_client(hub, second, packet_types=['s1'])
+        add_client(hub, other, packet_types=['g1'])
+
+        for index in range(3):
+            hub.collect(None, 's1', {'time': index})
+        hub.collect(None, 'z1', {'time': 0})
+        hub.flush()
+
+        self.assertEqual(len(first.messages), 2)
+        # the same encoded message is sent to clients
+        self.assertIs(first.messages[0], second.messages[0])
+        self.assertEqual(second.decoded(), [{
+            'packetType': 's1',
+            'data': [{'time': 0}, {'time': 1}, {'time': 2}]}])
+        self.assertEqual(other.messages, [])
+
+    def test_not_collected_without_streaming_client(self):
+        hub = StreamHub()
+        socket = _Socket()
+        client = add_client(hub, socket)
+        client.is_streaming = False
+        hub.update_subscriptions()
+
+        hub.collect(None, 's1', {'time': 0})
+        hub.flush()
+
+        self.assertEqual(socket.messages, [])
+
+    def test_decimated_to_max_rate(self):
+        hub = StreamHub()
+        full, decimated = _Socket(), _Socket()
+        add_client(hub, full)
+        decimated_client = add_client(hub, decimated, max_rate=10)
+
+        with mock.patch('time.time') as mock_time:
+            for flush_index in range(10):
+                mock_time.return_value = 100 + flush_index * 0.1
+                for index in range(20):
+                    hub.collect('dev', 's1', {'time': index})
+                hub.flush()
+
+        self.assertEqual(
+            sum([len(result['data']) for result in full.decoded()]), 200)
+        # one sample at first, then 10 per second
+        self.assertEqual(
+            sum([len(result['data']) for result in decimated.decoded()]), 10)
+        # samples skipped are counted
+        self.assertEqual(decimated_client.get_status()['decimatedCount'], 190)
+        self.assertEqual(pick_evenly(list(range(10)), 2), [0, 5])
+
+    def test_slow_client_drops_oldest(self):
+        hub = StreamHub()
+        fast, slow = _Socket(), _Socket(is_slow=True)
+        add_client(hub, fast)
+        slow_client = add_client(hub, slow, max_queue=3)
+
+        for index in range(10):
+            hub.collect(None, 's1', {'time': index})
+            hub.flush()
+
+        self.assertEqual(len(fast.messages), 10)
+        # the first one is writing, 3 are queued
+        self.assertEqual(len(slow.messages), 1)
+        self.assertEqual(slow_client.queue_size, 3)
+        self.assertEqual(slow_client.dropped_count, 6)
+
+        for _ in range(4):
+            slow.futures[-1].set_result(None)
+        self.assertEqual([result['data'][0]['time']
+                          for result in slow.decoded()], [0, 7, 8, 9])
+        self.assertEqual(slow_client.queue_size, 0)
+
+    def test_columnar_encoding(self):
+        hub = StreamHub()
+        socket = _Socket()
+        add_client(hub, socket, encoding='columnar')
+
+        for _ in range(2):
+            hub.collect(None, 's1', {'time': 1, 'x': 0.5})
+            hub.collect(None, 's1', {'time': 2, 'x': 1.5})
+            hub.collect(None, 'p1', [1, 2])
+            hub.flush()
+
+        results = socket.decoded()
+        schemas = [result for result in results
+                   if result['packetType'] == 'schema']
+        self.assertEqual(schemas, [{'packetType': 'schema', 'data': {
+            'schemaId': 1, 'packetType': 's1', 'fields': ['time', 'x']}}])
+        batches = [result for result in results
+                   if result['packetType'] == 's1']
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(batches[1], {
+            'packetType': 's1', 'encoding': 'columnar', 'schemaId': 1,
+            'data': [[1, 2], [0.5, 1.5]]})
+        # not a record, it is sent as json
+        self.assertIn({'packetType': 'p1', 'data': [[1, 2]]}, results)
+
+    def test_overflow_counted(self):
+        hub = StreamHub(capacity=5)
+        socket = _Socket()
+        add_client(hub, socket)
+
+        for index in range(8):
+            hub.collect('dev', 's1', {'time': index})
+        hub.flush()
+
+        self.assertEqual([sample['time'] for sample in socket.decoded()[0]['data']],
+                         [3, 4, 5, 6, 7])
+        self.assertEqual(hub.get_overflow_status(), [{
+            'deviceId': 'dev', 'packetType': 's1', 'droppedCount': 3}])
+
+    def test_samples_delivered_or_dropped(self):
+        hub = StreamHub(capacity=100)
+        socket = _Socket()
+        add_client(hub, socket)
+
+        def produce():
+            for index in range(20000):
+                hub.collect(None, 's1', index)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        while producer.is_alive():
+            hub.flush()
+        producer.join()
+        hub.flush()
+
+        delivered = sum([len(result['data']) for result in socket.decoded()])
+        dropped = sum([item['droppedCount']
+                       for item in hub.get_overflow_status()])
+        self.assertEqual(delivered + dropped, 20000)
+
+    def test_invalid_subscription(self):
+        client = HubClient(_Socket().send)
+        with self.assertRaises(ValueError):
+            client.subscribe(encoding='xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,49 @@
 import sys
 import unittest
 import time
+import threading
 
 try:
     from mocker.upgrade_workers.normal_worker import NormalWorker
     from mocker.upgrade_workers.error_worker import ErrorWorker
-    from aceinna.devices.upgrade_center import UpgradeCenter
-    from aceinna.devices.upgrade_workers import UPGRADE_EVENT, UPGRADE_GROUP
+    from aceinna.devices.upgrade_center import (
+        UpgradeCenter, format_timing_report)
+    from aceinna.devices.upgrade_workers import (
+        UPGRADE_EVENT, UPGRADE_GROUP, FirmwareUpgradeWorker,
+        JumpBootloaderWorker, JumpApplicationWorker)
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+    from test_firmware_worker import write_command_generator
 except:
     sys.path.append('./src')
     sys.path.append('./tests')
     from mocker.upgrade_workers.normal_worker import NormalWorker
     from mocker.upgrade_workers.error_worker import ErrorWorker
-    from aceinna.devices.upgrade_center import UpgradeCenter
-    from aceinna.devices.upgrade_workers import UPGRADE_EVENT, UPGRADE_GROUP
+    from aceinna.devices.upgrade_center import (
+        UpgradeCenter, format_timing_report)
+    from aceinna.devices.upgrade_workers import (
+        UPGRADE_EVENT, UPGRADE_GROUP, FirmwareUpgradeWorker,
+        JumpBootloaderWorker, JumpApplicationWorker)
+    from aceinna.framework.utils import helper
+    from mocker.communicator import MockCommunicator
+    from test_firmware_worker import write_command_generator
+
+
+def run_upgrade(workers):
+    upgrade_center = UpgradeCenter()
+    upgrade_center.register_workers(workers)
+    done = threading.Event()
+    results = []
+
+    def on_done(message='finish'):
+        results.append(message)
+        done.set()
+
+    upgrade_center.on(UPGRADE_EVENT.FINISH, on_done)
+    upgrade_center.on(UPGRADE_EVENT.ERROR, on_done)
+    upgrade_center.start()
+    done.wait(10)
+    return upgrade_center, results
 
 
 class TestUpgradeCenter(unittest.TestCase):
@@ -94,5 +124,86 @@ class TestUpgradeCenter(unittest.TestCase):
         upgrade_center.on('finish', self.handle_done)
         upgrade_center.start()
 
+    def test_timing_report(self):
+        communicator = MockCommunicator({'device': 'BOOTLOADER'})
+        self.addCleanup(communicator.close)
+        content = bytes(240 * 4)
+        probes = []
+
+        def is_bootloader_ready():
+            probes.append(time.time())
+            return len(probes) >= 3 and helper.probe_response(
+                communicator, helper.build_bootloader_input_packet('pG'),
+                'pG')
+
+        jump_worker = JumpBootloaderWorker(
+            communicator,
+            command=helper.build_bootloader_input_packet('JI'),
+            listen_packet='JI',
+            ready_probe=is_bootloader_ready)
+        firmware_worker = FirmwareUpgradeWorker(
+            communicator, content, write_command_generator)
+        firmware_worker.name = 'IMU'
+
+        start = time.time()
+        upgrade_center, results = run_upgrade([jump_worker, firmware_worker])
+
+        self.assertEqual(results, ['finish'])
+        # it is not waited for a fixed time after jump
+        self.assertLess(time.time() - start, 2)
+        report = upgrade_center.get_timing_report()
+        self.assertEqual(
+            [(item['worker'], item['phase']) for item in report['phases']],
+            [('worker-0', 'jump'), ('worker-0', 'bootloader ready'),
+             ('IMU', 'prepare'), ('IMU', 'erase'), ('IMU', 'write'),
+             ('IMU', 'complete')])
+        self.assertGreaterEqual(report['phases'][1]['duration'], 0.4)
+        # durations are rounded to ms
+        self.assertLessEqual(
+            sum([item['duration'] for item in report['phases']]),
+            report['total'] + 0.001 * len(report['phases']))
+        self.assertIn('IMU erase', format_timing_report(report))
+
+    def test_bootloader_not_identified(self):
+        communicator = MockCommunicator({'device': 'BOOTLOADER'})
+        self.addCleanup(communicator.close)
+        content = bytes(240 * 4)
+        jump_worker = JumpBootloaderWorker(
+            communicator,
+            command=helper.build_bootloader_input_packet('JI'),
+            listen_packet='JI',
+            wait_timeout_after_command=0.5,
+            ready_probe=lambda: False)
+        firmware_worker = FirmwareUpgradeWorker(
+            communicator, content, write_command_generator)
+
+        upgrade_center, results = run_upgrade([jump_worker, firmware_worker])
+
+        # the whole wait after command is taken, then firmware is written
+        self.assertEqual(results, ['finish'])
+        self.assertEqual(bytes(communicator.device_access._app.flash), content)
+        phases = upgrade_center.get_timing_report()['phases']
+        self.assertGreaterEqual(phases[0]['duration'] + phases[1]['duration'],
+                                0.49)
+
+    def test_application_not_probed(self):
+        communicator = MockCommunicator({'device': 'BOOTLOADER'})
+        self.addCleanup(communicator.close)
+        jump_worker = JumpApplicationWorker(
+            communicator,
+            command=helper.build_bootloader_input_packet('JA'),
+            listen_packet='JA',
+            wait_timeout_after_command=0.5)
+
+        upgrade_center, results = run_upgrade([jump_worker])
+
+        # bootloader acks before it jumps, the whole wait is taken
+        self.assertEqual(results, ['finish'])
+        phases = upgrade_center.get_timing_report()['phases']
+        self.assertEqual([item['phase'] for item in phases],
+                         ['jump', 'application ready'])
+        self.assertGreaterEqual(phases[0]['duration'] + phases[1]['duration'],
+                                0.49)
+
 if __name__ == '__main__':
      unittest.main()
\ No newline at end of file
@@ -64,6 +64,7 @@ ping_test
 
 import serial
 import math
+import binascii
 import string
 import time
 import sys
@@ -1314,17 +1315,8 @@ class OpenIMU:
     def calc_crc(self, payload):
         '''Calculates CRC per 380 manual
         '''
-        crc = 0x1D0F
-        for bytedata in payload:
-            crc = crc ^ (bytedata << 8)
-            for i in range(0, 8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc = crc << 1
-
-        crc = crc & 0xffff
-        return crc
+        # table driven CRC-CCITT(poly 0x1021), seeded with 0x1D0F
+        return binascii.crc_hqx(bytearray(payload), 0x1D0F)
 
     def open(self, port, baud):
         try:
@@ -5,8 +5,15 @@ import json
 import struct
 import math
 import collections
-import datetime
-import time
+try:
+    from aceinna.tools.kml_writer import (
+        KmlWriter, PLACEMARK, KML_START, COORDINATES, build_header,
+        placemark_name, gps_to_utc_seconds, utc_time)
+except:  # pylint: disable=bare-except
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src'))
+    from aceinna.tools.kml_writer import (
+        KmlWriter, PLACEMARK, KML_START, COORDINATES, build_header,
+        placemark_name, gps_to_utc_seconds, utc_time)
 
 PI = 3.1415926535897932
 WGS84 = {
@@ -62,6 +69,76 @@ rates = [
 	[58,100,P2_33_DEG,P2_29],
 ]
 
+class GnssKmlWriter(KmlWriter):
+    """Write gnss kml of bestpos and bestvel"""
+    colors = ["ffffffff","ff0000ff","ffff00ff","50FF78F0","ff00ff00","ff00aaff"]
+    style = '<Style id="P%d">\n'\
+        '<IconStyle>\n'\
+        '<color>%s</color>\n'\
+        '<scale>0.3</scale>\n'\
+        '<Icon><href>http://maps.google.com/mapfiles/kml/shapes/track.png</href></Icon>'\
+        '</IconStyle>\n'\
+        '</Style>\n'
+
+    def __init__(self, file_path, getpostype):
+        header = KML_START + ''.join(
+            [self.style % (i, color) for i, color in enumerate(self.colors)])
+        super(GnssKmlWriter, self).__init__(file_path, header, 'ffffffff')
+        self.getpostype = getpostype
+
+    def format_coordinates(self, point):
+        msg, _ = point
+        return COORDINATES % (msg['lon'], msg['lat'], msg['hgt'] + msg['undulation'])
+
+    def format_placemark(self, point, index, is_last):
+        msg, vel = point
+        ms = msg['header_gps_seconds'] % 1000
+        utc = utc_time(gps_to_utc_seconds(msg['header_gps_week'], msg['header_gps_seconds'] / 1000))
+        north_velocity = vel['hor_spd'] * math.cos(vel['trk_gnd'] * PI / 180)
+        east_velocity = vel['hor_spd'] * math.sin(vel['trk_gnd'] * PI / 180)
+        up_velocity = vel['vert_spd']
+        height = msg['hgt'] + msg['undulation']
+        return PLACEMARK % ((placemark_name(index, is_last, utc, utc[5]),) + utc +
+            (ms / 10, msg['header_gps_week'], msg['header_gps_seconds'] / 1000,
+             utc[3], utc[4], utc[5] + ms / 1000, utc[0], utc[1], utc[2],
+             '%.8f' % msg['lat'], '%.8f' % msg['lon'], height,
+             north_velocity, east_velocity, -up_velocity, '0', '0', vel['trk_gnd'],
+             msg['sol_status'], msg['pos_type'], self.getpostype(msg['pos_type']),
+             vel['trk_gnd'], msg['lon'], msg['lat'], height))
+
+
+class InsKmlWriter(KmlWriter):
+    """Write ins kml of inspvax at 1hz"""
+    # color of ins status
+    pcolors = {0: 0, 1: 1, 2: 1, 3: 4, 6: 1, 7: 1}
+
+    def __init__(self, file_path):
+        super(InsKmlWriter, self).__init__(
+            file_path, build_header(GnssKmlWriter.colors), 'ffffffff')
+
+    def format_coordinates(self, point):
+        if math.fmod(point['header_gps_seconds'] / 1000 + 0.0005, 1.0) >= 0.005:
+            return ''
+        return COORDINATES % (point['lon'], point['lat'], point['hgt'] + point['undulation'])
+
+    def format_placemark(self, point, index, is_last):
+        if not (index == 0 or is_last or math.fmod(point['header_gps_seconds'] / 1000 + 0.0005, 1.0) < 0.005):
+            return ''
+
+        ms = point['header_gps_seconds'] % 1000
+        utc = utc_time(gps_to_utc_seconds(point['header_gps_week'], point['header_gps_seconds'] / 1000))
+        second = utc[5] + ms / 1000
+        height = point['hgt'] + point['undulation']
+        return PLACEMARK % ((placemark_name(index, is_last, utc, second),) + utc +
+            (ms / 10, point['header_gps_week'], point['header_gps_seconds'] / 1000,
+             utc[3], utc[4], second, utc[0], utc[1], utc[2],
+             '%.9f' % point['lat'], '%.9f' % point['lon'], height,
+             point['north_velocity'], point['east_velocity'], -point['up_velocity'],
+             '%.4f' % point['roll'], '%.4f' % point['pitch'], -point['azimuth'],
+             point['ins_status'], point['pos_type'], self.pcolors.get(point['ins_status'], 0),
+             point['azimuth'], point['lon'], point['lat'], height))
+
+
 class INS2000Parser:
     gga_nmea_file = 'ins-gga.nmea'
     gnssposvel_txt_file = 'gnssposvel.txt'
@@ -92,9 +169,11 @@ class INS2000Parser:
         self.sync_state = 0
         self.lastlctime = 0
 
-        self.gnss_kmls = []
-        self.gnss_vels = []
-        self.inspvaxs = []
+        # bestpos and bestvel wait in queues until they are paired
+        self.gnss_kmls = collections.deque()
+        self.gnss_vels = collections.deque()
+        self.gnss_kml = None
+        self.ins_kml = None
 
         self.files = {}
         self.packets = 0
@@ -120,9 +199,6 @@ class INS2000Parser:
                 else:
                     break
 
-        self.save_gnss_kml()
-        self.save_ins_kml()
-
         self.close_files()
 
     def init_files(self):
@@ -130,15 +206,19 @@ class INS2000Parser:
 
         files = [self.gga_nmea_file, self.gnssposvel_txt_file, self.gnssposvel_txt_file,
             self.gnss_txt_file, self.gnssvel_txt_file, self.imu_txt_file, self.ins_txt_file,
-            self.heading_txt_file, self.process_txt_file, self.gnss_kml_file, self.ins_kml_file]
+            self.heading_txt_file, self.process_txt_file]
         for filename in files:
             fo = open(self.out_prefix + filename, 'w')
             self.files[filename] = fo
+        self.gnss_kml = GnssKmlWriter(self.out_prefix + self.gnss_kml_file, self.getpostype)
+        self.ins_kml = InsKmlWriter(self.out_prefix + self.ins_kml_file)
 
     def close_files(self):
         """close all files"""
         for _, fo in self.files.items():
             fo.close()
+        self.gnss_kml.close()
+        self.ins_kml.close()
 
     def append_process_txt(self, data):
         """append process txt"""
@@ -306,7 +386,7 @@ class INS2000Parser:
         """trace gga nmea"""
         self.print_ins_txt(msg)
         if math.fabs(msg['lat']) > 0.001:
-            self.inspvaxs.append(msg)
+            self.ins_kml.add(msg)
 
         if not (math.fabs(msg['lat']) > 0.001 and (msg['ins_status'] == 3 or msg['ins_status'] == 6 or
             msg['ins_status'] == 7)):
@@ -342,6 +422,7 @@ class INS2000Parser:
 
         if math.fabs(msg['lat']) > 0.001:
             self.gnss_kmls.append(msg)
+            self.save_gnss_kml()
 
     def print_gnss_txt(self, msg):
         """print gnss txt"""
@@ -362,6 +443,7 @@ class INS2000Parser:
 
         if math.fabs(msg['hor_spd']) > 0.0001 or math.fabs(msg['vert_spd']) > 0.0001 or math.fabs(msg['trk_gnd']) > 0.0001:
             self.gnss_vels.append(msg)
+            self.save_gnss_kml()
 
     def trace_rawimusx(self, msg):
         """trace rawimusx"""
@@ -413,215 +495,12 @@ class INS2000Parser:
             self.write_file(self.gnssposvel_txt_file, gnssposvel_txt)
 
     def save_gnss_kml(self):
-        """save gnss kml"""
-        gnss_kml = ''
-        gnss_kml += '<?xml version="1.0" encoding="UTF-8"?>\n'
-        gnss_kml += '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
-        gnss_kml += '<Document>\n'
-
-        colors = ["ffffffff","ff0000ff","ffff00ff","50FF78F0","ff00ff00","ff00aaff"]
-
-        for i in range(6):
-            gnss_kml += '<Style id="P{:d}">\n'.format(i)
-            gnss_kml += '<IconStyle>\n'
-            gnss_kml += '<color>{:s}</color>\n'.format(colors[i])
-            gnss_kml += '<scale>0.3</scale>\n'
-            gnss_kml += '<Icon><href>http://maps.google.com/mapfiles/kml/shapes/track.png</href></Icon>'
-            gnss_kml += '</IconStyle>\n'
-            gnss_kml += '</Style>\n'
-
-        gnss_kml += "<Placemark>\n"\
-            + "<name>Rover Track</name>\n"\
-            + "<Style>\n"\
-            + "<LineStyle>\n"\
-            + "<color>ffffffff</color>\n"\
-            + "</LineStyle>\n"\
-            + "</Style>\n"\
-            + "<LineString>\n"\
-            + "<coordinates>\n"
-
-        for msg in self.gnss_kmls:
-            gnss_kml += '{:.9f},{:.9f},{:.3f}\n'.format(msg['lon'], msg['lat'], msg['hgt'] + msg['undulation'])
-
-        gnss_kml += "</coordinates>\n"\
-            + "</LineString>\n"\
-            + "</Placemark>\n"
-
-        gnss_kml += "<Folder>\n"\
-            + "<name>Rover Position</name>\n"
-
-        for i, msg in enumerate(self.gnss_kmls):
-            ep = self.weeksecondstoutc(msg['header_gps_week'], msg['header_gps_seconds'] / 1000, -18)
-            ep_sp = time.strptime(ep, "%Y-%m-%d %H:%M:%S")
-
-            vel = self.gnss_vels[i]
-            north_velocity = vel['hor_spd']* math.cos(vel['trk_gnd'] * PI / 180)
-            east_velocity = vel['hor_spd'] * math.sin(vel['trk_gnd'] * PI / 180)
-            up_velocity = vel['vert_spd']
-
+        """save paired bestpos and bestvel into gnss kml"""
+        while self.gnss_kmls and self.gnss_vels:
+            msg = self.gnss_kmls.popleft()
+            vel = self.gnss_vels.popleft()
             self.print_gnssposvel_txt(msg, vel)
-
-            gnss_kml += "<Placemark>\n"
-            if i <= 1:
-                gnss_kml += "<name>Start</name>\n"
-            elif i == len(self.gnss_kmls)-1:
-                gnss_kml += "<name>End</name>\n"
-            else:
-                if math.fmod(ep_sp[5] + 0.025, 30) < 0.05:
-                    gnss_kml += "<name>"\
-                        + "%02d" % ep_sp[3] + "%02d" % ep_sp[4] + "%02d" % ep_sp[5]\
-                        + "</name>\n"
-
-            gnss_kml += "<TimeStamp><when>"\
-                    + time.strftime("%Y-%m-%dT%H:%M:%S.", ep_sp)\
-                    + "%02dZ" % ((msg['header_gps_seconds']%1000)/10)\
-                    + "</when></TimeStamp>\n"
-
-            gnss_kml += "<description><![CDATA[\n"\
-                + "<TABLE border=\"1\" width=\"100%\" Align=\"center\">\n"\
-                + "<TR ALIGN=RIGHT>\n"\
-                + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Time:</TD><TD>"\
-                + str(msg['header_gps_week']) + "</TD><TD>" + "%.3f" % (msg['header_gps_seconds']/1000) + "</TD><TD>"\
-                + "%2d:%2d:%7.4f" % (ep_sp[3],ep_sp[4],ep_sp[5]+(msg['header_gps_seconds']%1000)/1000) + "</TD><TD>"\
-                + "%4d/%2d/%2d" % (ep_sp[0], ep_sp[1], ep_sp[2]) + "</TD></TR>\n"\
-                + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Position:</TD><TD>"\
-                + "%.8f" % msg['lat'] + "</TD><TD>" + "%.8f" % msg['lon'] + "</TD><TD>" + "%.4f" % (msg['hgt'] + msg['undulation']) + "</TD><TD>(DMS,m)</TD></TR>\n"\
-                + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Vel(N,E,D):</TD><TD>"\
-                + "%.4f" % north_velocity + "</TD><TD>" + "%.4f" % east_velocity + "</TD><TD>" + "%.4f" % (-up_velocity) + "</TD><TD>(m/s)</TD></TR>\n"\
-                + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Att(r,p,h):</TD><TD>"\
-                + "0" + "</TD><TD>" + "0" + "</TD><TD>" + "%.4f" % vel['trk_gnd'] + "</TD><TD>(deg,approx)</TD></TR>\n"\
-                + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Mode:</TD><TD>"\
-                + str(msg['sol_status']) + "</TD><TD>" + str(msg['pos_type']) + "</TD><TR>\n"\
-                + "</TABLE>\n"\
-                + "]]></description>\n"
-
-            color = self.getpostype(msg['pos_type'])
-            gnss_kml += "<styleUrl>#P" + str(color) + "</styleUrl>\n"\
-                    + "<Style>\n"\
-                    + "<IconStyle>\n"\
-                    + "<heading>" + "%.4f" % vel['trk_gnd'] + "</heading>\n"\
-                    + "</IconStyle>\n"\
-                    + "</Style>\n"
-
-            gnss_kml += "<Point>\n"\
-                    + "<coordinates>" + "%.9f,%.9f,%.3f" % (msg['lon'], msg['lat'], msg['hgt'] + msg['undulation']) + "</coordinates>\n"\
-                    + "</Point>\n"
-
-            gnss_kml += "</Placemark>\n"
-
-        gnss_kml += "</Folder>\n"\
-            + "</Document>\n"\
-            + "</kml>\n"
-
-        self.write_file(self.gnss_kml_file, gnss_kml)
-
-    def save_ins_kml(self):
-        """save ins kml"""
-        color = ["ffffffff","ff0000ff","ffff00ff","50FF78F0","ff00ff00","ff00aaff"]
-        ins_kml = "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n"\
-            + "<kml xmlns=\"http://www.opengis.net/kml/2.2\">\n"\
-            + "<Document>\n"
-        for i in range(6):
-            ins_kml += "<Style id=\"P" + str(i) + "\">\r\n"\
-                + "<IconStyle>\r\n"\
-                + "<color>" + color[i] + "</color>\n"\
-                + "<scale>0.3</scale>\n"\
-                + "<Icon><href>http://maps.google.com/mapfiles/kml/shapes/track.png</href></Icon>\n"\
-                + "</IconStyle>\n"\
-                + "</Style>\n"
-
-        ins_kml += "<Placemark>\n"\
-                + "<name>Rover Track</name>\n"\
-                + "<Style>\n"\
-                + "<LineStyle>\n"\
-                + "<color>ffffffff</color>\n"\
-                + "</LineStyle>\n"\
-                + "</Style>\n"\
-                + "<LineString>\n"\
-                + "<coordinates>\n"
-
-        for ins in self.inspvaxs:
-            if math.fmod(ins['header_gps_seconds'] / 1000 + 0.0005, 1.0) < 0.005:
-                ins_kml += '{:.9f},{:.9f},{:.3f}\n'.format(ins['lon'], ins['lat'], ins['hgt'] + ins['undulation'])
-
-        ins_kml += "</coordinates>\n"\
-            + "</LineString>\n"\
-            + "</Placemark>\n"
-
-        ins_kml += "<Folder>\n"\
-            + "<name>Rover Position</name>\n"
-
-        for i, ins in enumerate(self.inspvaxs):
-            ep = self.weeksecondstoutc(ins['header_gps_week'], ins['header_gps_seconds'] / 1000, -18)
-            ep_sp = time.strptime(ep, "%Y-%m-%d %H:%M:%S")
-
-            if i == 0 or i == len(self.inspvaxs)-1 or math.fmod(ins['header_gps_seconds'] / 1000 + 0.0005, 1.0) < 0.005:
-                ins_kml += "<Placemark>\n"
-                if i <= 1:
-                    ins_kml += "<name>Start</name>\n"
-                elif i == len(self.inspvaxs)-1:
-                    ins_kml += "<name>End</name>\n"
-                else:
-                    if math.fmod(ep_sp[5]+(ins['header_gps_seconds'] % 1000)/1000+0.025, 30) < 0.05:
-                        ins_kml += "<name>"\
-                            + "%02d" % ep_sp[3] + "%02d" % ep_sp[4] + "%02d" % ep_sp[5]\
-                            + "</name>\n"
-
-                ins_kml += "<TimeStamp><when>"\
-                    + time.strftime("%Y-%m-%dT%H:%M:%S.", ep_sp)\
-                    + "%02dZ" % ((ins['header_gps_seconds']%1000)/10)\
-                    + "</when></TimeStamp>\n"
-
-                ins_kml += "<description><![CDATA[\n"\
-                    + "<TABLE border=\"1\" width=\"100%\" Align=\"center\">\n"\
-                    + "<TR ALIGN=RIGHT>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Time:</TD><TD>"\
-                    + str(ins['header_gps_week']) + "</TD><TD>" + "%.3f" % (ins['header_gps_seconds']/1000) + "</TD><TD>"\
-                    + "%2d:%2d:%7.4f" % (ep_sp[3],ep_sp[4],ep_sp[5]+(ins['header_gps_seconds']%1000)/1000) + "</TD><TD>"\
-                    + "%4d/%2d/%2d" % (ep_sp[0], ep_sp[1], ep_sp[2]) + "</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Position:</TD><TD>"\
-                    + "%.9f" % ins['lat'] + "</TD><TD>" + "%.9f" % ins['lon'] + "</TD><TD>" + "%.4f" % (ins['hgt'] + ins['undulation']) + "</TD><TD>(DMS,m)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Vel(N,E,D):</TD><TD>"\
-                    + "%.4f" % ins['north_velocity'] + "</TD><TD>" + "%.4f" % ins['east_velocity'] + "</TD><TD>" + "%.4f" % (-ins['up_velocity']) + "</TD><TD>(m/s)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Att(r,p,h):</TD><TD>"\
-                    + "%.4f" % ins['roll'] + "</TD><TD>" + "%.4f" % ins['pitch'] + "</TD><TD>" + "%.4f" % (-ins['azimuth']) + "</TD><TD>(deg,approx)</TD></TR>\n"\
-                    + "<TR ALIGN=RIGHT><TD ALIGN=LEFT>Mode:</TD><TD>"\
-                    + str(ins['ins_status']) + "</TD><TD>" + str(ins['pos_type']) + "</TD><TR>\n"\
-                    + "</TABLE>\n"\
-                    + "]]></description>\n"
-
-                pcolor = 0
-                if ins['ins_status'] == 0:     # "INS_INACTIVE"
-                    pcolor = 0
-                elif ins['ins_status'] == 1:   # "SPP/INS_SPP"
-                    pcolor = 1
-                elif ins['ins_status'] == 2:   # "PSRDIFF/INS_PSRDIFF (RTD)"
-                    pcolor = 1
-                elif ins['ins_status'] == 3:   # "INS_DR"
-                    pcolor = 4
-                elif ins['ins_status'] == 6:   # "RTK_FIX/INS_RTKFIXED"
-                    pcolor = 1
-                elif ins['ins_status'] == 7:   # "RTK_FLOAT/INS_RTKFLOAT"
-                    pcolor = 1
-
-                ins_kml += "<styleUrl>#P" + str(pcolor) + "</styleUrl>\n"\
-                    + "<Style>\n"\
-                    + "<IconStyle>\n"\
-                    + "<heading>" + "%.4f" % ins['azimuth'] + "</heading>\n"\
-                    + "</IconStyle>\n"\
-                    + "</Style>\n"
-
-                ins_kml += "<Point>\n"\
-                    + "<coordinates>" + "%.9f,%.9f,%.3f" % (ins['lon'], ins['lat'], ins['hgt'] + ins['undulation']) + "</coordinates>\n"\
-                    + "</Point>\n"
-
-                ins_kml += "</Placemark>\n"
-
-        ins_kml += "</Folder>\n"\
-            + "</Document>\n"\
-            + "</kml>\n"
-
-        self.write_file(self.ins_kml_file, ins_kml)
+            self.gnss_kml.add((msg, vel))
 
     def output_gga_nmea(self, time, pos_type, blh, ns, dop, age):
         """output gga nmea"""
@@ -750,12 +629,6 @@ class INS2000Parser:
         dms[2] = a
         dms[0] *= sign
 
-    def weeksecondstoutc(self, gpsweek, gpsseconds, leapseconds):
-        datetimeformat = "%Y-%m-%d %H:%M:%S"
-        epoch = datetime.datetime.strptime("1980-01-06 00:00:00",datetimeformat)
-        elapsed = datetime.timedelta(days=(gpsweek*7),seconds=(gpsseconds+leapseconds))
-        return datetime.datetime.strftime(epoch + elapsed,datetimeformat)
-
     def write_file(self, file, data):
         if self.files[file] is not None:
             self.files[file].write(data)